@@ -616,5 +616,43 @@ def get_atcud_report(company=None, doctype=None, date_from=None, date_to=None):
 		}
 
 
+# Colunas comuns ao ATCUD Log e ao ATCUD Log Archive
+ATCUD_REPORT_FIELDS = (
+	"name", "creation", "document_type", "document_name", "document_date", "company", "series_used",
+	"fiscal_year", "atcud_code", "validation_code_used", "sequence_number", "generation_status",
+	"generation_date"
+)
+ATCUD_REPORT_DEFAULT_FIELDS = (
+	"name", "creation", "document_type", "document_name", "company", "atcud_code", "generation_status"
+)
+
+
+@frappe.whitelist()
+def get_atcud_report_page(company=None, doctype=None, date_from=None, date_to=None, fields=None,
+						  sort_order="desc", cursor=None, page_length=None):
+	"""
+	✅ Linhas do relatório ATCUD paginadas por cursor (creation, name)
+
+	Para a página seguinte, repetir o pedido com cursor=next_cursor.
+	total só vem na primeira página (estimativa, ver keyset_pagination).
+	"""
+	from portugal_compliance.utils.atcud_log_store import get_atcud_log_page
+	from portugal_compliance.utils.keyset_pagination import parse_fields, parse_sort
+
+	_sort_by, sort_order = parse_sort("creation", sort_order, ("creation",))
+	fields = parse_fields(fields, ATCUD_REPORT_FIELDS, ATCUD_REPORT_DEFAULT_FIELDS)
+
+	filters = {}
+	if company:
+		filters["company"] = company
+	if doctype:
+		filters["document_type"] = doctype
+
+	page = get_atcud_log_page(filters, fields=fields, from_date=date_from, to_date=date_to,
+							  sort_order=sort_order, cursor=cursor, page_length=page_length)
+	page["success"] = True
+	return page
+
+
 # ========== LOG FINAL ==========
 frappe.logger().info("ATCUD API ALINHADO loaded - Version 2.1.0 - Fully Corrected & Compatible")
@@ -335,7 +335,7 @@ def communicate_series_safe(company_doc, settings):
 				"is_active": 1,
 				"is_communicated": 0
 			},
-			fields=["name", "prefix", "document_type"]
+			fields=["name", "prefix", "document_type", "naming_series"]
 		)
 
 		if not series_to_communicate:
@@ -345,21 +345,12 @@ def communicate_series_safe(company_doc, settings):
 				'communicated_count': 0
 			}
 
-		# ✅ SIMULAR COMUNICAÇÃO SEM TOCAR NA COMPANY
-		communicated_count = 0
-		for series in series_to_communicate:
-			try:
-				# ✅ ATUALIZAR APENAS A SÉRIE, NÃO A COMPANY
-				series_doc = frappe.get_doc("Portugal Series Configuration", series.name)
-				series_doc.is_communicated = 1
-				series_doc.communication_date = frappe.utils.now()
-				series_doc.at_response = f"Simulação: Série {series.prefix} comunicada com sucesso"
-				series_doc.flags.ignore_validate = True
-				series_doc.save(ignore_permissions=True)
-				communicated_count += 1
+		# ✅ COMUNICAR EM BACKGROUND (sem tocar na company): credenciais da empresa
+		from portugal_compliance.utils.series_communication import PROGRESS_EVENT, \
+			enqueue_series_communication
 
-			except Exception as e:
-				frappe.log_error(f"Erro ao comunicar série {series.name}: {str(e)}")
+		job = enqueue_series_communication(company_doc.name,
+										   [series.naming_series for series in series_to_communicate])
 
 		# ✅ GARANTIR COMPLIANCE SEM SAVE DA COMPANY
 		if original_compliance:
@@ -369,9 +360,12 @@ def communicate_series_safe(company_doc, settings):
 
 		return {
 			'success': True,
-			'message': f'{communicated_count} séries comunicadas com sucesso',
-			'communicated_count': communicated_count,
-			'total_series': len(series_to_communicate)
+			'queued': True,
+			'message': f'Comunicação de {job["total_series"]} séries iniciada',
+			'job_id': job['job_id'],
+			'already_running': job['already_running'],
+			'total_series': job['total_series'],
+			'progress_event': PROGRESS_EVENT
 		}
 
 	except Exception as e:
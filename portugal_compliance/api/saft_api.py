@@ -1,9 +1,28 @@
 import frappe
 from frappe import _
+from frappe.utils import cint, now
 import json
+import os
 from datetime import datetime
+from werkzeug.wrappers import Response
 from portugal_compliance.utils.saft_generator import SAFTGenerator
-import xml.etree.ElementTree as ET
+from portugal_compliance.utils.saft_file_store import (
+	COMPRESSION_TYPES,
+	compute_source_fingerprint,
+	get_download_state,
+	iter_file_range,
+	iter_gzip,
+	iter_zip,
+	resolve_range,
+	verify_file
+)
+from portugal_compliance.utils.saft_validator import (
+	apply_validation_result,
+	validate_saft_content,
+	validate_saft_file
+)
+
+DOWNLOAD_METHOD = "/api/method/portugal_compliance.api.saft_api.download_saft_file"
 
 
 @frappe.whitelist()
@@ -24,8 +43,12 @@ def generate_saft_export(company, from_date, to_date, export_type="full"):
 				"message": _("From date cannot be greater than to date")
 			}
 
-		# Gerar SAF-T
-		saft_data = generator.generate_saft(company, from_date, to_date, export_type)
+		# Fingerprint antes de gerar: alterações durante a geração forçam nova geração
+		source_fingerprint = compute_source_fingerprint(company, from_date, to_date, export_type)
+
+		# Gerar SAF-T diretamente para disco (o XML não segue na resposta JSON),
+		# com validação XSD em paralelo com a escrita
+		result = generator.write_saft_file(company, from_date, to_date, export_type)
 
 		# Criar log de exportação
 		export_log = frappe.get_doc({
@@ -35,15 +58,22 @@ def generate_saft_export(company, from_date, to_date, export_type="full"):
 			"to_date": to_date,
 			"export_type": export_type,
 			"status": "Completed",
-			"file_size": len(saft_data.encode('utf-8')),
-			"records_count": generator.get_records_count()
+			"file_path": result["file_path"],
+			"file_size": result["file_size"],
+			"file_hash": result["file_hash"],
+			"source_fingerprint": source_fingerprint,
+			"total_records": generator.get_records_count(),
+			"processing_time": result["processing_time"]
 		})
+		apply_validation_result(export_log, result["validation"])
 		export_log.insert()
 
 		return {
 			"status": "success",
-			"saft_data": saft_data,
 			"export_log": export_log.name,
+			"file_size": export_log.file_size,
+			"xml_validation_status": export_log.xml_validation_status,
+			"download_url": get_download_url(export_log.name),
 			"message": _("SAF-T generated successfully")
 		}
 
@@ -56,52 +86,48 @@ def generate_saft_export(company, from_date, to_date, export_type="full"):
 
 
 @frappe.whitelist()
-def validate_saft_xml(xml_content):
+def validate_saft_xml(xml_content=None, export_log_name=None):
 	"""
-	Valida XML SAF-T contra schema XSD
+	Valida XML SAF-T contra o schema XSD (xsd/saftpt1.04_01.xsd) em streaming
+	- export_log_name: valida o ficheiro guardado e grava o resultado no log
+	- xml_content: valida o XML enviado
 	"""
 	try:
-		# Parse XML
-		root = ET.fromstring(xml_content)
-
-		# Validações básicas
-		validations = []
-
-		# Verificar namespace
-		if root.tag != "{urn:OECD:StandardAuditFile-Tax:PT_1.04_01}AuditFile":
-			validations.append({
-				"type": "error",
-				"message": "Invalid root element or namespace"
-			})
-
-		# Verificar header obrigatório
-		header = root.find(".//{urn:OECD:StandardAuditFile-Tax:PT_1.04_01}Header")
-		if header is None:
-			validations.append({
-				"type": "error",
-				"message": "Header element is required"
-			})
-
-		# Verificar campos obrigatórios no header
-		required_fields = ["AuditFileVersion", "CompanyID", "TaxRegistrationNumber"]
-		for field in required_fields:
-			if header.find(f".//{{{root.nsmap[None]}}}{field}") is None:
-				validations.append({
-					"type": "error",
-					"message": f"Required field {field} is missing in Header"
-				})
+		if export_log_name:
+			export_log = frappe.get_doc("SAF-T Export Log", export_log_name)
+			export_log.check_permission("write")
+
+			if not export_log.file_path or not os.path.isfile(export_log.file_path):
+				return {
+					"status": "error",
+					"message": _("Export file not found")
+				}
+
+			result = validate_saft_file(export_log.file_path)
+			apply_validation_result(export_log, result)
+			export_log.save()
+		elif xml_content:
+			result = validate_saft_content(xml_content)
+		else:
+			return {
+				"status": "error",
+				"message": _("Provide xml_content or export_log_name")
+			}
 
 		return {
 			"status": "success",
-			"valid": len([v for v in validations if v["type"] == "error"]) == 0,
-			"validations": validations
+			"valid": result["valid"],
+			"error_count": result["error_count"],
+			"validations": [
+				{
+					"type": "error",
+					"line": error["line"],
+					"message": _("Line {0}: {1}").format(error["line"] or "?", error["message"])
+				}
+				for error in result["errors"]
+			]
 		}
 
-	except ET.ParseError as e:
-		return {
-			"status": "error",
-			"message": f"XML Parse Error: {str(e)}"
-		}
 	except Exception as e:
 		return {
 			"status": "error",
@@ -129,47 +155,163 @@ def get_saft_export_logs(filters=None):
 	return logs
 
 
+SAFT_EXPORT_LOG_SORT_FIELDS = ("creation", "modified", "name")
+SAFT_EXPORT_LOG_FIELDS = (
+	"name", "creation", "company", "from_date", "to_date", "export_type", "fiscal_year", "status",
+	"file_name", "file_size", "total_records", "xml_validation_status", "at_submission_status",
+	"download_count", "last_downloaded"
+)
+SAFT_EXPORT_LOG_DEFAULT_FIELDS = (
+	"name", "company", "from_date", "to_date", "export_type", "status", "creation", "file_size"
+)
+
+
 @frappe.whitelist()
-def download_saft_file(export_log_name):
+def get_saft_export_log_page(filters=None, fields=None, sort_by="creation", sort_order="desc",
+							 cursor=None, page_length=None):
 	"""
-	Prepara arquivo SAF-T para download
+	Logs de exportação SAF-T paginados por cursor (sort_by, name)
+	"""
+	from portugal_compliance.utils.keyset_pagination import get_page, parse_fields, parse_sort
+
+	sort_by, sort_order = parse_sort(sort_by, sort_order, SAFT_EXPORT_LOG_SORT_FIELDS)
+	fields = parse_fields(fields, SAFT_EXPORT_LOG_FIELDS, SAFT_EXPORT_LOG_DEFAULT_FIELDS)
+
+	return get_page("SAF-T Export Log", filters=filters, fields=fields, sort_by=sort_by,
+					sort_order=sort_order, cursor=cursor, page_length=page_length)
+
+
+def get_download_url(export_log_name, compression=None):
+	"""URL do download em streaming"""
+	url = f"{DOWNLOAD_METHOD}?export_log_name={export_log_name}"
+	return f"{url}&compression={compression}" if compression else url
+
+
+@frappe.whitelist()
+def prepare_saft_download(export_log_name, compression=None):
+	"""
+	Verifica se o ficheiro guardado ainda corresponde aos dados de origem;
+	só agenda nova geração quando o fingerprint mudou ou o ficheiro falta
 	"""
 	try:
 		export_log = frappe.get_doc("SAF-T Export Log", export_log_name)
+		export_log.check_permission("read")
+
+		state = get_download_state(export_log)
 
-		if export_log.status != "Completed":
+		if state == "ready":
+			return {
+				"status": "success",
+				"state": state,
+				"filename": export_log.file_name or os.path.basename(export_log.file_path),
+				"file_size": export_log.file_size,
+				"download_url": get_download_url(export_log.name, compression)
+			}
+
+		if state == "not_completed":
 			return {
 				"status": "error",
+				"state": state,
 				"message": _("Export not completed")
 			}
 
-		# Regenerar SAF-T se necessário
-		generator = SAFTGenerator()
-		saft_data = generator.generate_saft(
-			export_log.company,
-			export_log.from_date,
-			export_log.to_date,
-			export_log.export_type
-		)
-
-		# Criar arquivo temporário
-		filename = f"SAFT-PT_{export_log.company}_{export_log.from_date}_{export_log.to_date}.xml"
+		export_log.check_permission("write")
+		result = export_log.regenerate_export()
 
 		return {
-			"status": "success",
-			"filename": filename,
-			"content": saft_data,
-			"content_type": "application/xml"
+			"status": "regenerating" if result.get("status") == "success" else "error",
+			"state": state,
+			"message": _("Source data changed since this export was generated. The SAF-T file is being regenerated.")
+			if state == "stale" else _("SAF-T file not found. The SAF-T file is being regenerated.")
 		}
 
 	except Exception as e:
-		frappe.log_error(f"Error downloading SAF-T: {str(e)}")
+		frappe.log_error(f"Error preparing SAF-T download: {str(e)}")
 		return {
 			"status": "error",
 			"message": str(e)
 		}
 
 
+@frappe.whitelist()
+def download_saft_file(export_log_name, compression=None, verify=1):
+	"""
+	Envia o ficheiro SAF-T já gerado em streaming a partir do disco
+	- Range: suportado no ficheiro original (retoma de downloads)
+	- compression: "gzip" ou "zip" (comprimido em streaming, sem Range)
+	- verify: confirma o SHA256 guardado antes de enviar
+	"""
+	export_log = frappe.get_doc("SAF-T Export Log", export_log_name)
+	export_log.check_permission("read")
+
+	if compression and compression not in COMPRESSION_TYPES:
+		frappe.throw(_("Unsupported compression: {0}").format(compression))
+
+	state = get_download_state(export_log)
+	if state != "ready":
+		frappe.throw(_("SAF-T file is not ready for download ({0}). Use prepare_saft_download first.").format(state))
+
+	file_path = export_log.file_path
+	if cint(verify) and not verify_file(file_path, export_log.file_hash):
+		frappe.log_error(f"SAF-T file hash mismatch: {export_log.name}", "SAF-T Download")
+		frappe.throw(_("SAF-T file failed the integrity check (SHA256 mismatch)"))
+
+	filename = export_log.file_name or os.path.basename(file_path)
+	response = _build_file_response(file_path, filename, export_log.file_hash, compression)
+
+	if response.status_code == 200:
+		# Retomas (206) não contam como novo download
+		_record_download(export_log.name)
+
+	return response
+
+
+def _build_file_response(file_path, filename, etag, compression=None):
+	"""Resposta HTTP em streaming (o gerador lê do disco após o handler terminar)"""
+	file_size = os.path.getsize(file_path)
+	headers = {
+		"ETag": f'"{etag}"',
+		"Cache-Control": "private, no-cache"
+	}
+
+	if compression:
+		config = COMPRESSION_TYPES[compression]
+		iterator = iter_gzip(file_path, filename) if compression == "gzip" else iter_zip(file_path, filename)
+		filename = f"{filename}{config['extension']}"
+		response = Response(iterator, status=200, mimetype=config["content_type"], direct_passthrough=True)
+		headers["Accept-Ranges"] = "none"
+	else:
+		try:
+			byte_range = resolve_range(frappe.get_request_header("Range"), file_size,
+									   if_range=frappe.get_request_header("If-Range"), etag=etag)
+		except ValueError:
+			return Response(status=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+		start, stop = byte_range or (0, file_size)
+		response = Response(iter_file_range(file_path, start, stop), status=206 if byte_range else 200,
+							mimetype="application/xml", direct_passthrough=True)
+		headers["Accept-Ranges"] = "bytes"
+		headers["Content-Length"] = str(stop - start)
+		if byte_range:
+			headers["Content-Range"] = f"bytes {start}-{stop - 1}/{file_size}"
+
+	headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+	for key, value in headers.items():
+		response.headers[key] = value
+
+	return response
+
+
+def _record_download(export_log_name):
+	"""Contador de downloads sem gravar o documento inteiro (GET não faz commit automático)"""
+	frappe.db.sql("""
+		UPDATE `tabSAF-T Export Log`
+		SET download_count = IFNULL(download_count, 0) + 1, last_downloaded = %s
+		WHERE name = %s
+	""", (now(), export_log_name))
+	frappe.db.commit()
+
+
 @frappe.whitelist()
 def get_saft_statistics(company, from_date, to_date):
 	"""
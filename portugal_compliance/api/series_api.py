@@ -21,8 +21,8 @@ from datetime import datetime
 # ========== IMPORTAÇÕES CORRIGIDAS ==========
 
 # ✅ IMPORTAÇÕES CORRETAS (baseadas nos arquivos reais)
-from portugal_compliance.utils.at_webservice import ATWebserviceClient
 from portugal_compliance.utils.document_hooks import portugal_document_hooks
+from portugal_compliance.utils.series_communication import PROGRESS_EVENT, enqueue_series_communication
 
 
 # ========== APIs DE COMUNICAÇÃO COM AT CORRIGIDAS ==========
@@ -32,6 +32,8 @@ def communicate_series_to_at(username=None, password=None, series_names=None, co
 	"""
 	✅ CORRIGIDO: API para comunicar séries à AT (usando métodos reais)
 	Baseado na sua experiência com programação.autenticação[2]
+	✅ BACKGROUND: Devolve o job_id de imediato; progresso em series_communication_progress
+	ou get_series_communication_status
 	"""
 	try:
 		# ✅ VALIDAR PARÂMETROS
@@ -41,19 +43,17 @@ def communicate_series_to_at(username=None, password=None, series_names=None, co
 				"error": "Username e password são obrigatórios para comunicação com AT"
 			}
 
-		# ✅ OBTER SÉRIES PARA COMUNICAR
+		# ✅ OBTER SÉRIES PARA COMUNICAR (agrupadas por empresa)
+		series_by_company = {}
 		if series_names:
 			if isinstance(series_names, str):
 				series_names = json.loads(series_names)
 
-			series_to_communicate = []
-			for name in series_names:
-				try:
-					series_doc = frappe.get_doc("Portugal Series Configuration", name)
-					if not series_doc.is_communicated:
-						series_to_communicate.append(series_doc.naming_series)
-				except frappe.DoesNotExistError:
-					continue
+			series_list = frappe.get_all(
+				"Portugal Series Configuration",
+				filters={"name": ["in", series_names], "is_communicated": 0},
+				fields=["naming_series", "company"]
+			)
 		else:
 			# ✅ BUSCAR SÉRIES NÃO COMUNICADAS
 			filters = {"is_communicated": 0, "is_active": 1}
@@ -66,48 +66,28 @@ def communicate_series_to_at(username=None, password=None, series_names=None, co
 				fields=["naming_series", "company"]
 			)
 
-			series_to_communicate = [s.naming_series for s in series_list]
+		for series in series_list:
+			series_by_company.setdefault(series.company, []).append(series.naming_series)
 
-		if not series_to_communicate:
+		if not series_by_company:
 			return {
 				"success": False,
 				"error": "Nenhuma série ativa para comunicar"
 			}
 
-		# ✅ COMUNICAR À AT (usando método real do ATWebserviceClient)
-		client = ATWebserviceClient()
-		results = []
-		successful = 0
-		failed = 0
-
-		for naming_series in series_to_communicate:
-			try:
-				# ✅ USAR MÉTODO REAL: register_naming_series
-				result = client.register_naming_series(naming_series, company, username, password)
-
-				if result.get("success"):
-					successful += 1
-				else:
-					failed += 1
-
-				results.append({
-					"naming_series": naming_series,
-					"result": result
-				})
-
-			except Exception as e:
-				failed += 1
-				results.append({
-					"naming_series": naming_series,
-					"result": {"success": False, "error": str(e)}
-				})
+		# ✅ COMUNICAR À AT EM BACKGROUND: um job por empresa, progresso por realtime
+		jobs = [
+			enqueue_series_communication(series_company, naming_series, username, password)
+			for series_company, naming_series in series_by_company.items()
+		]
 
 		return {
 			"success": True,
-			"total_series": len(series_to_communicate),
-			"successful": successful,
-			"failed": failed,
-			"results": results
+			"queued": True,
+			"job_id": jobs[0]["job_id"] if len(jobs) == 1 else None,
+			"jobs": jobs,
+			"total_series": sum(job["total_series"] for job in jobs),
+			"progress_event": PROGRESS_EVENT
 		}
 
 	except Exception as e:
@@ -553,6 +533,45 @@ def get_series_report(company=None, include_stats=True):
 		}
 
 
+SERIES_REPORT_SORT_FIELDS = ("creation", "modified", "name")
+SERIES_REPORT_FIELDS = (
+	"name", "creation", "modified", "series_name", "company", "document_type", "prefix", "naming_series",
+	"is_active", "current_sequence", "total_documents_issued", "last_document_date", "is_communicated",
+	"communication_date", "validation_code", "at_environment"
+)
+SERIES_REPORT_DEFAULT_FIELDS = (
+	"name", "series_name", "company", "document_type", "prefix", "is_active", "is_communicated",
+	"validation_code", "current_sequence", "total_documents_issued"
+)
+
+
+@frappe.whitelist()
+def get_series_report_page(company=None, is_active=None, is_communicated=None, fields=None,
+						   sort_by="creation", sort_order="desc", cursor=None, page_length=None):
+	"""
+	✅ Relatório de séries paginado por cursor (sort_by, name)
+
+	Os totais por série vêm de total_documents_issued (sem COUNT por série).
+	"""
+	from portugal_compliance.utils.keyset_pagination import get_page, parse_fields, parse_sort
+
+	sort_by, sort_order = parse_sort(sort_by, sort_order, SERIES_REPORT_SORT_FIELDS)
+	fields = parse_fields(fields, SERIES_REPORT_FIELDS, SERIES_REPORT_DEFAULT_FIELDS)
+
+	filters = {}
+	if company:
+		filters["company"] = company
+	if is_active not in (None, ""):
+		filters["is_active"] = cint(is_active)
+	if is_communicated not in (None, ""):
+		filters["is_communicated"] = cint(is_communicated)
+
+	page = get_page("Portugal Series Configuration", filters=filters, fields=fields, sort_by=sort_by,
+					sort_order=sort_order, cursor=cursor, page_length=page_length)
+	page["success"] = True
+	return page
+
+
 # ========== APIs DE UTILITÁRIOS CORRIGIDAS ==========
 
 @frappe.whitelist()
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Benchmark Data Generator - Portugal Compliance
+Dados sintéticos determinísticos para o benchmark dos caminhos críticos
+✅ DETERMINÍSTICO: Mesma seed -> mesmas empresas, séries, NIFs, clientes e faturas
+✅ BULK INSERT: Empresas, séries, clientes e cabeçalhos de faturas (análise de
+   lacunas) inseridos em lote - nomes começam por PTBENCH
+✅ EM MEMÓRIA: Faturas para ATCUD/doc_events são documentos não gravados;
+   o contexto SAF-T gera as faturas à medida (1M linhas sem as ter em memória)
+
+Uso:
+	dataset = generate_dataset(companies=2, parties=1000, documents_per_series=10000)
+	...
+	remove_dataset()
+"""
+
+import random
+from datetime import date, datetime, time as datetime_time, timedelta
+
+import frappe
+from frappe.utils import cint, flt
+
+from portugal_compliance.benchmarks.party_search import (
+	BENCHMARK_NAME_PREFIX,
+	remove_benchmark_parties,
+	seed_benchmark_parties
+)
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.nif_validator import compute_check_digit
+
+SERIES_DOCTYPE = "Portugal Series Configuration"
+
+BENCHMARK_COMPANY_PREFIX = "PTBENCH Empresa"
+DEFAULT_SEED = 42
+DEFAULT_YEAR = 2025
+MAX_COMPANIES = 99
+
+# Lacuna sintética a cada N documentos (análise de sequência)
+GAP_EVERY = 97
+INSERT_CHUNK_SIZE = 10000
+
+ITEM_POOL_SIZE = 500
+UOMS = ("Un", "Kg", "Hora", "Cx")
+TAX_RATES = (23, 13, 6)
+
+
+def make_nif(rng, first_digits="125689"):
+	"""NIF válido (mod 11) com o primeiro dígito escolhido de first_digits"""
+	first_eight = f"{rng.choice(first_digits)}{rng.randrange(10 ** 7):07d}"
+	return f"{first_eight}{compute_check_digit(first_eight)}"
+
+
+def make_validation_code(rng):
+	"""Código de validação AT sintético: 10 caracteres A-Z0-9 com pelo menos uma letra"""
+	code = "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ23456789") for _ in range(9))
+	return rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ") + code
+
+
+def get_company_name(index):
+	return f"{BENCHMARK_COMPANY_PREFIX} {index:02d}"
+
+
+def get_series_prefix(index, year=DEFAULT_YEAR):
+	"""Prefixo no formato XXYYYY + COMPANY (ex.: FT2025PB1)"""
+	return f"FT{year}PB{index}"
+
+
+def get_customer_name(index):
+	"""Nome dado por seed_benchmark_parties ao cliente index"""
+	return f"{BENCHMARK_NAME_PREFIX}{index:07d}"
+
+
+class LazyRecords:
+	"""
+	Sequência de registos gerados à medida: len() sem materializar a lista,
+	cada iteração volta a gerar os mesmos registos
+	"""
+
+	def __init__(self, count, factory):
+		self.count = cint(count)
+		self.factory = factory
+
+	def __len__(self):
+		return self.count
+
+	def __iter__(self):
+		return (self.factory(index) for index in range(self.count))
+
+
+class BenchmarkDataset:
+	"""
+	✅ Conjunto de dados sintéticos de uma seed
+
+	Só os dados em memória (faturas, contexto SAF-T) são criados aqui;
+	insert() grava empresas, séries, clientes e cabeçalhos de faturas.
+	"""
+
+	def __init__(self, companies=2, parties=1000, documents_per_series=10000, seed=DEFAULT_SEED,
+				 year=DEFAULT_YEAR):
+		if not 0 < cint(companies) <= MAX_COMPANIES:
+			frappe.throw(f"Número de empresas deve estar entre 1 e {MAX_COMPANIES}")
+
+		self.seed = cint(seed)
+		self.year = cint(year)
+		self.parties = max(cint(parties), 1)
+		self.documents_per_series = cint(documents_per_series)
+
+		rng = random.Random(self.seed)
+		self.companies = []
+		self.series = []
+
+		for index in range(1, cint(companies) + 1):
+			company = frappe._dict({
+				"name": get_company_name(index),
+				"abbr": f"PB{index}",
+				"tax_id": make_nif(rng, "5"),
+				"default_currency": "EUR"
+			})
+			self.companies.append(company)
+
+			prefix = get_series_prefix(index, self.year)
+			self.series.append(frappe._dict({
+				"name": f"{BENCHMARK_COMPANY_PREFIX} {prefix}",
+				"company": company.name,
+				"document_type": "Sales Invoice",
+				"prefix": prefix,
+				"naming_series": f"{prefix}.####",
+				"validation_code": make_validation_code(rng),
+				"is_communicated": 1,
+				"current_sequence": self.documents_per_series + 1
+			}))
+
+		self.items = [
+			frappe._dict({
+				"item_code": f"{BENCHMARK_NAME_PREFIX}ITEM-{index:04d}",
+				"item_name": f"Artigo sintético {index}",
+				"uom": rng.choice(UOMS),
+				"rate": flt(rng.uniform(0.5, 500), 2),
+				"tax_rate": rng.choice(TAX_RATES)
+			})
+			for index in range(ITEM_POOL_SIZE)
+		]
+
+		# Quantidades pré-sorteadas: a linha n usa quantities[n % len]
+		self.quantities = [rng.randint(1, 20) for _ in range(997)]
+
+	# ---------- GRAVAÇÃO ----------
+
+	def insert(self):
+		"""Gravar empresas, séries, clientes e cabeçalhos (idempotente)"""
+		timestamp = frappe.utils.now()
+		audit = (timestamp, timestamp, "Administrator", "Administrator")
+
+		frappe.db.bulk_insert("Company", [
+			"name", "company_name", "abbr", "default_currency", "country", "tax_id",
+			"portugal_compliance_enabled", "creation", "modified", "owner", "modified_by"
+		], [
+			(company.name, company.name, company.abbr, company.default_currency, "Portugal",
+			 company.tax_id, 1, *audit)
+			for company in self.companies
+		], ignore_duplicates=True)
+
+		frappe.db.bulk_insert(SERIES_DOCTYPE, [
+			"name", "series_name", "company", "document_type", "prefix", "naming_series",
+			"is_active", "current_sequence", "is_communicated", "validation_code",
+			"communication_date", "creation", "modified", "owner", "modified_by"
+		], [
+			(series.name, series.name, series.company, series.document_type, series.prefix,
+			 series.naming_series, 1, series.current_sequence, series.is_communicated,
+			 series.validation_code, timestamp, *audit)
+			for series in self.series
+		], ignore_duplicates=True)
+		frappe.db.commit()
+
+		seed_benchmark_parties("Customer", rows=self.parties)
+		self.insert_invoice_headers()
+
+		compliance_cache.invalidate("company")
+		compliance_cache.invalidate("party")
+		compliance_cache.invalidate("series")
+
+	def insert_invoice_headers(self, chunk_size=INSERT_CHUNK_SIZE):
+		"""
+		Cabeçalhos de Sales Invoice por série (sem linhas, com ATCUD), com uma lacuna
+		a cada GAP_EVERY números - só para a auditoria de sequências
+		"""
+		fields = ["name", "naming_series", "company", "customer", "posting_date", "currency", "atcud_code",
+				  "docstatus", "net_total", "grand_total", "creation", "modified", "owner", "modified_by"]
+
+		for series in self.series:
+			values = []
+			for number in range(1, self.documents_per_series + 1):
+				if number % GAP_EVERY == 0:
+					continue
+
+				invoice = self.make_invoice_header(series, number)
+				values.append((invoice.name, series.naming_series, series.company, invoice.customer,
+							   invoice.posting_date, "EUR", f"{series.validation_code}-{number:08d}", 1,
+							   invoice.net_total, invoice.grand_total, invoice.creation, invoice.creation,
+							   "Administrator", "Administrator"))
+
+				if len(values) >= chunk_size:
+					frappe.db.bulk_insert("Sales Invoice", fields, values, ignore_duplicates=True)
+					frappe.db.commit()
+					values = []
+
+			if values:
+				frappe.db.bulk_insert("Sales Invoice", fields, values, ignore_duplicates=True)
+				frappe.db.commit()
+
+	def expected_gaps(self):
+		"""Lacunas inseridas por série (para confirmar o resultado da análise)"""
+		return max(self.documents_per_series - 1, 0) // GAP_EVERY
+
+	# ---------- FATURAS EM MEMÓRIA ----------
+
+	def make_invoice_header(self, series, number):
+		"""Cabeçalho determinístico da fatura number de uma série (sem random)"""
+		posting_date = date(self.year, 1, 1) + timedelta(days=number % 365)
+		net_total = flt(10 + (number * 7919) % 100000 / 100, 2)
+		return frappe._dict({
+			"name": f"{series.prefix}.{number:04d}",
+			"customer": get_customer_name(number % self.parties),
+			"posting_date": posting_date,
+			"creation": datetime.combine(posting_date, datetime_time(9)) + timedelta(seconds=number % 36000),
+			"net_total": net_total,
+			"grand_total": flt(net_total * 1.23, 2)
+		})
+
+	def make_invoice_lines(self, number, lines):
+		items = []
+		for line in range(cint(lines)):
+			position = number * 31 + line
+			item = self.items[position % ITEM_POOL_SIZE]
+			qty = self.quantities[position % len(self.quantities)]
+			items.append(frappe._dict({
+				"item_code": item.item_code,
+				"item_name": item.item_name,
+				"uom": item.uom,
+				"qty": qty,
+				"rate": item.rate,
+				"amount": flt(qty * item.rate, 2),
+				"tax_rate": item.tax_rate
+			}))
+
+		return items
+
+	def make_invoice(self, number, lines=5, series=None):
+		"""
+		✅ Sales Invoice não gravada (para ATCUD, QR e doc_events)
+
+		name e naming_series já preenchidos como se o documento tivesse sido numerado.
+		"""
+		series = series or self.series[0]
+		header = self.make_invoice_header(series, number)
+		items = self.make_invoice_lines(number, lines)
+		net_total = flt(sum(item.amount for item in items), 2)
+		taxes = flt(sum(item.amount * item.tax_rate / 100 for item in items), 2)
+
+		doc = frappe.get_doc({
+			"doctype": "Sales Invoice",
+			"naming_series": series.naming_series,
+			"company": series.company,
+			"customer": header.customer,
+			"posting_date": header.posting_date,
+			"currency": "EUR",
+			"conversion_rate": 1,
+			"items": [dict(item) for item in items],
+			"net_total": net_total,
+			"total_taxes_and_charges": taxes,
+			"grand_total": flt(net_total + taxes, 2)
+		})
+		doc.name = header.name
+		doc.creation = header.creation
+		doc.owner = "Administrator"
+		return doc
+
+	def get_series_info(self, series=None):
+		"""series_info no formato do ATCUDGenerator"""
+		series = series or self.series[0]
+		return {
+			"series_name": series.name,
+			"prefix": series.prefix,
+			"validation_code": series.validation_code,
+			"is_communicated": series.is_communicated
+		}
+
+	# ---------- CONTEXTO SAF-T ----------
+
+	def make_saft_invoice(self, series, number, lines):
+		header = self.make_invoice_header(series, number)
+		items = self.make_invoice_lines(number, lines)
+		net_total = flt(sum(item.amount for item in items), 2)
+		taxes = flt(sum(item.amount * item.tax_rate / 100 for item in items), 2)
+
+		return frappe._dict({
+			"name": header.name,
+			"atcud_code": f"{series.validation_code}-{number:08d}",
+			"docstatus": 1,
+			"posting_date": header.posting_date,
+			"creation": header.creation,
+			"owner": "Administrator",
+			"is_pos": 0,
+			"customer": header.customer,
+			"currency": "EUR",
+			"items": items,
+			"net_total": net_total,
+			"total_taxes_and_charges": taxes,
+			"grand_total": flt(net_total + taxes, 2)
+		})
+
+	def make_saft_context(self, invoice_lines, lines_per_invoice=10):
+		"""
+		✅ Contexto do template SAF-T com invoice_lines linhas de fatura
+
+		Clientes e faturas são LazyRecords: o template itera-os sem que a lista
+		completa exista em memória.
+		"""
+		series = self.series[0]
+		company = self.companies[0]
+		invoices = max(cint(invoice_lines) // cint(lines_per_invoice), 1)
+		created = datetime(self.year + 1, 1, 15, 10, 0, 0)
+
+		def make_customer(index):
+			rng = random.Random(self.seed * 1000003 + index)
+			return frappe._dict({
+				"name": get_customer_name(index),
+				"customer_name": f"Cliente sintético {index}",
+				"tax_id": make_nif(rng, "1235689"),
+				"creation": created
+			})
+
+		return {
+			"company": frappe._dict({
+				"name": company.name,
+				"company_name": company.name,
+				"tax_id": company.tax_id,
+				"default_currency": company.default_currency
+			}),
+			"company_address": frappe._dict({
+				"address_line1": "100 Avenida da Liberdade",
+				"city": "Lisboa",
+				"pincode": "1250-001",
+				"country_code": "PT"
+			}),
+			"fiscal_year": self.year,
+			"start_date": date(self.year, 1, 1),
+			"end_date": date(self.year, 12, 31),
+			"creation_date": created,
+			"creation_time": created,
+			"erpnext_version": "15",
+			"customers": LazyRecords(min(self.parties, invoices), make_customer),
+			"suppliers": [],
+			"items": self.items,
+			"chart_of_accounts": [],
+			"sales_invoices": LazyRecords(
+				invoices, lambda index: self.make_saft_invoice(series, index + 1, lines_per_invoice)),
+			"purchase_invoices": [],
+			"payments": [],
+			"stock_entries": [],
+			"total_sales_debit": "0.00",
+			"total_sales_credit": "0.00",
+			"total_records": invoices
+		}
+
+
+def generate_dataset(companies=2, parties=1000, documents_per_series=10000, seed=DEFAULT_SEED,
+					 year=DEFAULT_YEAR, insert=True):
+	"""✅ Criar (e opcionalmente gravar) o conjunto de dados sintéticos"""
+	dataset = BenchmarkDataset(companies=companies, parties=parties,
+							   documents_per_series=documents_per_series, seed=seed, year=year)
+	if insert:
+		dataset.insert()
+
+	return dataset
+
+
+def remove_dataset(chunk_size=INSERT_CHUNK_SIZE):
+	"""
+	✅ Apagar todos os dados sintéticos (qualquer seed)
+
+	Returns:
+		dict: registos apagados por doctype
+	"""
+	companies = frappe.get_all("Company", filters={"name": ["like", f"{BENCHMARK_COMPANY_PREFIX}%"]},
+							   pluck="name")
+	removed = {"Sales Invoice": 0, SERIES_DOCTYPE: 0, "Company": len(companies)}
+
+	if companies:
+		while True:
+			names = frappe.get_all("Sales Invoice", filters={"company": ["in", companies]},
+								   pluck="name", limit=chunk_size, order_by="name")
+			if not names:
+				break
+
+			frappe.db.delete("Sales Invoice", {"name": ["in", names]})
+			frappe.db.commit()
+			removed["Sales Invoice"] += len(names)
+
+		removed[SERIES_DOCTYPE] = frappe.db.count(SERIES_DOCTYPE, {"company": ["in", companies]})
+		frappe.db.delete(SERIES_DOCTYPE, {"company": ["in", companies]})
+		frappe.db.delete("Company", {"name": ["in", companies]})
+		frappe.db.commit()
+
+	removed["Customer"] = remove_benchmark_parties("Customer")
+
+	compliance_cache.invalidate("company")
+	compliance_cache.invalidate("party")
+	compliance_cache.invalidate("series")
+	return removed
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Import Profile - Portugal Compliance
+Custo de importação dos módulos carregados por cada worker
+✅ ISOLADO: Cada perfil corre num interpretador novo (sys.modules vazio), depois de
+   "import frappe" - só conta o que a app acrescenta
+✅ DEPENDÊNCIAS PESADAS: Indica que módulos pesados (qrcode, PIL, numpy, lxml, ...)
+   passaram a estar carregados após cada import
+✅ USO: Grupo "imports" do pt-benchmark e teste de perfil de importação
+"""
+
+import json
+import subprocess
+import sys
+
+# Módulos importados por hooks, doc_events, override_doctype_class e jinja
+HOOK_MODULES = (
+	"portugal_compliance.hooks",
+	"portugal_compliance.utils.document_hooks",
+	"portugal_compliance.overrides.sales_invoice",
+	"portugal_compliance.utils.compliance_hooks",
+	"portugal_compliance.utils.atcud_generator",
+	"portugal_compliance.utils.jinja_methods",
+	"portugal_compliance.queries.party_search",
+	"portugal_compliance.regional.portugal",
+	"portugal_compliance.email"
+)
+
+# Dependências que só devem ser carregadas na primeira utilização
+HEAVY_MODULES = ("numpy", "qrcode", "PIL", "lxml", "xmlschema", "requests", "Crypto", "cryptography")
+
+PROFILE_TIMEOUT = 120
+
+_PROFILE_SCRIPT = """
+import json, sys, time
+
+heavy = tuple(sys.argv[2].split(","))
+
+def loaded_heavy():
+	return {name for name in heavy if name in sys.modules}
+
+started = time.perf_counter()
+import frappe
+baseline_ms = (time.perf_counter() - started) * 1000
+before = loaded_heavy()
+
+modules = []
+for module in sys.argv[1].split(","):
+	entry = {"module": module}
+	started = time.perf_counter()
+	try:
+		__import__(module)
+	except Exception as e:
+		entry["error"] = f"{type(e).__name__}: {e}"
+	entry["import_ms"] = round((time.perf_counter() - started) * 1000, 3)
+	loaded = loaded_heavy()
+	entry["heavy_modules"] = sorted(loaded - before)
+	before = loaded
+	modules.append(entry)
+
+print(json.dumps({"baseline_ms": round(baseline_ms, 3), "modules": modules}))
+"""
+
+
+def profile_imports(modules=HOOK_MODULES, heavy_modules=HEAVY_MODULES, timeout=PROFILE_TIMEOUT):
+	"""
+	✅ Importar modules (por esta ordem) num interpretador novo
+
+	O tempo de cada módulo é incremental: só inclui o que ainda não tinha sido
+	carregado pelos módulos anteriores.
+
+	Returns:
+		dict: {"baseline_ms", "total_ms", "heavy_modules", "modules": [{"module",
+		"import_ms", "heavy_modules", "error"?}]}
+	"""
+	output = subprocess.run(
+		[sys.executable, "-c", _PROFILE_SCRIPT, ",".join(modules), ",".join(heavy_modules)],
+		capture_output=True, text=True, timeout=timeout
+	)
+	if output.returncode:
+		raise RuntimeError(f"Perfil de importação falhou: {output.stderr.strip()[-2000:]}")
+
+	profile = json.loads(output.stdout.strip().splitlines()[-1])
+	profile["total_ms"] = round(sum(entry["import_ms"] for entry in profile["modules"]), 3)
+	profile["heavy_modules"] = sorted({
+		name for entry in profile["modules"] for name in entry["heavy_modules"]
+	})
+
+	return profile
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Party Search Benchmark - Portugal Compliance
+Pesquisa de Clientes/Fornecedores: anterior (LIKE '%txt%') vs indexada
+✅ DADOS: Registos sintéticos (name começa por PTBENCH-) inseridos em bulk
+✅ LATÊNCIA: p50/p95/máximo por consulta, modo NIF ou nome
+
+Uso: bench --site <site> pt-benchmark-party-search --seed 1000000 --cleanup
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint
+
+from portugal_compliance.queries.party_search import (
+	NORMALIZED_TAX_ID_FIELD,
+	PARTY_SEARCH_CONFIG,
+	has_fulltext_index,
+	is_nif_query,
+	run_party_search
+)
+
+BENCHMARK_NAME_PREFIX = "PTBENCH-"
+BENCHMARK_WORDS = ("Silva", "Santos", "Ferreira", "Pereira", "Oliveira", "Costa", "Rodrigues",
+				   "Martins", "Sousa", "Fernandes", "Gonçalves", "Lopes", "Marques", "Almeida")
+
+
+def seed_benchmark_parties(doctype="Customer", rows=1000000, chunk_size=10000):
+	"""
+	✅ Inserir registos sintéticos (name começa por PTBENCH-) via bulk insert
+	"""
+	import random
+
+	from portugal_compliance.utils.nif_validator import compute_check_digit
+
+	config = PARTY_SEARCH_CONFIG[doctype]
+	group = frappe.db.get_value(f"{doctype} Group", {"is_group": 0}, "name")
+	rng = random.Random(42)
+	fields = ["name", config["name_field"], config["group_field"], "tax_id",
+			  NORMALIZED_TAX_ID_FIELD, "disabled", "creation", "modified", "owner", "modified_by"]
+	timestamp = frappe.utils.now()
+
+	for offset in range(0, cint(rows), chunk_size):
+		values = []
+		for index in range(offset, min(offset + chunk_size, cint(rows))):
+			first_eight = f"{rng.choice('1235689')}{rng.randrange(10 ** 7):07d}"
+			nif = f"{first_eight}{compute_check_digit(first_eight)}"
+			party_name = f"{rng.choice(BENCHMARK_WORDS)} {rng.choice(BENCHMARK_WORDS)} {index}"
+			values.append((f"{BENCHMARK_NAME_PREFIX}{index:07d}", party_name, group, f"PT{nif}",
+						   nif, 0, timestamp, timestamp, "Administrator", "Administrator"))
+
+		frappe.db.bulk_insert(doctype, fields, values, ignore_duplicates=True)
+		frappe.db.commit()
+
+
+def remove_benchmark_parties(doctype="Customer", chunk_size=10000):
+	"""Apagar os registos sintéticos do benchmark"""
+	removed = 0
+
+	while True:
+		names = frappe.db.sql_list(f"""
+			SELECT name FROM `tab{doctype}`
+			WHERE name LIKE %(prefix)s
+			ORDER BY name
+			LIMIT %(limit)s
+		""", {"prefix": f"{BENCHMARK_NAME_PREFIX}%", "limit": chunk_size})
+
+		if not names:
+			break
+
+		frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE name IN %(names)s", {"names": tuple(names)})
+		frappe.db.commit()
+		removed += len(names)
+
+	return removed
+
+
+def _legacy_search(doctype, txt, start, page_len):
+	"""Consulta anterior (LIKE '%txt%' + ORDER BY CASE) para comparação"""
+	config = PARTY_SEARCH_CONFIG[doctype]
+	return frappe.db.sql(f"""
+		SELECT name, {config['name_field']}, {config['group_field']}, tax_id
+		FROM `tab{doctype}`
+		WHERE ({config['name_field']} LIKE %(txt)s OR name LIKE %(txt)s OR tax_id LIKE %(txt)s)
+		AND disabled = 0
+		ORDER BY CASE WHEN name LIKE %(txt)s THEN 0 ELSE 1 END, {config['name_field']}
+		LIMIT %(start)s, %(page_len)s
+	""", {"txt": f"%{txt}%", "start": start, "page_len": page_len})
+
+
+def _percentile(samples, fraction):
+	ordered = sorted(samples)
+	return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def benchmark_party_search(doctype="Customer", queries=None, iterations=20, page_len=20):
+	"""
+	✅ Latência (ms) da pesquisa anterior vs indexada, por consulta
+
+	Returns:
+		dict: {"rows", "results": [{"query", "mode", "legacy": {...}, "indexed": {...}}]}
+	"""
+	queries = queries or ["Silva", "Costa Mar", "PTBENCH-00012", "5001", "PT 123 456 789", "Gonç"]
+	results = []
+
+	for query in queries:
+		timings = {}
+		for label, runner in (("legacy", _legacy_search), ("indexed", run_party_search)):
+			samples = []
+			for _iteration in range(cint(iterations)):
+				started = time.perf_counter()
+				runner(doctype, query, 0, page_len)
+				samples.append((time.perf_counter() - started) * 1000)
+
+			timings[label] = {
+				"p50_ms": round(_percentile(samples, 0.5), 3),
+				"p95_ms": round(_percentile(samples, 0.95), 3),
+				"max_ms": round(max(samples), 3)
+			}
+
+		results.append({
+			"query": query,
+			"mode": "nif" if is_nif_query(query) else "name",
+			**timings
+		})
+
+	return {
+		"doctype": doctype,
+		"rows": frappe.db.estimate_count(doctype),
+		"fulltext_index": has_fulltext_index(doctype),
+		"results": results
+	}
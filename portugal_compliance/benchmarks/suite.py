@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Benchmark Suite - Portugal Compliance
+Medição dos caminhos críticos de compliance sobre dados sintéticos
+✅ CASOS: Validação de NIF, payload/imagem QR, geração de ATCUD, cadeia de
+   doc_events da Sales Invoice (gravar/submeter), permission queries, análise de
+   lacunas de sequência, renderização SAF-T (10k/100k/1M linhas) e importação
+   de hooks/doc_events num interpretador novo
+✅ ISOLADO: Escritas feitas pelos casos são revertidas (rollback) fora do tempo medido
+✅ JSON: Resultado legível por máquina (metadados do commit + estatísticas por caso)
+✅ COMPARAÇÃO: compare_results() indica regressões face a um resultado anterior
+
+Uso: bench --site <site> pt-benchmark --output atual.json --compare base.json
+"""
+
+import os
+import platform
+import subprocess
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from portugal_compliance.benchmarks.data_generator import (
+	DEFAULT_SEED,
+	generate_dataset,
+	make_nif,
+	remove_dataset
+)
+
+RESULT_FORMAT_VERSION = 1
+
+DEFAULT_ITERATIONS = 50
+WARMUP_ITERATIONS = 2
+NIF_BATCH_SIZE = 10000
+SAFT_LINE_SCALES = (10000, 100000, 1000000)
+SAFT_LINES_PER_INVOICE = 10
+
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_METRIC = "p50_ms"
+
+
+# ========== MEDIÇÃO ==========
+
+def _percentile(samples, fraction):
+	ordered = sorted(samples)
+	return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(name, func, iterations=DEFAULT_ITERATIONS, setup=None, teardown=None, ops=1,
+			warmup=WARMUP_ITERATIONS):
+	"""
+	✅ Medir func() em iterations repetições (após warmup repetições não medidas)
+
+	setup() corre antes de cada repetição e o seu resultado é passado a func;
+	teardown() corre depois. Nenhum dos dois entra no tempo medido.
+	ops: operações por repetição (para ops_per_sec).
+	"""
+	samples = []
+	result = {"name": name, "iterations": 0, "ops_per_iteration": ops}
+
+	for iteration in range(cint(warmup) + cint(iterations)):
+		argument = setup() if setup else None
+		try:
+			started = time.perf_counter()
+			func(argument) if setup else func()
+			elapsed = (time.perf_counter() - started) * 1000
+		except Exception as e:
+			result["error"] = f"{type(e).__name__}: {e}"
+			break
+		finally:
+			if teardown:
+				teardown()
+
+		if iteration >= cint(warmup):
+			samples.append(elapsed)
+
+	if samples:
+		result.update(_statistics(samples, ops))
+
+	return result
+
+
+def _statistics(samples, ops=1):
+	mean = sum(samples) / len(samples)
+	return {
+		"iterations": len(samples),
+		"min_ms": round(min(samples), 4),
+		"mean_ms": round(mean, 4),
+		"p50_ms": round(_percentile(samples, 0.5), 4),
+		"p95_ms": round(_percentile(samples, 0.95), 4),
+		"max_ms": round(max(samples), 4),
+		"ops_per_sec": round(ops * 1000 / mean, 2) if mean else None
+	}
+
+
+def _rollback():
+	frappe.db.rollback()
+
+
+# ========== CASOS ==========
+
+def bench_nif(dataset, options):
+	"""Validação de NIF: escalar e em lote"""
+	import random
+
+	from portugal_compliance.utils.nif_validator import validate_nif, validate_nif_batch
+
+	rng = random.Random(dataset.seed)
+	nifs = []
+	for index in range(NIF_BATCH_SIZE):
+		nif = make_nif(rng)
+		# Um em cada dez com dígito de controlo errado, um em cada cinco formatado
+		if index % 10 == 0:
+			nif = nif[:8] + str((int(nif[8]) + 1) % 10)
+		elif index % 5 == 0:
+			nif = f"PT {nif[:3]} {nif[3:6]} {nif[6:]}"
+		nifs.append(nif)
+
+	def validate_all():
+		for nif in nifs:
+			validate_nif(nif)
+
+	return [
+		measure("nif.validate", validate_all, options["iterations"], ops=len(nifs)),
+		measure("nif.validate_batch", lambda: validate_nif_batch(nifs), options["iterations"], ops=len(nifs))
+	]
+
+
+def bench_qr(dataset, options):
+	"""Payload QR (com NIFs da cache) e imagem PNG"""
+	from portugal_compliance.utils.atcud_generator import atcud_generator
+
+	series = dataset.series[0]
+	series_info = dataset.get_series_info(series)
+	doc = dataset.make_invoice(1, series=series)
+	atcud_code = f"{series.validation_code}-{1:08d}"
+
+	return [
+		measure("qr.payload", lambda: atcud_generator._build_qr_data_optimized(doc, atcud_code, series_info),
+				options["iterations"]),
+		measure("qr.image", lambda: atcud_generator._generate_qr_code_optimized(doc, atcud_code, series_info),
+				options["iterations"])
+	]
+
+
+def _invoice_factory(dataset):
+	"""Faturas novas (números acima dos cabeçalhos gravados) para cada repetição"""
+	counter = {"number": dataset.documents_per_series}
+
+	def make():
+		counter["number"] += 1
+		return dataset.make_invoice(counter["number"])
+
+	return make
+
+
+def bench_atcud(dataset, options):
+	"""Geração de ATCUD por documento (série, código AT, sequência, unicidade, QR, log)"""
+	from portugal_compliance.utils.atcud_generator import generate_atcud_for_document
+
+	return [
+		measure("atcud.generate", generate_atcud_for_document, options["iterations"],
+				setup=_invoice_factory(dataset), teardown=_rollback)
+	]
+
+
+def get_doc_event_handlers(doctype, events):
+	"""Handlers de doc_events (todas as apps, incluindo "*") pela ordem de execução"""
+	doc_events = frappe.get_hooks("doc_events")
+	handlers = []
+
+	for event in events:
+		for key in ("*", doctype):
+			methods = (doc_events.get(key) or {}).get(event) or []
+			if isinstance(methods, str):
+				methods = [methods]
+			handlers.extend((event, frappe.get_attr(method)) for method in methods)
+
+	return handlers
+
+
+def bench_doc_events(dataset, options):
+	"""
+	Cadeia de doc_events da Sales Invoice sem o controlador ERPNext:
+	só o custo acrescentado pelos hooks ao gravar e ao submeter
+	"""
+	cases = (
+		("doc_events.save", ("before_insert", "validate", "before_save", "after_insert")),
+		("doc_events.submit", ("validate", "before_submit", "on_submit"))
+	)
+	results = []
+
+	for name, events in cases:
+		handlers = get_doc_event_handlers("Sales Invoice", events)
+
+		def run_chain(doc, handlers=handlers):
+			for event, handler in handlers:
+				handler(doc, event)
+
+		result = measure(name, run_chain, options["iterations"],
+						 setup=_invoice_factory(dataset), teardown=_rollback)
+		result["handlers"] = len(handlers)
+		results.append(result)
+
+	return results
+
+
+def _get_permission_users():
+	"""Administrator + até 3 utilizadores de sistema (sempre os mesmos por ordem de nome)"""
+	users = frappe.get_all("User", filters={
+		"enabled": 1,
+		"user_type": "System User",
+		"name": ["not in", ["Administrator", "Guest"]]
+	}, pluck="name", order_by="name", limit=3)
+	return ["Administrator"] + users
+
+
+def bench_permissions(dataset, options):
+	"""Construção das permission queries (séries e ATCUD Log) por utilizador"""
+	from portugal_compliance.queries import has_permission_for_atcud, has_permission_for_series
+
+	results = []
+	original_user = frappe.session.user
+
+	try:
+		for position, user in enumerate(_get_permission_users()):
+			frappe.set_user(user)
+			label = "admin" if user == "Administrator" else f"user{position}"
+			results.append(measure(f"permissions.series[{label}]",
+								   lambda: has_permission_for_series.get_permission_query_conditions(user),
+								   options["iterations"]))
+			results.append(measure(f"permissions.atcud_log[{label}]",
+								   lambda: has_permission_for_atcud.get_permission_query_conditions(user),
+								   options["iterations"]))
+	finally:
+		frappe.set_user(original_user)
+
+	return results
+
+
+def bench_sequence_gaps(dataset, options):
+	"""Auditoria completa de uma série (sequence_audit) sobre os cabeçalhos sintéticos"""
+	from portugal_compliance.utils.sequence_audit import audit_series, reset_audit_state
+
+	series = dataset.series[0]
+	outcome = {}
+
+	def audit():
+		reset_audit_state(series.name)
+		outcome["audit"] = audit_series(series.name, cutoff="2999-12-31 00:00:00")
+
+	result = measure("sequence_gaps.audit_series", audit,
+					 max(cint(options["iterations"]) // 10, 3), ops=dataset.documents_per_series)
+
+	result["gaps_found"] = (outcome.get("audit") or {}).get("gap_count", 0)
+	result["gaps_expected"] = dataset.expected_gaps()
+	return [result]
+
+
+def bench_saft(dataset, options):
+	"""Renderização SAF-T em streaming (template Jinja) para cada escala de linhas"""
+	from portugal_compliance.utils.saft_generator import SAFTGenerator
+
+	generator = SAFTGenerator()
+	results = []
+
+	for lines in options["saft_lines"]:
+		context = dataset.make_saft_context(lines, SAFT_LINES_PER_INVOICE)
+		output = {}
+
+		def render(context=context, output=output):
+			output["bytes"] = sum(len(block) for block in generator.iter_rendered_blocks(context))
+
+		iterations = 1 if lines >= 1000000 else max(cint(options["iterations"]) // 10, 3)
+		result = measure(f"saft.render[{lines}]", render, iterations, ops=lines,
+						 warmup=0 if lines >= 100000 else 1)
+		result["bytes"] = output.get("bytes")
+		results.append(result)
+
+	return results
+
+
+def bench_imports(dataset, options):
+	"""
+	Importação de hooks e módulos de doc_events num interpretador novo
+	(cada repetição é um processo; tempos incrementais por módulo)
+	"""
+	from portugal_compliance.benchmarks.import_profile import profile_imports
+
+	iterations = max(cint(options["iterations"]) // 10, 3)
+	samples = {}
+	heavy_modules = set()
+
+	try:
+		for iteration in range(iterations):
+			profile = profile_imports()
+			samples.setdefault("imports.total", []).append(profile["total_ms"])
+			for entry in profile["modules"]:
+				samples.setdefault(f"imports[{entry['module']}]", []).append(entry["import_ms"])
+			heavy_modules.update(profile["heavy_modules"])
+	except Exception as e:
+		return [{"name": "imports.total", "iterations": 0, "ops_per_iteration": 1,
+				 "error": f"{type(e).__name__}: {e}"}]
+
+	results = []
+	for name, values in samples.items():
+		result = {"name": name, "ops_per_iteration": 1}
+		result.update(_statistics(values))
+		results.append(result)
+
+	results[0]["heavy_modules"] = sorted(heavy_modules)
+	return results
+
+
+def bench_encryption(dataset, options):
+	"""
+	Cifra/decifra com o key ring em cache vs derivação PBKDF2 (custo por EncryptionUtils()
+	antes da cache por worker)
+	"""
+	from portugal_compliance.utils import encryption_utils
+
+	secrets = iter(range(10 ** 9))
+	encrypted = encryption_utils.encrypt_portugal_data("AAJFJ1MV")
+
+	return [
+		measure("encryption.encrypt", lambda: encryption_utils.encrypt_portugal_data("AAJFJ1MV"),
+				options["iterations"]),
+		measure("encryption.decrypt", lambda: encryption_utils.decrypt_portugal_data(encrypted),
+				options["iterations"]),
+		measure("encryption.key_derivation",
+				lambda: encryption_utils.derive_fernet_key(f"benchmark-{next(secrets)}"),
+				max(cint(options["iterations"]) // 10, 3), warmup=0)
+	]
+
+
+BENCHMARKS = {
+	"nif": bench_nif,
+	"qr": bench_qr,
+	"atcud": bench_atcud,
+	"doc_events": bench_doc_events,
+	"permissions": bench_permissions,
+	"sequence_gaps": bench_sequence_gaps,
+	"saft": bench_saft,
+	"imports": bench_imports,
+	"encryption": bench_encryption
+}
+
+# Grupos que leem dados sintéticos da BD
+DATABASE_BENCHMARKS = {"qr", "atcud", "doc_events", "sequence_gaps"}
+
+
+# ========== EXECUÇÃO ==========
+
+def get_git_commit():
+	try:
+		output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10,
+								cwd=frappe.get_app_path("portugal_compliance"))
+		return output.stdout.strip() or None
+	except Exception:
+		return None
+
+
+def get_metadata(options):
+	import portugal_compliance
+
+	return {
+		"app_version": portugal_compliance.__version__,
+		"git_commit": get_git_commit(),
+		"frappe_version": frappe.__version__,
+		"python_version": platform.python_version(),
+		"machine": platform.machine(),
+		"cpu_count": os.cpu_count(),
+		"db_type": frappe.db.db_type,
+		"timestamp": frappe.utils.now(),
+		"options": options
+	}
+
+
+def run_benchmarks(only=None, iterations=DEFAULT_ITERATIONS, saft_lines=SAFT_LINE_SCALES, companies=2,
+				   parties=1000, documents_per_series=10000, seed=DEFAULT_SEED, keep_data=False):
+	"""
+	✅ Executar os grupos pedidos (todos por omissão)
+
+	Returns:
+		dict: {"format_version", "metadata", "results": [{"name", "p50_ms", ...}]}
+	"""
+	groups = list(only or BENCHMARKS)
+	unknown = [group for group in groups if group not in BENCHMARKS]
+	if unknown:
+		frappe.throw(f"Benchmarks desconhecidos: {', '.join(unknown)}")
+
+	options = {
+		"groups": groups,
+		"iterations": cint(iterations),
+		"saft_lines": [cint(lines) for lines in saft_lines],
+		"companies": cint(companies),
+		"parties": cint(parties),
+		"documents_per_series": cint(documents_per_series),
+		"seed": cint(seed)
+	}
+
+	uses_database = bool(DATABASE_BENCHMARKS.intersection(groups))
+	dataset = generate_dataset(companies=companies, parties=parties, documents_per_series=documents_per_series,
+							   seed=seed, insert=uses_database)
+	results = []
+
+	try:
+		for group in groups:
+			frappe.logger().info(f"Benchmark: {group}")
+			results.extend(BENCHMARKS[group](dataset, options))
+			_rollback()
+	finally:
+		if uses_database and not keep_data:
+			remove_dataset()
+
+	return {
+		"format_version": RESULT_FORMAT_VERSION,
+		"metadata": get_metadata(options),
+		"results": results
+	}
+
+
+# ========== COMPARAÇÃO ==========
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD, metric=DEFAULT_METRIC):
+	"""
+	✅ Comparar dois resultados pelo metric de cada caso
+
+	Regressão: current > baseline * (1 + threshold); melhoria: current < baseline * (1 - threshold).
+
+	Returns:
+		dict: {"metric", "threshold", "regressions", "improvements", "unchanged", "failed", "missing", "new"}
+	"""
+	baseline_cases = {case["name"]: case for case in baseline.get("results", [])}
+	current_cases = {case["name"]: case for case in current.get("results", [])}
+	comparison = {
+		"metric": metric,
+		"threshold": threshold,
+		"baseline_commit": (baseline.get("metadata") or {}).get("git_commit"),
+		"current_commit": (current.get("metadata") or {}).get("git_commit"),
+		"regressions": [],
+		"improvements": [],
+		"unchanged": [],
+		"failed": [],
+		"missing": sorted(set(baseline_cases) - set(current_cases)),
+		"new": sorted(set(current_cases) - set(baseline_cases))
+	}
+
+	for name, case in current_cases.items():
+		previous = baseline_cases.get(name)
+		if not previous:
+			continue
+
+		before, after = previous.get(metric), case.get(metric)
+		if case.get("error") or after is None:
+			comparison["failed"].append(name)
+			continue
+
+		if not before:
+			comparison["unchanged"].append(name)
+			continue
+
+		change = (flt(after) - flt(before)) / flt(before)
+		entry = {"name": name, "baseline": before, "current": after, "change": round(change, 4)}
+
+		if change > threshold:
+			comparison["regressions"].append(entry)
+		elif change < -threshold:
+			comparison["improvements"].append(entry)
+		else:
+			comparison["unchanged"].append(name)
+
+	comparison["regressions"].sort(key=lambda entry: -entry["change"])
+	comparison["improvements"].sort(key=lambda entry: entry["change"])
+	return comparison
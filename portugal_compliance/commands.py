@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Comandos bench - Portugal Compliance
+Uso: bench --site <site> <comando>
+"""
+
+import json
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+def _connect(context):
+	import frappe
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	return frappe
+
+
+@click.command("pt-scan-party-nifs")
+@click.option("--doctype", "doctypes", multiple=True, type=click.Choice(["Customer", "Supplier"]),
+			  help="Doctype a auditar (pode repetir; padrão: Customer e Supplier)")
+@click.option("--chunk-size", default=50000, show_default=True, help="Registos por página")
+@click.option("--include-empty", is_flag=True, default=False, help="Incluir registos sem NIF no CSV")
+@pass_context
+def scan_party_nifs(context, doctypes, chunk_size, include_empty):
+	"""Auditar NIFs de Clientes/Fornecedores e escrever relatório de qualidade de dados"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.utils.party_nif_scanner import scan_party_nifs as run_scan
+
+		summary = run_scan(doctypes=list(doctypes) or None, chunk_size=chunk_size,
+						   include_empty=include_empty)
+		click.echo(json.dumps(summary, indent=2, ensure_ascii=False, default=str))
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-archive-atcud-logs")
+@click.option("--before", "before_date", required=True, help="Arquivar logs criados antes desta data (AAAA-MM-DD)")
+@click.option("--company", default=None, help="Limitar a uma empresa")
+@click.option("--chunk-size", default=5000, show_default=True, help="Linhas por chunk/transação")
+@click.option("--max-chunks", default=None, type=int, help="Parar após N chunks")
+@click.option("--doctype", default="ATCUD Log Archive", show_default=True,
+			  type=click.Choice(["ATCUD Log", "ATCUD Log Archive"]), help="Camada de origem")
+@pass_context
+def archive_atcud_logs(context, before_date, company, chunk_size, max_chunks, doctype):
+	"""Arquivar ATCUD Logs antigos em JSONL gzip particionado por empresa e mês"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.utils.atcud_archiver import archive_atcud_logs as run_archive
+
+		metrics = run_archive(before_date, chunk_size=chunk_size, company=company, max_chunks=max_chunks,
+							  doctype=doctype)
+		click.echo(json.dumps(metrics, indent=2, ensure_ascii=False, default=str))
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-restore-atcud-archive")
+@click.option("--company", default=None, help="Restaurar apenas esta empresa")
+@click.option("--from-period", default=None, help="Primeiro mês a restaurar (AAAA-MM)")
+@click.option("--to-period", default=None, help="Último mês a restaurar (AAAA-MM)")
+@click.option("--chunk-size", default=5000, show_default=True, help="Linhas por transação")
+@click.option("--doctype", default="ATCUD Log Archive", show_default=True,
+			  type=click.Choice(["ATCUD Log", "ATCUD Log Archive"]), help="Camada de destino")
+@pass_context
+def restore_atcud_archive(context, company, from_period, to_period, chunk_size, doctype):
+	"""Reinserir ATCUD Logs arquivados (idempotente)"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.utils.atcud_archiver import restore_atcud_archive as run_restore
+
+		result = run_restore(company=company, from_period=from_period, to_period=to_period,
+							 chunk_size=chunk_size, doctype=doctype)
+		click.echo(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-move-atcud-logs-to-cold")
+@click.option("--cutoff", default=None, help="Mover logs criados antes desta data (padrão: janela quente)")
+@click.option("--chunk-size", default=5000, show_default=True, help="Linhas por chunk/transação")
+@pass_context
+def move_atcud_logs_to_cold(context, cutoff, chunk_size):
+	"""Mover ATCUD Logs fora da janela quente para ATCUD Log Archive"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.utils.atcud_log_store import move_to_cold_storage
+
+		result = move_to_cold_storage(cutoff=cutoff, chunk_size=chunk_size)
+		click.echo(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-benchmark-party-search")
+@click.option("--doctype", default="Customer", show_default=True, type=click.Choice(["Customer", "Supplier"]))
+@click.option("--seed", default=0, show_default=True, help="Inserir N registos sintéticos antes de medir")
+@click.option("--query", "queries", multiple=True, help="Texto a pesquisar (pode repetir)")
+@click.option("--iterations", default=20, show_default=True, help="Repetições por consulta")
+@click.option("--cleanup", is_flag=True, default=False, help="Apagar os registos sintéticos no fim")
+@pass_context
+def benchmark_party_search(context, doctype, seed, queries, iterations, cleanup):
+	"""Medir a latência da pesquisa de Clientes/Fornecedores (anterior vs indexada)"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.benchmarks import party_search as party_search_benchmark
+		from portugal_compliance.queries.party_search import ensure_party_search_schema
+
+		if seed:
+			ensure_party_search_schema()
+			party_search_benchmark.seed_benchmark_parties(doctype, rows=seed)
+
+		report = party_search_benchmark.benchmark_party_search(doctype, queries=list(queries) or None,
+															   iterations=iterations)
+		click.echo(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+		if cleanup:
+			party_search_benchmark.remove_benchmark_parties(doctype)
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-build-gl-balances")
+@click.option("--company", required=True, help="Empresa")
+@click.option("--from-date", default=None, help="Reconstruir apenas a partir deste mês (AAAA-MM-DD)")
+@click.option("--verify", is_flag=True, default=False, help="Comparar o agregado com o GL Entry em vez de construir")
+@pass_context
+def build_gl_balances(context, company, from_date, verify):
+	"""Construir/reconstruir o agregado mensal de saldos (GL Monthly Balance)"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.utils import gl_balance_engine
+
+		if verify:
+			result = gl_balance_engine.verify_gl_balances(company, from_date=from_date)
+		else:
+			result = gl_balance_engine.build_gl_balances(company, from_date=from_date)
+		click.echo(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+	finally:
+		frappe.destroy()
+
+
+@click.command("pt-benchmark")
+@click.option("--only", "groups", multiple=True,
+			  type=click.Choice(["nif", "qr", "atcud", "doc_events", "permissions", "sequence_gaps", "saft",
+									"imports", "encryption"]),
+			  help="Grupo a executar (pode repetir; padrão: todos)")
+@click.option("--iterations", default=50, show_default=True, help="Repetições por caso")
+@click.option("--saft-lines", multiple=True, type=int, help="Linhas de fatura no SAF-T (padrão: 10000, 100000, 1000000)")
+@click.option("--companies", default=2, show_default=True, help="Empresas sintéticas")
+@click.option("--parties", default=1000, show_default=True, help="Clientes sintéticos")
+@click.option("--documents", default=10000, show_default=True, help="Faturas gravadas por série (análise de lacunas)")
+@click.option("--seed", default=42, show_default=True, help="Seed dos dados sintéticos")
+@click.option("--keep-data", is_flag=True, default=False, help="Não apagar os dados sintéticos no fim")
+@click.option("--output", default=None, help="Escrever o resultado JSON neste ficheiro")
+@click.option("--compare", "baseline_path", default=None, help="Resultado JSON anterior para comparar")
+@click.option("--threshold", default=0.10, show_default=True, help="Variação do p50 considerada regressão")
+@pass_context
+def run_benchmark(context, groups, iterations, saft_lines, companies, parties, documents, seed, keep_data,
+				  output, baseline_path, threshold):
+	"""Benchmark dos caminhos críticos de compliance (resultado JSON comparável entre commits)"""
+	frappe = _connect(context)
+	try:
+		from portugal_compliance.benchmarks import suite
+
+		report = suite.run_benchmarks(only=list(groups) or None, iterations=iterations,
+									  saft_lines=list(saft_lines) or suite.SAFT_LINE_SCALES,
+									  companies=companies, parties=parties, documents_per_series=documents,
+									  seed=seed, keep_data=keep_data)
+
+		if baseline_path:
+			with open(baseline_path) as handle:
+				report["comparison"] = suite.compare_results(report, json.load(handle), threshold=threshold)
+
+		content = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+		if output:
+			with open(output, "w") as handle:
+				handle.write(content)
+		click.echo(content)
+	finally:
+		frappe.destroy()
+
+	if report.get("comparison", {}).get("regressions"):
+		raise SystemExit(1)
+
+
+commands = [
+	scan_party_nifs,
+	archive_atcud_logs,
+	restore_atcud_archive,
+	move_atcud_logs_to_cold,
+	benchmark_party_search,
+	build_gl_balances,
+	run_benchmark
+]
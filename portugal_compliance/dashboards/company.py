@@ -7,6 +7,8 @@ from frappe import _
 from frappe.utils import today, add_days, getdate, now, cint, flt
 from datetime import datetime, timedelta
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_logs
+
 
 def get_data():
 	"""
@@ -128,13 +130,12 @@ class CompanyDashboard:
 	def get_recent_atcud_logs(self):
 		"""Obtém logs ATCUD recentes da empresa"""
 		try:
-			logs = frappe.db.get_all('ATCUD Log',
-									 filters={'company': self.company_name},
-									 fields=['name', 'atcud_code', 'document_type',
-											 'document_name', 'creation', 'validation_status'],
-									 order_by='creation desc',
-									 limit=10
-									 )
+			logs = get_atcud_logs(filters={'company': self.company_name},
+								  fields=['name', 'atcud_code', 'document_type',
+										  'document_name', 'creation', 'validation_status'],
+								  order_by='creation desc',
+								  limit=10
+								  )
 
 			# Formatar dados
 			for log in logs:
@@ -224,13 +225,12 @@ class CompanyDashboard:
 					'company': self.company_name,
 					'is_communicated': 1
 				}),
-				'total_atcud_generated': frappe.db.count('ATCUD Log', {
+				'total_atcud_generated': count_atcud_logs({
 					'company': self.company_name
 				}),
-				'atcud_this_month': frappe.db.count('ATCUD Log', {
-					'company': self.company_name,
-					'creation': ['>=', frappe.utils.get_first_day(today())]
-				}),
+				'atcud_this_month': count_atcud_logs({
+					'company': self.company_name
+				}, from_date=frappe.utils.get_first_day(today())),
 				'documents_this_month': self.get_documents_count_this_month()
 			}
 
@@ -317,10 +317,9 @@ class CompanyDashboard:
 				month_start = frappe.utils.get_first_day(add_days(today(), -30 * i))
 				month_end = frappe.utils.get_last_day(month_start)
 
-				atcud_count = frappe.db.count('ATCUD Log', {
-					'company': self.company_name,
-					'creation': ['between', [month_start, month_end]]
-				})
+				atcud_count = count_atcud_logs({
+					'company': self.company_name
+				}, from_date=month_start, to_date=month_end)
 
 				trends.append({
 					'month': month_start.strftime('%b %Y'),
@@ -7,6 +7,8 @@ from frappe import _
 from frappe.utils import today, add_days, getdate, now, cint, flt, formatdate
 from datetime import datetime, timedelta
 
+from portugal_compliance.utils.atcud_log_store import find_atcud_log
+
 
 def get_data():
 	"""
@@ -157,10 +159,10 @@ class SalesInvoiceDashboard:
 				}
 
 			# Obter log do ATCUD
-			atcud_log = frappe.db.get_value('ATCUD Log', {
+			atcud_log = find_atcud_log({
 				'atcud_code': atcud_code,
 				'document_name': self.sales_invoice_name
-			}, ['name', 'validation_status', 'generation_method', 'creation'], as_dict=True)
+			}, ['name', 'validation_status', 'generation_method', 'creation'])
 
 			if atcud_log:
 				return {
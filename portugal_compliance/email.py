@@ -14,6 +14,15 @@ from frappe.core.doctype.communication.email import make
 import json
 from datetime import datetime, timedelta
 
+from portugal_compliance.utils.notification_dispatcher import (
+	get_company_recipients,
+	make_dedup_key,
+	queue_notification
+)
+from portugal_compliance.utils.lazy import LazySingleton
+
+COMPANY_NOTIFICATION_ROLES = ("Accounts Manager", "Accounts User", "Portugal Compliance User")
+
 
 class PortugalComplianceEmailManager:
 	"""
@@ -321,14 +330,12 @@ class PortugalComplianceEmailManager:
 
 	# ========== MÉTODOS AUXILIARES ==========
 
-	def _send_notification(self, template_key, template_data, recipients=None, priority="normal"):
+	def _send_notification(self, template_key, template_data, recipients=None, priority="normal",
+						   dedup_key=None):
 		"""
-		✅ Envia notificação usando template especificado
+		✅ Coloca a notificação na fila do dispatcher (digest por destinatário)
 		"""
 		try:
-			if not recipients:
-				recipients = self.notification_settings["notification_recipients"]
-
 			template_config = self.email_templates.get(template_key)
 			if not template_config:
 				frappe.log_error(f"Template não encontrado: {template_key}")
@@ -340,17 +347,24 @@ class PortugalComplianceEmailManager:
 			# Gerar conteúdo do email
 			email_content = self._generate_email_content(template_key, template_data)
 
-			# Enviar para cada destinatário
-			for recipient in recipients:
-				try:
-					self._send_email(
-						recipient["email"],
-						subject,
-						email_content,
-						priority=priority
-					)
-				except Exception as e:
-					frappe.log_error(f"Erro ao enviar email para {recipient['email']}: {str(e)}")
+			if recipients:
+				recipients = [recipient["email"] for recipient in recipients]
+			elif not template_data.get("company"):
+				recipients = [recipient["email"] for recipient in
+							  self.notification_settings["notification_recipients"]]
+
+			# Sem destinatários explícitos, o dispatcher resolve-os pela empresa (cache);
+			# a chave inclui empresa e destinatários (outro público não é duplicado)
+			company = template_data.get("company")
+			queue_notification(
+				subject,
+				email_content,
+				dedup_key=dedup_key or make_dedup_key(template_key, subject, company, *sorted(recipients or [])),
+				company=company,
+				recipients=recipients,
+				priority=priority,
+				roles=COMPANY_NOTIFICATION_ROLES
+			)
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao enviar notificação {template_key}: {str(e)}")
@@ -397,26 +411,16 @@ class PortugalComplianceEmailManager:
 
 	def _get_company_users(self, company):
 		"""
-		✅ Obtém usuários relacionados com uma empresa específica
+		✅ Obtém usuários com acesso à empresa (cache por empresa no dispatcher)
 		"""
 		try:
-			# Buscar usuários que têm acesso à empresa
-			users = frappe.db.sql("""
-								  SELECT DISTINCT u.email, u.full_name
-								  FROM `tabUser` u
-										   JOIN `tabUserRole` ur ON u.name = ur.parent
-								  WHERE ur.role IN ('Accounts Manager', 'Accounts User',
-													'Portugal Compliance User')
-									AND u.enabled = 1
-									AND u.email IS NOT NULL
-									AND u.email != ''
-								  """, as_dict=True)
+			users = get_company_recipients(company, roles=COMPANY_NOTIFICATION_ROLES)
 
 			if not users:
 				# Fallback para destinatários padrão
 				return self.notification_settings["notification_recipients"]
 
-			return [{"email": user.email, "name": user.full_name} for user in users]
+			return [{"email": user["email"], "name": user["full_name"]} for user in users]
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao obter usuários da empresa {company}: {str(e)}")
@@ -744,7 +748,7 @@ class PortugalComplianceEmailManager:
 # ========== INSTÂNCIA GLOBAL ==========
 
 # ✅ Instância global para uso em hooks e APIs
-email_manager = PortugalComplianceEmailManager()
+email_manager = LazySingleton(PortugalComplianceEmailManager)
 
 
 # ========== FUNÇÕES GLOBAIS PARA HOOKS ==========
@@ -117,7 +117,11 @@ doc_events = {
 	"Delivery Note": {
 		"before_save": "portugal_compliance.utils.document_hooks.generate_atcud_before_save",
 		"validate": "portugal_compliance.utils.document_hooks.validate_portugal_compliance",
-		"before_submit": "portugal_compliance.utils.document_hooks.before_submit_document",
+		"before_submit": [
+			"portugal_compliance.utils.document_hooks.before_submit_document",
+			"portugal_compliance.utils.transport_communication.mark_transport_document"
+		],
+		"on_submit": "portugal_compliance.utils.transport_communication.queue_transport_document",
 		"after_insert": "portugal_compliance.utils.document_hooks.generate_atcud_after_insert"
 	},
 	"Purchase Receipt": {
@@ -129,6 +133,8 @@ doc_events = {
 	"Stock Entry": {
 		"before_save": "portugal_compliance.utils.document_hooks.generate_atcud_before_save",
 		"validate": "portugal_compliance.utils.document_hooks.validate_portugal_compliance",
+		"before_submit": "portugal_compliance.utils.transport_communication.mark_transport_document",
+		"on_submit": "portugal_compliance.utils.transport_communication.queue_transport_document",
 		"after_insert": "portugal_compliance.utils.document_hooks.generate_atcud_after_insert"
 	},
 
@@ -156,22 +162,74 @@ doc_events = {
 
 	# ========== CONFIGURAÇÃO DA EMPRESA ==========
 	"Company": {
-		"on_update": "portugal_compliance.utils.document_hooks.setup_company_portugal_compliance",
+		"on_update": [
+			"portugal_compliance.utils.document_hooks.setup_company_portugal_compliance",
+			"portugal_compliance.utils.compliance_cache.invalidate_company_cache"
+		],
+		"on_trash": "portugal_compliance.utils.compliance_cache.invalidate_company_cache",
 		"validate": "portugal_compliance.regional.portugal.validate_portugal_company_settings"
 	},
 
 	# ========== VALIDAÇÃO DE ENTIDADES ==========
 	"Customer": {
-		"validate": "portugal_compliance.utils.document_hooks.validate_customer_nif"
+		"validate": "portugal_compliance.utils.document_hooks.validate_customer_nif",
+		"on_update": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		],
+		"on_trash": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		],
+		"after_rename": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		]
 	},
 	"Supplier": {
-		"validate": "portugal_compliance.utils.document_hooks.validate_supplier_nif"
+		"validate": "portugal_compliance.utils.document_hooks.validate_supplier_nif",
+		"on_update": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		],
+		"on_trash": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		],
+		"after_rename": [
+			"portugal_compliance.queries.party_search.invalidate_party_search_cache",
+			"portugal_compliance.utils.compliance_cache.invalidate_party_cache"
+		]
 	},
 
 	# ========== CONFIGURAÇÃO DE SÉRIES PORTUGUESAS ==========
 	"Portugal Series Configuration": {
 		"validate": "portugal_compliance.utils.document_hooks.validate_series_configuration",
-		"before_save": "portugal_compliance.utils.document_hooks.update_series_pattern"
+		"before_save": "portugal_compliance.utils.document_hooks.update_series_pattern",
+		"on_update": "portugal_compliance.utils.compliance_cache.invalidate_series_cache",
+		"on_trash": "portugal_compliance.utils.compliance_cache.invalidate_series_cache",
+		"after_rename": "portugal_compliance.utils.compliance_cache.invalidate_series_cache"
+	},
+
+	# ========== CALENDÁRIO FISCAL (utils/fiscal_calendar) ==========
+	"Fiscal Year": {
+		"on_update": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache",
+		"on_trash": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache",
+		"after_rename": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache"
+	},
+	"Period Closing Voucher": {
+		"on_submit": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache",
+		"on_cancel": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache"
+	},
+	"Accounting Period": {
+		"on_update": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache",
+		"on_trash": "portugal_compliance.utils.compliance_cache.invalidate_fiscal_cache"
+	},
+
+	# ========== CACHE DE DESTINATÁRIOS DE NOTIFICAÇÕES ==========
+	"User Permission": {
+		"on_update": "portugal_compliance.utils.notification_dispatcher.clear_recipient_cache",
+		"on_trash": "portugal_compliance.utils.notification_dispatcher.clear_recipient_cache"
 	}
 }
 
@@ -179,12 +237,14 @@ doc_events = {
 # ✅ PERMISSIONS
 permission_query_conditions = {
 	"Portugal Series Configuration": "portugal_compliance.queries.has_permission_for_series.get_permission_query_conditions",
-	"ATCUD Log": "portugal_compliance.queries.has_permission_for_atcud.get_permission_query_conditions"
+	"ATCUD Log": "portugal_compliance.queries.has_permission_for_atcud.get_permission_query_conditions",
+	"ATCUD Log Archive": "portugal_compliance.queries.has_permission_for_atcud.get_permission_query_conditions"
 }
 
 has_permission = {
 	"Portugal Series Configuration": "portugal_compliance.queries.has_permission_for_series.has_permission",
-	"ATCUD Log": "portugal_compliance.queries.has_permission_for_atcud.has_permission"
+	"ATCUD Log": "portugal_compliance.queries.has_permission_for_atcud.has_permission",
+	"ATCUD Log Archive": "portugal_compliance.queries.has_permission_for_atcud.has_permission"
 }
 
 # ✅ OVERRIDE DOCTYPE CLASS
@@ -6,6 +6,10 @@ import frappe
 from frappe import _
 from erpnext.stock.doctype.delivery_note.delivery_note import DeliveryNote
 
+from portugal_compliance.utils.atcud_log_store import update_atcud_log
+from portugal_compliance.utils.atcud_log_writer import queue_atcud_log, queue_series_usage
+from portugal_compliance.utils.nif_validator import validate_nif
+
 
 class CustomDeliveryNote(DeliveryNote):
 	"""
@@ -77,38 +81,7 @@ class CustomDeliveryNote(DeliveryNote):
 
 	def validate_portuguese_nif(self, nif):
 		"""Valida NIF português"""
-		try:
-			if not nif:
-				return False
-
-			# Remover espaços e caracteres não numéricos
-			import re
-			nif = re.sub(r'[^\d]', '', str(nif))
-
-			# Verificar se tem 9 dígitos
-			if len(nif) != 9:
-				return False
-
-			# Verificar se começa com dígito válido
-			if nif[0] not in '123456789':
-				return False
-
-			# Calcular dígito de controlo
-			check_sum = 0
-			for i in range(8):
-				check_sum += int(nif[i]) * (9 - i)
-
-			remainder = check_sum % 11
-
-			if remainder < 2:
-				check_digit = 0
-			else:
-				check_digit = 11 - remainder
-
-			return int(nif[8]) == check_digit
-
-		except Exception:
-			return False
+		return validate_nif(nif)
 
 	def validate_transport_information(self):
 		"""Valida informações de transporte"""
@@ -332,56 +305,25 @@ class CustomDeliveryNote(DeliveryNote):
 			)
 
 	def create_atcud_log(self):
-		"""Cria log do ATCUD gerado"""
+		"""Acumula o log do ATCUD gerado (um INSERT para toda a transação no commit)"""
 		if not getattr(self, 'atcud_code', None):
 			return
 
 		try:
-			atcud_log = frappe.get_doc({
-				"doctype": "ATCUD Log",
-				"atcud_code": self.atcud_code,
-				"document_type": "Delivery Note",
-				"document_name": self.name,
-				"company": self.company,
-				"series_name": self.naming_series,
-				"document_date": self.posting_date,
-				"customer": self.customer,
-				"customer_name": self.customer_name,
-				"delivery_address": self.shipping_address_name,
-				"transporter": getattr(self, 'transporter', None),
-				"vehicle_no": getattr(self, 'vehicle_no', None),
-				"total_weight": getattr(self, 'total_net_weight', 0),
-				"validation_status": "Valid",
-				"generation_method": "Automatic"
-			})
-			atcud_log.insert(ignore_permissions=True)
-
+			queue_atcud_log(self)
 		except Exception as e:
-			frappe.log_error(f"Error creating ATCUD log for Delivery Note {self.name}: {str(e)}")
+			frappe.log_error(f"Error creating ATCUD log for {self.doctype} {self.name}: {str(e)}")
 
 	def update_series_sequence(self):
-		"""Atualiza sequência da série"""
+		"""Acumula a utilização da série (um UPDATE por série no commit)"""
 		if not self.naming_series:
 			return
 
 		try:
-			# Atualizar contador da série
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"series_name": self.naming_series,
-				"document_type": "Delivery Note",
-				"company": self.company
-			}, "name")
-
-			if series_config:
-				current_number = self.get_document_number()
-				frappe.db.set_value("Portugal Series Configuration", series_config, {
-					"current_number": current_number,
-					"last_used_date": self.posting_date
-				})
-
+			queue_series_usage(self)
 		except Exception as e:
 			frappe.log_error(
-				f"Error updating series sequence for Delivery Note {self.name}: {str(e)}")
+				f"Error updating series sequence for {self.doctype} {self.name}: {str(e)}")
 
 	def create_transport_notification(self):
 		"""Cria notificação de transporte se necessário"""
@@ -463,19 +405,16 @@ class CustomDeliveryNote(DeliveryNote):
 
 		try:
 			# Marcar log como cancelado
-			atcud_log = frappe.db.exists("ATCUD Log", {
+			update_atcud_log({
 				"atcud_code": self.atcud_code,
 				"document_name": self.name
+			}, {
+				"validation_status": "Cancelled",
+				"cancellation_date": frappe.utils.now(),
+				"cancellation_reason": getattr(self, 'reason_for_cancellation',
+											   'Delivery note cancelled')
 			})
 
-			if atcud_log:
-				frappe.db.set_value("ATCUD Log", atcud_log, {
-					"validation_status": "Cancelled",
-					"cancellation_date": frappe.utils.now(),
-					"cancellation_reason": getattr(self, 'reason_for_cancellation',
-												   'Delivery note cancelled')
-				})
-
 		except Exception as e:
 			frappe.log_error(
 				f"Error updating ATCUD log on cancel for Delivery Note {self.name}: {str(e)}")
@@ -485,6 +424,8 @@ class CustomDeliveryNote(DeliveryNote):
 		return {
 			"transport_document_number": self.name,
 			"atcud_code": getattr(self, 'atcud_code', None),
+			"at_transport_code": getattr(self, 'at_transport_code', None),
+			"at_transport_status": getattr(self, 'at_transport_status', None),
 			"transport_date": self.posting_date,
 			"customer_name": self.customer_name,
 			"delivery_address": self.shipping_address_name,
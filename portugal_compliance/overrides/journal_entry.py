@@ -4,8 +4,14 @@
 
 import frappe
 from frappe import _
+from frappe.utils import getdate
 from erpnext.accounts.doctype.journal_entry.journal_entry import JournalEntry
 
+from portugal_compliance.utils.atcud_log_store import update_atcud_log
+from portugal_compliance.utils.atcud_log_writer import queue_atcud_log, queue_series_usage
+from portugal_compliance.utils.fiscal_calendar import get_fiscal_year, get_period_closing, is_period_closed
+from portugal_compliance.utils.nif_validator import validate_nif
+
 
 class CustomJournalEntry(JournalEntry):
 	"""
@@ -103,38 +109,7 @@ class CustomJournalEntry(JournalEntry):
 
 	def validate_portuguese_nif(self, nif):
 		"""Valida NIF português"""
-		try:
-			if not nif:
-				return False
-
-			# Remover espaços e caracteres não numéricos
-			import re
-			nif = re.sub(r'[^\d]', '', str(nif))
-
-			# Verificar se tem 9 dígitos
-			if len(nif) != 9:
-				return False
-
-			# Verificar se começa com dígito válido
-			if nif[0] not in '123456789':
-				return False
-
-			# Calcular dígito de controlo
-			check_sum = 0
-			for i in range(8):
-				check_sum += int(nif[i]) * (9 - i)
-
-			remainder = check_sum % 11
-
-			if remainder < 2:
-				check_digit = 0
-			else:
-				check_digit = 11 - remainder
-
-			return int(nif[8]) == check_digit
-
-		except Exception:
-			return False
+		return validate_nif(nif)
 
 	def validate_journal_type(self):
 		"""Valida tipo de lançamento"""
@@ -153,14 +128,13 @@ class CustomJournalEntry(JournalEntry):
 
 	def validate_opening_entry(self):
 		"""Valida lançamento de abertura"""
-		# Verificar se é início de período fiscal
-		from erpnext.accounts.utils import get_fiscal_year
-
+		# Verificar se é início de período fiscal (calendário fiscal em memória)
 		try:
-			fiscal_year = get_fiscal_year(self.posting_date, company=self.company)
-			fy_start_date = fiscal_year[1]
+			fiscal_year = get_fiscal_year(self.posting_date, self.company)
+			if not fiscal_year:
+				return
 
-			if self.posting_date != fy_start_date:
+			if getdate(self.posting_date) != fiscal_year[1]:
 				frappe.msgprint(
 					_("Opening entries should typically be posted on fiscal year start date"),
 					indicator="orange",
@@ -171,14 +145,13 @@ class CustomJournalEntry(JournalEntry):
 
 	def validate_closing_entry(self):
 		"""Valida lançamento de encerramento"""
-		# Verificar se é fim de período fiscal
-		from erpnext.accounts.utils import get_fiscal_year
-
+		# Verificar se é fim de período fiscal (calendário fiscal em memória)
 		try:
-			fiscal_year = get_fiscal_year(self.posting_date, company=self.company)
-			fy_end_date = fiscal_year[2]
+			fiscal_year = get_fiscal_year(self.posting_date, self.company)
+			if not fiscal_year:
+				return
 
-			if self.posting_date != fy_end_date:
+			if getdate(self.posting_date) != fiscal_year[2]:
 				frappe.msgprint(
 					_("Closing entries should typically be posted on fiscal year end date"),
 					indicator="orange",
@@ -328,25 +301,17 @@ class CustomJournalEntry(JournalEntry):
 
 	def validate_closed_periods(self):
 		"""Valida períodos fechados"""
-		# Verificar se período está fechado
-		try:
-			from erpnext.accounts.utils import get_fiscal_year
-
-			fiscal_year = get_fiscal_year(self.posting_date, company=self.company)
-
-			# Verificar se existe Period Closing Voucher
-			period_closing = frappe.db.exists("Period Closing Voucher", {
-				"company": self.company,
-				"fiscal_year": fiscal_year[0],
-				"docstatus": 1
-			})
+		# Verificar se período está fechado (Period Closing Voucher / Accounting Period)
+		closing = get_period_closing(self.posting_date, self.company, self.doctype)
+		if not closing:
+			return
 
-			if period_closing:
-				frappe.throw(_("Cannot create journal entry in closed fiscal year '{0}'").format(
-					fiscal_year[0]))
+		if closing["reason"] == "fiscal_year":
+			frappe.throw(_("Cannot create journal entry in closed fiscal year '{0}'").format(
+				closing["fiscal_year"]))
 
-		except Exception:
-			pass
+		frappe.throw(_("Cannot create journal entry in closed accounting period '{0}'").format(
+			closing["accounting_period"]))
 
 	def validate_amount_limits(self):
 		"""Valida limites de valores"""
@@ -376,58 +341,25 @@ class CustomJournalEntry(JournalEntry):
 					frappe.throw(_("Cannot change posting date to more than 30 days in the past"))
 
 	def create_atcud_log(self):
-		"""Cria log do ATCUD gerado"""
+		"""Acumula o log do ATCUD gerado (um INSERT para toda a transação no commit)"""
 		if not getattr(self, 'atcud_code', None):
 			return
 
 		try:
-			# Calcular totais
-			total_debit = sum([d.debit_in_account_currency for d in self.accounts])
-			total_credit = sum([d.credit_in_account_currency for d in self.accounts])
-
-			atcud_log = frappe.get_doc({
-				"doctype": "ATCUD Log",
-				"atcud_code": self.atcud_code,
-				"document_type": "Journal Entry",
-				"document_name": self.name,
-				"company": self.company,
-				"series_name": self.naming_series,
-				"document_date": self.posting_date,
-				"voucher_type": self.voucher_type,
-				"total_debit": total_debit,
-				"total_credit": total_credit,
-				"user_remark": self.user_remark,
-				"validation_status": "Valid",
-				"generation_method": "Automatic"
-			})
-			atcud_log.insert(ignore_permissions=True)
-
+			queue_atcud_log(self)
 		except Exception as e:
-			frappe.log_error(f"Error creating ATCUD log for Journal Entry {self.name}: {str(e)}")
+			frappe.log_error(f"Error creating ATCUD log for {self.doctype} {self.name}: {str(e)}")
 
 	def update_series_sequence(self):
-		"""Atualiza sequência da série"""
+		"""Acumula a utilização da série (um UPDATE por série no commit)"""
 		if not self.naming_series:
 			return
 
 		try:
-			# Atualizar contador da série
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"series_name": self.naming_series,
-				"document_type": "Journal Entry",
-				"company": self.company
-			}, "name")
-
-			if series_config:
-				current_number = self.get_document_number()
-				frappe.db.set_value("Portugal Series Configuration", series_config, {
-					"current_number": current_number,
-					"last_used_date": self.posting_date
-				})
-
+			queue_series_usage(self)
 		except Exception as e:
 			frappe.log_error(
-				f"Error updating series sequence for Journal Entry {self.name}: {str(e)}")
+				f"Error updating series sequence for {self.doctype} {self.name}: {str(e)}")
 
 	def create_accounting_notification(self):
 		"""Cria notificação contabilística se necessário"""
@@ -492,22 +424,8 @@ class CustomJournalEntry(JournalEntry):
 						_("Cannot cancel journal entry older than 30 days due to Portuguese regulations"))
 
 			# Verificar se não afeta períodos fechados
-			try:
-				from erpnext.accounts.utils import get_fiscal_year
-
-				fiscal_year = get_fiscal_year(self.posting_date, company=self.company)
-
-				period_closing = frappe.db.exists("Period Closing Voucher", {
-					"company": self.company,
-					"fiscal_year": fiscal_year[0],
-					"docstatus": 1
-				})
-
-				if period_closing:
-					frappe.throw(_("Cannot cancel journal entry in closed fiscal year"))
-
-			except Exception:
-				pass
+			if is_period_closed(self.posting_date, self.company, self.doctype):
+				frappe.throw(_("Cannot cancel journal entry in closed fiscal year"))
 
 	def on_cancel(self):
 		"""Ações após cancelamento"""
@@ -524,19 +442,16 @@ class CustomJournalEntry(JournalEntry):
 
 		try:
 			# Marcar log como cancelado
-			atcud_log = frappe.db.exists("ATCUD Log", {
+			update_atcud_log({
 				"atcud_code": self.atcud_code,
 				"document_name": self.name
+			}, {
+				"validation_status": "Cancelled",
+				"cancellation_date": frappe.utils.now(),
+				"cancellation_reason": getattr(self, 'reason_for_cancellation',
+											   'Journal entry cancelled')
 			})
 
-			if atcud_log:
-				frappe.db.set_value("ATCUD Log", atcud_log, {
-					"validation_status": "Cancelled",
-					"cancellation_date": frappe.utils.now(),
-					"cancellation_reason": getattr(self, 'reason_for_cancellation',
-												   'Journal entry cancelled')
-				})
-
 		except Exception as e:
 			frappe.log_error(
 				f"Error updating ATCUD log on cancel for Journal Entry {self.name}: {str(e)}")
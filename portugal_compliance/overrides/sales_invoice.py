@@ -13,10 +13,14 @@ Overrides específicos para Sales Invoice com compliance português
 
 import frappe
 from frappe import _
-from frappe.utils import flt, cint, getdate, now_datetime
+from frappe.utils import flt, getdate, now_datetime
 import re
 from datetime import datetime
 
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.nif_validator import STRICT_FIRST_DIGITS, validate_nif
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class SalesInvoicePortugalCompliance:
 	"""
@@ -534,24 +538,7 @@ class SalesInvoicePortugalCompliance:
 		✅ OTIMIZADO: Verificar se empresa é portuguesa com cache
 		"""
 		try:
-			cache_key = f"portuguese_company_{company}"
-			cached_result = frappe.cache().get_value(cache_key)
-
-			if cached_result is None:
-				company_data = frappe.db.get_value("Company", company,
-												   ["country", "portugal_compliance_enabled"],
-												   as_dict=True)
-
-				if company_data:
-					cached_result = (company_data.country == "Portugal" and
-									 cint(company_data.portugal_compliance_enabled))
-				else:
-					cached_result = False
-
-				# Cache por 10 minutos
-				frappe.cache().set_value(cache_key, cached_result, expires_in_sec=600)
-
-			return cached_result
+			return compliance_cache.is_portuguese_company(company)
 
 		except Exception:
 			return False
@@ -575,33 +562,7 @@ class SalesInvoicePortugalCompliance:
 		"""
 		✅ ATUALIZADO: Validar NIF português
 		"""
-		try:
-			if not nif:
-				return False
-
-			# Limpar NIF
-			clean_nif = re.sub(r'[^0-9]', '', str(nif))
-
-			# Verificar comprimento
-			if len(clean_nif) != 9:
-				return False
-
-			# Verificar primeiro dígito
-			if clean_nif[0] not in ['1', '2', '3', '5', '6', '7', '8', '9']:
-				return False
-
-			# Calcular dígito de controle
-			checksum = 0
-			for i in range(8):
-				checksum += int(clean_nif[i]) * (9 - i)
-
-			remainder = checksum % 11
-			control_digit = 0 if remainder < 2 else 11 - remainder
-
-			return int(clean_nif[8]) == control_digit
-
-		except Exception:
-			return False
+		return validate_nif(nif, STRICT_FIRST_DIGITS)
 
 	# ========== RELATÓRIOS ESPECÍFICOS ==========
 
@@ -654,7 +615,7 @@ class SalesInvoicePortugalCompliance:
 
 
 # ========== INSTÂNCIA GLOBAL ==========
-sales_invoice_portugal_compliance = SalesInvoicePortugalCompliance()
+sales_invoice_portugal_compliance = LazySingleton(SalesInvoicePortugalCompliance)
 
 
 # ========== FUNÇÕES PARA HOOKS ==========
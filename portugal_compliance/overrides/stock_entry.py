@@ -6,6 +6,10 @@ import frappe
 from frappe import _
 from erpnext.stock.doctype.stock_entry.stock_entry import StockEntry
 
+from portugal_compliance.utils.atcud_log_store import update_atcud_log
+from portugal_compliance.utils.atcud_log_writer import queue_atcud_log, queue_series_usage
+from portugal_compliance.utils.fiscal_calendar import get_period_closing
+
 
 class CustomStockEntry(StockEntry):
 	"""
@@ -335,29 +339,19 @@ class CustomStockEntry(StockEntry):
 
 	def validate_closed_periods(self):
 		"""Valida períodos fechados"""
-		# Verificar se período está fechado para stock
-		try:
-			from erpnext.accounts.utils import get_fiscal_year
-
-			fiscal_year = get_fiscal_year(self.posting_date, company=self.company)
+		# Verificar se período está fechado para stock (calendário fiscal em memória)
+		closing = get_period_closing(self.posting_date, self.company, self.doctype)
+		if not closing:
+			return
 
-			# Verificar se existe Period Closing Voucher
-			period_closing = frappe.db.exists("Period Closing Voucher", {
-				"company": self.company,
-				"fiscal_year": fiscal_year[0],
-				"docstatus": 1
-			})
+		if closing["reason"] == "fiscal_year":
+			message = _("Stock entry in closed fiscal year '{0}' may require special authorization").format(
+				closing["fiscal_year"])
+		else:
+			message = _("Stock entry in closed accounting period '{0}' may require special authorization").format(
+				closing["accounting_period"])
 
-			if period_closing:
-				frappe.msgprint(
-					_("Stock entry in closed fiscal year '{0}' may require special authorization").format(
-						fiscal_year[0]),
-					indicator="orange",
-					title=_("Closed Period")
-				)
-
-		except Exception:
-			pass
+		frappe.msgprint(message, indicator="orange", title=_("Closed Period"))
 
 	def validate_value_limits(self):
 		"""Valida limites de valores"""
@@ -388,62 +382,25 @@ class CustomStockEntry(StockEntry):
 			)
 
 	def create_atcud_log(self):
-		"""Cria log do ATCUD gerado"""
+		"""Acumula o log do ATCUD gerado (um INSERT para toda a transação no commit)"""
 		if not getattr(self, 'atcud_code', None):
 			return
 
 		try:
-			# Calcular totais
-			total_qty = sum([item.qty for item in self.items])
-			total_value = sum([item.amount for item in self.items if item.amount])
-
-			atcud_log = frappe.get_doc({
-				"doctype": "ATCUD Log",
-				"atcud_code": self.atcud_code,
-				"document_type": "Stock Entry",
-				"document_name": self.name,
-				"company": self.company,
-				"series_name": self.naming_series,
-				"document_date": self.posting_date,
-				"stock_entry_type": self.stock_entry_type,
-				"total_qty": total_qty,
-				"total_value": total_value,
-				"purpose": self.purpose,
-				"from_warehouse": getattr(self, 'from_warehouse', None),
-				"to_warehouse": getattr(self, 'to_warehouse', None),
-				"work_order": getattr(self, 'work_order', None),
-				"bom_no": getattr(self, 'bom_no', None),
-				"validation_status": "Valid",
-				"generation_method": "Automatic"
-			})
-			atcud_log.insert(ignore_permissions=True)
-
+			queue_atcud_log(self)
 		except Exception as e:
-			frappe.log_error(f"Error creating ATCUD log for Stock Entry {self.name}: {str(e)}")
+			frappe.log_error(f"Error creating ATCUD log for {self.doctype} {self.name}: {str(e)}")
 
 	def update_series_sequence(self):
-		"""Atualiza sequência da série"""
+		"""Acumula a utilização da série (um UPDATE por série no commit)"""
 		if not self.naming_series:
 			return
 
 		try:
-			# Atualizar contador da série
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"series_name": self.naming_series,
-				"document_type": "Stock Entry",
-				"company": self.company
-			}, "name")
-
-			if series_config:
-				current_number = self.get_document_number()
-				frappe.db.set_value("Portugal Series Configuration", series_config, {
-					"current_number": current_number,
-					"last_used_date": self.posting_date
-				})
-
+			queue_series_usage(self)
 		except Exception as e:
 			frappe.log_error(
-				f"Error updating series sequence for Stock Entry {self.name}: {str(e)}")
+				f"Error updating series sequence for {self.doctype} {self.name}: {str(e)}")
 
 	def create_stock_notification(self):
 		"""Cria notificação de stock se necessário"""
@@ -540,19 +497,16 @@ class CustomStockEntry(StockEntry):
 
 		try:
 			# Marcar log como cancelado
-			atcud_log = frappe.db.exists("ATCUD Log", {
+			update_atcud_log({
 				"atcud_code": self.atcud_code,
 				"document_name": self.name
+			}, {
+				"validation_status": "Cancelled",
+				"cancellation_date": frappe.utils.now(),
+				"cancellation_reason": getattr(self, 'reason_for_cancellation',
+											   'Stock entry cancelled')
 			})
 
-			if atcud_log:
-				frappe.db.set_value("ATCUD Log", atcud_log, {
-					"validation_status": "Cancelled",
-					"cancellation_date": frappe.utils.now(),
-					"cancellation_reason": getattr(self, 'reason_for_cancellation',
-												   'Stock entry cancelled')
-				})
-
 		except Exception as e:
 			frappe.log_error(
 				f"Error updating ATCUD log on cancel for Stock Entry {self.name}: {str(e)}")
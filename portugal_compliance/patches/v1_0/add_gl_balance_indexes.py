@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from portugal_compliance.utils.db_indexes import run_index_patch
+
+
+def execute():
+	"""
+	✅ Saldos do SAF-T: índices no GL Entry/GL Monthly Balance.
+	O agregado é construído na primeira exportação contabilística (ou com bench pt-build-gl-balances).
+	"""
+	from portugal_compliance.utils.gl_balance_engine import ensure_balance_schema
+
+	run_index_patch(ensure_balance_schema, "Índices do agregado de saldos GL criados")
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from portugal_compliance.utils.db_indexes import run_index_patch
+
+
+def execute():
+	"""
+	✅ Pesquisa indexada de Clientes/Fornecedores:
+	coluna NIF normalizada (preenchida em chunks), índice no nome e índice FULLTEXT
+	"""
+	from portugal_compliance.queries.party_search import ensure_party_search_schema
+
+	run_index_patch(ensure_party_search_schema, "Índices de pesquisa de Clientes/Fornecedores criados")
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from portugal_compliance.utils.db_indexes import run_index_patch
+
+
+def execute():
+	"""
+	✅ Relatórios paginados por cursor: índices (creation) e (company, creation)
+	no ATCUD Log (quente/frio), SAF-T Export Log e Portugal Series Configuration.
+	"""
+	from portugal_compliance.utils.keyset_pagination import ensure_report_indexes
+
+	run_index_patch(ensure_report_indexes, "Índices dos relatórios paginados criados")
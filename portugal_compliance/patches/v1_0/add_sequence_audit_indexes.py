@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from portugal_compliance.utils.db_indexes import run_index_patch
+
+
+def execute():
+	"""
+	✅ Auditoria incremental de sequências: índices (naming_series, modified) e
+	(atcud_code) nas tabelas dos documentos com séries configuradas.
+	"""
+	from portugal_compliance.utils.sequence_audit import ensure_audit_indexes
+
+	run_index_patch(ensure_audit_indexes, "Índices da auditoria de sequências criados")
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class ATCUDLogArchive(Document):
+	"""
+	Armazenamento frio do ATCUD Log (só leitura)
+	As linhas são movidas em bloco por utils.atcud_log_store - nunca criadas pela UI.
+	"""
+	pass
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class CompliancePerformanceMetric(Document):
+	"""
+	Histograma horário de uma etapa instrumentada (só leitura)
+	Escrito por utils.performance_metrics.persist_metrics - nunca criado pela UI.
+	"""
+
+	def autoname(self):
+		from portugal_compliance.utils.performance_metrics import make_row_name
+
+		self.name = make_row_name(self.stage, self.period_start)
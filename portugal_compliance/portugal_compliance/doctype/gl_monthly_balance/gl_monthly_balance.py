@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class GLMonthlyBalance(Document):
+	"""
+	Totais mensais de débito/crédito por conta (só leitura)
+	Mantidos por utils.gl_balance_engine a partir do GL Entry - nunca criados pela UI.
+	"""
+	pass
@@ -116,6 +116,10 @@ function add_action_buttons(frm) {
         frm.add_custom_button(__('Download SAF-T File'), function() {
             download_saft_file(frm);
         }, __('Actions'));
+
+        frm.add_custom_button(__('Download SAF-T File (ZIP)'), function() {
+            download_saft_file(frm, 'zip');
+        }, __('Actions'));
     }
 
     // Botão para validar XML
@@ -263,41 +267,30 @@ function show_export_statistics(frm) {
     }
 }
 
-function download_saft_file(frm) {
+function download_saft_file(frm, compression) {
     frappe.call({
-        method: 'portugal_compliance.api.saft_api.download_saft_file',
+        method: 'portugal_compliance.api.saft_api.prepare_saft_download',
         args: {
-            export_log_name: frm.doc.name
+            export_log_name: frm.doc.name,
+            compression: compression || null
         },
         callback: function(r) {
             if (r.message && r.message.status === 'success') {
-                // Criar blob e fazer download
-                const blob = new Blob([r.message.content], {
-                    type: r.message.content_type
-                });
-
-                const url = URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = r.message.filename;
-                document.body.appendChild(a);
-                a.click();
-                document.body.removeChild(a);
-                URL.revokeObjectURL(url);
-
-                // Incrementar contador de downloads
-                frappe.call({
-                    method: 'increment_download_count',
-                    doc: frm.doc,
-                    callback: function() {
-                        frm.reload_doc();
-                    }
-                });
+                // Streaming direto do ficheiro guardado (sem passar pelo JSON)
+                window.open(r.message.download_url);
 
                 frappe.show_alert({
-                    message: __('SAF-T file downloaded successfully'),
+                    message: __('SAF-T file download started'),
                     indicator: 'green'
                 });
+                setTimeout(() => frm.reload_doc(), 2000);
+            } else if (r.message && r.message.status === 'regenerating') {
+                frappe.msgprint({
+                    title: __('SAF-T Regeneration'),
+                    message: r.message.message,
+                    indicator: 'orange'
+                });
+                frm.reload_doc();
             } else {
                 frappe.msgprint({
                     title: __('Download Error'),
@@ -3,9 +3,14 @@ from frappe.model.document import Document
 from frappe import _
 import os
 import hashlib
-import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 
+from portugal_compliance.utils.saft_validator import (
+	apply_validation_result,
+	validate_saft_content,
+	validate_saft_file
+)
+
 
 class SAFTExportLog(Document):
 	def validate(self):
@@ -63,7 +68,8 @@ class SAFTExportLog(Document):
 
 	def after_insert(self):
 		"""Executado após inserir"""
-		if self.status == "Pending":
+		# Os logs de um lote (utils/saft_batch) são gerados pelos jobs do lote
+		if self.status == "Pending" and not self.flags.in_saft_batch:
 			# Agendar geração do SAF-T em background
 			frappe.enqueue(
 				'portugal_compliance.utils.saft_generator.generate_saft_background',
@@ -95,58 +101,34 @@ class SAFTExportLog(Document):
 			self.save()
 
 	def validate_xml_content(self, xml_content):
-		"""Valida conteúdo XML contra schema XSD"""
+		"""Valida conteúdo XML contra schema XSD (streaming por secções)"""
 		try:
-			# Parse XML
-			root = ET.fromstring(xml_content)
-
-			validation_errors = []
-
-			# Verificar namespace
-			expected_namespace = "urn:OECD:StandardAuditFile-Tax:PT_1.04_01"
-			if root.tag != f"{{{expected_namespace}}}AuditFile":
-				validation_errors.append("Invalid root element or namespace")
-
-			# Verificar elementos obrigatórios
-			required_elements = ["Header", "MasterFiles"]
-			for element in required_elements:
-				if root.find(f".//{{{expected_namespace}}}{element}") is None:
-					validation_errors.append(f"Required element {element} is missing")
-
-			# Verificar header obrigatório
-			header = root.find(f".//{{{expected_namespace}}}Header")
-			if header is not None:
-				required_header_fields = [
-					"AuditFileVersion", "CompanyID", "TaxRegistrationNumber",
-					"CompanyName", "FiscalYear", "StartDate", "EndDate"
-				]
-
-				for field in required_header_fields:
-					if header.find(f".//{{{expected_namespace}}}{field}") is None:
-						validation_errors.append(f"Required header field {field} is missing")
-
-			# Atualizar status de validação
-			if validation_errors:
-				self.xml_validation_status = "Invalid"
-				self.xsd_validation_errors = "\n".join(validation_errors)
-			else:
-				self.xml_validation_status = "Valid"
-				self.xsd_validation_errors = ""
-
+			result = validate_saft_content(xml_content)
+			apply_validation_result(self, result)
 			self.save()
 
-			return len(validation_errors) == 0
+			return result["valid"]
 
-		except ET.ParseError as e:
+		except Exception as e:
 			self.xml_validation_status = "Validation Error"
-			self.xsd_validation_errors = f"XML Parse Error: {str(e)}"
+			self.xsd_validation_errors = f"Validation Error: {str(e)}"
 			self.save()
 			return False
+
+	def validate_xml_file(self):
+		"""Valida o ficheiro guardado contra schema XSD sem o carregar em memória"""
+		if not self.file_path or not os.path.exists(self.file_path):
+			frappe.throw(_("Export file not found"))
+
+		try:
+			result = validate_saft_file(self.file_path)
+			apply_validation_result(self, result)
 		except Exception as e:
 			self.xml_validation_status = "Validation Error"
 			self.xsd_validation_errors = f"Validation Error: {str(e)}"
-			self.save()
-			return False
+
+		self.save()
+		return self.xml_validation_status == "Valid"
 
 	def submit_to_at(self, username, password):
 		"""Submete arquivo à AT"""
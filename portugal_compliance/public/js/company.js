@@ -833,7 +833,11 @@ function communicate_all_series_to_at_fixed(frm) {
                             message: __('Processo de comunicação iniciado. Verifique os logs para detalhes.'),
                             indicator: 'green'
                         });
-                        frm.reload_doc();
+                        if (r.message.job_id) {
+                            track_series_communication(frm, r.message.job_id);
+                        } else {
+                            frm.reload_doc();
+                        }
                     } else {
                         frappe.msgprint({
                             title: __('❌ Erro na Comunicação'),
@@ -854,6 +858,32 @@ function communicate_all_series_to_at_fixed(frm) {
     );
 }
 
+function track_series_communication(frm, job_id) {
+    /**
+     * ✅ Progresso da comunicação em background (evento realtime por série)
+     */
+
+    const event = 'series_communication_progress';
+    const handler = function(data) {
+        if (data.job_id !== job_id) return;
+
+        frappe.show_progress(__('Comunicação de Séries à AT'), data.done, data.total,
+            data.naming_series || '');
+
+        if (data.finished) {
+            frappe.realtime.off(event, handler);
+            frappe.hide_progress();
+            frappe.show_alert({
+                message: __('{0} séries comunicadas, {1} falhadas', [data.successful, data.failed]),
+                indicator: data.failed ? 'orange' : 'green'
+            });
+            frm.reload_doc();
+        }
+    };
+
+    frappe.realtime.on(event, handler);
+}
+
 function check_communicated_series_fixed(frm) {
     /**
      * ✅ CORRIGIDO: Verificar séries usando método whitelisted
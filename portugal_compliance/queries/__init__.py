@@ -93,6 +93,9 @@ except ImportError as e:
 	def get_filtered_atcud_list(document_type=None, company=None, validation_status=None):
 		return {"status": "error", "atcud_logs": [], "total": 0}
 
+# ✅ standard_queries (hooks) aponta para portugal_compliance.queries.customer_query
+from .customer import customer_query, supplier_query
+
 # Exportar apenas as funções que existem
 __all__ = [
 	'get_permission_query_conditions_for_series',
@@ -100,6 +103,8 @@ __all__ = [
 	'has_permission_for_atcud',
 	'get_filtered_series_list',
 	'get_filtered_atcud_list',
-	'customer'
+	'customer',
+	'customer_query',
+	'supplier_query'
 ]
 
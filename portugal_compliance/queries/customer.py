@@ -10,42 +10,21 @@ Baseado na sua experiência com programação.sistemas_erp[3]
 import frappe
 from frappe import _
 
+from portugal_compliance.queries.party_search import search_parties, search_parties_fallback
+
 @frappe.whitelist()
 def customer_query(doctype, txt, searchfield, start, page_len, filters, as_dict=False):
     """
     ✅ ENGLISH: Query for customer search with Portuguese validations
-    Uses native naming series format (without hyphens)
+    NIF-shaped input uses the normalized tax ID index, names use prefix/full-text indexes
+    Link-field filters and User Permissions apply as in ERPNext's customer_query
     """
     try:
-        return frappe.db.sql("""
-            SELECT name, customer_name, customer_group, tax_id
-            FROM `tabCustomer`
-            WHERE (customer_name LIKE %(txt)s OR name LIKE %(txt)s OR tax_id LIKE %(txt)s)
-            AND disabled = 0
-            ORDER BY
-                CASE WHEN name LIKE %(txt)s THEN 0 ELSE 1 END,
-                customer_name
-            LIMIT %(start)s, %(page_len)s
-        """, {
-            "txt": f"%{txt}%",
-            "start": start,
-            "page_len": page_len
-        }, as_dict=as_dict)
+        return search_parties("Customer", txt, start, page_len, filters, as_dict=as_dict)
 
     except Exception as e:
         frappe.log_error(f"Error in customer_query: {str(e)}")
-        return frappe.db.sql("""
-            SELECT name, customer_name, customer_group
-            FROM `tabCustomer`
-            WHERE customer_name LIKE %(txt)s
-            AND disabled = 0
-            ORDER BY customer_name
-            LIMIT %(start)s, %(page_len)s
-        """, {
-            "txt": f"%{txt}%",
-            "start": start,
-            "page_len": page_len
-        }, as_dict=as_dict)
+        return search_parties_fallback("Customer", txt, start, page_len, filters, as_dict=as_dict)
 
 @frappe.whitelist()
 def supplier_query(doctype, txt, searchfield, start, page_len, filters, as_dict=False):
@@ -53,19 +32,8 @@ def supplier_query(doctype, txt, searchfield, start, page_len, filters, as_dict=
     ✅ ENGLISH: Query for supplier search with Portuguese validations
     """
     try:
-        return frappe.db.sql("""
-            SELECT name, supplier_name, supplier_group, tax_id
-            FROM `tabSupplier`
-            WHERE (supplier_name LIKE %(txt)s OR name LIKE %(txt)s OR tax_id LIKE %(txt)s)
-            AND disabled = 0
-            ORDER BY supplier_name
-            LIMIT %(start)s, %(page_len)s
-        """, {
-            "txt": f"%{txt}%",
-            "start": start,
-            "page_len": page_len
-        }, as_dict=as_dict)
+        return search_parties("Supplier", txt, start, page_len, filters, as_dict=as_dict)
 
     except Exception as e:
         frappe.log_error(f"Error in supplier_query: {str(e)}")
-        return []
+        return search_parties_fallback("Supplier", txt, start, page_len, filters, as_dict=as_dict)
@@ -5,6 +5,8 @@
 import frappe
 from frappe import _
 
+from portugal_compliance.utils.atcud_log_store import get_atcud_logs
+
 
 def get_permission_query_conditions_for_atcud(user):
 	"""
@@ -369,14 +371,13 @@ def get_filtered_atcud_list(document_type=None, company=None, validation_status=
 		filters = get_atcud_filters_for_user(user, filters)
 
 		# Obter lista de ATCUD
-		atcud_list = frappe.db.get_all("ATCUD Log",
-									   filters=filters,
-									   fields=["name", "atcud_code", "document_type",
-											   "document_name", "company",
-											   "validation_status", "creation", "owner"],
-									   order_by="creation desc",
-									   limit=100
-									   )
+		atcud_list = get_atcud_logs(filters=filters,
+									fields=["name", "atcud_code", "document_type",
+											"document_name", "company",
+											"validation_status", "creation", "owner"],
+									order_by="creation desc",
+									limit=100
+									)
 
 		return {
 			"status": "success",
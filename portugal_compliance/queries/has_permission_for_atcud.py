@@ -5,6 +5,8 @@
 import frappe
 from frappe import _
 
+from portugal_compliance.utils.atcud_log_store import HOT_DOCTYPE, find_atcud_log, get_atcud_logs
+
 
 def has_permission_for_atcud(user=None, atcud_code=None, document_type=None, company=None):
 	"""
@@ -192,9 +194,9 @@ def check_specific_atcud_permission(user, atcud_code):
 	"""
 	try:
 		# Verificar se ATCUD existe
-		atcud_log = frappe.db.get_value("ATCUD Log", {
+		atcud_log = find_atcud_log({
 			"atcud_code": atcud_code
-		}, ["company", "document_type", "document_name", "owner"], as_dict=True)
+		}, ["company", "document_type", "document_name", "owner"])
 
 		if not atcud_log:
 			return False
@@ -388,9 +390,9 @@ def validate_atcud_access(atcud_code):
 		has_access = check_specific_atcud_permission(user, atcud_code)
 
 		if has_access:
-			atcud_info = frappe.db.get_value("ATCUD Log", {
+			atcud_info = find_atcud_log({
 				"atcud_code": atcud_code
-			}, ["document_type", "document_name", "company", "creation"], as_dict=True)
+			}, ["document_type", "document_name", "company", "creation"])
 
 			return {
 				"status": "success",
@@ -510,12 +512,14 @@ def has_permission(doc, user):
 		return False
 
 
-def get_permission_query_conditions(user):
+def get_permission_query_conditions(user, doctype=HOT_DOCTYPE):
 	"""
 	Obter condições de query para permissões ATCUD Log (para hooks.py)
+	✅ Mesmas condições para a camada fria (ATCUD Log Archive)
 
 	Args:
 		user: Usuário
+		doctype: ATCUD Log ou ATCUD Log Archive
 
 	Returns:
 		str: Condições SQL
@@ -539,7 +543,7 @@ def get_permission_query_conditions(user):
 
 		if user_companies:
 			companies = [f"'{company.for_value}'" for company in user_companies]
-			return f"`tabATCUD Log`.company in ({','.join(companies)})"
+			return f"`tab{doctype}`.company in ({','.join(companies)})"
 
 		return "1=0"
 
@@ -570,8 +574,8 @@ def get_atcud_logs_for_document(document_type, document_name=None, company=None)
 		if company:
 			filters["company"] = company
 
-		logs = frappe.get_all("ATCUD Log",
-							  filters=filters,
+		# ✅ Camadas quente e fria (logs antigos movidos para ATCUD Log Archive)
+		logs = get_atcud_logs(filters=filters,
 							  fields=["name", "atcud_code", "document_name", "series_used",
 									  "generation_status", "generation_date", "sequence_number"],
 							  order_by="creation desc",
@@ -612,10 +616,9 @@ def validate_atcud_code(atcud_code):
 			}
 
 		# Verificar se já existe
-		existing = frappe.db.exists("ATCUD Log", {"atcud_code": atcud_code})
+		log_doc = find_atcud_log({"atcud_code": atcud_code})
 
-		if existing:
-			log_doc = frappe.get_doc("ATCUD Log", existing)
+		if log_doc:
 			return {
 				"status": "warning",
 				"valid": True,
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Party Search - Portugal Compliance
+Pesquisa indexada de Clientes/Fornecedores para campos Link
+✅ NIF: Entrada com forma de NIF usa igualdade/prefixo na coluna normalizada indexada
+✅ NOMES: Prefixo (índice B-tree) e, se necessário, índice FULLTEXT
+   (sem índice FULLTEXT ou se a consulta falhar: substring, como antes)
+✅ CACHE: Resultados recentes por utilizador, invalidados ao gravar Cliente/Fornecedor
+✅ SEM OFFSET EM TABELA COMPLETA: Cada consulta lê no máximo start + page_len linhas
+✅ FILTROS E PERMISSÕES: Filtros do campo Link e User Permissions aplicados em todas
+   as consultas (como nas consultas standard do ERPNext)
+"""
+
+import hashlib
+import json
+import re
+
+import frappe
+from frappe.desk.reportview import build_match_conditions, get_filters_cond
+from frappe.utils import cint
+
+from portugal_compliance.utils.db_indexes import ensure_indexes
+from portugal_compliance.utils.nif_validator import NIF_LENGTH, normalize_nif
+
+NORMALIZED_TAX_ID_FIELD = "pt_tax_id_normalized"
+FULLTEXT_INDEX_NAME = "pt_party_name_fulltext"
+
+PARTY_SEARCH_CONFIG = {
+	"Customer": {"name_field": "customer_name", "group_field": "customer_group"},
+	"Supplier": {"name_field": "supplier_name", "group_field": "supplier_group"}
+}
+
+# "PT 123 456", "123.456.789", "5001" - dígitos com separadores opcionais
+NIF_QUERY_PATTERN = re.compile(r"^\s*(PT)?[\d\s.\-]+$", re.IGNORECASE)
+MIN_NIF_PREFIX_LENGTH = 3
+
+# innodb_ft_min_token_size padrão
+MIN_FULLTEXT_TOKEN_LENGTH = 3
+
+SEARCH_CACHE_TTL = 120
+SEARCH_CACHE_PREFIX = "portugal_compliance:party_search:"
+
+_fulltext_index_cache = {}
+
+
+# ========== DETEÇÃO DE MODO ==========
+
+def is_nif_query(txt):
+	"""Texto com forma de NIF (prefixo de 3 a 9 dígitos, opcionalmente com "PT")"""
+	if not txt or not NIF_QUERY_PATTERN.match(txt):
+		return False
+
+	return MIN_NIF_PREFIX_LENGTH <= len(normalize_nif(txt)) <= NIF_LENGTH
+
+
+def _escape_like(txt):
+	return txt.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_fulltext_query(txt):
+	"""'+palavra*' para cada palavra indexável (modo BOOLEAN); None se nenhuma"""
+	words = [word for word in re.findall(r"\w+", txt or "") if len(word) >= MIN_FULLTEXT_TOKEN_LENGTH]
+	if not words:
+		return None
+
+	return " ".join(f"+{word}*" for word in words)
+
+
+def has_fulltext_index(doctype):
+	"""Índice FULLTEXT no nome (verificado uma vez por processo)"""
+	if doctype not in _fulltext_index_cache:
+		_fulltext_index_cache[doctype] = bool(frappe.db.sql(
+			f"SHOW INDEX FROM `tab{doctype}` WHERE Key_name = %s", FULLTEXT_INDEX_NAME))
+
+	return _fulltext_index_cache[doctype]
+
+
+def _has_normalized_tax_id(doctype):
+	return frappe.db.has_column(doctype, NORMALIZED_TAX_ID_FIELD)
+
+
+# ========== CONSULTAS ==========
+
+def _parse_filters(filters):
+	"""Filtros do campo Link (dict/lista ou JSON) - None se vazios"""
+	if isinstance(filters, str):
+		filters = json.loads(filters) if filters.strip() else None
+
+	return filters or None
+
+
+def get_search_conditions(doctype, filters=None):
+	"""
+	✅ Condições extra " AND ..." para todas as consultas:
+	filtros do campo Link + condições de User Permissions do utilizador
+	"""
+	conditions = get_filters_cond(doctype, _parse_filters(filters), [], ignore_permissions=True) or ""
+
+	match_conditions = build_match_conditions(doctype)
+	if match_conditions:
+		conditions += f" AND ({match_conditions})"
+
+	return conditions
+
+
+def _select_columns(doctype):
+	config = PARTY_SEARCH_CONFIG[doctype]
+	return f"name, {config['name_field']}, {config['group_field']}, tax_id"
+
+
+def _search_by_tax_id(doctype, txt, limit, conditions=""):
+	"""Igualdade (9 dígitos) ou prefixo na coluna normalizada"""
+	digits = normalize_nif(txt)
+
+	if _has_normalized_tax_id(doctype):
+		column = NORMALIZED_TAX_ID_FIELD
+	else:
+		# Ainda sem coluna normalizada (patch por correr): prefixo no tax_id original
+		column = "tax_id"
+
+	if len(digits) == NIF_LENGTH:
+		condition, value = f"{column} = %(value)s", digits
+	else:
+		condition, value = f"{column} LIKE %(value)s", f"{digits}%"
+
+	return frappe.db.sql(f"""
+		SELECT {_select_columns(doctype)}
+		FROM `tab{doctype}`
+		WHERE {condition} AND disabled = 0 {conditions}
+		ORDER BY {column}, name
+		LIMIT %(limit)s
+	""", {"value": value, "limit": limit}, as_dict=True)
+
+
+def _search_by_name_prefix(doctype, txt, limit, conditions=""):
+	"""Prefixo no nome e no ID - cada ramo do UNION usa o seu índice"""
+	name_field = PARTY_SEARCH_CONFIG[doctype]["name_field"]
+	columns = _select_columns(doctype)
+
+	return frappe.db.sql(f"""
+		SELECT * FROM (
+			(SELECT {columns}, 0 AS match_rank FROM `tab{doctype}`
+			 WHERE name LIKE %(prefix)s AND disabled = 0 {conditions}
+			 ORDER BY name LIMIT %(limit)s)
+			UNION
+			(SELECT {columns}, 1 AS match_rank FROM `tab{doctype}`
+			 WHERE {name_field} LIKE %(prefix)s AND disabled = 0 {conditions}
+			 ORDER BY {name_field} LIMIT %(limit)s)
+		) matches
+		ORDER BY match_rank, {name_field}, name
+		LIMIT %(limit)s
+	""", {"prefix": f"{_escape_like(txt)}%", "limit": limit}, as_dict=True)
+
+
+def _search_by_fulltext(doctype, txt, limit, exclude, conditions=""):
+	"""Palavras em qualquer posição do nome (índice FULLTEXT)"""
+	fulltext_query = build_fulltext_query(txt)
+	if not fulltext_query or not has_fulltext_index(doctype):
+		return []
+
+	name_field = PARTY_SEARCH_CONFIG[doctype]["name_field"]
+	exclude_condition = "AND name NOT IN %(exclude)s" if exclude else ""
+
+	return frappe.db.sql(f"""
+		SELECT {_select_columns(doctype)}
+		FROM `tab{doctype}`
+		WHERE MATCH({name_field}) AGAINST (%(query)s IN BOOLEAN MODE)
+			AND disabled = 0
+			{exclude_condition} {conditions}
+		ORDER BY MATCH({name_field}) AGAINST (%(query)s IN BOOLEAN MODE) DESC, {name_field}
+		LIMIT %(limit)s
+	""", {"query": fulltext_query, "limit": limit, "exclude": tuple(exclude)}, as_dict=True)
+
+
+def _search_by_substring(doctype, txt, limit, exclude=None, start=0, conditions=""):
+	"""Texto em qualquer posição do nome, ID ou NIF (LIKE '%txt%', sem índice)"""
+	name_field = PARTY_SEARCH_CONFIG[doctype]["name_field"]
+	exclude_condition = "AND name NOT IN %(exclude)s" if exclude else ""
+
+	return frappe.db.sql(f"""
+		SELECT {_select_columns(doctype)}
+		FROM `tab{doctype}`
+		WHERE ({name_field} LIKE %(txt)s OR name LIKE %(txt)s OR tax_id LIKE %(txt)s)
+			AND disabled = 0
+			{exclude_condition} {conditions}
+		ORDER BY {name_field}, name
+		LIMIT %(start)s, %(limit)s
+	""", {"txt": f"%{_escape_like(txt)}%", "start": cint(start), "limit": limit,
+		  "exclude": tuple(exclude or ())}, as_dict=True)
+
+
+def _search_anywhere_in_name(doctype, txt, limit, exclude, conditions=""):
+	"""FULLTEXT quando existe índice e palavras indexáveis; caso contrário substring"""
+	if build_fulltext_query(txt) and has_fulltext_index(doctype):
+		try:
+			return _search_by_fulltext(doctype, txt, limit, exclude, conditions)
+		except Exception:
+			frappe.log_error(title=f"Party search: FULLTEXT em {doctype}", message=frappe.get_traceback())
+
+	return _search_by_substring(doctype, txt, limit, exclude, conditions=conditions)
+
+
+def _search_default(doctype, limit, conditions=""):
+	"""Sem texto: primeiros registos ativos pela ordem do nome"""
+	name_field = PARTY_SEARCH_CONFIG[doctype]["name_field"]
+	return frappe.db.sql(f"""
+		SELECT {_select_columns(doctype)}
+		FROM `tab{doctype}`
+		WHERE disabled = 0 {conditions}
+		ORDER BY {name_field}
+		LIMIT %(limit)s
+	""", {"limit": limit}, as_dict=True)
+
+
+def run_party_search(doctype, txt, start=0, page_len=20, filters=None):
+	"""
+	✅ Pesquisa sem cache (usada também pelo benchmark)
+
+	Args:
+		filters: Filtros do campo Link (aplicados com as User Permissions)
+
+	Returns:
+		list[dict]: linhas [start, start + page_len)
+	"""
+	txt = (txt or "").strip()
+	start, page_len = cint(start), cint(page_len) or 20
+	limit = start + page_len
+	conditions = get_search_conditions(doctype, filters)
+
+	if not txt:
+		rows = _search_default(doctype, limit, conditions)
+	elif is_nif_query(txt):
+		rows = _search_by_tax_id(doctype, txt, limit, conditions)
+		if not rows:
+			# Nomes numéricos ("1000 Ideias, Lda") continuam a ser encontrados
+			rows = _search_by_name_prefix(doctype, txt, limit, conditions)
+	else:
+		rows = _search_by_name_prefix(doctype, txt, limit, conditions)
+		if len(rows) < limit:
+			found = {row.name for row in rows}
+			rows.extend(_search_anywhere_in_name(doctype, txt, limit - len(rows), found, conditions))
+
+	for row in rows:
+		row.pop("match_rank", None)
+
+	return rows[start:limit]
+
+
+# ========== CACHE POR UTILIZADOR ==========
+
+def _version_key(doctype):
+	return f"{SEARCH_CACHE_PREFIX}version:{doctype}"
+
+
+def _cache_key(doctype, txt, start, page_len, filters=None):
+	version = frappe.cache().get_value(_version_key(doctype)) or "0"
+	filters_key = json.dumps(_parse_filters(filters), sort_keys=True, default=str)
+	digest = hashlib.sha1(f"{txt}|{start}|{page_len}|{filters_key}".encode("utf-8")).hexdigest()
+	return f"{SEARCH_CACHE_PREFIX}{frappe.session.user}:{doctype}:{version}:{digest}"
+
+
+def invalidate_party_search_cache(doc, method=None):
+	"""
+	✅ doc_events de Customer/Supplier: nova versão torna as entradas antigas inacessíveis
+	"""
+	if doc.doctype in PARTY_SEARCH_CONFIG:
+		frappe.cache().set_value(_version_key(doc.doctype), frappe.generate_hash(length=10))
+
+
+def search_parties(doctype, txt, start=0, page_len=20, filters=None, as_dict=False):
+	"""
+	✅ Pesquisa com cache por utilizador e filtros (TTL curto)
+	"""
+	txt = (txt or "").strip()
+	cache_key = _cache_key(doctype, txt.lower(), cint(start), cint(page_len), filters)
+
+	rows = frappe.cache().get_value(cache_key)
+	if rows is None:
+		rows = [dict(row) for row in run_party_search(doctype, txt, start, page_len, filters)]
+		frappe.cache().set_value(cache_key, rows, expires_in_sec=SEARCH_CACHE_TTL)
+
+	return _format_rows(rows, as_dict)
+
+
+def search_parties_fallback(doctype, txt, start=0, page_len=20, filters=None, as_dict=False):
+	"""
+	✅ Pesquisa por substring sem cache nem índices (se a pesquisa indexada falhar)
+	"""
+	rows = _search_by_substring(doctype, (txt or "").strip(), cint(page_len) or 20, start=start,
+								conditions=get_search_conditions(doctype, filters))
+	return _format_rows(rows, as_dict)
+
+
+def _format_rows(rows, as_dict):
+	if as_dict:
+		return [frappe._dict(row) for row in rows]
+
+	return [tuple(row.values()) for row in rows]
+
+
+# ========== ESQUEMA (PATCH) ==========
+
+def ensure_party_search_schema(chunk_size=20000):
+	"""
+	✅ Criar coluna normalizada + índices e preencher em chunks (idempotente)
+	"""
+	from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+	create_custom_fields({
+		doctype: [{
+			"fieldname": NORMALIZED_TAX_ID_FIELD,
+			"label": "NIF Normalizado",
+			"fieldtype": "Data",
+			"insert_after": "nif_validated",
+			"read_only": 1,
+			"hidden": 1,
+			"no_copy": 1,
+			"print_hide": 1,
+			"search_index": 1,
+			"module": "Portugal Compliance"
+		}] for doctype in PARTY_SEARCH_CONFIG
+	}, update=True)
+
+	ensure_indexes({doctype: ([config["name_field"]],) for doctype, config in PARTY_SEARCH_CONFIG.items()})
+
+	for doctype, config in PARTY_SEARCH_CONFIG.items():
+		backfill_normalized_tax_ids(doctype, chunk_size=chunk_size)
+
+		if not has_fulltext_index(doctype):
+			frappe.db.sql_ddl(
+				f"ALTER TABLE `tab{doctype}` ADD FULLTEXT INDEX `{FULLTEXT_INDEX_NAME}` ({config['name_field']})")
+			_fulltext_index_cache.pop(doctype, None)
+
+
+def backfill_normalized_tax_ids(doctype, chunk_size=20000):
+	"""Preencher pt_tax_id_normalized (keyset por name, um commit por chunk)"""
+	last_name = ""
+	updated = 0
+
+	while True:
+		names = frappe.db.sql_list(f"""
+			SELECT name FROM `tab{doctype}`
+			WHERE name > %(last_name)s
+			ORDER BY name
+			LIMIT %(limit)s
+		""", {"last_name": last_name, "limit": chunk_size})
+
+		if not names:
+			break
+
+		frappe.db.sql(f"""
+			UPDATE `tab{doctype}`
+			SET {NORMALIZED_TAX_ID_FIELD} = REGEXP_REPLACE(IFNULL(tax_id, ''), '[^0-9]', '')
+			WHERE name IN %(names)s
+		""", {"names": tuple(names)})
+		frappe.db.commit()
+
+		updated += len(names)
+		last_name = names[-1]
+
+	return updated
@@ -13,6 +13,9 @@ from frappe import _
 from frappe.utils import cint, now, today
 import re
 
+from portugal_compliance.utils import series_registry
+
+
 @frappe.whitelist()
 def get_naming_series_for_doctype(doctype, txt="", searchfield="naming_series", start=0,
 								  page_len=20, filters=None):
@@ -399,6 +402,58 @@ def get_series_usage_report(date_from=None, date_to=None, company=None):
 		return []
 
 
+SERIES_USAGE_FIELDS = (
+	"name", "creation", "prefix", "series_name", "document_type", "company", "is_communicated",
+	"validation_code", "current_sequence", "total_documents_issued", "communication_date",
+	"at_environment", "last_document_date"
+)
+
+
+def get_usage_category(total_documents_issued):
+	"""Categoria de uso (mesmos limites de get_series_usage_report)"""
+	total = cint(total_documents_issued)
+	if total == 0:
+		return "Não Usada"
+	if total < 10:
+		return "Baixo Uso"
+	if total < 100:
+		return "Uso Médio"
+	return "Alto Uso"
+
+
+@frappe.whitelist()
+def get_series_usage_page(date_from=None, date_to=None, company=None, fields=None, sort_by="creation",
+						  sort_order="desc", cursor=None, page_length=None):
+	"""
+	Relatório de uso das séries paginado por cursor (sort_by, name)
+	usage_category e days_since_last_use são calculados apenas para a página
+	"""
+	from frappe.utils import date_diff, getdate
+
+	from portugal_compliance.utils.keyset_pagination import get_page, parse_fields, parse_sort
+
+	sort_by, sort_order = parse_sort(sort_by, sort_order, ("creation", "modified", "name"))
+	fields = parse_fields(fields, SERIES_USAGE_FIELDS, SERIES_USAGE_FIELDS)
+	query_fields = list(dict.fromkeys([*fields, "total_documents_issued", "last_document_date"]))
+
+	filters = [["is_active", "=", 1]]
+	if company:
+		filters.append(["company", "=", company])
+	if date_from:
+		filters.append(["creation", ">=", getdate(date_from)])
+	if date_to:
+		filters.append(["creation", "<", frappe.utils.add_days(getdate(date_to), 1)])
+
+	page = get_page("Portugal Series Configuration", filters=filters, fields=query_fields, sort_by=sort_by,
+					sort_order=sort_order, cursor=cursor, page_length=page_length)
+
+	for row in page["data"]:
+		row["usage_category"] = get_usage_category(row.total_documents_issued)
+		row["days_since_last_use"] = date_diff(today(), row.last_document_date) if row.last_document_date else None
+
+	return page
+
+
 def get_series_by_document_name(doctype, document_name):
 	"""
 	Obter série portuguesa usada por um documento específico
@@ -655,17 +710,13 @@ def get_naming_series_options(doctype, company=None, only_communicated=False):
 		doctype = sanitize_query_input(doctype)
 		company = sanitize_query_input(company) if company else None
 
-		# Obter séries
-		series_list = get_portuguese_series_list(
-			doctype=doctype,
+		# Obter séries (registo em memória, já ordenado por preferência)
+		series_list = series_registry.get_company_series(
+			doctype,
 			company=company,
-			include_inactive=False
+			communicated_only=cint(only_communicated)
 		)
 
-		# Filtrar apenas comunicadas se solicitado
-		if cint(only_communicated):
-			series_list = [s for s in series_list if s.is_communicated]
-
 		# Formatar para retorno
 		options = []
 		for series in series_list:
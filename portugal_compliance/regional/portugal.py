@@ -17,6 +17,14 @@ from frappe.utils import nowdate, get_datetime, flt, cint, getdate
 import re
 from datetime import datetime, date
 
+from portugal_compliance.utils.nif_validator import (
+	NIF_STATUS_MESSAGES,
+	NIF_VALID,
+	STRICT_FIRST_DIGITS,
+	get_nif_status,
+	normalize_nif,
+)
+
 # ========== CONFIGURAÇÃO DE TIPOS DE DOCUMENTO ATUALIZADA ==========
 
 PORTUGAL_DOCUMENT_TYPES = {
@@ -373,40 +381,20 @@ def validate_portuguese_nif_enhanced(nif):
 	Baseado na sua experiência com programação.autenticação[3]
 	"""
 	try:
-		if not nif:
-			return {'valid': False, 'message': 'NIF não fornecido', 'type': None}
-
-		# Limpar NIF
-		nif_clean = re.sub(r'[^0-9]', '', str(nif))
-
-		if len(nif_clean) != 9:
-			return {'valid': False, 'message': 'NIF deve ter 9 dígitos', 'type': None}
+		status = get_nif_status(nif, STRICT_FIRST_DIGITS)
 
-		# Verificar primeiro dígito válido
-		first_digit = nif_clean[0]
-		if first_digit not in ['1', '2', '3', '5', '6', '7', '8', '9']:
-			return {'valid': False, 'message': 'Primeiro dígito do NIF inválido', 'type': None}
+		if status != NIF_VALID:
+			return {'valid': False, 'message': NIF_STATUS_MESSAGES[status], 'type': None}
 
-		# Algoritmo de validação mod 11
-		checksum = 0
-		for i in range(8):
-			checksum += int(nif_clean[i]) * (9 - i)
+		# ✅ DETERMINAR TIPO DE ENTIDADE
+		nif_clean = normalize_nif(nif)
 
-		remainder = checksum % 11
-		control_digit = 0 if remainder < 2 else 11 - remainder
-
-		if int(nif_clean[8]) == control_digit:
-			# ✅ DETERMINAR TIPO DE ENTIDADE
-			entity_type = get_nif_entity_type(first_digit)
-
-			return {
-				'valid': True,
-				'message': 'NIF válido',
-				'type': entity_type,
-				'formatted': format_nif_display(nif_clean)
-			}
-		else:
-			return {'valid': False, 'message': 'Dígito de controlo inválido', 'type': None}
+		return {
+			'valid': True,
+			'message': NIF_STATUS_MESSAGES[status],
+			'type': get_nif_entity_type(nif_clean[0]),
+			'formatted': format_nif_display(nif_clean)
+		}
 
 	except Exception as e:
 		return {'valid': False, 'message': f'Erro na validação: {str(e)}', 'type': None}
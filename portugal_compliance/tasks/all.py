@@ -10,6 +10,8 @@ import frappe
 from frappe import _
 from frappe.utils import now, get_datetime
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_log_source
+
 
 def execute():
 	"""
@@ -109,9 +111,9 @@ def check_critical_data_integrity():
 			frappe.log_error(f"Found {len(series_without_atcud)} series without validation code")
 
 		# Verificar documentos com ATCUD duplicado
-		duplicate_atcud = frappe.db.sql("""
+		duplicate_atcud = frappe.db.sql(f"""
 										SELECT atcud_code, COUNT(*) as count
-										FROM `tabATCUD Log`
+										FROM {get_atcud_log_source(columns=["atcud_code"])} atcud_log
 										WHERE atcud_code IS NOT NULL
 										GROUP BY atcud_code
 										HAVING count > 1
@@ -252,9 +254,7 @@ def log_system_metrics():
 		metrics = {
 			"date": today_date,
 			"timestamp": now(),
-			"atcud_generated_today": frappe.db.count("ATCUD Log", {
-				"creation": [">=", today_date]
-			}),
+			"atcud_generated_today": count_atcud_logs(from_date=today_date),
 			"series_communicated_today": frappe.db.count("Portugal Series Configuration", {
 				"communication_date": [">=", today_date],
 				"is_communicated": 1
@@ -13,6 +13,16 @@ from frappe.utils import today, now, add_days, get_datetime, cint, flt
 from datetime import datetime, timedelta
 import json
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_logs
+from portugal_compliance.utils.compliance_cache import invalidate as invalidate_compliance_cache
+from portugal_compliance.utils.notification_dispatcher import (
+	CHANNEL_SYSTEM,
+	get_company_recipients,
+	make_dedup_key,
+	queue_notification
+)
+from portugal_compliance.utils.task_graph import start_suite, task
+
 
 def execute():
 	"""
@@ -27,29 +37,11 @@ def execute():
 			frappe.logger().info("Portugal Compliance not enabled, skipping daily tasks")
 			return
 
-		# ✅ TAREFAS PRINCIPAIS (ADAPTADAS PARA NOVA ABORDAGEM)
-		generate_daily_report()
-		check_series_expiration()
-		validate_daily_sequences()
-		cleanup_old_logs()
-		check_pending_communications()
-		update_usage_statistics()
-		backup_critical_data()
-		send_daily_notifications()
-
-		# ✅ NOVAS TAREFAS ADAPTADAS PARA NAMING SERIES NATIVA
-		validate_naming_series_formats()
-		check_atcud_sequence_integrity()
-		monitor_communication_failures()
-		update_series_trends()
-		check_naming_series_consistency()
-		validate_essential_custom_fields_integrity()
-		cleanup_failed_communications()
-		generate_compliance_metrics()
-		sync_portugal_series_configurations()
+		# ✅ GRAFO DE TAREFAS: passos enfileirados como jobs independentes (ver TASK_GRAPH)
+		run_id = start_suite("daily")
 
 		frappe.logger().info(
-			"🇵🇹 Portugal Compliance: Daily tasks completed successfully - NEW APPROACH")
+			f"🇵🇹 Portugal Compliance: Daily tasks enqueued (run {run_id}) - NEW APPROACH")
 
 	except Exception as e:
 		frappe.log_error(f"Error in portugal_compliance.tasks.daily: {str(e)}")
@@ -87,9 +79,7 @@ def generate_daily_report():
 		# ✅ ESTATÍSTICAS ADAPTADAS PARA NAMING SERIES NATIVA
 		daily_stats = {
 			"date": today_date,
-			"atcud_generated": frappe.db.count("ATCUD Log", {
-				"creation": [">=", today_date]
-			}),
+			"atcud_generated": count_atcud_logs(from_date=today_date),
 			"series_communicated": frappe.db.count("Portugal Series Configuration", {
 				"communication_date": [">=", today_date],
 				"is_communicated": 1
@@ -203,12 +193,9 @@ def calculate_avg_atcud_time():
 	Calcula tempo médio de geração de ATCUD - MANTIDA
 	"""
 	try:
-		recent_logs = frappe.db.get_all("ATCUD Log",
-										filters={
-											"creation": [">=", add_days(today(), -7)],
-											"generation_status": "Success"
-										},
-										fields=["creation", "generation_date"])
+		recent_logs = get_atcud_logs(filters={"generation_status": "Success"},
+									 fields=["creation", "generation_date"],
+									 from_date=add_days(today(), -7))
 
 		if len(recent_logs) > 0:
 			return round(len(recent_logs) / 7, 2)
@@ -366,34 +353,14 @@ def validate_naming_series_formats():
 
 def check_atcud_sequence_integrity():
 	"""
-	Verifica integridade das sequências ATCUD - MANTIDA
+	Verifica integridade das sequências ATCUD - INCREMENTAL
+	✅ Shards (empresa, série) em jobs paralelos; só documentos alterados desde a
+	   última auditoria (ver utils/sequence_audit.py)
 	"""
 	try:
-		# Verificar duplicações de ATCUD
-		duplicate_atcuds = frappe.db.sql("""
-										 SELECT atcud_code, COUNT(*) as count
-										 FROM `tabATCUD Log`
-										 WHERE atcud_code IS NOT NULL
-										   AND atcud_code != ''
-										 GROUP BY atcud_code
-										 HAVING count > 1
-										 """, as_dict=True)
-
-		if duplicate_atcuds:
-			frappe.logger().error(f"❌ Found {len(duplicate_atcuds)} duplicate ATCUD codes")
-			create_atcud_integrity_alert(duplicate_atcuds)
-
-		# ✅ ADAPTADO: Verificar formato de ATCUDs (novo formato: 0.SEQUENCIAL)
-		invalid_atcuds = frappe.db.sql("""
-									   SELECT name, atcud_code, document_type
-									   FROM `tabATCUD Log`
-									   WHERE atcud_code IS NOT NULL
-										 AND atcud_code NOT REGEXP '^0\\.[0-9]+$'
-			  AND creation >= %s
-									   """, add_days(today(), -7), as_dict=True)
-
-		if invalid_atcuds:
-			frappe.logger().warning(f"⚠️ Found {len(invalid_atcuds)} ATCUDs with invalid format")
+		from portugal_compliance.utils.sequence_audit import start_sequence_audit
+
+		return start_sequence_audit()
 
 	except Exception as e:
 		frappe.log_error(f"Error checking ATCUD sequence integrity: {str(e)}")
@@ -546,6 +513,7 @@ def try_fix_naming_series_configuration(series_info):
 		# Atualizar Portugal Series Configuration
 		frappe.db.set_value("Portugal Series Configuration", series_info["series"],
 							"naming_series", expected_naming)
+		invalidate_compliance_cache("series")
 
 		frappe.logger().info(
 			f"✅ Fixed naming series for {series_info['series']}: {expected_naming}")
@@ -660,8 +628,8 @@ def generate_compliance_metrics():
 			"communicated_series": frappe.db.count("Portugal Series Configuration",
 												   {"is_communicated": 1}),
 			"correct_naming_series": count_series_with_correct_naming_series(),
-			"total_atcuds": frappe.db.count("ATCUD Log"),
-			"successful_atcuds": frappe.db.count("ATCUD Log", {"generation_status": "Success"}),
+			"total_atcuds": count_atcud_logs(),
+			"successful_atcuds": count_atcud_logs({"generation_status": "Success"}),
 			"portuguese_companies": frappe.db.count("Company", {"country": "Portugal"}),
 			"compliance_enabled_companies": frappe.db.count("Company",
 															{"portugal_compliance_enabled": 1})
@@ -756,8 +724,6 @@ def create_naming_series_format_alert(invalid_naming_series, missing_naming_seri
 	Cria alerta para formatos de naming series incorretos
 	"""
 	try:
-		admin_users = get_compliance_users()
-
 		message = f"""
 		⚠️ Alerta de Naming Series:
 		- {len(invalid_naming_series)} séries com naming series inválido
@@ -766,14 +732,12 @@ def create_naming_series_format_alert(invalid_naming_series, missing_naming_seri
 		Recomenda-se corrigir para formato: PREFIX.####
 		"""
 
-		for user in admin_users:
-			frappe.get_doc({
-				"doctype": "Notification Log",
-				"subject": "Portugal Compliance: Naming Series",
-				"email_content": message,
-				"for_user": user,
-				"type": "Alert"
-			}).insert(ignore_permissions=True)
+		queue_notification(
+			"Portugal Compliance: Naming Series",
+			message,
+			dedup_key=make_dedup_key("naming_series_format", today()),
+			channel=CHANNEL_SYSTEM
+		)
 
 	except Exception as e:
 		frappe.log_error(f"Error creating naming series format alert: {str(e)}")
@@ -784,8 +748,6 @@ def create_atcud_integrity_alert(duplicate_atcuds):
 	Cria alerta crítico para duplicação de ATCUD - MANTIDA
 	"""
 	try:
-		admin_users = get_compliance_users()
-
 		message = f"""
 		🚨 ALERTA CRÍTICO - Duplicação de ATCUD:
 		Encontrados {len(duplicate_atcuds)} códigos ATCUD duplicados.
@@ -794,14 +756,13 @@ def create_atcud_integrity_alert(duplicate_atcuds):
 		Verificação imediata necessária.
 		"""
 
-		for user in admin_users:
-			frappe.get_doc({
-				"doctype": "Notification Log",
-				"subject": "CRÍTICO: Duplicação ATCUD",
-				"email_content": message,
-				"for_user": user,
-				"type": "Alert"
-			}).insert(ignore_permissions=True)
+		queue_notification(
+			"CRÍTICO: Duplicação ATCUD",
+			message,
+			dedup_key=make_dedup_key("atcud_integrity", today()),
+			channel=CHANNEL_SYSTEM,
+			priority="high"
+		)
 
 	except Exception as e:
 		frappe.log_error(f"Error creating ATCUD integrity alert: {str(e)}")
@@ -809,6 +770,37 @@ def create_atcud_integrity_alert(duplicate_atcuds):
 
 # ========== MANTER TODAS AS FUNÇÕES EXISTENTES ADAPTADAS ==========
 
+def sync_naming_series_options():
+	"""
+	Sincroniza as opções de naming_series com as séries ativas (só escreve o que mudou)
+	✅ A 1 de janeiro as séries do novo ano passam a ser a predefinição
+	"""
+	try:
+		from portugal_compliance.utils.naming_series_sync import sync_naming_series_options as sync_options
+
+		sync_options()
+		frappe.db.commit()
+
+	except Exception as e:
+		frappe.log_error(f"Error syncing naming series options: {str(e)}")
+
+
+def prepare_series_rollover():
+	"""
+	Prepara as séries do próximo ano (só em dezembro; idempotente)
+	✅ Séries criadas e comunicadas antes de 1 de janeiro (utils/series_rollover)
+	"""
+	try:
+		from portugal_compliance.utils.series_rollover import run_series_rollover
+
+		summary = run_series_rollover()
+		if summary:
+			frappe.logger().info(f"Series rollover: {summary}")
+
+	except Exception as e:
+		frappe.log_error(f"Error preparing series rollover: {str(e)}")
+
+
 def check_series_expiration():
 	"""
 	Verifica séries que estão a expirar - ADAPTADA
@@ -843,22 +835,20 @@ def create_expiry_notification(series, days_until_expiry, severity):
 	Cria notificação de expiração de série - MANTIDA
 	"""
 	try:
-		users_to_notify = get_compliance_users(series.company)
-
 		message = _("Series '{0}' expires in {1} days").format(
 			series.series_name, days_until_expiry
 		)
 
-		for user in users_to_notify:
-			frappe.get_doc({
-				"doctype": "Notification Log",
-				"subject": _("Series Expiration Warning"),
-				"email_content": message,
-				"for_user": user,
-				"type": "Alert",
-				"document_type": "Portugal Series Configuration",
-				"document_name": series.name
-			}).insert(ignore_permissions=True)
+		# ✅ Fila do dispatcher: um alerta (digest) por utilizador da empresa
+		queue_notification(
+			_("Series Expiration Warning"),
+			message,
+			dedup_key=make_dedup_key("series_expiry", series.name, severity, today()),
+			company=series.company,
+			channel=CHANNEL_SYSTEM,
+			document_type="Portugal Series Configuration",
+			document_name=series.name
+		)
 
 	except Exception as e:
 		frappe.log_error(f"Error creating expiry notification: {str(e)}")
@@ -866,24 +856,20 @@ def create_expiry_notification(series, days_until_expiry, severity):
 
 def validate_daily_sequences():
 	"""
-	Valida sequências de ATCUD do dia - MANTIDA
+	Valida sequências de ATCUD - estado da última auditoria incremental
 	"""
 	try:
-		today_date = today()
+		from portugal_compliance.utils.sequence_audit import get_audit_summary
 
-		duplicate_sequences = frappe.db.sql("""
-											SELECT atcud_code, COUNT(*) as count
-											FROM `tabATCUD Log`
-											WHERE DATE (creation) = %s
-											  AND atcud_code IS NOT NULL
-											GROUP BY atcud_code
-											HAVING count > 1
-											""", today_date, as_dict=True)
-
-		if duplicate_sequences:
-			error_msg = f"Found {len(duplicate_sequences)} duplicate ATCUD sequences today"
+		summary = get_audit_summary()
+		if summary["duplicate_sequences"]:
+			error_msg = f"Found {summary['duplicate_sequences']} duplicate ATCUD sequences " \
+						f"in {summary['series_with_duplicates']} series"
 			frappe.log_error(error_msg, "ATCUD Sequence Validation")
 
+		if summary["invalid_documents"]:
+			frappe.logger().warning(f"⚠️ Found {summary['invalid_documents']} submitted documents without a valid ATCUD")
+
 		check_sequence_gaps()
 
 	except Exception as e:
@@ -892,17 +878,14 @@ def validate_daily_sequences():
 
 def check_sequence_gaps():
 	"""
-	Verifica gaps nas sequências de documentos - ADAPTADA
+	Verifica gaps nas sequências de documentos - estado da auditoria
 	"""
 	try:
-		active_series = frappe.db.get_all("Portugal Series Configuration",
-										  filters={"is_active": 1, "is_communicated": 1},
-										  fields=["name", "prefix", "current_sequence"])
+		from portugal_compliance.utils.sequence_audit import get_audit_state
 
-		for series in active_series:
-			gaps = find_sequence_gaps(series.prefix)
-			if gaps:
-				frappe.logger().warning(f"Sequence gaps found in series {series.prefix}: {gaps}")
+		for series in get_audit_state(active_only=True):
+			if series.gap_count:
+				frappe.logger().warning(f"Sequence gaps found in series {series.prefix}: {series.gaps}")
 
 	except Exception as e:
 		frappe.log_error(f"Error checking sequence gaps: {str(e)}")
@@ -910,14 +893,28 @@ def check_sequence_gaps():
 
 def find_sequence_gaps(series_prefix):
 	"""
-	Encontra gaps numa sequência de documentos - MANTIDA
+	Encontra gaps numa sequência de documentos (intervalos [início, fim] da última auditoria)
 	"""
 	try:
-		return []  # Implementação simplificada
+		gaps = frappe.db.get_value("Portugal Series Configuration", {"prefix": series_prefix}, "audit_gaps")
+		return json.loads(gaps) if gaps else []
 	except Exception:
 		return []
 
 
+def refresh_gl_balances():
+	"""
+	Avança o agregado mensal de saldos (SAF-T contabilístico) - NOVA
+	"""
+	try:
+		from portugal_compliance.utils.gl_balance_engine import refresh_all_companies
+
+		refresh_all_companies()
+
+	except Exception as e:
+		frappe.log_error(f"Error refreshing GL balances: {str(e)}")
+
+
 def cleanup_old_logs():
 	"""
 	Limpa logs antigos - MANTIDA
@@ -926,16 +923,17 @@ def cleanup_old_logs():
 		# Manter logs por 90 dias
 		cutoff_date = add_days(today(), -90)
 
-		# Limpar logs de ATCUD antigos
-		old_atcud_logs = frappe.db.count("ATCUD Log", {
-			"creation": ["<", cutoff_date]
-		})
+		# ✅ ATCUD Logs são registo de auditoria: mover para a camada fria em vez de apagar
+		from portugal_compliance.utils.atcud_log_store import move_to_cold_storage
 
-		if old_atcud_logs > 0:
-			frappe.db.delete("ATCUD Log", {
-				"creation": ["<", cutoff_date]
-			})
-			frappe.logger().info(f"🧹 Cleaned up {old_atcud_logs} old ATCUD logs")
+		moved = move_to_cold_storage()["moved"]
+		if moved:
+			frappe.logger().info(f"🧹 Moved {moved} old ATCUD logs to cold storage")
+
+		# Histogramas horários da instrumentação (retenção própria)
+		from portugal_compliance.utils.performance_metrics import cleanup_metrics
+
+		cleanup_metrics()
 
 		# Limpar logs de erro antigos relacionados com Portugal Compliance
 		frappe.db.sql("""
@@ -1039,7 +1037,7 @@ def backup_critical_data():
 		backup_data = {
 			"date": today(),
 			"series_count": frappe.db.count("Portugal Series Configuration"),
-			"atcud_count": frappe.db.count("ATCUD Log"),
+			"atcud_count": count_atcud_logs(),
 			"companies_count": frappe.db.count("Company", {"portugal_compliance_enabled": 1}),
 			"naming_series_health": check_naming_series_health()
 		}
@@ -1095,20 +1093,14 @@ def send_alert_notifications(alerts):
 	Envia notificações de alerta - MANTIDA
 	"""
 	try:
-		admin_users = frappe.db.get_all("User",
-										filters={
-											"role_profile_name": ["like", "%System Manager%"]},
-										fields=["name"])
-
 		for alert in alerts:
-			for user in admin_users:
-				frappe.get_doc({
-					"doctype": "Notification Log",
-					"subject": _("Portugal Compliance Alert"),
-					"email_content": alert["message"],
-					"for_user": user.name,
-					"type": "Alert"
-				}).insert(ignore_permissions=True)
+			queue_notification(
+				_("Portugal Compliance Alert"),
+				alert["message"],
+				dedup_key=make_dedup_key("critical_alert", alert.get("type"), alert["message"]),
+				channel=CHANNEL_SYSTEM,
+				roles=("System Manager",)
+			)
 
 	except Exception as e:
 		frappe.log_error(f"Error sending alert notifications: {str(e)}")
@@ -1119,17 +1111,71 @@ def get_compliance_users(company=None):
 	Obtém utilizadores responsáveis pelo compliance - MANTIDA
 	"""
 	try:
-		users = frappe.db.sql("""
-							  SELECT DISTINCT u.name
-							  FROM `tabUser` u
-									   JOIN `tabUserRole` ur ON u.name = ur.parent
-							  WHERE ur.role IN
-									('Accounts Manager', 'Accounts User', 'System Manager',
-									 'Portugal Compliance User')
-								AND u.enabled = 1
-							  """, as_list=True)
-
-		return [user[0] for user in users]
+		return [user["user"] for user in get_company_recipients(company)]
 
 	except Exception:
 		return ["Administrator"]
+
+
+# ========== GRAFO DE TAREFAS ==========
+
+def series_fingerprint():
+	"""Séries (número e última alteração) - passos que só leem Portugal Series Configuration"""
+	count, modified = frappe.db.sql("""
+		SELECT COUNT(*), MAX(modified) FROM `tabPortugal Series Configuration`
+	""")[0]
+	return f"{count}|{modified}"
+
+
+def naming_series_options_fingerprint():
+	"""Séries + ano (a ordem das opções muda na passagem de ano)"""
+	return f"{series_fingerprint()}|{today()[:4]}"
+
+
+def document_series_fingerprint():
+	"""Portugal Document Series + séries (origem e destino da sincronização)"""
+	if not frappe.db.table_exists("tabPortugal Document Series"):
+		return f"-|{series_fingerprint()}"
+
+	count, modified = frappe.db.sql("""
+		SELECT COUNT(*), MAX(modified) FROM `tabPortugal Document Series`
+	""")[0]
+	return f"{count}|{modified}|{series_fingerprint()}"
+
+
+def custom_field_fingerprint():
+	"""Campos atcud_code existentes"""
+	count, modified = frappe.db.sql("""
+		SELECT COUNT(*), MAX(modified) FROM `tabCustom Field` WHERE fieldname = 'atcud_code'
+	""")[0]
+	return f"{count}|{modified}"
+
+
+# Séries sincronizadas primeiro (todos os passos sobre séries leem o resultado);
+# verificações do ATCUD Log antes de mover logs para a camada fria;
+# notificações depois dos passos que geram alertas.
+TASK_GRAPH = {
+	"sync_portugal_series_configurations": task(fingerprint=document_series_fingerprint),
+	"check_naming_series_consistency": task(["sync_portugal_series_configurations"],
+											fingerprint=series_fingerprint),
+	"validate_naming_series_formats": task(["check_naming_series_consistency"], fingerprint=series_fingerprint),
+	"check_series_expiration": task(["sync_portugal_series_configurations"]),
+	"prepare_series_rollover": task(["sync_portugal_series_configurations"], timeout=1800, queue="long"),
+	"sync_naming_series_options": task(["prepare_series_rollover"], fingerprint=naming_series_options_fingerprint),
+	"check_pending_communications": task(["sync_portugal_series_configurations"]),
+	"monitor_communication_failures": task(["check_pending_communications"]),
+	"cleanup_failed_communications": task(["monitor_communication_failures"]),
+	"update_usage_statistics": task(["check_naming_series_consistency"], timeout=1800, queue="long"),
+	"update_series_trends": task(["check_naming_series_consistency"], timeout=1800, queue="long"),
+	"validate_daily_sequences": task(),
+	"check_atcud_sequence_integrity": task(),
+	"cleanup_old_logs": task(["validate_daily_sequences", "check_atcud_sequence_integrity"],
+							 timeout=3600, queue="long"),
+	"refresh_gl_balances": task(timeout=3600, queue="long"),
+	"validate_essential_custom_fields_integrity": task(fingerprint=custom_field_fingerprint),
+	"generate_daily_report": task(["check_pending_communications", "check_naming_series_consistency"]),
+	"generate_compliance_metrics": task(["check_naming_series_consistency", "cleanup_old_logs"]),
+	"backup_critical_data": task(["check_naming_series_consistency"]),
+	"send_daily_notifications": task(["check_series_expiration", "validate_naming_series_formats",
+									  "check_atcud_sequence_integrity", "monitor_communication_failures"])
+}
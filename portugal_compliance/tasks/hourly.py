@@ -12,6 +12,12 @@ from frappe.utils import now, get_datetime, add_to_date, cint
 from datetime import datetime, timedelta
 import requests
 
+from portugal_compliance.utils.atcud_log_store import get_atcud_logs
+from portugal_compliance.utils.compliance_cache import invalidate as invalidate_compliance_cache
+from portugal_compliance.utils.notification_dispatcher import resume_notification_queue
+from portugal_compliance.utils.saft_batch import resume_saft_queue
+from portugal_compliance.utils.transport_communication import resume_transport_queue
+
 
 def execute():
 	"""
@@ -28,11 +34,15 @@ def execute():
 		check_at_connectivity()
 		sync_pending_series()
 		monitor_system_performance()
+		persist_performance_metrics()
 		process_failed_communications()
 		update_real_time_cache()
 		check_certificate_status()
 		validate_recent_atcud()
 		cleanup_temporary_files()
+		resume_saft_queue()
+		resume_transport_queue()
+		resume_notification_queue()
 
 		frappe.logger().info("Portugal Compliance: Hourly tasks completed successfully")
 
@@ -187,6 +197,7 @@ def try_series_communication(series):
 				"validation_code": communication_result.get("validation_code"),
 				"communication_status": "Success"
 			})
+			invalidate_compliance_cache("series")
 			frappe.logger().info(f"Successfully communicated series {series.name}")
 		else:
 			frappe.db.set_value("Portugal Series Configuration", series.name, {
@@ -226,6 +237,21 @@ def simulate_at_communication(series):
 		}
 
 
+def persist_performance_metrics():
+	"""
+	Passa os histogramas da instrumentação (Redis) para Compliance Performance Metric
+	"""
+	try:
+		from portugal_compliance.utils.performance_metrics import persist_metrics
+
+		stages = persist_metrics()
+		if stages:
+			frappe.logger().info(f"Persisted performance metrics for {stages} stages")
+
+	except Exception as e:
+		frappe.log_error(f"Error persisting performance metrics: {str(e)}")
+
+
 def monitor_system_performance():
 	"""
 	Monitoriza performance do sistema
@@ -447,11 +473,10 @@ def validate_recent_atcud():
 		# Obter ATCUDs gerados na última hora
 		one_hour_ago = add_to_date(now(), hours=-1)
 
-		recent_atcud = frappe.db.get_all("ATCUD Log",
-										 filters={"creation": [">=", one_hour_ago]},
-										 fields=["name", "atcud_code", "document_type",
-												 "document_name"]
-										 )
+		recent_atcud = get_atcud_logs(filters={"creation": [">=", one_hour_ago]},
+									  fields=["name", "atcud_code", "document_type",
+											  "document_name"],
+									  from_date=one_hour_ago)
 
 		# Verificar duplicados
 		atcud_codes = [log.atcud_code for log in recent_atcud if log.atcud_code]
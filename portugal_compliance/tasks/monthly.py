@@ -8,12 +8,15 @@ Tarefas que executam mensalmente
 
 import frappe
 from frappe import _
-from frappe.utils import today, now, add_days, get_datetime, add_to_date, formatdate, \
+from frappe.utils import today, add_days, get_datetime, add_to_date, formatdate, \
 	get_first_day, get_last_day
 from datetime import datetime, timedelta
 import json
 import calendar
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_log_source
+from portugal_compliance.utils.task_graph import start_suite, task
+
 
 def execute():
 	"""
@@ -27,20 +30,10 @@ def execute():
 			frappe.logger().info("Portugal Compliance not enabled, skipping monthly tasks")
 			return
 
-		# Executar tarefas mensais
-		generate_monthly_compliance_report()
-		generate_monthly_saft()
-		analyze_monthly_trends()
-		perform_monthly_maintenance()
-		review_series_performance()
-		update_compliance_metrics()
-		archive_monthly_data()
-		generate_regulatory_reports()
-		review_system_capacity()
-		plan_next_month_activities()
-		send_monthly_executive_summary()
-
-		frappe.logger().info("Portugal Compliance: Monthly tasks completed successfully")
+		# ✅ GRAFO DE TAREFAS: passos enfileirados como jobs independentes (ver TASK_GRAPH)
+		run_id = start_suite("monthly")
+
+		frappe.logger().info(f"Portugal Compliance: Monthly tasks enqueued (run {run_id})")
 
 	except Exception as e:
 		frappe.log_error(f"Error in portugal_compliance.tasks.monthly: {str(e)}")
@@ -211,9 +204,7 @@ def calculate_atcud_compliance_score(start_date, end_date):
 								   """, (start_date, end_date, start_date, end_date, start_date,
 										 end_date))[0][0]
 
-		docs_with_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		docs_with_atcud = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_docs > 0:
 			compliance_rate = (docs_with_atcud / total_docs) * 100
@@ -289,11 +280,11 @@ def calculate_regulatory_compliance_score(start_date, end_date):
 			score -= min(overdue_series * 10, 50)
 
 		# Penalizar por códigos ATCUD duplicados
-		duplicate_atcud = frappe.db.sql("""
+		duplicate_atcud = frappe.db.sql(f"""
 										SELECT COUNT(*) as count
 										FROM (
 											SELECT atcud_code, COUNT (*) as dup_count
-											FROM `tabATCUD Log`
+											FROM {get_atcud_log_source(start_date, end_date, ["atcud_code", "creation"])} atcud_log
 											WHERE creation BETWEEN %s AND %s
 											GROUP BY atcud_code
 											HAVING dup_count > 1
@@ -402,9 +393,7 @@ def get_key_achievements(start_date, end_date):
 		achievements = []
 
 		# ATCUD gerados
-		total_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_atcud = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_atcud > 1000:
 			achievements.append(f"Generated {total_atcud:,} ATCUD codes")
@@ -463,11 +452,11 @@ def get_critical_issues(start_date, end_date):
 			})
 
 		# Códigos ATCUD duplicados
-		duplicate_atcud = frappe.db.sql("""
+		duplicate_atcud = frappe.db.sql(f"""
 										SELECT COUNT(*) as count
 										FROM (
 											SELECT atcud_code
-											FROM `tabATCUD Log`
+											FROM {get_atcud_log_source(start_date, end_date, ["atcud_code", "creation"])} atcud_log
 											WHERE creation BETWEEN %s AND %s
 											GROUP BY atcud_code
 											HAVING COUNT (*) > 1
@@ -512,13 +501,9 @@ def calculate_growth_metrics(start_date, end_date):
 		prev_month_end = start_date - timedelta(days=1)
 		prev_month_start = get_first_day(prev_month_end)
 
-		current_month_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		current_month_atcud = count_atcud_logs(from_date=start_date, to_date=end_date)
 
-		prev_month_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [prev_month_start, prev_month_end]]
-		})
+		prev_month_atcud = count_atcud_logs(from_date=prev_month_start, to_date=prev_month_end)
 
 		# Calcular crescimento
 		atcud_growth = 0
@@ -644,9 +629,7 @@ def get_monthly_atcud_analytics(start_date, end_date):
 	"""
 	try:
 		analytics = {
-			"total_generated": frappe.db.count("ATCUD Log", {
-				"creation": ["between", [start_date, end_date]]
-			}),
+			"total_generated": count_atcud_logs(from_date=start_date, to_date=end_date),
 			"by_document_type": {},
 			"by_company": {},
 			"by_day": {},
@@ -655,10 +638,12 @@ def get_monthly_atcud_analytics(start_date, end_date):
 			"error_analysis": {}
 		}
 
+		source = get_atcud_log_source(start_date, end_date, ["document_type", "company", "creation"])
+
 		# Análise por tipo de documento
-		doc_type_stats = frappe.db.sql("""
+		doc_type_stats = frappe.db.sql(f"""
 									   SELECT document_type, COUNT(*) as count
-									   FROM `tabATCUD Log`
+									   FROM {source} atcud_log
 									   WHERE creation BETWEEN %s
 										 AND %s
 									   GROUP BY document_type
@@ -669,9 +654,9 @@ def get_monthly_atcud_analytics(start_date, end_date):
 			analytics["by_document_type"][stat.document_type] = stat.count
 
 		# Análise por empresa
-		company_stats = frappe.db.sql("""
+		company_stats = frappe.db.sql(f"""
 									  SELECT company, COUNT(*) as count
-									  FROM `tabATCUD Log`
+									  FROM {source} atcud_log
 									  WHERE creation BETWEEN %s
 										AND %s
 									  GROUP BY company
@@ -783,9 +768,7 @@ def calculate_financial_impact(start_date, end_date):
 		impact["total_transaction_value"] = float(total_value)
 
 		# Contar documentos processados
-		impact["documents_processed"] = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		impact["documents_processed"] = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		# Estimar poupanças (baseado em automação vs processo manual)
 		if impact["documents_processed"] > 0:
@@ -912,8 +895,11 @@ def generate_monthly_recommendations(start_date, end_date):
 def generate_monthly_saft():
 	"""
 	Gera SAF-T mensal
+	✅ Um SAF-T Export Log por empresa; geração em jobs por grupo de empresas (utils/saft_batch)
 	"""
 	try:
+		from portugal_compliance.utils.saft_batch import start_saft_batch
+
 		frappe.logger().info("Generating monthly SAF-T")
 
 		# Mês anterior
@@ -921,51 +907,14 @@ def generate_monthly_saft():
 		last_month_end = get_first_day(today_date) - timedelta(days=1)
 		last_month_start = get_first_day(last_month_end)
 
-		# Obter empresas com compliance ativo
-		companies = frappe.db.get_all("Company",
-									  filters={"portugal_compliance_enabled": 1},
-									  fields=["name", "company_name"]
-									  )
-
-		for company in companies:
-			try:
-				# Gerar SAF-T para cada empresa
-				generate_company_monthly_saft(company.name, last_month_start, last_month_end)
+		run_id = start_saft_batch("monthly", last_month_start, last_month_end)
 
-			except Exception as e:
-				frappe.log_error(
-					f"Error generating monthly SAF-T for company {company.name}: {str(e)}")
-
-		frappe.logger().info("Monthly SAF-T generation completed")
+		frappe.logger().info(f"Monthly SAF-T generation enqueued: {run_id}")
 
 	except Exception as e:
 		frappe.log_error(f"Error in monthly SAF-T generation: {str(e)}")
 
 
-def generate_company_monthly_saft(company, start_date, end_date):
-	"""
-	Gera SAF-T mensal para uma empresa específica
-	"""
-	try:
-		# Simular geração de SAF-T (implementar com SAFTGenerator real)
-		frappe.logger().info(f"Generating monthly SAF-T for {company}")
-
-		# Criar registo de export
-		export_log = frappe.get_doc({
-			"doctype": "SAF-T Export Log",
-			"company": company,
-			"export_type": "Monthly",
-			"period_start": start_date,
-			"period_end": end_date,
-			"status": "Completed",
-			"export_date": now()
-		})
-		export_log.insert(ignore_permissions=True)
-
-	except Exception as e:
-		frappe.log_error(f"Error generating company monthly SAF-T for {company}: {str(e)}")
-
-
 def analyze_monthly_trends():
 	"""
 	Analisa tendências mensais
@@ -1122,3 +1071,23 @@ def get_monthly_summary():
 			}
 	except Exception:
 		return {"status": "error", "month": "Unknown"}
+
+
+# ========== GRAFO DE TAREFAS ==========
+
+# O passo do SAF-T só cria os logs e enfileira os jobs por empresa (utils/saft_batch);
+# arquivo depois do relatório; resumo e planeamento leem o relatório.
+TASK_GRAPH = {
+	"generate_monthly_compliance_report": task(timeout=1800, queue="long"),
+	"generate_monthly_saft": task(),
+	"analyze_monthly_trends": task(),
+	"review_series_performance": task(),
+	"update_compliance_metrics": task(),
+	"review_system_capacity": task(),
+	"generate_regulatory_reports": task(["generate_monthly_saft"]),
+	"archive_monthly_data": task(["generate_monthly_compliance_report", "generate_monthly_saft"],
+								 timeout=3600, queue="long"),
+	"perform_monthly_maintenance": task(["archive_monthly_data"], timeout=3600, queue="long"),
+	"plan_next_month_activities": task(["generate_monthly_compliance_report"]),
+	"send_monthly_executive_summary": task(["generate_monthly_compliance_report"])
+}
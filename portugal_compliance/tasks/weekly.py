@@ -12,6 +12,9 @@ from frappe.utils import today, now, add_days, get_datetime, add_to_date, format
 from datetime import datetime, timedelta
 import json
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_log_source
+from portugal_compliance.utils.task_graph import start_suite, task
+
 
 def execute():
 	"""
@@ -25,19 +28,10 @@ def execute():
 			frappe.logger().info("Portugal Compliance not enabled, skipping weekly tasks")
 			return
 
-		# Executar tarefas semanais
-		generate_weekly_compliance_report()
-		analyze_usage_patterns()
-		check_system_health_trends()
-		optimize_database_performance()
-		backup_configuration_data()
-		review_error_patterns()
-		update_series_recommendations()
-		cleanup_archived_data()
-		generate_audit_trail()
-		send_weekly_summary()
+		# ✅ GRAFO DE TAREFAS: passos enfileirados como jobs independentes (ver TASK_GRAPH)
+		run_id = start_suite("weekly")
 
-		frappe.logger().info("Portugal Compliance: Weekly tasks completed successfully")
+		frappe.logger().info(f"Portugal Compliance: Weekly tasks enqueued (run {run_id})")
 
 	except Exception as e:
 		frappe.log_error(f"Error in portugal_compliance.tasks.weekly: {str(e)}")
@@ -94,19 +88,20 @@ def get_weekly_atcud_stats(start_date, end_date):
 	"""
 	try:
 		stats = {
-			"total_generated": frappe.db.count("ATCUD Log", {
-				"creation": ["between", [start_date, end_date]]
-			}),
+			"total_generated": count_atcud_logs(from_date=start_date, to_date=end_date),
 			"by_document_type": {},
 			"by_company": {},
 			"duplicates_found": 0,
 			"validation_errors": 0
 		}
 
+		source = get_atcud_log_source(start_date, end_date,
+									  ["document_type", "company", "atcud_code", "creation"])
+
 		# Estatísticas por tipo de documento
-		doc_types = frappe.db.sql("""
+		doc_types = frappe.db.sql(f"""
 								  SELECT document_type, COUNT(*) as count
-								  FROM `tabATCUD Log`
+								  FROM {source} atcud_log
 								  WHERE DATE (creation) BETWEEN %s
 									AND %s
 								  GROUP BY document_type
@@ -116,9 +111,9 @@ def get_weekly_atcud_stats(start_date, end_date):
 			stats["by_document_type"][doc_type.document_type] = doc_type.count
 
 		# Estatísticas por empresa
-		companies = frappe.db.sql("""
+		companies = frappe.db.sql(f"""
 								  SELECT company, COUNT(*) as count
-								  FROM `tabATCUD Log`
+								  FROM {source} atcud_log
 								  WHERE DATE (creation) BETWEEN %s
 									AND %s
 								  GROUP BY company
@@ -128,9 +123,9 @@ def get_weekly_atcud_stats(start_date, end_date):
 			stats["by_company"][company.company] = company.count
 
 		# Verificar duplicados
-		duplicates = frappe.db.sql("""
+		duplicates = frappe.db.sql(f"""
 								   SELECT atcud_code, COUNT(*) as count
-								   FROM `tabATCUD Log`
+								   FROM {source} atcud_log
 								   WHERE DATE (creation) BETWEEN %s
 									 AND %s
 									 AND atcud_code IS NOT NULL
@@ -342,9 +337,7 @@ def calculate_weekly_compliance_score(start_date, end_date):
 																	communicated_series / total_series) * 100
 
 		# Taxa de sucesso de geração de ATCUD
-		total_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_atcud = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_atcud > 0:
 			score_components["atcud_generation_success"] = 95  # Assumir 95% de sucesso
@@ -451,19 +444,21 @@ def analyze_atcud_patterns():
 	Analisa padrões de geração de ATCUD
 	"""
 	try:
+		source = get_atcud_log_source(add_days(today(), -7), columns=["creation"])
+
 		# Análise por hora do dia
-		hourly_pattern = frappe.db.sql("""
+		hourly_pattern = frappe.db.sql(f"""
 									   SELECT HOUR (creation) as hour, COUNT (*) as count
-									   FROM `tabATCUD Log`
+									   FROM {source} atcud_log
 									   WHERE creation >= DATE_SUB(NOW(), INTERVAL 7 DAY)
 									   GROUP BY HOUR (creation)
 									   ORDER BY hour
 									   """, as_dict=True)
 
 		# Análise por dia da semana
-		daily_pattern = frappe.db.sql("""
+		daily_pattern = frappe.db.sql(f"""
 									  SELECT DAYOFWEEK(creation) as day_of_week, COUNT(*) as count
-									  FROM `tabATCUD Log`
+									  FROM {source} atcud_log
 									  WHERE creation >= DATE_SUB(NOW(), INTERVAL 7 DAY)
 									  GROUP BY DAYOFWEEK(creation)
 									  ORDER BY day_of_week
@@ -582,9 +577,7 @@ def calculate_atcud_trend():
 			week_start = add_days(today(), -(i + 1) * 7)
 			week_end = add_days(week_start, 7)
 
-			count = frappe.db.count("ATCUD Log", {
-				"creation": ["between", [week_start, week_end]]
-			})
+			count = count_atcud_logs(from_date=week_start, to_date=week_end)
 			weekly_counts.append(count)
 
 		# Calcular tendência (crescimento/decrescimento)
@@ -1070,9 +1063,9 @@ def identify_bottlenecks():
 			})
 
 		# Verificar ATCUD com problemas
-		duplicate_atcud = frappe.db.sql("""
+		duplicate_atcud = frappe.db.sql(f"""
 										SELECT atcud_code, COUNT(*) as count
-										FROM `tabATCUD Log`
+										FROM {get_atcud_log_source(add_days(today(), -7), columns=["atcud_code", "creation"])} atcud_log
 										WHERE creation >= DATE_SUB(NOW(), INTERVAL 7 DAY)
 										GROUP BY atcud_code
 										HAVING count > 1
@@ -1158,14 +1151,16 @@ def analyze_series_usage():
 	Analisa uso de séries
 	"""
 	try:
+		source = get_atcud_log_source()
+
 		# Séries pouco utilizadas
-		underused_series = frappe.db.sql("""
+		underused_series = frappe.db.sql(f"""
 										 SELECT psc.name,
 												psc.series_name,
 												psc.company,
 												COUNT(al.name) as usage_count
 										 FROM `tabPortugal Series Configuration` psc
-												  LEFT JOIN `tabATCUD Log` al ON al.series_name = psc.series_name
+												  LEFT JOIN {source} al ON al.series_name = psc.series_name
 										 WHERE psc.is_active = 1
 										   AND psc.creation <= DATE_SUB(NOW(), INTERVAL 30 DAY)
 										 GROUP BY psc.name
@@ -1173,13 +1168,13 @@ def analyze_series_usage():
 										 """, as_dict=True)
 
 		# Séries muito utilizadas
-		overused_series = frappe.db.sql("""
+		overused_series = frappe.db.sql(f"""
 										SELECT psc.name,
 											   psc.series_name,
 											   psc.company,
 											   COUNT(al.name) as usage_count
 										FROM `tabPortugal Series Configuration` psc
-												 LEFT JOIN `tabATCUD Log` al ON al.series_name = psc.series_name
+												 LEFT JOIN {source} al ON al.series_name = psc.series_name
 										WHERE psc.is_active = 1
 										GROUP BY psc.name
 										HAVING usage_count > 1000
@@ -1253,36 +1248,16 @@ def cleanup_archived_data():
 def archive_old_atcud_logs():
 	"""
 	Arquiva logs de ATCUD antigos
+	Move os logs fora da janela quente para ATCUD Log Archive (ver utils.atcud_log_store);
+	o histórico continua consultável até à retenção de 10 anos (tasks.yearly)
 	"""
 	try:
-		# Arquivar logs com mais de 2 anos
-		archive_date = add_days(today(), -730)
+		from portugal_compliance.utils.atcud_log_store import move_to_cold_storage
 
-		old_logs_count = frappe.db.count("ATCUD Log", {
-			"creation": ["<", archive_date]
-		})
-
-		if old_logs_count > 0:
-			# Criar backup antes de arquivar
-			old_logs = frappe.db.get_all("ATCUD Log",
-										 filters={"creation": ["<", archive_date]},
-										 fields=["*"]
-										 )
-
-			# Armazenar backup
-			archive_data = {
-				"archive_date": now(),
-				"total_logs": len(old_logs),
-				"logs_data": old_logs
-			}
+		result = move_to_cold_storage()
 
-			frappe.cache.set(f"portugal_compliance_atcud_archive_{archive_date}", archive_data,
-							 expires_in_sec=31536000)  # 1 ano
-
-			# Remover logs antigos
-			frappe.db.delete("ATCUD Log", {"creation": ["<", archive_date]})
-
-			frappe.logger().info(f"Archived {old_logs_count} old ATCUD logs")
+		if result["moved"]:
+			frappe.logger().info(f"Archived {result['moved']} old ATCUD logs to cold storage")
 
 	except Exception as e:
 		frappe.log_error(f"Error archiving old ATCUD logs: {str(e)}")
@@ -1390,10 +1365,10 @@ def get_user_activities(start_date, end_date):
 	"""
 	try:
 		# Atividades relacionadas com Portugal Compliance
-		activities = frappe.db.sql("""
+		activities = frappe.db.sql(f"""
 								   SELECT COUNT(DISTINCT owner) as unique_users,
 										  COUNT(*)              as total_activities
-								   FROM `tabATCUD Log`
+								   FROM {get_atcud_log_source(start_date, end_date, ["owner", "creation"])} atcud_log
 								   WHERE creation BETWEEN %s AND %s
 								   """, (start_date, end_date), as_dict=True)
 
@@ -1581,3 +1556,23 @@ def get_weekly_summary():
 			}
 	except Exception:
 		return {"status": "error", "report_date": today()}
+
+
+# ========== GRAFO DE TAREFAS ==========
+
+# Análises leem a camada quente do ATCUD Log: arquivo depois delas, otimização
+# da base de dados no fim; o resumo lê o relatório semanal da cache.
+TASK_GRAPH = {
+	"generate_weekly_compliance_report": task(timeout=1800, queue="long"),
+	"analyze_usage_patterns": task(),
+	"check_system_health_trends": task(),
+	"backup_configuration_data": task(),
+	"review_error_patterns": task(),
+	"update_series_recommendations": task(),
+	"generate_audit_trail": task(),
+	"cleanup_archived_data": task(["generate_weekly_compliance_report", "analyze_usage_patterns",
+								   "check_system_health_trends", "generate_audit_trail"],
+								  timeout=3600, queue="long"),
+	"optimize_database_performance": task(["cleanup_archived_data"], timeout=3600, queue="long"),
+	"send_weekly_summary": task(["generate_weekly_compliance_report"])
+}
@@ -14,6 +14,9 @@ from datetime import datetime, timedelta, date
 import json
 import calendar
 
+from portugal_compliance.utils.atcud_log_store import count_atcud_logs, get_atcud_log_source
+from portugal_compliance.utils.task_graph import start_suite, task
+
 
 def execute():
 	"""
@@ -27,21 +30,10 @@ def execute():
 			frappe.logger().info("Portugal Compliance not enabled, skipping yearly tasks")
 			return
 
-		# Executar tarefas anuais
-		generate_annual_compliance_report()
-		generate_annual_saft()
-		perform_annual_data_archival()
-		conduct_annual_compliance_audit()
-		review_annual_performance()
-		update_regulatory_requirements()
-		plan_next_year_compliance()
-		generate_executive_annual_summary()
-		perform_annual_system_optimization()
-		review_and_update_policies()
-		conduct_annual_risk_assessment()
-		prepare_regulatory_submissions()
-
-		frappe.logger().info("Portugal Compliance: Yearly tasks completed successfully")
+		# ✅ GRAFO DE TAREFAS: passos enfileirados como jobs independentes (ver TASK_GRAPH)
+		run_id = start_suite("yearly")
+
+		frappe.logger().info(f"Portugal Compliance: Yearly tasks enqueued (run {run_id})")
 
 	except Exception as e:
 		frappe.log_error(f"Error in portugal_compliance.tasks.yearly: {str(e)}")
@@ -107,9 +99,7 @@ def generate_annual_executive_summary(start_date, end_date):
 		summary = {
 			"year_overview": {
 				"total_documents_processed": get_annual_document_count(start_date, end_date),
-				"total_atcud_generated": frappe.db.count("ATCUD Log", {
-					"creation": ["between", [start_date, end_date]]
-				}),
+				"total_atcud_generated": count_atcud_logs(from_date=start_date, to_date=end_date),
 				"series_managed": frappe.db.count("Portugal Series Configuration", {
 					"creation": ["<=", end_date]
 				}),
@@ -175,9 +165,7 @@ def get_annual_achievements(start_date, end_date):
 		achievements = []
 
 		# Milestone de documentos processados
-		total_docs = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_docs = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_docs >= 100000:
 			achievements.append(f"Processed over {total_docs:,} documents with ATCUD compliance")
@@ -363,20 +351,18 @@ def calculate_data_integrity_annual(start_date, end_date):
 	"""
 	try:
 		# Verificar duplicados ATCUD
-		duplicates = frappe.db.sql("""
+		duplicates = frappe.db.sql(f"""
 								   SELECT COUNT(*) as count
 								   FROM (
 									   SELECT atcud_code
-									   FROM `tabATCUD Log`
+									   FROM {get_atcud_log_source(start_date, end_date)} atcud_log
 									   WHERE creation BETWEEN %s AND %s
 									   GROUP BY atcud_code
 									   HAVING COUNT (*) > 1
 									   ) as dup
 								   """, (start_date, end_date))[0][0]
 
-		total_atcud = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_atcud = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_atcud > 0:
 			integrity_score = max(0, 100 - (duplicates / total_atcud * 100))
@@ -439,9 +425,7 @@ def calculate_system_reliability_annual(start_date, end_date):
 			"error": ["like", "%portugal_compliance%"]
 		})
 
-		total_operations = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_operations = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_operations > 0:
 			error_rate = (total_errors / total_operations) * 100
@@ -513,81 +497,26 @@ def calculate_year_over_year_change(start_date, end_date):
 def generate_annual_saft():
 	"""
 	Gera SAF-T anual
+	✅ Um SAF-T Export Log por empresa; geração em jobs por grupo de empresas (utils/saft_batch)
 	"""
 	try:
+		from portugal_compliance.utils.saft_batch import start_saft_batch
+
 		frappe.logger().info("Generating annual SAF-T export")
 
 		# Ano anterior completo
-		current_year = datetime.now().year
-		previous_year = current_year - 1
+		previous_year = datetime.now().year - 1
 		year_start = date(previous_year, 1, 1)
 		year_end = date(previous_year, 12, 31)
 
-		# Obter empresas com compliance ativo
-		companies = frappe.db.get_all("Company",
-									  filters={"portugal_compliance_enabled": 1},
-									  fields=["name", "company_name"]
-									  )
+		run_id = start_saft_batch("annual", year_start, year_end)
 
-		for company in companies:
-			try:
-				# Gerar SAF-T para cada empresa
-				generate_company_annual_saft(company.name, year_start, year_end, previous_year)
-
-			except Exception as e:
-				frappe.log_error(
-					f"Error generating annual SAF-T for company {company.name}: {str(e)}")
-
-		frappe.logger().info(f"Annual SAF-T generation completed for year {previous_year}")
+		frappe.logger().info(f"Annual SAF-T generation for year {previous_year} enqueued: {run_id}")
 
 	except Exception as e:
 		frappe.log_error(f"Error in annual SAF-T generation: {str(e)}")
 
 
-def generate_company_annual_saft(company, start_date, end_date, year):
-	"""
-	Gera SAF-T anual para uma empresa específica
-	"""
-	try:
-		from portugal_compliance.utils.saft_generator import SAFTGenerator
-
-		# Criar instância do gerador
-		saft_generator = SAFTGenerator()
-
-		# Gerar SAF-T
-		saft_xml = saft_generator.generate_saft(
-			company=company,
-			start_date=start_date,
-			end_date=end_date
-		)
-
-		# Criar registo de export
-		export_log = frappe.get_doc({
-			"doctype": "SAF-T Export Log",
-			"company": company,
-			"export_type": "Annual",
-			"period_start": start_date,
-			"period_end": end_date,
-			"year": year,
-			"status": "Completed",
-			"file_size": len(saft_xml.encode('utf-8')),
-			"export_date": now()
-		})
-		export_log.insert(ignore_permissions=True)
-
-		# Guardar ficheiro
-		filename = f"SAF-T_{company}_{year}_Annual.xml"
-		file_path = f"/tmp/{filename}"
-
-		with open(file_path, 'w', encoding='utf-8') as f:
-			f.write(saft_xml)
-
-		frappe.logger().info(f"Annual SAF-T generated for {company}: {filename}")
-
-	except Exception as e:
-		frappe.log_error(f"Error generating company annual SAF-T for {company}: {str(e)}")
-
-
 def perform_annual_data_archival():
 	"""
 	Realiza arquivo anual de dados
@@ -616,37 +545,17 @@ def perform_annual_data_archival():
 def archive_old_atcud_logs(retention_date):
 	"""
 	Arquiva logs de ATCUD antigos
+	Em chunks para JSONL gzip particionado em private/files (ver utils.atcud_archiver)
 	"""
 	try:
-		# Contar registos a arquivar
-		old_logs_count = frappe.db.count("ATCUD Log", {
-			"creation": ["<", retention_date]
-		})
-
-		if old_logs_count > 0:
-			# Criar backup antes de arquivar
-			old_logs = frappe.db.get_all("ATCUD Log",
-										 filters={"creation": ["<", retention_date]},
-										 fields=["*"]
-										 )
-
-			# Armazenar backup
-			archive_data = {
-				"archive_date": now(),
-				"retention_date": retention_date,
-				"total_logs": len(old_logs),
-				"logs_data": old_logs
-			}
-
-			# Guardar arquivo (implementar storage adequado)
-			archive_filename = f"atcud_archive_{retention_date.strftime('%Y%m%d')}.json"
-			with open(f"/tmp/{archive_filename}", 'w') as f:
-				json.dump(archive_data, f, default=str, indent=2)
+		from portugal_compliance.utils.atcud_archiver import archive_atcud_logs
 
-			# Remover logs antigos
-			frappe.db.delete("ATCUD Log", {"creation": ["<", retention_date]})
+		# Camada fria primeiro (onde está quase todo o histórico), depois restos na quente
+		for doctype in ("ATCUD Log Archive", "ATCUD Log"):
+			metrics = archive_atcud_logs(retention_date, doctype=doctype)
 
-			frappe.logger().info(f"Archived {old_logs_count} old ATCUD logs")
+			if metrics["rows"]:
+				frappe.logger().info(f"Archived {metrics['rows']} old ATCUD logs from {doctype}")
 
 	except Exception as e:
 		frappe.log_error(f"Error archiving old ATCUD logs: {str(e)}")
@@ -726,6 +635,7 @@ def optimize_database_after_archival():
 		# Otimizar tabelas principais
 		tables_to_optimize = [
 			"tabATCUD Log",
+			"tabATCUD Log Archive",
 			"tabError Log",
 			"tabSAF-T Export Log",
 			"tabPortugal Series Configuration"
@@ -826,11 +736,11 @@ def audit_atcud_compliance(start_date, end_date):
 					"Implement mandatory ATCUD validation before document submission")
 
 		# Verificar duplicados
-		duplicates = frappe.db.sql("""
+		duplicates = frappe.db.sql(f"""
 								   SELECT COUNT(*) as count
 								   FROM (
 									   SELECT atcud_code
-									   FROM `tabATCUD Log`
+									   FROM {get_atcud_log_source(start_date, end_date)} atcud_log
 									   WHERE creation BETWEEN %s AND %s
 									   GROUP BY atcud_code
 									   HAVING COUNT (*) > 1
@@ -921,7 +831,7 @@ def audit_data_integrity(start_date, end_date):
 		inconsistencies = 0
 
 		# Documentos com ATCUD mas sem registo no log
-		docs_with_atcud = frappe.db.sql("""
+		docs_with_atcud = frappe.db.sql(f"""
 										SELECT COUNT(*) as count
 										FROM `tabSales Invoice`
 										WHERE posting_date BETWEEN %s
@@ -930,7 +840,7 @@ def audit_data_integrity(start_date, end_date):
 										  AND atcud_code != ''
 										  AND atcud_code NOT IN (
 											SELECT DISTINCT atcud_code
-											FROM `tabATCUD Log`
+											FROM {get_atcud_log_source()} atcud_log
 											WHERE atcud_code IS NOT NULL
 											)
 										""", (start_date, end_date))[0][0]
@@ -942,9 +852,9 @@ def audit_data_integrity(start_date, end_date):
 				f"{docs_with_atcud} documents with ATCUD but no log entry")
 
 		# Logs ATCUD sem documento correspondente
-		orphaned_logs = frappe.db.sql("""
+		orphaned_logs = frappe.db.sql(f"""
 									  SELECT COUNT(*) as count
-									  FROM `tabATCUD Log`
+									  FROM {get_atcud_log_source(start_date, end_date)} atcud_log
 									  WHERE creation BETWEEN %s
 										AND %s
 										AND document_name NOT IN (
@@ -962,9 +872,7 @@ def audit_data_integrity(start_date, end_date):
 			audit_result["issues"].append(f"{orphaned_logs} orphaned ATCUD log entries")
 
 		# Calcular score baseado em inconsistências
-		total_records = frappe.db.count("ATCUD Log", {
-			"creation": ["between", [start_date, end_date]]
-		})
+		total_records = count_atcud_logs(from_date=start_date, to_date=end_date)
 
 		if total_records > 0 and inconsistencies > 0:
 			integrity_score = max(0, 100 - (inconsistencies / total_records * 100))
@@ -1221,3 +1129,16 @@ def get_yearly_summary():
 			}
 	except Exception:
 		return {"status": "error", "year": datetime.now().year - 1}
+
+
+# ========== GRAFO DE TAREFAS ==========
+
+# Relatório e auditoria leem o ano completo: o arquivo corre depois. O passo do SAF-T
+# só cria os logs e enfileira os jobs por empresa (utils/saft_batch).
+TASK_GRAPH = {
+	"generate_annual_compliance_report": task(timeout=3600, queue="long"),
+	"generate_annual_saft": task(),
+	"conduct_annual_compliance_audit": task(timeout=3600, queue="long"),
+	"perform_annual_data_archival": task(["generate_annual_compliance_report", "generate_annual_saft",
+										  "conduct_annual_compliance_audit"], timeout=14400, queue="long")
+}
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test ATCUD Log Archiver - Portugal Compliance
+✅ Arquivo em partições verificadas, apagamento por chunk e restauro idempotente
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import atcud_archiver
+from portugal_compliance.utils.atcud_archiver import ArchiveVerificationError
+
+
+def make_row(name, creation, company="Test Company PT"):
+	return frappe._dict({
+		"name": name,
+		"naming_series": "ATCUD-LOG-.YYYY.-.####",
+		"document_type": "Stock Entry",
+		"document_name": f"GT2023TSTA{name[-4:]}",
+		"company": company,
+		"atcud_code": f"AAJFJ1-{int(name[-4:])}",
+		"generation_status": "Success",
+		"creation": creation,
+		"modified": creation
+	})
+
+
+class TestATCUDArchiver(FrappeTestCase):
+	"""
+	✅ Classe de teste para o arquivo/restauro do ATCUD Log
+	"""
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+		patcher = patch.object(atcud_archiver, "get_archive_root", return_value=self.root)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.rows = [
+			make_row("ATCUD-LOG-2023-0001", datetime(2023, 1, 5, 10, 0)),
+			make_row("ATCUD-LOG-2023-0002", datetime(2023, 1, 20, 11, 0)),
+			make_row("ATCUD-LOG-2023-0003", datetime(2023, 2, 2, 9, 30))
+		]
+
+	def archive(self, rows, sql=None):
+		"""Arquivar rows como um único chunk lido da tabela quente"""
+		with patch.object(atcud_archiver, "iter_atcud_log_chunks", return_value=iter([rows])), \
+				patch.object(atcud_archiver.frappe.db, "sql", sql or MagicMock()) as sql, \
+				patch.object(atcud_archiver.frappe.db, "commit"), \
+				patch.object(atcud_archiver.frappe, "cache"):
+			return atcud_archiver.archive_atcud_logs("2024-01-01"), sql
+
+	def test_archive_partitions_and_deletes_chunk(self):
+		"""✅ Uma parte por empresa/mês, registada no manifesto, e um DELETE do chunk"""
+		metrics, sql = self.archive(self.rows)
+
+		self.assertEqual((metrics["rows"], metrics["files"], metrics["chunks"]), (3, 2, 1))
+		self.assertEqual(metrics["partitions"], ["Test Company PT/2023-01", "Test Company PT/2023-02"])
+
+		query, values = sql.call_args.args
+		self.assertIn("DELETE FROM `tabATCUD Log`", query)
+		self.assertEqual(sorted(values["names"]), [row.name for row in self.rows])
+
+		january = atcud_archiver.get_partition_dir("Test Company PT", "2023-01")
+		self.assertEqual([entry["rows"] for entry in atcud_archiver.read_manifest(january)], [2])
+		self.assertEqual([row["name"] for row in atcud_archiver.iter_partition_rows(january)],
+						 ["ATCUD-LOG-2023-0001", "ATCUD-LOG-2023-0002"])
+
+	def test_verify_detects_changed_file(self):
+		"""✅ Checksum e contagem relidos: ficheiro alterado não passa a verificação"""
+		partition_dir = os.path.join(self.root, "partition")
+		entry = atcud_archiver.write_partition_file(partition_dir, self.rows)
+		atcud_archiver.verify_partition_file(partition_dir, entry)
+
+		with self.assertRaises(ArchiveVerificationError):
+			atcud_archiver.verify_partition_file(partition_dir, dict(entry, rows=2))
+
+		with gzip.open(os.path.join(partition_dir, entry["file"]), "at", encoding="utf-8") as f:
+			f.write("{}\n")
+
+		with self.assertRaises(ArchiveVerificationError):
+			atcud_archiver.verify_partition_file(partition_dir, entry)
+
+	def test_failed_verification_keeps_rows(self):
+		"""✅ Sem verificação válida nada é apagado"""
+		sql = MagicMock()
+		with patch.object(atcud_archiver, "verify_partition_file", side_effect=ArchiveVerificationError), \
+				self.assertRaises(ArchiveVerificationError):
+			self.archive(self.rows, sql)
+
+		sql.assert_not_called()
+
+	def test_restore_counts_only_inserted_rows(self):
+		"""✅ Restauro idempotente: a segunda execução não insere (nem conta) linhas"""
+		self.archive(self.rows)
+		self.addCleanup(frappe.db.rollback)
+		frappe.db.delete("ATCUD Log Archive", {"name": ["in", [row.name for row in self.rows]]})
+
+		with patch.object(atcud_archiver.frappe.db, "commit"):
+			first = atcud_archiver.restore_atcud_archive(company="Test Company PT", chunk_size=2)
+			second = atcud_archiver.restore_atcud_archive(company="Test Company PT", chunk_size=2)
+
+		self.assertEqual((first["restored"], first["skipped"]), (3, 0))
+		self.assertEqual((second["restored"], second["skipped"]), (0, 3))
+		self.assertEqual(frappe.db.count("ATCUD Log Archive",
+										 {"name": ["in", [row.name for row in self.rows]]}), 3)
+
+	def test_restore_period_filter(self):
+		"""✅ Filtro por período (AAAA-MM) restaura apenas as partições pedidas"""
+		self.archive(self.rows)
+
+		with patch.object(atcud_archiver, "_bulk_restore", side_effect=lambda doctype, rows: len(rows)) as restore:
+			result = atcud_archiver.restore_atcud_archive(from_period="2023-02", to_period="2023-02")
+
+		self.assertEqual(result["restored"], 1)
+		self.assertEqual(result["partitions"], [f"{frappe.scrub('Test Company PT')}/2023-02"])
+		self.assertEqual(restore.call_args.args[0], "ATCUD Log Archive")
+
+
+if __name__ == '__main__':
+	unittest.main()
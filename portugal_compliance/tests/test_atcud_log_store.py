@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test ATCUD Log Store - Portugal Compliance
+✅ Roteamento quente/frio por intervalo de datas
+"""
+
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import atcud_log_store
+from portugal_compliance.utils.atcud_log_store import COLD_DOCTYPE, HOT_DOCTYPE, resolve_tiers
+
+
+class TestATCUDLogStore(FrappeTestCase):
+	"""
+	✅ Classe de teste para a camada de consulta do ATCUD Log
+	"""
+
+	BOUNDS = {
+		"cold_upper_bound": date(2025, 1, 1),
+		"hot_lower_bound": date(2025, 1, 1)
+	}
+
+	def resolve(self, bounds, from_date=None, to_date=None):
+		with patch.object(atcud_log_store, "get_storage_bounds", return_value=bounds):
+			return resolve_tiers(from_date, to_date)
+
+	def test_hot_only_before_first_move(self):
+		"""✅ Sem camada fria, consulta só a quente"""
+		empty = {"cold_upper_bound": None, "hot_lower_bound": None}
+		self.assertEqual(self.resolve(empty), [HOT_DOCTYPE])
+		self.assertEqual(self.resolve(empty, to_date="2020-12-31"), [HOT_DOCTYPE])
+
+	def test_recent_range_is_hot_only(self):
+		"""✅ Intervalo dentro da janela quente"""
+		self.assertEqual(self.resolve(self.BOUNDS, from_date="2025-03-01"), [HOT_DOCTYPE])
+
+	def test_old_range_is_cold_only(self):
+		"""✅ Intervalo totalmente anterior à janela quente"""
+		self.assertEqual(
+			self.resolve(self.BOUNDS, from_date="2023-01-01", to_date="2023-12-31"), [COLD_DOCTYPE])
+
+	def test_spanning_range_unions_both(self):
+		"""✅ Intervalo que atravessa o limite ou sem datas"""
+		self.assertEqual(
+			self.resolve(self.BOUNDS, from_date="2024-06-01", to_date="2025-06-01"),
+			[HOT_DOCTYPE, COLD_DOCTYPE])
+		self.assertEqual(self.resolve(self.BOUNDS), [HOT_DOCTYPE, COLD_DOCTYPE])
+
+	def test_move_in_progress_keeps_union(self):
+		"""✅ Durante um movimento (limites diferentes) o intervalo intermédio une as duas"""
+		moving = {"cold_upper_bound": date(2025, 2, 1), "hot_lower_bound": date(2025, 1, 1)}
+		self.assertEqual(
+			self.resolve(moving, from_date="2025-01-10", to_date="2025-01-20"),
+			[HOT_DOCTYPE, COLD_DOCTYPE])
+
+	def test_update_goes_to_the_tier_holding_the_log(self):
+		"""✅ Cancelamento atualiza o log na camada onde ele está (ex: fria)"""
+		values = {"validation_status": "Cancelled"}
+		with patch.object(atcud_log_store, "find_atcud_log",
+						  return_value=frappe._dict(name="ATCUD-LOG-2023-0001", storage_tier="cold")), \
+				patch.object(atcud_log_store.frappe.db, "set_value") as set_value:
+			name = atcud_log_store.update_atcud_log({"atcud_code": "AAJFJ1-1"}, values)
+
+		self.assertEqual(name, "ATCUD-LOG-2023-0001")
+		set_value.assert_called_once_with(COLD_DOCTYPE, "ATCUD-LOG-2023-0001", values)
+
+		with patch.object(atcud_log_store, "find_atcud_log", return_value=None), \
+				patch.object(atcud_log_store.frappe.db, "set_value") as set_value:
+			self.assertIsNone(atcud_log_store.update_atcud_log({"atcud_code": "AAJFJ1-2"}, values))
+		set_value.assert_not_called()
+
+	def test_archive_has_same_permission_hooks(self):
+		"""✅ ATCUD Log Archive com as mesmas permissões do ATCUD Log"""
+		from portugal_compliance import hooks
+
+		for hook in (hooks.permission_query_conditions, hooks.has_permission):
+			self.assertEqual(hook[COLD_DOCTYPE], hook[HOT_DOCTYPE])
+
+
+if __name__ == '__main__':
+	unittest.main()
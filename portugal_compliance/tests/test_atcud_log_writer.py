@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test ATCUD Log Writer - Portugal Compliance
+✅ Acumulação por transação dos ATCUD Log e da utilização das séries
+✅ Escrita no commit: linhas ATCUD Log, contador da tabSeries e estatísticas da série
+"""
+
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import cint, getdate, now_datetime
+
+from portugal_compliance.utils import atcud_log_writer, compliance_cache
+
+TEST_COMPANY = "Test Company PT"
+TEST_SERIES = "GT2025TSTW"
+
+
+def make_doc(name, posting_date, atcud_code="AAJFJ1-1", doctype="Stock Entry"):
+	return frappe._dict({
+		"doctype": doctype,
+		"name": name,
+		"company": TEST_COMPANY,
+		"naming_series": "GT2025TST.####",
+		"posting_date": posting_date,
+		"atcud_code": atcud_code
+	})
+
+
+class TestATCUDLogWriter(FrappeTestCase):
+	"""
+	✅ Classe de teste para o writer em lote do ATCUD Log
+	"""
+
+	def setUp(self):
+		atcud_log_writer._discard()
+		self.addCleanup(atcud_log_writer._discard)
+
+		series = frappe._dict(name="SERIES-GT")
+		for target, value in (("get_series_by_naming_series", series), ("_register_flush", None)):
+			patcher = patch.object(atcud_log_writer, target, return_value=value)
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def test_parse_atcud(self):
+		"""✅ Código de validação e número sequencial do ATCUD"""
+		self.assertEqual(atcud_log_writer.parse_atcud("AAJFJ1-123"), ("AAJFJ1", 123))
+		self.assertEqual(atcud_log_writer.parse_atcud("AAJFJ1"), ("AAJFJ1", None))
+		self.assertEqual(atcud_log_writer.parse_atcud(None), (None, None))
+
+	def test_logs_are_buffered_per_document(self):
+		"""✅ Uma linha por documento na transação, com série e sequência resolvidas"""
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TST0001", date(2025, 5, 1), "AAJFJ1-1"))
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TST0002", date(2025, 5, 1), "AAJFJ1-2"))
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TST0002", date(2025, 5, 1), "AAJFJ1-2"))
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TST0003", date(2025, 5, 1), atcud_code=None))
+
+		logs = atcud_log_writer._get_state()["logs"]
+		self.assertEqual(len(logs), 2)
+
+		row = logs[("Stock Entry", "GT2025TST0002")]
+		self.assertEqual(row["series_used"], "SERIES-GT")
+		self.assertEqual(row["validation_code_used"], "AAJFJ1")
+		self.assertEqual(row["sequence_number"], 2)
+		self.assertEqual(row["generation_status"], "Success")
+
+	def test_series_usage_is_combined(self):
+		"""✅ Uma entrada por série: contagem, data mais recente e último documento"""
+		atcud_log_writer.queue_series_usage(make_doc("GT2025TST0001", date(2025, 5, 3)))
+		atcud_log_writer.queue_series_usage(make_doc("GT2025TST0002", date(2025, 5, 1)))
+
+		usage = atcud_log_writer._get_state()["series"]
+		self.assertEqual(usage, {
+			"SERIES-GT": {"count": 2, "last_date": date(2025, 5, 3), "last_name": "GT2025TST0002"}
+		})
+
+
+class TestATCUDLogWriterFlush(FrappeTestCase):
+	"""
+	✅ Escrita real do buffer (flush): sem mocks do writer nem do registo de séries
+	"""
+
+	def setUp(self):
+		atcud_log_writer._discard()
+		self.addCleanup(atcud_log_writer._discard)
+		self.addCleanup(frappe.db.rollback)
+
+		self.prefix = atcud_log_writer.LOG_NAME_PREFIX.format(year=now_datetime().year)
+		self.counter = cint(frappe.db.get_value("Series", self.prefix, "current"))
+
+		frappe.db.delete("ATCUD Log", {"document_name": ["like", "GT2025TSTW%"]})
+		frappe.db.delete("Portugal Series Configuration", {"series_name": TEST_SERIES})
+		frappe.get_doc({
+			"doctype": "Portugal Series Configuration",
+			"name": TEST_SERIES,
+			"series_name": TEST_SERIES,
+			"prefix": TEST_SERIES,
+			"naming_series": "GT2025TST.####",
+			"company": TEST_COMPANY,
+			"document_type": "Stock Entry",
+			"is_active": 1,
+			"total_documents_issued": 5,
+			"last_document_date": date(2025, 5, 2)
+		}).db_insert()
+		compliance_cache.invalidate("series")
+
+	def get_logs(self):
+		return frappe.get_all("ATCUD Log", filters={"document_name": ["like", "GT2025TSTW%"]},
+							  fields=["name", "document_name", "generation_status", "series_used",
+									  "sequence_number"], order_by="name")
+
+	def insert_log(self, document_name, status):
+		frappe.get_doc({
+			"doctype": "ATCUD Log",
+			"name": frappe.generate_hash(length=10),
+			"naming_series": "ATCUD-LOG-.YYYY.-.####",
+			"document_type": "Stock Entry",
+			"document_name": document_name,
+			"company": TEST_COMPANY,
+			"atcud_code": "AAJFJ1-1",
+			"generation_status": status
+		}).db_insert()
+
+	def test_reserve_log_names_advances_counter(self):
+		"""✅ Nomes consecutivos a seguir ao contador da tabSeries, avançado uma vez"""
+		names = atcud_log_writer.reserve_log_names(3)
+
+		self.assertEqual(names, [f"{self.prefix}{str(self.counter + i).zfill(4)}" for i in (1, 2, 3)])
+		self.assertEqual(cint(frappe.db.get_value("Series", self.prefix, "current")), self.counter + 3)
+
+	def test_flush_inserts_logs_and_series_stats(self):
+		"""✅ Um log por documento com nome reservado, série resolvida e estatísticas somadas"""
+		for name, posting_date, atcud in (("GT2025TSTW0001", date(2025, 5, 3), "AAJFJ1-1"),
+										  ("GT2025TSTW0002", date(2025, 5, 1), "AAJFJ1-2")):
+			doc = make_doc(name, posting_date, atcud)
+			atcud_log_writer.queue_atcud_log(doc)
+			atcud_log_writer.queue_series_usage(doc)
+
+		self.assertEqual(atcud_log_writer.flush(), {"logs": 2, "series": 1})
+		self.assertEqual(atcud_log_writer.flush(), {"logs": 0, "series": 0})
+
+		logs = self.get_logs()
+		self.assertEqual([(log.document_name, log.series_used, log.sequence_number) for log in logs], [
+			("GT2025TSTW0001", TEST_SERIES, 1),
+			("GT2025TSTW0002", TEST_SERIES, 2)
+		])
+		self.assertEqual([log.name for log in logs],
+						 [f"{self.prefix}{str(self.counter + i).zfill(4)}" for i in (1, 2)])
+		self.assertEqual(cint(frappe.db.get_value("Series", self.prefix, "current")), self.counter + 2)
+
+		series = frappe.db.get_value("Portugal Series Configuration", TEST_SERIES,
+									 ["total_documents_issued", "last_document_date", "last_document_name"],
+									 as_dict=True)
+		self.assertEqual(series.total_documents_issued, 7)
+		self.assertEqual(getdate(series.last_document_date), date(2025, 5, 3))
+		self.assertEqual(series.last_document_name, "GT2025TSTW0002")
+
+	def test_write_logs_skips_success_and_clears_failed(self):
+		"""✅ Documento já com log Success não duplica; logs Failed anteriores são apagados"""
+		self.insert_log("GT2025TSTW0001", "Success")
+		self.insert_log("GT2025TSTW0002", "Failed")
+
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TSTW0001", date(2025, 5, 1), "AAJFJ1-1"))
+		atcud_log_writer.queue_atcud_log(make_doc("GT2025TSTW0002", date(2025, 5, 1), "AAJFJ1-2"))
+
+		self.assertEqual(atcud_log_writer.flush()["logs"], 1)
+		self.assertEqual([(log.document_name, log.generation_status) for log in self.get_logs()
+						  if log.document_name == "GT2025TSTW0002"], [("GT2025TSTW0002", "Success")])
+		self.assertEqual(frappe.db.count("ATCUD Log", {"document_name": "GT2025TSTW0001",
+													   "generation_status": "Success"}), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Benchmark Suite - Portugal Compliance
+✅ Determinismo dos dados sintéticos, medição e comparação de resultados
+"""
+
+import re
+import unittest
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.benchmarks.data_generator import BenchmarkDataset, GAP_EVERY
+from portugal_compliance.benchmarks.suite import compare_results, measure
+from portugal_compliance.utils.nif_validator import validate_nif
+
+
+def make_report(**timings):
+	return {
+		"metadata": {"git_commit": "abc"},
+		"results": [{"name": name, "p50_ms": p50} for name, p50 in timings.items()]
+	}
+
+
+class TestBenchmarkDataGenerator(FrappeTestCase):
+	"""
+	✅ Classe de teste para o gerador de dados sintéticos
+	"""
+
+	def test_same_seed_same_dataset(self):
+		"""Testa que a mesma seed gera os mesmos dados"""
+		first = BenchmarkDataset(companies=3, parties=50, documents_per_series=100, seed=7)
+		second = BenchmarkDataset(companies=3, parties=50, documents_per_series=100, seed=7)
+
+		self.assertEqual(first.companies, second.companies)
+		self.assertEqual(first.series, second.series)
+		self.assertEqual(first.items, second.items)
+		self.assertNotEqual(first.series, BenchmarkDataset(companies=3, seed=8).series)
+
+	def test_generated_identifiers_are_valid(self):
+		"""Testa NIFs, prefixos e códigos de validação no formato esperado"""
+		dataset = BenchmarkDataset(companies=12)
+
+		for company in dataset.companies:
+			self.assertTrue(validate_nif(company.tax_id))
+
+		for series in dataset.series:
+			self.assertRegex(series.prefix, r'^[A-Z]{2,4}\d{4}[A-Z0-9]{2,4}$')
+			self.assertRegex(series.validation_code, r'^[A-Z0-9]{8,12}$')
+			self.assertTrue(re.search(r'[A-Z]', series.validation_code))
+
+	def test_saft_context_is_lazy(self):
+		"""Testa que o contexto SAF-T tem o número de linhas pedido sem materializar a lista"""
+		dataset = BenchmarkDataset(parties=10)
+		context = dataset.make_saft_context(1000, lines_per_invoice=10)
+		invoices = context["sales_invoices"]
+
+		self.assertEqual(len(invoices), 100)
+		self.assertNotIsInstance(invoices, list)
+		self.assertEqual(sum(len(invoice["items"]) for invoice in invoices), 1000)
+		self.assertEqual(next(iter(invoices)), next(iter(invoices)))
+
+	def test_expected_gaps(self):
+		"""Testa a contagem de lacunas sintéticas (última posição nunca é lacuna)"""
+		self.assertEqual(BenchmarkDataset(documents_per_series=GAP_EVERY * 3).expected_gaps(), 2)
+		self.assertEqual(BenchmarkDataset(documents_per_series=GAP_EVERY * 3 + 1).expected_gaps(), 3)
+
+
+class TestBenchmarkSuite(FrappeTestCase):
+	"""
+	✅ Classe de teste para medição e comparação
+	"""
+
+	def test_measure_statistics(self):
+		"""Testa as estatísticas e que setup/teardown correm em cada repetição"""
+		calls = {"setup": 0, "teardown": 0}
+
+		def setup():
+			calls["setup"] += 1
+			return calls["setup"]
+
+		def teardown():
+			calls["teardown"] += 1
+
+		result = measure("case", lambda value: value * 2, iterations=5, setup=setup, teardown=teardown,
+						 ops=10, warmup=1)
+
+		self.assertEqual(result["iterations"], 5)
+		self.assertEqual(calls, {"setup": 6, "teardown": 6})
+		self.assertLessEqual(result["min_ms"], result["p50_ms"])
+		self.assertLessEqual(result["p50_ms"], result["max_ms"])
+		self.assertNotIn("error", result)
+
+	def test_measure_records_error(self):
+		"""Testa que uma exceção interrompe o caso e fica registada"""
+		result = measure("case", lambda: 1 / 0, iterations=3, warmup=0)
+
+		self.assertEqual(result["iterations"], 0)
+		self.assertIn("ZeroDivisionError", result["error"])
+
+	def test_compare_results(self):
+		"""Testa a classificação em regressões, melhorias e casos em falta"""
+		baseline = make_report(fast=1.0, slow=1.0, same=1.0, removed=1.0)
+		current = make_report(fast=0.5, slow=1.5, same=1.05, added=1.0)
+
+		comparison = compare_results(current, baseline, threshold=0.10)
+
+		self.assertEqual([entry["name"] for entry in comparison["regressions"]], ["slow"])
+		self.assertEqual(comparison["regressions"][0]["change"], 0.5)
+		self.assertEqual([entry["name"] for entry in comparison["improvements"]], ["fast"])
+		self.assertEqual(comparison["unchanged"], ["same"])
+		self.assertEqual(comparison["missing"], ["removed"])
+		self.assertEqual(comparison["new"], ["added"])
+
+
+if __name__ == '__main__':
+	unittest.main()
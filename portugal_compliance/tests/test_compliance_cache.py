@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Compliance Cache - Portugal Compliance
+✅ LRU local, invalidação por versão (após commit) e função pura de naming series
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.compliance_cache import _LocalLRU, _MISSING
+
+
+class TestComplianceCache(FrappeTestCase):
+	"""
+	✅ Classe de teste para a cache em dois níveis
+	"""
+
+	def test_local_lru_evicts_oldest(self):
+		"""✅ LRU limitado remove a entrada menos usada"""
+		lru = _LocalLRU(max_entries=2)
+		lru.set("a", 1, 60)
+		lru.set("b", 2, 60)
+		lru.get("a")
+		lru.set("c", 3, 60)
+
+		self.assertEqual(lru.get("a"), 1)
+		self.assertIs(lru.get("b"), _MISSING)
+		self.assertEqual(lru.get("c"), 3)
+
+	def test_local_lru_expires(self):
+		"""✅ Entradas expiradas não são devolvidas"""
+		lru = _LocalLRU()
+		lru.set("a", 1, -1)
+		self.assertIs(lru.get("a"), _MISSING)
+
+	def test_get_or_set_and_invalidate(self):
+		"""✅ Loader chamado uma vez; invalidar o namespace força nova leitura"""
+		loader = MagicMock(side_effect=["first", "second"])
+		key = frappe.generate_hash(length=10)
+
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "first")
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "first")
+		self.assertEqual(loader.call_count, 1)
+
+		compliance_cache.invalidate("party")
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "second")
+		self.assertEqual(loader.call_count, 2)
+
+	def test_invalidate_waits_for_commit(self):
+		"""✅ Com transação aberta a versão só muda no commit; até lá leitura sem cache"""
+		loader = MagicMock(side_effect=["first", "second", "third"])
+		key = frappe.generate_hash(length=10)
+		self.addCleanup(compliance_cache._discard_pending)
+
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "first")
+		version = compliance_cache.get_version("party")
+
+		with patch.object(compliance_cache, "_in_transaction", return_value=True):
+			compliance_cache.invalidate("party")
+
+		self.assertTrue(compliance_cache.is_pending("party"))
+		self.assertEqual(compliance_cache.get_version("party"), version)
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "second")
+
+		compliance_cache._bump_pending()
+		self.assertFalse(compliance_cache.is_pending("party"))
+		self.assertEqual(compliance_cache.get_version("party"), version + 1)
+		self.assertEqual(compliance_cache.get_or_set("party", key, loader), "third")
+
+	def test_none_is_cached(self):
+		"""✅ Resultado None também fica em cache"""
+		loader = MagicMock(return_value=None)
+		key = frappe.generate_hash(length=10)
+
+		compliance_cache.get_or_set("series", key, loader)
+		compliance_cache.get_or_set("series", key, loader)
+		self.assertEqual(loader.call_count, 1)
+
+	def test_portuguese_naming_series(self):
+		"""✅ Padrão sem hífens"""
+		self.assertTrue(compliance_cache.is_portuguese_naming_series("FT2025NDX.####"))
+		self.assertFalse(compliance_cache.is_portuguese_naming_series("FT-2025-NDX.####"))
+		self.assertFalse(compliance_cache.is_portuguese_naming_series(None))
+
+
+if __name__ == '__main__':
+	unittest.main()
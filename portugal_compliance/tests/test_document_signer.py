@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Document Signer - Portugal Compliance
+✅ Mensagem da assinatura e encadeamento RSA-SHA1
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+import frappe
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import document_signer
+from portugal_compliance.utils.document_signer import (
+	SIGNED_DOCTYPES, build_message, get_document_message, sign_message, verify_signature
+)
+from portugal_compliance.utils.saft_generator import SAFTGenerator
+
+
+class TestDocumentSigner(FrappeTestCase):
+	"""
+	✅ Classe de teste para a assinatura encadeada
+	"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=1024)
+
+	def test_message_format(self):
+		"""✅ Datas, número, total com 2 casas e hash anterior separados por ;"""
+		message = build_message(date(2025, 5, 18), datetime(2025, 5, 18, 11, 22, 19, 123456),
+								"FT2025NDX.0001", 3.1, "abc=")
+
+		self.assertEqual(message, "2025-05-18;2025-05-18T11:22:19;FT2025NDX.0001;3.10;abc=")
+
+	def test_first_document_has_empty_previous_hash(self):
+		"""✅ Primeiro documento da série termina em ;"""
+		message = build_message("2025-01-02", "2025-01-02 09:00:00", "FT2025NDX.0001", 10, None)
+		self.assertTrue(message.endswith("10.00;"))
+
+	def test_chain_detects_tampering(self):
+		"""✅ Alterar um documento quebra a assinatura seguinte na verificação"""
+		first = build_message("2025-01-02", "2025-01-02 09:00:00", "FT2025NDX.0001", 10, "")
+		first_hash = sign_message(first, self.private_key)
+		second = build_message("2025-01-02", "2025-01-02 09:05:00", "FT2025NDX.0002", 20, first_hash)
+		second_hash = sign_message(second, self.private_key)
+
+		public_key = self.private_key.public_key()
+		self.assertTrue(verify_signature(first, first_hash, public_key))
+		self.assertTrue(verify_signature(second, second_hash, public_key))
+
+		tampered = build_message("2025-01-02", "2025-01-02 09:05:00", "FT2025NDX.0002", 25, first_hash)
+		self.assertFalse(verify_signature(tampered, second_hash, public_key))
+		self.assertFalse(verify_signature(second, first_hash, public_key))
+
+	def test_exported_invoice_reproduces_signed_message(self):
+		"""✅ Campos exportados no SAF-T (número, datas, total) reproduzem a mensagem assinada"""
+		doc = frappe._dict(doctype="Sales Invoice", name="FT2025NDX0001", posting_date=date(2025, 3, 4),
+						   creation=datetime(2025, 3, 4, 10, 15, 30), grand_total=123.4)
+		doc.saft_hash = sign_message(get_document_message(doc, "prev="), self.private_key)
+
+		row = frappe._dict(doc, customer="CUST-1", docstatus=1, owner="Administrator", saft_hash_control="1",
+						   item_code="ITEM-1", item_name="Item", qty=1, rate=123.4, amount=123.4,
+						   base_amount=123.4)
+		with patch.object(frappe.db, "sql", return_value=[row]):
+			invoice = SAFTGenerator().get_signed_invoices_data("Sales Invoice", "Company", "2025-03-01", "2025-03-31")[0]
+
+		message = build_message(invoice.posting_date, invoice.creation, invoice.document_no,
+								invoice.grand_total, "prev=")
+		self.assertEqual(invoice.document_no, doc.name)
+		self.assertEqual(invoice.hash_control, doc.saft_hash)
+		self.assertTrue(verify_signature(message, invoice.hash_control, self.private_key.public_key()))
+
+	def test_signed_doctypes_have_saft_hash(self):
+		"""✅ Só são assinados documentos cujo hash o SAF-T exporta (Payments não tem Hash)"""
+		self.assertEqual(set(SIGNED_DOCTYPES), {"Sales Invoice", "POS Invoice", "Delivery Note"})
+
+	def test_verify_chain_with_public_key_only(self):
+		"""✅ Verificação da cadeia só com a chave pública (sem chave privada configurada)"""
+		rows = []
+		previous_hash = ""
+		for position in (1, 2):
+			row = frappe._dict(name=f"FT2025NDX000{position}", posting_date=date(2025, 1, 2),
+							   creation=datetime(2025, 1, 2, 9, position), gross_total=10 * position,
+							   saft_hash_sequence=position)
+			row.saft_hash = sign_message(build_message(row.posting_date, row.creation, row.name,
+													   row.gross_total, previous_hash), self.private_key)
+			previous_hash = row.saft_hash
+			rows.append(row)
+
+		series = frappe._dict(document_type="Sales Invoice", naming_series="FT2025NDX.####", company="Company",
+							  hashed_documents=2, last_hash=previous_hash, last_hash_document=rows[-1].name)
+
+		with tempfile.NamedTemporaryFile("wb", suffix=".pem", delete=False) as handle:
+			handle.write(self.private_key.public_key().public_bytes(
+				serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo))
+		self.addCleanup(os.remove, handle.name)
+
+		with patch.dict(frappe.conf, {"portugal_compliance_signing_public_key": handle.name,
+									  "portugal_compliance_signing_key": None}), \
+				patch.object(document_signer.frappe, "get_doc", return_value=series), \
+				patch.object(document_signer, "iter_signed_documents", return_value=iter(rows)), \
+				patch.object(document_signer, "get_private_key", side_effect=AssertionError) as get_private_key:
+			result = document_signer.verify_series_chain("FT2025NDX.####-Sales Invoice")
+
+		self.assertTrue(result["valid"], result["breaks"])
+		self.assertEqual(result["checked"], 2)
+		get_private_key.assert_not_called()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Encryption Utils - Portugal Compliance
+✅ Key ring versionado, formato antigo e cache da derivação de chaves
+"""
+
+import base64
+import unittest
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import encryption_utils
+from portugal_compliance.utils.encryption_utils import LEGACY_VERSION, KeyRing, derive_fernet_key
+
+
+class TestEncryptionUtils(FrappeTestCase):
+	"""
+	✅ Classe de teste para a encriptação com chaves versionadas
+	"""
+
+	def test_rotation_keeps_old_values_readable(self):
+		"""Testa que valores da versão antiga decifram depois da rotação e pedem re-cifra"""
+		old_ring = KeyRing({"1": "secret-one"}, "1")
+		encrypted = old_ring.encrypt("AAJFJ1MV")
+		self.assertTrue(encrypted.startswith("pcv1:"))
+
+		ring = KeyRing({"1": "secret-one", "2": "secret-two"}, "2")
+		self.assertEqual(ring.decrypt(encrypted), "AAJFJ1MV")
+		self.assertTrue(ring.needs_reencryption(encrypted))
+		self.assertFalse(ring.needs_reencryption(ring.encrypt("AAJFJ1MV")))
+		self.assertFalse(ring.needs_reencryption("AAJFJ1MV"))
+
+	def test_legacy_format(self):
+		"""Testa valores do formato antigo (base64 de token Fernet, sem versão)"""
+		legacy = base64.urlsafe_b64encode(
+			Fernet(derive_fernet_key("secret-one")).encrypt(b"AAJFJ1MV")).decode()
+		ring = KeyRing({"1": "secret-one", "2": "secret-two"}, "2")
+
+		self.assertEqual(ring.get_version(legacy), LEGACY_VERSION)
+		self.assertEqual(ring.decrypt(legacy), "AAJFJ1MV")
+		self.assertTrue(ring.needs_reencryption(legacy))
+
+	def test_key_derivation_is_cached(self):
+		"""Testa que o PBKDF2 corre uma vez por segredo"""
+		with patch.object(encryption_utils, "PBKDF2HMAC", wraps=encryption_utils.PBKDF2HMAC) as kdf:
+			KeyRing({"7": "secret-cached"}, "7")
+			KeyRing({"7": "secret-cached"}, "7")
+
+		self.assertEqual(kdf.call_count, 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
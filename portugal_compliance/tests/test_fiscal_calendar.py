@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Fiscal Calendar - Portugal Compliance
+✅ Pesquisa por intervalos de anos fiscais e períodos fechados
+"""
+
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import fiscal_calendar
+from portugal_compliance.utils.fiscal_calendar import FiscalCalendar
+
+
+class TestFiscalCalendar(FrappeTestCase):
+	"""
+	✅ Classe de teste para o calendário fiscal
+	"""
+
+	FISCAL_YEARS = [
+		frappe._dict(name="2025", year_start_date=date(2025, 1, 1), year_end_date=date(2025, 12, 31)),
+		frappe._dict(name="2024", year_start_date="2024-01-01", year_end_date="2024-12-31"),
+		frappe._dict(name="2026", year_start_date=date(2026, 1, 1), year_end_date=date(2026, 12, 31))
+	]
+
+	ACCOUNTING_PERIODS = [
+		frappe._dict(name="2025-03", start_date=date(2025, 3, 1), end_date=date(2025, 3, 31),
+					 document_type="Journal Entry", closed=1),
+		frappe._dict(name="2025-03", start_date=date(2025, 3, 1), end_date=date(2025, 3, 31),
+					 document_type="Stock Entry", closed=0),
+		frappe._dict(name="2025-04", start_date=date(2025, 4, 1), end_date=date(2025, 4, 30),
+					 document_type=None, closed=None)
+	]
+
+	def setUp(self):
+		self.calendar = FiscalCalendar("Test Company PT", self.FISCAL_YEARS, ["2024"], self.ACCOUNTING_PERIODS)
+		self.patcher = patch.object(fiscal_calendar, "get_calendar", return_value=self.calendar)
+		self.patcher.start()
+		self.addCleanup(self.patcher.stop)
+
+	def test_fiscal_year_lookup(self):
+		"""✅ Ano fiscal por data, incluindo limites e datas fora do calendário"""
+		self.assertEqual(fiscal_calendar.get_fiscal_year("2025-06-15", "Test Company PT"),
+						 ("2025", date(2025, 1, 1), date(2025, 12, 31)))
+		self.assertEqual(fiscal_calendar.get_fiscal_year(date(2024, 12, 31), "Test Company PT")[0], "2024")
+		self.assertEqual(fiscal_calendar.get_fiscal_year(date(2026, 1, 1), "Test Company PT")[0], "2026")
+		self.assertIsNone(fiscal_calendar.get_fiscal_year(date(2023, 12, 31), "Test Company PT"))
+		self.assertIsNone(fiscal_calendar.get_fiscal_year(None, "Test Company PT"))
+
+	def test_closed_fiscal_year(self):
+		"""✅ Ano fiscal com Period Closing Voucher submetido"""
+		self.assertEqual(fiscal_calendar.get_period_closing("2024-05-10", "Test Company PT"),
+						 {"reason": "fiscal_year", "fiscal_year": "2024"})
+		self.assertFalse(fiscal_calendar.is_period_closed("2025-05-10", "Test Company PT"))
+
+	def test_closed_accounting_period(self):
+		"""✅ Accounting Period só fecha os doctypes marcados"""
+		self.assertEqual(fiscal_calendar.get_period_closing("2025-03-15", "Test Company PT", "Journal Entry"),
+						 {"reason": "accounting_period", "accounting_period": "2025-03"})
+		self.assertFalse(fiscal_calendar.is_period_closed("2025-03-15", "Test Company PT", "Stock Entry"))
+		self.assertFalse(fiscal_calendar.is_period_closed("2025-04-15", "Test Company PT", "Journal Entry"))
+
+	def test_calendar_reload(self):
+		"""✅ Recarregado quando expira; sem cache com invalidação pendente"""
+		self.patcher.stop()
+		fiscal_calendar.clear_calendars()
+		self.addCleanup(fiscal_calendar.clear_calendars)
+
+		def load(company):
+			return FiscalCalendar(company, self.FISCAL_YEARS, [], [])
+
+		with patch.object(fiscal_calendar, "load_calendar", side_effect=load) as loader, \
+				patch.object(fiscal_calendar.compliance_cache, "get_version", return_value=1), \
+				patch.object(fiscal_calendar.compliance_cache, "is_pending", return_value=False):
+			calendar = fiscal_calendar.get_calendar("Test Company PT")
+			self.assertIs(fiscal_calendar.get_calendar("Test Company PT"), calendar)
+
+			calendar.loaded_at -= fiscal_calendar.CALENDAR_MAX_AGE
+			self.assertIsNot(fiscal_calendar.get_calendar("Test Company PT"), calendar)
+			self.assertEqual(loader.call_count, 2)
+
+			with patch.object(fiscal_calendar.compliance_cache, "is_pending", return_value=True):
+				fiscal_calendar.get_calendar("Test Company PT")
+				fiscal_calendar.get_calendar("Test Company PT")
+				self.assertEqual(loader.call_count, 4)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test GL Balance Engine - Portugal Compliance
+✅ Limites do período, agregação mensal e consolidação nas contas-grupo
+"""
+
+import unittest
+from datetime import date
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.gl_balance_engine import (
+	aggregate_entries,
+	get_period_bounds,
+	roll_up_balances
+)
+
+
+class TestGLBalanceEngine(FrappeTestCase):
+	"""
+	✅ Classe de teste para o agregado de saldos GL
+	"""
+
+	def test_month_aligned_period(self):
+		"""✅ Período alinhado ao mês: só meses agregados"""
+		self.assertEqual(get_period_bounds("2025-01-01", "2025-03-31"),
+						 (date(2025, 1, 1), date(2025, 4, 1)))
+
+	def test_partial_months(self):
+		"""✅ Pontas parciais lidas do GL Entry"""
+		self.assertEqual(get_period_bounds("2025-01-15", "2025-03-20"),
+						 (date(2025, 1, 1), date(2025, 3, 1)))
+		self.assertEqual(get_period_bounds("2025-02-10", "2025-02-20"),
+						 (date(2025, 2, 1), date(2025, 2, 1)))
+
+	def test_aggregate_entries_by_month(self):
+		"""✅ Soma por (conta, mês)"""
+		totals = aggregate_entries([
+			{"account": "11 - Caixa", "posting_date": date(2025, 1, 3), "debit": 100, "credit": 0},
+			{"account": "11 - Caixa", "posting_date": date(2025, 1, 28), "debit": 0, "credit": 40},
+			{"account": "11 - Caixa", "posting_date": date(2025, 2, 1), "debit": 10, "credit": 0}
+		])
+
+		self.assertEqual(totals[("11 - Caixa", date(2025, 1, 1))], [100.0, 40.0, 2])
+		self.assertEqual(totals[("11 - Caixa", date(2025, 2, 1))], [10.0, 0.0, 1])
+
+	def test_roll_up_to_groups(self):
+		"""✅ Contas-grupo recebem a soma das contas de movimento"""
+		accounts = [
+			{"name": "1 - Ativo", "parent_account": None},
+			{"name": "11 - Caixa", "parent_account": "1 - Ativo"},
+			{"name": "12 - Depósitos", "parent_account": "1 - Ativo"},
+			{"name": "2 - Terceiros", "parent_account": None}
+		]
+		balances = roll_up_balances(accounts, {
+			"11 - Caixa": {"opening_balance": 50.0, "closing_balance": 80.0},
+			"12 - Depósitos": {"opening_balance": 25.0, "closing_balance": -5.0}
+		})
+
+		self.assertEqual(balances["1 - Ativo"], {"opening_balance": 75.0, "closing_balance": 75.0})
+		self.assertEqual(balances["2 - Terceiros"], {"opening_balance": 0.0, "closing_balance": 0.0})
+
+
+if __name__ == '__main__':
+	unittest.main()
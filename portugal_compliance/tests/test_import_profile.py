@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Import Profile - Portugal Compliance
+✅ Hooks e doc_events importam sem carregar dependências pesadas
+✅ Singletons construídos apenas no primeiro acesso
+"""
+
+import unittest
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.benchmarks.import_profile import profile_imports
+from portugal_compliance.utils.lazy import LazySingleton
+
+# Margem larga (máquinas de CI lentas) - o objetivo é apanhar regressões grosseiras
+IMPORT_BUDGET_MS = 3000
+
+
+class Counter:
+	instances = 0
+
+	def __init__(self):
+		Counter.instances += 1
+		self.value = 1
+
+	def double(self):
+		return self.value * 2
+
+
+class TestLazySingleton(FrappeTestCase):
+	"""
+	✅ Classe de teste para o proxy de singleton
+	"""
+
+	def setUp(self):
+		Counter.instances = 0
+
+	def test_constructed_on_first_access(self):
+		"""Testa que a instância só é criada no primeiro acesso e uma única vez"""
+		counter = LazySingleton(Counter)
+		self.assertFalse(counter.is_constructed())
+		self.assertEqual(Counter.instances, 0)
+
+		self.assertEqual(counter.double(), 2)
+		counter.value = 5
+		self.assertEqual(counter.double(), 10)
+		self.assertEqual(Counter.instances, 1)
+
+	def test_patch_object(self):
+		"""Testa que patch.object substitui e repõe o método da instância"""
+		counter = LazySingleton(Counter)
+
+		with patch.object(counter, "double", return_value=0):
+			self.assertEqual(counter.double(), 0)
+
+		self.assertEqual(counter.double(), 2)
+
+
+class TestImportProfile(FrappeTestCase):
+	"""
+	✅ Classe de teste para o custo de importação dos workers
+	"""
+
+	def test_hook_modules_import_without_heavy_dependencies(self):
+		"""Testa que hooks e doc_events não carregam qrcode/PIL/numpy/lxml/... ao importar"""
+		profile = profile_imports()
+
+		errors = {entry["module"]: entry["error"] for entry in profile["modules"] if entry.get("error")}
+		self.assertEqual(errors, {})
+		self.assertEqual(profile["heavy_modules"], [])
+		self.assertLess(profile["total_ms"], IMPORT_BUDGET_MS)
+
+
+if __name__ == '__main__':
+	unittest.main()
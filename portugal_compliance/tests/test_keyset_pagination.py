@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Keyset Pagination - Portugal Compliance
+✅ Páginas por cursor (creation, name) sem repetições nem falhas, também entre camadas
+"""
+
+import operator
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import db_indexes, keyset_pagination
+from portugal_compliance.utils.keyset_pagination import estimate_total, get_page, parse_sort
+
+OPERATORS = {"=": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def make_rows(prefix, count, start_day):
+	# Duas linhas por instante de creation para exercitar o desempate pelo name
+	return [
+		frappe._dict(name=f"{prefix}-{index:04d}", creation=f"2025-01-{start_day + index // 2:02d} 10:00:00")
+		for index in range(count)
+	]
+
+
+class FakeTables:
+	"""get_list em memória sobre {doctype: [linhas]}"""
+
+	def __init__(self, tables):
+		self.tables = tables
+		self.calls = []
+
+	def matches(self, row, condition):
+		field, op, value = condition
+		return OPERATORS[op](row[field], value)
+
+	def get_list(self, doctype, filters=None, or_filters=None, fields=None, order_by=None,
+				 limit_page_length=None, pluck=None):
+		self.calls.append(doctype)
+		rows = [
+			row for row in self.tables[doctype]
+			if all(self.matches(row, condition) for condition in filters or [])
+			and (not or_filters or any(self.matches(row, condition) for condition in or_filters))
+		]
+		if order_by:
+			rows.sort(key=lambda row: (row.creation, row.name), reverse=order_by.endswith("desc"))
+		rows = rows[:limit_page_length]
+		if pluck:
+			return [row[pluck] for row in rows]
+		return [frappe._dict(row) for row in rows]
+
+
+class TestKeysetPagination(FrappeTestCase):
+	"""
+	✅ Classe de teste para a paginação por cursor
+	"""
+
+	def read_all(self, tables, doctypes, sort_order="desc", page_length=7):
+		fake = FakeTables(tables)
+		names = []
+		cursor = None
+		with patch.object(keyset_pagination.frappe, "get_list", fake.get_list), \
+				patch.object(keyset_pagination.frappe.db, "estimate_count", return_value=0):
+			while True:
+				page = get_page(doctypes, fields=["name", "creation"], sort_order=sort_order,
+								cursor=cursor, page_length=page_length)
+				self.assertLessEqual(len(page["data"]), page_length)
+				names.extend(row.name for row in page["data"])
+				if not page["has_more"]:
+					break
+				cursor = page["next_cursor"]
+
+		return names
+
+	def test_pages_cover_all_rows_in_order(self):
+		"""Testa que as páginas percorrem todas as linhas uma única vez"""
+		rows = make_rows("A", 30, 1)
+		names = self.read_all({"ATCUD Log": rows}, "ATCUD Log")
+
+		expected = [row.name for row in sorted(rows, key=lambda row: (row.creation, row.name), reverse=True)]
+		self.assertEqual(names, expected)
+
+		ascending = self.read_all({"ATCUD Log": rows}, "ATCUD Log", sort_order="asc", page_length=4)
+		self.assertEqual(ascending, list(reversed(expected)))
+
+	def test_pages_continue_across_tiers(self):
+		"""Testa a passagem da camada quente para a fria a meio de uma página"""
+		tables = {"ATCUD Log": make_rows("H", 10, 20), "ATCUD Log Archive": make_rows("C", 9, 1)}
+		names = self.read_all(tables, ["ATCUD Log", "ATCUD Log Archive"], page_length=4)
+
+		self.assertEqual(len(names), 19)
+		self.assertEqual(len(set(names)), 19)
+		self.assertTrue(all(name.startswith("H") for name in names[:10]))
+
+	def test_cursor_bound_to_sort(self):
+		"""Testa que um cursor não serve para outra ordenação e que só há ordenação indexada"""
+		cursor = keyset_pagination.encode_cursor("creation", "desc", {"creation": "2025-01-01", "name": "X"})
+
+		self.assertRaises(frappe.ValidationError, keyset_pagination.decode_cursor, cursor, "creation", "asc")
+		self.assertRaises(frappe.ValidationError, keyset_pagination.decode_cursor, "???", "creation", "desc")
+		self.assertRaises(frappe.ValidationError, parse_sort, "atcud_code", "desc", ("creation",))
+
+	def test_estimate_total_is_capped(self):
+		"""Testa a contagem limitada com filtros e a estimativa sem filtros"""
+		fake = FakeTables({"ATCUD Log": make_rows("A", 30, 1)})
+		filters = {"creation": [">=", "2025-01-01"]}
+
+		with patch.object(keyset_pagination.frappe, "get_list", fake.get_list), \
+				patch.object(keyset_pagination.frappe.db, "estimate_count", return_value=123456):
+			self.assertEqual(estimate_total("ATCUD Log", filters, cap=10), {"count": 10, "exact": False})
+			self.assertEqual(estimate_total("ATCUD Log", filters, cap=100), {"count": 30, "exact": True})
+			self.assertEqual(estimate_total("ATCUD Log"), {"count": 123456, "exact": False})
+
+	def test_report_indexes_use_shared_helper(self):
+		"""Testa os nomes dos índices e que tabelas inexistentes são ignoradas"""
+		with patch.object(db_indexes.frappe.db, "table_exists", side_effect=lambda doctype: doctype != "ATCUD Log Archive"), \
+				patch.object(db_indexes.frappe.db, "add_index") as add_index:
+			keyset_pagination.ensure_report_indexes()
+
+		created = [call.args for call in add_index.call_args_list]
+		self.assertIn(("ATCUD Log", ["creation"], "creation"), created)
+		self.assertIn(("ATCUD Log", ["company", "creation"], "company_creation_index"), created)
+		self.assertNotIn("ATCUD Log Archive", [args[0] for args in created])
+
+
+if __name__ == '__main__':
+	unittest.main()
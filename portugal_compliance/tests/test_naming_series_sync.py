@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Naming Series Sync - Portugal Compliance
+✅ Opções desejadas por doctype e diff com os Property Setters atuais
+"""
+
+import unittest
+from datetime import datetime
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.naming_series_sync import compute_desired_options, diff_property_setters
+
+
+def make_series(prefix, document_type="Sales Invoice", is_communicated=1, day=1):
+	return frappe._dict(document_type=document_type, prefix=prefix, is_communicated=is_communicated,
+						creation=datetime(2025, 1, day))
+
+
+class TestNamingSeriesSync(FrappeTestCase):
+	"""
+	✅ Classe de teste para a sincronização de Property Setters
+	"""
+
+	def test_desired_options_order(self):
+		"""Testa a ordem: ano corrente antes do próximo, comunicadas e mais recentes primeiro"""
+		rows = [
+			make_series("FT2026NDX", day=20),
+			make_series("FS2025NDX", is_communicated=0, day=15),
+			make_series("FT2025NDX", day=2),
+			make_series("FR2025NDX", day=10),
+			make_series("GR2025NDX", document_type="Delivery Note")
+		]
+		desired = compute_desired_options(rows, year=2025)
+
+		self.assertEqual(desired["Sales Invoice"].split("\n"),
+						 ["FR2025NDX.####", "FT2025NDX.####", "FS2025NDX.####", "FT2026NDX.####"])
+		self.assertEqual(desired["Delivery Note"], "GR2025NDX.####")
+		self.assertTrue(compute_desired_options(rows, year=2026)["Sales Invoice"].startswith("FT2026NDX"))
+
+	def test_diff_writes_only_changes(self):
+		"""Testa que só os Property Setters diferentes são criados, atualizados ou removidos"""
+		desired = {"Sales Invoice": "FT2025NDX.####", "POS Invoice": "FS2025NDX.####",
+				   "Delivery Note": "GR2025NDX.####"}
+		current = [
+			frappe._dict(name="Sales Invoice-naming_series-options", doc_type="Sales Invoice",
+						 value="FT2025NDX.####"),
+			frappe._dict(name="POS Invoice-naming_series-options", doc_type="POS Invoice", value="FS2024NDX.####"),
+			frappe._dict(name="POS Invoice-naming_series-options-NDX", doc_type="POS Invoice",
+						 value="FS2024NDX.####")
+		]
+		changes = diff_property_setters(desired, current)
+
+		self.assertEqual(changes["create"], {"Delivery Note": "GR2025NDX.####"})
+		self.assertEqual(changes["update"], {"POS Invoice-naming_series-options": "FS2025NDX.####"})
+		self.assertEqual(changes["remove"], ["POS Invoice-naming_series-options-NDX"])
+		self.assertEqual(changes["doctypes"], {"Delivery Note", "POS Invoice"})
+
+		unchanged = diff_property_setters({"Sales Invoice": "FT2025NDX.####"}, current[:1])
+		self.assertFalse(unchanged["create"] or unchanged["update"] or unchanged["remove"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test NIF Validator - Portugal Compliance
+✅ Validação escalar e em lote devem concordar
+✅ Fallback sem NumPy devolve o mesmo resultado
+"""
+
+import unittest
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import nif_validator
+from portugal_compliance.utils.nif_validator import (
+	NIF_EMPTY,
+	NIF_INVALID_CHECK_DIGIT,
+	NIF_INVALID_FIRST_DIGIT,
+	NIF_INVALID_LENGTH,
+	NIF_VALID,
+	STRICT_FIRST_DIGITS,
+	classify_nif_batch,
+	get_nif_status,
+	validate_nif,
+	validate_nif_batch,
+)
+
+
+class TestNIFValidator(FrappeTestCase):
+	"""
+	✅ Classe de teste para o validador canónico de NIF
+	"""
+
+	SAMPLE_NIFS = [
+		"999999990",  # Consumidor final
+		"501964843",  # Pessoa coletiva válida
+		"PT 501 964 843",  # Com prefixo e espaços
+		"501964844",  # Dígito de controlo errado
+		"12345",  # Comprimento errado
+		"",  # Vazio
+		None,  # Nulo
+		"012345678",  # Primeiro dígito inválido
+		"453456789"  # Não residente ("45")
+	]
+
+	def test_scalar_validation(self):
+		"""✅ Validação escalar"""
+		self.assertTrue(validate_nif("999999990"))
+		self.assertTrue(validate_nif("PT501964843"))
+		self.assertFalse(validate_nif("501964844"))
+		self.assertFalse(validate_nif(""))
+		self.assertFalse(validate_nif(None))
+
+	def test_status_codes(self):
+		"""✅ Códigos de estado"""
+		self.assertEqual(get_nif_status(""), NIF_EMPTY)
+		self.assertEqual(get_nif_status("12345"), NIF_INVALID_LENGTH)
+		self.assertEqual(get_nif_status("012345678"), NIF_INVALID_FIRST_DIGIT)
+		self.assertEqual(get_nif_status("501964844"), NIF_INVALID_CHECK_DIGIT)
+		self.assertEqual(get_nif_status("501964843"), NIF_VALID)
+
+	def test_strict_first_digits(self):
+		"""✅ Conjunto estrito exclui o primeiro dígito 4"""
+		self.assertEqual(get_nif_status("400000008"), NIF_VALID)
+		self.assertEqual(get_nif_status("400000008", STRICT_FIRST_DIGITS), NIF_INVALID_FIRST_DIGIT)
+
+	def test_batch_matches_scalar(self):
+		"""✅ Lote vetorizado concorda com a validação escalar"""
+		expected = [get_nif_status(nif) for nif in self.SAMPLE_NIFS]
+		self.assertEqual(classify_nif_batch(self.SAMPLE_NIFS), expected)
+		self.assertEqual(
+			validate_nif_batch(self.SAMPLE_NIFS),
+			[status == NIF_VALID for status in expected]
+		)
+
+	def test_batch_without_numpy(self):
+		"""✅ Fallback em Python puro"""
+		expected = [get_nif_status(nif) for nif in self.SAMPLE_NIFS]
+		with patch.object(nif_validator, "np", None):
+			self.assertEqual(classify_nif_batch(self.SAMPLE_NIFS), expected)
+
+	def test_empty_batch(self):
+		"""✅ Lote vazio"""
+		self.assertEqual(classify_nif_batch([]), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
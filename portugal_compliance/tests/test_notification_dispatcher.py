@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Notification Dispatcher - Portugal Compliance
+✅ Agrupamento de eventos em digests por destinatário, reenvio de falhas e
+   chave de deduplicação por empresa/destinatários
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import notification_dispatcher
+from portugal_compliance.utils.notification_dispatcher import (
+	CHANNEL_EMAIL,
+	CHANNEL_SYSTEM,
+	group_by_recipient,
+	make_dedup_key
+)
+
+
+def make_event(subject, recipients, channel=CHANNEL_EMAIL):
+	return {"channel": channel, "subject": subject, "content": subject, "recipients": recipients}
+
+
+class TestNotificationDispatcher(FrappeTestCase):
+	"""
+	✅ Classe de teste para o dispatcher de notificações
+	"""
+
+	def test_dedup_key_is_stable(self):
+		"""✅ Mesmas partes, mesma chave; None é ignorado"""
+		self.assertEqual(make_dedup_key("a", 1, None), make_dedup_key("a", 1))
+		self.assertNotEqual(make_dedup_key("a", 1), make_dedup_key("a", 2))
+
+	def test_burst_becomes_one_digest_per_recipient_group(self):
+		"""✅ Centenas de eventos para os mesmos destinatários = um envio"""
+		events = [make_event(f"ATCUD {i}", ["a@x.pt", "b@x.pt"]) for i in range(300)]
+		batches = group_by_recipient(events)
+
+		self.assertEqual(len(batches), 1)
+		channel, recipients, batch = batches[0]
+		self.assertEqual(channel, CHANNEL_EMAIL)
+		self.assertEqual(recipients, ["a@x.pt", "b@x.pt"])
+		self.assertEqual(len(batch), 300)
+
+	def test_recipients_with_different_events_get_separate_digests(self):
+		"""✅ Cada destinatário recebe apenas os seus eventos"""
+		events = [
+			make_event("E1", ["a@x.pt", "b@x.pt"]),
+			make_event("E2", ["b@x.pt"]),
+			make_event("S1", ["Administrator"], channel=CHANNEL_SYSTEM)
+		]
+		batches = {(channel, tuple(recipients)): [e["subject"] for e in batch]
+				   for channel, recipients, batch in group_by_recipient(events)}
+
+		self.assertEqual(batches, {
+			(CHANNEL_EMAIL, ("a@x.pt",)): ["E1"],
+			(CHANNEL_EMAIL, ("b@x.pt",)): ["E1", "E2"],
+			(CHANNEL_SYSTEM, ("Administrator",)): ["S1"]
+		})
+
+	def test_failed_digest_is_requeued(self):
+		"""✅ Digest que falha volta à fila (só com os destinatários em falta)"""
+		events = [dict(make_event("E1", ["a@x.pt", "b@x.pt"]), field="email:e1", queued_at="1")]
+
+		with patch.object(notification_dispatcher, "_claim_pending", side_effect=[events, []]), \
+				patch.object(notification_dispatcher, "_send_email_digest", side_effect=Exception("SMTP")), \
+				patch.object(notification_dispatcher, "requeue_failed", return_value=1) as requeue, \
+				patch.object(notification_dispatcher.frappe, "db", MagicMock()) as db:
+			summary = notification_dispatcher.flush_notifications()
+
+		self.assertEqual(summary["requeued"], 1)
+		requeue.assert_called_once_with([(["a@x.pt", "b@x.pt"], events)])
+		db.rollback.assert_called_once_with(save_point="notification_digest")
+
+	def test_requeue_keeps_occurrences_and_counts_attempts(self):
+		"""✅ Evento devolvido com destinatários do envio falhado; descartado no limite"""
+		pipe = MagicMock()
+		cache = MagicMock(make_key=lambda key: key)
+		cache.pipeline.return_value = pipe
+
+		event = dict(make_event("E1", None), field="email:e1", occurrences=3)
+		exhausted = dict(make_event("E2", None), field="email:e2",
+						 attempts=notification_dispatcher.MAX_SEND_ATTEMPTS - 1)
+
+		with patch.object(notification_dispatcher.frappe, "cache", return_value=cache), \
+				patch.object(notification_dispatcher.frappe, "log_error") as log_error:
+			requeued = notification_dispatcher.requeue_failed([(["b@x.pt"], [event, exhausted]),
+															   (["a@x.pt"], [event])])
+
+		self.assertEqual(requeued, 1)
+		log_error.assert_called_once()
+		field, payload = pipe.hset.call_args.args[1:]
+		self.assertEqual(field, "email:e1")
+		self.assertEqual(json.loads(payload)["recipients"], ["a@x.pt", "b@x.pt"])
+		self.assertEqual(json.loads(payload)["attempts"], 1)
+		pipe.hincrby.assert_called_once_with(notification_dispatcher.COUNTS_KEY, "email:e1", 3)
+
+	def test_email_dedup_key_includes_company_and_recipients(self):
+		"""✅ Mesmo template e assunto para outro público não é deduplicado"""
+		from portugal_compliance.email import PortugalComplianceEmailManager
+
+		manager = PortugalComplianceEmailManager.__new__(PortugalComplianceEmailManager)
+		manager.email_templates = {"test": {"subject": "Série {series_name}"}}
+		manager.notification_settings = {"notification_recipients": []}
+		manager._generate_email_content = lambda template_key, data: "conteúdo"
+
+		with patch("portugal_compliance.email.queue_notification") as queue:
+			for company, recipients in (("Company A", [{"email": "a@x.pt"}]),
+										("Company A", [{"email": "b@x.pt"}]),
+										("Company B", [{"email": "a@x.pt"}]),
+										("Company A", [{"email": "a@x.pt"}])):
+				manager._send_notification("test", {"series_name": "FT2025CA", "company": company},
+										   recipients=recipients)
+
+		keys = [call.kwargs["dedup_key"] for call in queue.call_args_list]
+		self.assertEqual(len(set(keys[:3])), 3)
+		self.assertEqual(keys[0], keys[3])
+
+
+if __name__ == '__main__':
+	unittest.main()
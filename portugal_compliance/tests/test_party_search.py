@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Party Search - Portugal Compliance
+✅ Deteção de NIF e construção da consulta FULLTEXT
+✅ Sem índice FULLTEXT (ou com erro) a pesquisa mantém a correspondência por substring
+✅ Filtros do campo Link e User Permissions aplicados em todas as consultas
+"""
+
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.queries import party_search
+from portugal_compliance.queries.party_search import build_fulltext_query, is_nif_query
+
+
+class TestPartySearch(FrappeTestCase):
+	"""
+	✅ Classe de teste para a pesquisa indexada de Clientes/Fornecedores
+	"""
+
+	def test_nif_shaped_input(self):
+		"""✅ Dígitos com separadores e prefixo PT"""
+		for txt in ("123456789", "PT123456789", "pt 123 456 789", "123.456", "500"):
+			self.assertTrue(is_nif_query(txt), txt)
+
+	def test_name_input(self):
+		"""✅ Nomes, prefixos curtos e números longos não são NIF"""
+		for txt in ("", "Silva", "12", "1000 Ideias", "1234567890", "CUST-0001"):
+			self.assertFalse(is_nif_query(txt), txt)
+
+	def test_fulltext_query(self):
+		"""✅ Palavras curtas são ignoradas (innodb_ft_min_token_size)"""
+		self.assertEqual(build_fulltext_query("Costa da Mar"), "+Costa* +Mar*")
+		self.assertIsNone(build_fulltext_query("de a"))
+
+	def search_words(self, txt, fulltext_index=True, fulltext_error=None, filters=None, match_conditions=""):
+		"""Pesquisa por nome sem resultados de prefixo; devolve (linhas, SQL executado)"""
+		queries = []
+
+		def sql(query, values=None, as_dict=False):
+			queries.append(query)
+			if "MATCH(" in query and fulltext_error:
+				raise fulltext_error
+			if "LIKE %(txt)s" in query:
+				return [frappe._dict(name="CUST-0001", customer_name="Ana Costa da Silva")]
+			return []
+
+		with patch.object(party_search.frappe.db, "sql", side_effect=sql), \
+				patch.object(party_search, "has_fulltext_index", return_value=fulltext_index), \
+				patch.object(party_search, "build_match_conditions", return_value=match_conditions), \
+				patch.object(party_search, "_has_normalized_tax_id", return_value=True), \
+				patch.object(party_search.frappe, "log_error") as log_error:
+			rows = party_search.run_party_search("Customer", txt, filters=filters)
+
+		return rows, queries, log_error
+
+	def test_substring_without_fulltext_index(self):
+		"""✅ Sem índice FULLTEXT: texto a meio do nome continua a ser encontrado"""
+		rows, queries, _log_error = self.search_words("Costa", fulltext_index=False)
+
+		self.assertEqual([row.name for row in rows], ["CUST-0001"])
+		self.assertFalse(any("MATCH(" in query for query in queries))
+
+	def test_substring_for_short_words(self):
+		"""✅ Palavras abaixo do tamanho mínimo do FULLTEXT usam substring"""
+		rows, queries, _log_error = self.search_words("da")
+
+		self.assertEqual([row.name for row in rows], ["CUST-0001"])
+		self.assertFalse(any("MATCH(" in query for query in queries))
+
+	def test_fulltext_error_is_logged(self):
+		"""✅ Erro na consulta FULLTEXT é registado e a pesquisa recorre à substring"""
+		rows, _queries, log_error = self.search_words("Costa", fulltext_error=Exception("FULLTEXT"))
+
+		self.assertEqual([row.name for row in rows], ["CUST-0001"])
+		log_error.assert_called_once()
+
+	def test_filters_and_user_permissions_applied(self):
+		"""✅ Filtros do campo Link e User Permissions em todas as consultas executadas"""
+		match_conditions = "`tabCustomer`.`territory` in ('Portugal')"
+
+		for txt in ("", "Costa", "500100"):
+			_rows, queries, _log_error = self.search_words(
+				txt, fulltext_index=False, filters={"customer_group": "Commercial"},
+				match_conditions=match_conditions)
+
+			self.assertTrue(queries, txt)
+			for query in queries:
+				self.assertIn("customer_group", query, txt)
+				self.assertIn("'Commercial'", query, txt)
+				self.assertIn(match_conditions, query, txt)
+
+	def test_filters_in_cache_key(self):
+		"""✅ Filtros diferentes não partilham resultados em cache"""
+		with patch.object(party_search.frappe, "cache") as cache:
+			cache.return_value.get_value.return_value = "1"
+			unfiltered = party_search._cache_key("Customer", "costa", 0, 20)
+			filtered = party_search._cache_key("Customer", "costa", 0, 20, '{"customer_group": "Commercial"}')
+			empty = party_search._cache_key("Customer", "costa", 0, 20, {})
+
+		self.assertNotEqual(unfiltered, filtered)
+		self.assertEqual(unfiltered, empty)
+
+	def test_customer_query_falls_back_on_error(self):
+		"""✅ Falha da pesquisa indexada: erro registado e resultados por substring"""
+		from portugal_compliance.queries import customer
+
+		with patch.object(customer, "search_parties", side_effect=Exception("Redis")), \
+				patch.object(customer, "search_parties_fallback", return_value=[("CUST-0001",)]) as fallback, \
+				patch.object(customer.frappe, "log_error") as log_error:
+			result = customer.customer_query("Customer", "Costa", "name", 0, 20, {"customer_group": "Commercial"})
+
+		self.assertEqual(result, [("CUST-0001",)])
+		log_error.assert_called_once()
+		fallback.assert_called_once_with("Customer", "Costa", 0, 20, {"customer_group": "Commercial"}, as_dict=False)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Performance Metrics - Portugal Compliance
+✅ Histogramas por etapa, percentis estimados e formato Prometheus
+"""
+
+import unittest
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import performance_metrics
+from portugal_compliance.utils.performance_metrics import (
+	BUCKETS_MS,
+	estimate_percentile,
+	instrumented,
+	render_prometheus
+)
+
+
+class TestPerformanceMetrics(FrappeTestCase):
+	"""
+	✅ Classe de teste para a instrumentação
+	"""
+
+	def setUp(self):
+		performance_metrics._take_histograms()
+
+	def tearDown(self):
+		performance_metrics._take_histograms()
+
+	def test_disabled_does_not_record(self):
+		"""Testa que a função decorada não mede nada com a instrumentação desativada"""
+		@instrumented("test.stage")
+		def work(value):
+			return value + 1
+
+		with patch.object(performance_metrics, "is_enabled", return_value=False):
+			self.assertEqual(work(1), 2)
+
+		self.assertEqual(performance_metrics._histograms, {})
+
+	def test_record_buckets(self):
+		"""Testa contagens, totais e bucket de cada observação"""
+		with patch.object(performance_metrics, "flush"):
+			performance_metrics.record("test.stage", 0.5, db_queries=2, redis_calls=1)
+			performance_metrics.record("test.stage", 7, db_queries=4)
+			performance_metrics.record("test.stage", 60000)
+
+		histogram = performance_metrics._histograms["test.stage"]
+		self.assertEqual(histogram["calls"], 3)
+		self.assertEqual(histogram["db_queries"], 6)
+		self.assertEqual(histogram["redis_calls"], 1)
+		self.assertEqual(histogram["buckets"][0], 1)
+		self.assertEqual(histogram["buckets"][BUCKETS_MS.index(10)], 1)
+		self.assertEqual(histogram["buckets"][-1], 1)
+
+	def test_estimate_percentile(self):
+		"""Testa o percentil pelo limite superior do bucket"""
+		buckets = [0] * (len(BUCKETS_MS) + 1)
+		buckets[BUCKETS_MS.index(5)] = 90
+		buckets[BUCKETS_MS.index(100)] = 10
+
+		self.assertEqual(estimate_percentile(buckets, 0.5), 5)
+		self.assertEqual(estimate_percentile(buckets, 0.95), 100)
+		self.assertIsNone(estimate_percentile([0] * len(buckets), 0.5))
+
+	def test_parse_redis_hash(self):
+		"""Testa a leitura dos campos "etapa|métrica" somados no Redis"""
+		stages = performance_metrics._parse_redis_hash({
+			b"hooks|save|calls": b"4",
+			b"hooks|save|total_us": b"12500",
+			b"hooks|save|db_queries": b"8",
+			b"hooks|save|b3": b"4"
+		})
+
+		histogram = stages["hooks|save"]
+		self.assertEqual(histogram["calls"], 4)
+		self.assertEqual(histogram["total_ms"], 12.5)
+		self.assertEqual(histogram["db_queries"], 8)
+		self.assertEqual(histogram["buckets"][3], 4)
+
+	def test_render_prometheus(self):
+		"""Testa buckets cumulativos em segundos, soma e contagem"""
+		histogram = performance_metrics._new_histogram()
+		histogram.update({"calls": 3, "total_ms": 30.0, "db_queries": 6})
+		histogram["buckets"][0] = 1
+		histogram["buckets"][BUCKETS_MS.index(25)] = 2
+
+		text = render_prometheus({"atcud.generate": histogram})
+
+		self.assertIn('portugal_compliance_stage_duration_seconds_bucket{stage="atcud.generate",le="0.001"} 1', text)
+		self.assertIn('portugal_compliance_stage_duration_seconds_bucket{stage="atcud.generate",le="0.025"} 3', text)
+		self.assertIn('portugal_compliance_stage_duration_seconds_bucket{stage="atcud.generate",le="+Inf"} 3', text)
+		self.assertIn('portugal_compliance_stage_duration_seconds_sum{stage="atcud.generate"} 0.030000', text)
+		self.assertIn('portugal_compliance_stage_db_queries_total{stage="atcud.generate"} 6', text)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test SAF-T Batch - Portugal Compliance
+✅ Agrupamento de empresas por volume para os jobs SAF-T mensais/anuais
+✅ Slots: limite global, libertação com a fila vazia e recuperação de grupos perdidos
+"""
+
+import fnmatch
+import json
+import unittest
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import saft_batch
+from portugal_compliance.utils.saft_batch import group_companies
+
+
+class FakeRedis:
+	"""Redis em memória com os comandos usados pelos slots e pela fila (pipeline imediato)"""
+
+	def __init__(self):
+		self.values = {}
+		self.lists = {}
+
+	def make_key(self, key):
+		return key
+
+	def pipeline(self):
+		return FakePipeline(self)
+
+	def scan_iter(self, match):
+		return [key for key in list(self.values) + list(self.lists) if fnmatch.fnmatch(key, match)]
+
+	def expire_slot(self, slot):
+		"""Simula a expiração do TTL do slot"""
+		self.values.pop(saft_batch.SLOT_KEY.format(slot=slot), None)
+
+
+class FakePipeline:
+	def __init__(self, redis):
+		self.redis = redis
+		self.results = []
+
+	def _add(self, result):
+		self.results.append(result)
+		return self
+
+	def set(self, key, value, nx=False, ex=None):
+		if nx and key in self.redis.values:
+			return self._add(None)
+		self.redis.values[key] = value
+		return self._add(True)
+
+	def delete(self, key):
+		existed = self.redis.values.pop(key, None) is not None or self.redis.lists.pop(key, None) is not None
+		return self._add(int(existed))
+
+	def expire(self, key, ttl):
+		return self._add(key in self.redis.values)
+
+	def lpush(self, key, value):
+		self.redis.lists.setdefault(key, []).insert(0, value)
+		return self._add(len(self.redis.lists[key]))
+
+	def rpoplpush(self, source, destination):
+		items = self.redis.lists.get(source)
+		if not items:
+			return self._add(None)
+		value = items.pop()
+		if not items:
+			del self.redis.lists[source]
+		self.redis.lists.setdefault(destination, []).insert(0, value)
+		return self._add(value)
+
+	def llen(self, key):
+		return self._add(len(self.redis.lists.get(key, [])))
+
+	def execute(self):
+		results, self.results = self.results, []
+		return results
+
+
+class TestSAFTBatch(FrappeTestCase):
+	"""
+	✅ Classe de teste para o lote SAF-T
+	"""
+
+	def test_large_companies_run_alone(self):
+		"""Testa que empresas grandes ficam num job próprio e saem primeiro"""
+		sizes = {"Big A": 500000, "Big B": 80000, "Small 1": 100, "Small 2": 50}
+		groups = group_companies(sizes, small_company_rows=20000, group_row_budget=100000)
+
+		self.assertEqual(groups[0]["companies"], ["Big A"])
+		self.assertEqual(groups[1]["companies"], ["Big B"])
+		self.assertEqual(groups[2]["companies"], ["Small 1", "Small 2"])
+
+	def test_small_companies_respect_budget(self):
+		"""Testa que cada grupo de empresas pequenas fica dentro do orçamento"""
+		sizes = {f"Company {index}": 6000 for index in range(10)}
+		groups = group_companies(sizes, small_company_rows=20000, group_row_budget=20000)
+
+		self.assertEqual(sorted(c for group in groups for c in group["companies"]), sorted(sizes))
+		self.assertTrue(all(group["rows"] <= 20000 for group in groups))
+		self.assertEqual(len(groups), 4)
+
+
+class TestSAFTBatchSlots(FrappeTestCase):
+	"""
+	✅ Classe de teste para a fila e os slots do lote SAF-T
+	"""
+
+	def setUp(self):
+		self.redis = FakeRedis()
+		self.enqueued = []
+
+		for patcher in (patch.object(saft_batch.frappe, "cache", return_value=self.redis),
+						patch.object(saft_batch.frappe, "enqueue",
+									 side_effect=lambda method, **kwargs: self.enqueued.append(kwargs)),
+						patch.object(saft_batch, "get_max_concurrency", return_value=2)):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def push_groups(self, count):
+		for index in range(count):
+			self.redis.pipeline().lpush(saft_batch.QUEUE_KEY, json.dumps({
+				"run_id": "run-1", "timeout": 3600, "export_logs": [f"SAFT-{index}"]})).execute()
+
+	def running_logs(self):
+		return [kwargs["group"]["export_logs"][0] for kwargs in self.enqueued]
+
+	def finish(self, slot):
+		"""Fim do job do slot: o slot passa ao grupo seguinte"""
+		saft_batch.dispatch(slot)
+
+	def test_concurrency_cap(self):
+		"""Testa que só há N jobs em simultâneo e que a fila sai pela ordem de entrada"""
+		self.push_groups(5)
+		saft_batch.fill_slots()
+		saft_batch.fill_slots()
+
+		self.assertEqual(self.running_logs(), ["SAFT-0", "SAFT-1"])
+		self.assertEqual([kwargs["slot"] for kwargs in self.enqueued], [0, 1])
+
+		self.finish(0)
+		self.assertEqual(self.running_logs()[-1], "SAFT-2")
+		self.assertEqual(len(self.redis.lists[saft_batch.QUEUE_KEY]), 2)
+
+	def test_slot_released_when_queue_empty(self):
+		"""Testa que, sem grupos na fila, o slot e o grupo em curso são libertados"""
+		self.push_groups(1)
+		saft_batch.fill_slots()
+
+		self.assertNotIn(saft_batch.SLOT_KEY.format(slot=1), self.redis.values)
+		self.assertIn(saft_batch.SLOT_KEY.format(slot=0), self.redis.values)
+
+		self.finish(0)
+		self.assertEqual(self.redis.values, {})
+		self.assertEqual(self.redis.lists, {})
+
+	def test_lost_group_recovered(self):
+		"""Testa que o grupo de um job perdido volta a correr depois de o slot expirar"""
+		self.push_groups(1)
+		saft_batch.fill_slots()
+		self.assertEqual(self.running_logs(), ["SAFT-0"])
+
+		# Job perdido: nunca chama dispatch; o slot ainda ocupado bloqueia a recuperação
+		saft_batch.resume_saft_queue()
+		self.assertEqual(self.running_logs(), ["SAFT-0"])
+
+		self.redis.expire_slot(0)
+		saft_batch.resume_saft_queue()
+		self.assertEqual(self.running_logs(), ["SAFT-0", "SAFT-0"])
+
+		self.finish(0)
+		self.assertEqual(self.redis.lists, {})
+
+	def test_lost_group_above_limit_recovered(self):
+		"""Testa a recuperação de um grupo num slot acima do limite atual"""
+		self.push_groups(1)
+		with patch.object(saft_batch, "get_max_concurrency", return_value=4):
+			saft_batch.fill_slots()
+
+		self.redis.lists[saft_batch.INFLIGHT_KEY.format(slot=3)] = self.redis.lists.pop(
+			saft_batch.INFLIGHT_KEY.format(slot=0))
+		self.redis.expire_slot(0)
+
+		saft_batch.resume_saft_queue()
+
+		self.assertEqual(self.running_logs(), ["SAFT-0", "SAFT-0"])
+		self.assertEqual(self.enqueued[-1]["slot"], 0)
+		self.assertNotIn(saft_batch.SLOT_KEY.format(slot=3), self.redis.values)
+
+	def test_interrupted_log_is_retried(self):
+		"""Testa que um log "In Progress" de um job perdido volta a ser gerado"""
+		statuses = {"SAFT-0": "In Progress", "SAFT-1": "Completed", "SAFT-2": "Pending"}
+
+		with patch.object(saft_batch.frappe.db, "get_value", side_effect=lambda doctype, name, field: statuses[name]), \
+				patch.object(saft_batch.frappe.db, "commit"), \
+				patch("portugal_compliance.utils.saft_generator.generate_saft_background") as generate, \
+				patch.object(saft_batch, "dispatch") as dispatch:
+			saft_batch.run_saft_group(0, {"export_logs": list(statuses)})
+
+		self.assertEqual([call.args[0] for call in generate.call_args_list], ["SAFT-0", "SAFT-2"])
+		dispatch.assert_called_once_with(0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test SAF-T File Store - Portugal Compliance
+✅ Streaming do ficheiro guardado (ranges, gzip, zip) e um ficheiro por exportação
+"""
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.saft_file_store import (
+	hash_file,
+	iter_file_range,
+	iter_gzip,
+	iter_zip,
+	resolve_range
+)
+
+
+class TestSAFTFileStore(FrappeTestCase):
+	"""
+	✅ Classe de teste para o download em streaming de ficheiros SAF-T
+	"""
+
+	def setUp(self):
+		self.content = b"<AuditFile>" + os.urandom(200000) + b"</AuditFile>"
+		handle, self.file_path = tempfile.mkstemp(suffix=".xml")
+		with os.fdopen(handle, "wb") as file:
+			file.write(self.content)
+
+	def tearDown(self):
+		os.remove(self.file_path)
+
+	def test_range_chunks(self):
+		"""✅ Intervalos lidos em blocos pequenos"""
+		data = b"".join(iter_file_range(self.file_path, 100, 5000, chunk_size=333))
+		self.assertEqual(data, self.content[100:5000])
+		self.assertEqual(resolve_range("bytes=100-4999", len(self.content)), (100, 5000))
+		self.assertEqual(resolve_range("bytes=-11", len(self.content)),
+						 (len(self.content) - 11, len(self.content)))
+
+	def test_unsatisfiable_range(self):
+		"""✅ Intervalo fora do ficheiro = 416"""
+		with self.assertRaises(ValueError):
+			resolve_range(f"bytes={len(self.content) + 10}-", len(self.content))
+
+	def test_if_range_mismatch_sends_full_file(self):
+		"""✅ If-Range com ETag antigo ignora o Range"""
+		self.assertIsNone(resolve_range("bytes=0-10", len(self.content), if_range='"old"', etag="new"))
+
+	def test_compressed_streams(self):
+		"""✅ gzip e zip em streaming reproduzem o ficheiro original"""
+		gzipped = b"".join(iter_gzip(self.file_path, "saft.xml", chunk_size=4096))
+		self.assertEqual(gzip.decompress(gzipped), self.content)
+
+		zipped = b"".join(iter_zip(self.file_path, "saft.xml", chunk_size=4096))
+		self.assertEqual(zipfile.ZipFile(io.BytesIO(zipped)).read("saft.xml"), self.content)
+
+	def test_hash_file(self):
+		"""✅ SHA256 em blocos"""
+		import hashlib
+		self.assertEqual(hash_file(self.file_path, chunk_size=1000), hashlib.sha256(self.content).hexdigest())
+
+	def test_export_path_is_unique_per_export(self):
+		"""✅ Tipo e log no nome: exportações do mesmo período não se substituem"""
+		from portugal_compliance.utils import saft_generator
+
+		generator = saft_generator.SAFTGenerator.__new__(saft_generator.SAFTGenerator)
+		site_path = tempfile.mkdtemp()
+
+		with patch.object(saft_generator, "get_site_path", return_value=site_path):
+			full = generator.get_export_path("Company A", "2025-01-01", "2025-01-31", "full", "SAFT-LOG-0001")
+			simplified = generator.get_export_path("Company A", "2025-01-01", "2025-01-31", "simplified",
+												   "SAFT-LOG-0001")
+			rerun = generator.get_export_path("Company A", "2025-01-01", "2025-01-31", "full", "SAFT-LOG-0002")
+			unnamed = {generator.get_export_path("Company A", "2025-01-01", "2025-01-31") for _i in range(2)}
+
+		self.assertTrue(os.path.basename(full).endswith("_full_SAFT-LOG-0001.xml"))
+		self.assertEqual(len({full, simplified, rerun}), 3)
+		self.assertEqual(len(unnamed), 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
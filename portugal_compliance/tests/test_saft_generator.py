@@ -302,38 +302,34 @@ class TestSAFTGenerator(unittest.TestCase):
 		self.assertIn('<MasterFiles>', xml_content)
 		self.assertIn('<SourceDocuments>', xml_content)
 
-	def test_validate_xml_structure(self):
-		"""Testa validação da estrutura XML"""
-		# XML válido de teste
-		valid_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-        <AuditFile xmlns="urn:OECD:StandardAuditFile-Tax:PT_1.04_01">
-            <Header>
-                <AuditFileVersion>1.04_01</AuditFileVersion>
-                <CompanyID>999999999</CompanyID>
-            </Header>
-        </AuditFile>'''
+	def generate_with_validation(self, validation):
+		"""generate_saft com dados/template simulados e o resultado de validação indicado"""
+		with patch.object(self.generator, 'prepare_context', return_value={}), \
+			patch.object(self.generator, 'render_template', return_value="<AuditFile/>"), \
+			patch('portugal_compliance.utils.saft_generator.validate_saft_content', return_value=validation), \
+			patch.object(frappe, 'get_doc'), \
+			patch.object(frappe, 'publish_realtime'), \
+			patch.object(frappe, 'log_error'):
+			return self.generator.generate_saft(self.test_company, self.test_start_date, self.test_end_date)
 
-		# Executar teste
-		result = self.generator._validate_xml_structure(valid_xml)
+	def test_validate_xml_structure(self):
+		"""Testa que o XML gerado válido pelo XSD é devolvido"""
+		validation = {"valid": True, "well_formed": True, "error_count": 0, "errors": [], "sections": {}}
 
-		# Verificações
-		self.assertTrue(result)
+		self.assertEqual(self.generate_with_validation(validation), "<AuditFile/>")
 
 	def test_validate_xml_structure_invalid(self):
-		"""Testa validação de XML inválido"""
-		# XML inválido (malformado)
-		invalid_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-        <AuditFile>
-            <Header>
-                <AuditFileVersion>1.04_01</AuditFileVersion>
-            <!-- Tag não fechada
-        </AuditFile>'''
+		"""Testa que erros XSD do XML gerado interrompem a geração com os erros recolhidos"""
+		from portugal_compliance.exceptions.saft_generation_error import SAFTSchemaError
 
-		# Executar teste
-		result = self.generator._validate_xml_structure(invalid_xml)
+		errors = [{"line": 12, "path": "/AuditFile/Header/CompanyID", "message": "Element 'CompanyID': missing"}]
+		validation = {"valid": False, "well_formed": True, "error_count": 1, "errors": errors, "sections": {}}
 
-		# Verificações
-		self.assertFalse(result)
+		with self.assertRaises(SAFTSchemaError) as context:
+			self.generate_with_validation(validation)
+
+		self.assertEqual(context.exception.validation_errors, errors)
+		self.assertIn("Line 12: /AuditFile/Header/CompanyID", str(context.exception))
 
 	def test_calculate_totals(self):
 		"""Testa cálculo de totais"""
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test SAF-T Validator - Portugal Compliance
+✅ Validação XSD em streaming e resultado aplicado ao log
+"""
+
+import unittest
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.saft_validator import (
+	SAFT_NAMESPACE,
+	ConcurrentSAFTValidator,
+	apply_validation_result,
+	validate_saft_content
+)
+
+
+class TestSAFTValidator(FrappeTestCase):
+	"""
+	✅ Classe de teste para o validador SAF-T
+	"""
+
+	def test_syntax_error_is_not_well_formed(self):
+		"""✅ XML mal formado: erro de sintaxe com linha"""
+		result = validate_saft_content(f'<AuditFile xmlns="{SAFT_NAMESPACE}">\n<Header>')
+
+		self.assertFalse(result["well_formed"])
+		self.assertFalse(result["valid"])
+		self.assertTrue(result["errors"][0]["message"].startswith("XML syntax error"))
+
+	def test_missing_required_sections(self):
+		"""✅ AuditFile sem Header/MasterFiles é inválido"""
+		result = validate_saft_content(f'<AuditFile xmlns="{SAFT_NAMESPACE}"></AuditFile>')
+
+		self.assertTrue(result["well_formed"])
+		self.assertFalse(result["valid"])
+		self.assertTrue(any("Header" in error["message"] for error in result["errors"]))
+
+	def test_concurrent_matches_sequential(self):
+		"""✅ Validação em thread devolve o mesmo resultado"""
+		xml_content = f'<AuditFile xmlns="{SAFT_NAMESPACE}"></AuditFile>'.encode("utf-8")
+
+		validator = ConcurrentSAFTValidator()
+		validator.feed(xml_content[:10])
+		validator.feed(xml_content[10:])
+
+		self.assertEqual(validator.close(), validate_saft_content(xml_content))
+
+	def test_apply_validation_result(self):
+		"""✅ Estado e erros gravados no log"""
+		export_log = frappe._dict()
+		apply_validation_result(export_log, {
+			"valid": False,
+			"well_formed": True,
+			"error_count": 3,
+			"errors": [{"line": 12, "path": "/AuditFile/Header", "message": "Required element TaxRegistrationNumber is missing"}],
+			"sections": 1
+		})
+
+		self.assertEqual(export_log.xml_validation_status, "Invalid")
+		self.assertIn("Line 12", export_log.xsd_validation_errors)
+		self.assertIn("2 more error(s)", export_log.xsd_validation_errors)
+
+
+if __name__ == '__main__':
+	unittest.main()
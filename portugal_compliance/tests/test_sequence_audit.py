@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Sequence Audit - Portugal Compliance
+✅ Lacunas em intervalos e candidatos a duplicado da auditoria incremental
+"""
+
+import unittest
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.sequence_audit import apply_sequences, count_missing, get_last_checked
+
+
+class TestSequenceAudit(FrappeTestCase):
+	"""
+	✅ Classe de teste para o estado da auditoria de sequências
+	"""
+
+	def test_gaps_from_first_batch(self):
+		"""✅ Sequências em falta ficam como intervalos"""
+		max_sequence, gaps, candidates = apply_sequences(0, [], [1, 2, 5, 9, 6])
+
+		self.assertEqual(max_sequence, 9)
+		self.assertEqual(gaps, [[3, 4], [7, 8]])
+		self.assertEqual(candidates, [])
+		self.assertEqual(get_last_checked(max_sequence, gaps), 2)
+		self.assertEqual(count_missing(gaps), 4)
+
+	def test_late_documents_close_gaps(self):
+		"""✅ Documentos lidos depois dividem ou fecham os intervalos"""
+		max_sequence, gaps, candidates = apply_sequences(9, [[3, 4], [7, 8]], [4, 7, 10, 12])
+
+		self.assertEqual(max_sequence, 12)
+		self.assertEqual(gaps, [[3, 3], [8, 8], [11, 11]])
+		self.assertEqual(candidates, [])
+
+		max_sequence, gaps, _candidates = apply_sequences(max_sequence, gaps, [3, 8, 11])
+		self.assertEqual(gaps, [])
+		self.assertEqual(get_last_checked(max_sequence, gaps), 12)
+
+	def test_duplicate_candidates(self):
+		"""✅ Sequências já vistas ou repetidas no lote são candidatas a duplicado"""
+		max_sequence, gaps, candidates = apply_sequences(5, [[2, 2]], [3, 6, 6, 2])
+
+		self.assertEqual(max_sequence, 6)
+		self.assertEqual(gaps, [])
+		self.assertEqual(candidates, [3, 6])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Series Communication Jobs - Portugal Compliance
+✅ Job de comunicação de séries: deduplicação, credenciais fora do payload,
+   agrupamento por empresa e progresso
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import series_communication
+
+
+class FakeCache:
+	"""Cache em memória com a interface usada (get_value/set_value/delete_value)"""
+
+	def __init__(self):
+		self.values = {}
+
+	def get_value(self, key):
+		return self.values.get(key)
+
+	def set_value(self, key, value, expires_in_sec=None):
+		self.values[key] = value
+
+	def delete_value(self, key):
+		self.values.pop(key, None)
+
+
+class FakeKeyRing:
+	def encrypt(self, value):
+		return "pcv1:" + value[::-1]
+
+	def decrypt(self, value):
+		return value[len("pcv1:"):][::-1]
+
+
+class TestSeriesCommunicationJobs(FrappeTestCase):
+	"""
+	✅ Classe de teste para o job de comunicação de séries
+	"""
+
+	def setUp(self):
+		self.cache = FakeCache()
+		for patcher in (patch.object(series_communication.frappe, "cache", return_value=self.cache),
+						patch.object(series_communication, "get_key_ring", return_value=FakeKeyRing())):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def test_job_id_dedup(self):
+		"""✅ Mesmo conjunto de séries da mesma empresa = mesmo job_id"""
+		job_id = series_communication.get_job_id("Company A", ["FT2025CA.####", "FS2025CA.####"])
+
+		self.assertEqual(job_id, series_communication.get_job_id("Company A", ["FS2025CA.####", "FT2025CA.####"]))
+		self.assertNotEqual(job_id, series_communication.get_job_id("Company B", ["FS2025CA.####", "FT2025CA.####"]))
+		self.assertNotEqual(job_id, series_communication.get_job_id("Company A", ["FT2025CA.####"]))
+
+	def test_enqueued_job_is_reused(self):
+		"""✅ Job já em fila: devolve o existente sem enfileirar outro"""
+		with patch("frappe.utils.background_jobs.is_job_enqueued", return_value=True), \
+				patch.object(series_communication.frappe, "enqueue") as enqueue:
+			job = series_communication.enqueue_series_communication("Company A", ["FT2025CA.####"] * 2)
+
+		self.assertTrue(job["already_running"])
+		self.assertEqual(job["total_series"], 1)
+		enqueue.assert_not_called()
+
+	def test_credentials_not_in_job_payload(self):
+		"""✅ Credenciais cifradas em cache (não nos argumentos do job) e lidas uma vez"""
+		with patch("frappe.utils.background_jobs.is_job_enqueued", return_value=False), \
+				patch.object(series_communication.frappe, "enqueue") as enqueue:
+			job = series_communication.enqueue_series_communication(
+				"Company A", ["FT2025CA.####"], "599999993/1", "secret")
+
+		kwargs = enqueue.call_args.kwargs
+		self.assertNotIn("username", kwargs)
+		self.assertNotIn("password", kwargs)
+		self.assertEqual(kwargs["job_id"], job["job_id"])
+		self.assertNotIn("secret", repr(self.cache.values))
+
+		self.assertEqual(series_communication.pop_credentials(job["job_id"]), ("599999993/1", "secret"))
+		self.assertEqual(series_communication.pop_credentials(job["job_id"]), (None, None))
+
+	def test_progress_and_status(self):
+		"""✅ Estado e eventos atualizados por série; totais no fim"""
+		results = {
+			"FT2025CA.####": {"success": True, "atcud": "AAJFJ1"},
+			"FS2025CA.####": {"success": False, "error": "Série já registada"}
+		}
+		frappe.local.site = frappe.local.site or "test_site"
+
+		with patch.object(series_communication, "_register_series",
+						  side_effect=lambda site, user, series, *args: results[series]) as register, \
+				patch.object(series_communication.frappe, "publish_realtime") as publish:
+			status = series_communication.communicate_series(
+				"Company A", sorted(results), notify_user="Administrator", status_key="job-1")
+
+		self.assertEqual(register.call_count, 2)
+		self.assertEqual((status["status"], status["done"], status["successful"], status["failed"]),
+						 ("Completed", 2, 1, 1))
+		self.assertEqual(series_communication.get_status("job-1")["status"], "Completed")
+		self.assertEqual(publish.call_count, 3)
+		self.assertTrue(publish.call_args.args[1]["finished"])
+
+	def test_series_api_groups_by_company(self):
+		"""✅ API de séries: um job por empresa"""
+		from portugal_compliance.api import series_api
+
+		rows = [
+			frappe._dict(naming_series="FT2025CA.####", company="Company A"),
+			frappe._dict(naming_series="FS2025CA.####", company="Company A"),
+			frappe._dict(naming_series="FT2025CB.####", company="Company B")
+		]
+		enqueue = MagicMock(side_effect=lambda company, series, *args: {
+			"job_id": company, "total_series": len(series)})
+
+		with patch.object(series_api.frappe, "get_all", return_value=rows), \
+				patch.object(series_api, "enqueue_series_communication", enqueue):
+			result = series_api.communicate_series_to_at("599999993/1", "secret")
+
+		self.assertTrue(result["success"])
+		self.assertEqual(result["total_series"], 3)
+		self.assertEqual([call.args[:2] for call in enqueue.call_args_list], [
+			("Company A", ["FT2025CA.####", "FS2025CA.####"]),
+			("Company B", ["FT2025CB.####"])
+		])
+
+	def test_company_api_uses_stored_credentials(self):
+		"""✅ API da empresa: comunicação com as credenciais guardadas (nenhuma no job)"""
+		from portugal_compliance.api import company_api
+
+		company = frappe._dict(name="Company A", at_username="599999993/1", at_environment="test",
+							   portugal_compliance_enabled=0)
+		rows = [frappe._dict(naming_series="FT2025CA.####")]
+
+		with patch.object(company_api.frappe, "get_all", return_value=rows), \
+				patch.object(company_api.frappe.db, "commit"), \
+				patch.object(series_communication, "enqueue_series_communication",
+							 return_value={"job_id": "job-1", "total_series": 1, "already_running": False}) as enqueue:
+			result = company_api.communicate_series_safe(company, {})
+
+		self.assertTrue(result["success"])
+		self.assertEqual(result["job_id"], "job-1")
+		enqueue.assert_called_once_with("Company A", ["FT2025CA.####"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Series Registry - Portugal Compliance
+✅ Índices do registo em memória e ordem de preferência das séries
+"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import series_registry
+from portugal_compliance.utils.series_registry import SeriesRegistry
+
+
+def make_series(name, prefix, is_communicated=0, validation_code=None, communication_date=None,
+				is_active=1, document_type="Sales Invoice", company="Test Company PT"):
+	return {
+		"name": name,
+		"series_name": name,
+		"company": company,
+		"document_type": document_type,
+		"prefix": prefix,
+		"naming_series": f"{prefix}.####",
+		"is_active": is_active,
+		"is_communicated": is_communicated,
+		"validation_code": validation_code,
+		"communication_date": communication_date,
+		"current_sequence": 1,
+		"creation": datetime(2025, 1, 1)
+	}
+
+
+class TestSeriesRegistry(FrappeTestCase):
+	"""
+	✅ Classe de teste para o registo de séries
+	"""
+
+	ROWS = [
+		make_series("S1", "FT2025TST"),
+		make_series("S2", "FS2025TST", is_communicated=1),
+		make_series("S3", "FR2025TST", is_communicated=1, validation_code="AAJFJ1",
+					communication_date=datetime(2025, 2, 1)),
+		make_series("S4", "NC2025TST", is_active=0, is_communicated=1, validation_code="AAJFJ2",
+					communication_date=datetime(2025, 3, 1)),
+		make_series("S5", "GR2025TST", document_type="Delivery Note")
+	]
+
+	def setUp(self):
+		self.registry = SeriesRegistry(self.ROWS, version=1)
+		patcher = patch.object(series_registry, "get_registry", return_value=self.registry)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_indexes(self):
+		"""✅ Resolução por prefixo e naming_series"""
+		self.assertEqual(series_registry.get_series_by_prefix("FS2025TST", "Test Company PT").name, "S2")
+		self.assertEqual(
+			series_registry.get_series_by_naming_series("GR2025TST.####", "Test Company PT").name, "S5")
+		self.assertIsNone(series_registry.get_series_by_naming_series(
+			"GR2025TST.####", "Test Company PT", doctype="Sales Invoice"))
+
+	def test_best_series_prefers_communicated_with_code(self):
+		"""✅ Comunicada com código AT > comunicada > ativa (inativas ignoradas)"""
+		self.assertEqual(series_registry.get_best_series("Sales Invoice", "Test Company PT").name, "S3")
+		self.assertEqual(
+			[series.name for series in series_registry.get_company_series("Sales Invoice", "Test Company PT")],
+			["S3", "S2", "S1"])
+
+	def test_best_series_skips_future_year(self):
+		"""✅ Série do próximo ano (passagem de ano) não é usada antes de 1 de janeiro"""
+		rows = self.ROWS + [make_series("S6", "FT2026TST", is_communicated=1, validation_code="AAJFJ3",
+										communication_date=datetime(2025, 12, 2))]
+		registry = SeriesRegistry(rows, version=2)
+
+		with patch.object(series_registry, "get_registry", return_value=registry), \
+				patch.object(series_registry, "getdate", return_value=datetime(2025, 12, 31)):
+			self.assertEqual(series_registry.get_best_series("Sales Invoice", "Test Company PT").name, "S3")
+
+		with patch.object(series_registry, "get_registry", return_value=registry), \
+				patch.object(series_registry, "getdate", return_value=datetime(2026, 1, 1)):
+			self.assertEqual(series_registry.get_best_series("Sales Invoice", "Test Company PT").name, "S6")
+
+	def test_registry_reload(self):
+		"""✅ Recarregado com versão nova ou registo expirado; sem cache com invalidação pendente"""
+		patch.stopall()
+		series_registry.clear_registry()
+		self.addCleanup(series_registry.clear_registry)
+
+		with patch.object(series_registry, "_load_registry",
+						  side_effect=lambda version: SeriesRegistry(self.ROWS, version)) as load, \
+				patch.object(series_registry.compliance_cache, "get_version", return_value=1), \
+				patch.object(series_registry.compliance_cache, "is_pending", return_value=False):
+			registry = series_registry.get_registry()
+			self.assertIs(series_registry.get_registry(), registry)
+
+			registry.loaded_at -= series_registry.REGISTRY_MAX_AGE
+			self.assertIsNot(series_registry.get_registry(), registry)
+			self.assertEqual(load.call_count, 2)
+
+			with patch.object(series_registry.compliance_cache, "is_pending", return_value=True):
+				series_registry.get_registry()
+				load.assert_called_with(None)
+
+	def test_filters(self):
+		"""✅ Filtros de ativas/comunicadas"""
+		self.assertEqual(
+			[series.name for series in series_registry.get_company_series(
+				"Sales Invoice", "Test Company PT", communicated_only=True)],
+			["S3", "S2"])
+		self.assertEqual(len(series_registry.get_company_series(
+			"Sales Invoice", "Test Company PT", active_only=False)), 4)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Series Rollover - Portugal Compliance
+✅ Plano em memória das séries do ano seguinte
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import series_rollover
+from portugal_compliance.utils.series_rollover import get_next_year_prefix, plan_rollover
+
+
+def make_series(company, document_type, prefix):
+	return frappe._dict(series_name=f"Fatura - {prefix}", company=company, document_type=document_type,
+						prefix=prefix, at_environment="Teste", document_code=prefix[:2], company_code=prefix[6:])
+
+
+class TestSeriesRollover(FrappeTestCase):
+	"""
+	✅ Classe de teste para a passagem de ano das séries
+	"""
+
+	def test_next_year_prefix(self):
+		"""Testa a substituição do ano no prefixo"""
+		self.assertEqual(get_next_year_prefix("FT2025NDX", 2025), "FT2026NDX")
+		self.assertIsNone(get_next_year_prefix("FT2024NDX", 2025))
+		self.assertIsNone(get_next_year_prefix("FT-2025-NDX", 2025))
+
+	def test_plan_skips_existing_series(self):
+		"""Testa que o plano só inclui as séries do ano seguinte em falta"""
+		current = [
+			make_series("Company A", "Sales Invoice", "FT2025CA"),
+			make_series("Company A", "POS Invoice", "FS2025CA"),
+			make_series("Company B", "Sales Invoice", "FT2025CB")
+		]
+		existing = [frappe._dict(company="Company A", prefix="FS2026CA", series_name="Fatura - FS2026CA")]
+
+		with patch.object(series_rollover.frappe, "get_all", side_effect=[current, existing]):
+			plan = plan_rollover(2025)
+
+		self.assertEqual([(series.company, series.prefix) for series in plan],
+						 [("Company A", "FT2026CA"), ("Company B", "FT2026CB")])
+		self.assertEqual(plan[0].naming_series, "FT2026CA.####")
+		self.assertEqual(plan[0].series_name, "Fatura - FT2026CA")
+		self.assertEqual(plan[0].year_code, "2026")
+
+	def test_series_cache_invalidated_after_commit(self):
+		"""Testa que a versão "series" só é incrementada no commit da passagem de ano"""
+		current = [make_series("Company A", "Sales Invoice", "FT2025CA")]
+
+		with patch.object(series_rollover.frappe, "get_all", side_effect=[current, []]):
+			plan = plan_rollover(2025)
+
+		db = MagicMock()
+		with patch.object(series_rollover.frappe, "db", db), \
+				patch.object(series_rollover.compliance_cache, "invalidate") as invalidate:
+			self.assertEqual(series_rollover.create_rollover_series(plan), 1)
+			db.bulk_insert.assert_called_once()
+			invalidate.assert_not_called()
+
+			callback = db.after_commit.add.call_args[0][0]
+			callback()
+			invalidate.assert_called_once_with("series")
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Task Graph - Portugal Compliance
+✅ Ordem topológica, ciclos, caminho crítico e grafos declarados pelas suites
+"""
+
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils import task_graph
+from portugal_compliance.utils.task_graph import SUITES, critical_path, get_graph, task, topological_order
+
+GRAPH = {
+	"sync": task(),
+	"check": task(["sync"]),
+	"report": task(["sync"]),
+	"cleanup": task(),
+	"notify": task(["check", "report", "cleanup"])
+}
+
+
+class TestTaskGraph(FrappeTestCase):
+	"""
+	✅ Classe de teste para o grafo de tarefas
+	"""
+
+	def test_topological_order(self):
+		"""Testa que cada passo vem depois das suas dependências"""
+		order = topological_order(GRAPH)
+
+		self.assertEqual(len(order), len(GRAPH))
+		for step, spec in GRAPH.items():
+			for dependency in spec.depends_on:
+				self.assertLess(order.index(dependency), order.index(step))
+
+	def test_invalid_graphs(self):
+		"""Testa ciclos e dependências não declaradas"""
+		self.assertRaises(ValueError, topological_order, {"a": task(["b"]), "b": task(["a"])})
+		self.assertRaises(ValueError, topological_order, {"a": task(["missing"])})
+
+	def test_critical_path(self):
+		"""Testa que o caminho crítico é o mais longo e não a soma"""
+		durations = {"sync": 10, "check": 50, "report": 5, "cleanup": 70, "notify": 1}
+		path = critical_path(GRAPH, durations)
+
+		self.assertEqual(path, {"duration_ms": 71, "steps": ["cleanup", "notify"]})
+
+	def test_unchanged_fingerprint_skips_step(self):
+		"""Testa que um passo com o mesmo fingerprint da última execução não corre"""
+		spec = task(fingerprint=lambda: "same")
+
+		with patch.object(frappe.db, "get_global", return_value="same"), \
+				patch.object(task_graph.frappe, "get_attr") as get_attr:
+			self.assertEqual(task_graph.execute_step("daily", "check_naming_series_consistency", spec),
+							 ("skipped", None))
+
+		get_attr.assert_not_called()
+
+	def test_suite_graphs_are_valid(self):
+		"""Testa que os grafos das suites são acíclicos e apontam para funções existentes"""
+		for suite, module in SUITES.items():
+			graph = get_graph(suite)
+			self.assertEqual(len(topological_order(graph)), len(graph))
+			for step in graph:
+				self.assertTrue(callable(frappe.get_attr(f"{module}.{step}")), f"{suite}.{step}")
+
+
+if __name__ == '__main__':
+	unittest.main()
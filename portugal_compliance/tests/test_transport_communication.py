@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Test Transport Communication - Portugal Compliance
+✅ Envelope SOAP, resposta da AT e stub local dos documentos de transporte
+"""
+
+import unittest
+from datetime import date, datetime
+
+import frappe
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from portugal_compliance.utils.transport_communication import (
+	STUB_ENDPOINT,
+	StubTransportAdapter,
+	TransportTransientError,
+	build_transport_envelope,
+	get_movement_type,
+	parse_transport_response
+)
+
+CREDENTIALS = {"username": "599999993/1", "password": "secret", "nonce": "", "created": "2025-01-01T00:00:00"}
+
+
+def make_document(name="GR2025TST0001"):
+	address = {"detail": "Rua & Filhos, 1", "city": "Lisboa", "postal_code": "1000-001", "country": "PT"}
+	return frappe._dict({
+		"doctype": "Delivery Note",
+		"name": name,
+		"company": "Test Company PT",
+		"company_tax_id": "599999993",
+		"company_name": "Test Company PT",
+		"company_address": address,
+		"atcud": "AAJFJ1-1",
+		"movement_type": "GR",
+		"movement_date": date(2025, 6, 2),
+		"movement_start_time": datetime(2025, 6, 2, 10, 0),
+		"customer_tax_id": "999999990",
+		"customer_name": "Cliente <Teste>",
+		"customer_address": address,
+		"address_to": address,
+		"address_from": address,
+		"vehicle_id": "AA-00-BB",
+		"lines": [{"description": "Artigo", "quantity": 2, "uom": "UN", "unit_price": 10.5}]
+	})
+
+
+class TestTransportCommunication(FrappeTestCase):
+	"""
+	✅ Classe de teste para a comunicação de guias
+	"""
+
+	def test_envelope_is_escaped(self):
+		"""✅ Valores com caracteres XML são escapados"""
+		envelope = build_transport_envelope(make_document(), CREDENTIALS)
+
+		self.assertIn("<DocumentNumber>GR2025TST0001</DocumentNumber>", envelope)
+		self.assertIn("<CustomerName>Cliente &lt;Teste&gt;</CustomerName>", envelope)
+		self.assertIn("<Addressdetail>Rua &amp; Filhos, 1</Addressdetail>", envelope)
+		self.assertIn("<MovementStartTime>2025-06-02T10:00:00</MovementStartTime>", envelope)
+		self.assertIn("<Quantity>2.00</Quantity>", envelope)
+
+	def test_parse_response(self):
+		"""✅ Sucesso, erro de validação e falha temporária"""
+		result = parse_transport_response(
+			200, "<ReturnCode>0</ReturnCode><ReturnMessage>OK</ReturnMessage><ATDocCodeID>123456789</ATDocCodeID>")
+		self.assertEqual(result, {"success": True, "code": "123456789", "message": "OK"})
+
+		result = parse_transport_response(200, "<ReturnCode>-3</ReturnCode><ReturnMessage>NIF inválido</ReturnMessage>")
+		self.assertFalse(result["success"])
+		self.assertEqual(result["message"], "NIF inválido")
+
+		result = parse_transport_response(500, "<soap:Fault><faultstring>Autenticação</faultstring></soap:Fault>")
+		self.assertFalse(result["success"])
+
+		with self.assertRaises(TransportTransientError):
+			parse_transport_response(503, "Service Unavailable")
+
+	def test_stub_endpoint(self):
+		"""✅ Stub local devolve um código determinístico por documento"""
+		session = requests.Session()
+		session.mount("stub://", StubTransportAdapter())
+
+		envelope = build_transport_envelope(make_document(), CREDENTIALS)
+		first = session.post(STUB_ENDPOINT, data=envelope.encode("utf-8"))
+		second = session.post(STUB_ENDPOINT, data=envelope.encode("utf-8"))
+
+		result = parse_transport_response(first.status_code, first.text)
+		self.assertTrue(result["success"])
+		self.assertEqual(result["code"], parse_transport_response(second.status_code, second.text)["code"])
+
+	def test_movement_type(self):
+		"""✅ Tipo de guia pelo prefixo, com predefinição por doctype"""
+		self.assertEqual(get_movement_type("Delivery Note", "GT2025TST0001"), "GT")
+		self.assertEqual(get_movement_type("Stock Entry", "MAT-STE-2025-00001"), "GT")
+		self.assertEqual(get_movement_type("Delivery Note", "MAT-DN-2025-00001"), "GR")
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -29,6 +29,9 @@ import json
 import time
 from frappe.utils import now, today, get_datetime
 
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.performance_metrics import instrumented
+
 
 class ATWebserviceClient:
 	"""
@@ -530,6 +533,7 @@ class ATWebserviceClient:
 
 	# ========== REGISTRO DE NAMING SERIES ERPNEXT NA AT ==========
 
+	@instrumented("at_webservice.register_naming_series")
 	def register_naming_series(self, naming_series, company, username=None, password=None):
 		"""
 		✅ CORRIGIDO: Registar naming_series ERPNext (SEM HÍFENS) na AT
@@ -855,6 +859,7 @@ class ATWebserviceClient:
 					frappe.logger().info(f"✅ ATCUD REAL salvo: {naming_series} = {atcud_code}")
 
 				frappe.db.commit()
+				compliance_cache.invalidate("series")
 			else:
 				frappe.logger().warning(f"⚠️ Série não encontrada: {naming_series}")
 
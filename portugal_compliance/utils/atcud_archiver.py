@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+ATCUD Log Archiver - Portugal Compliance
+Arquivo em streaming dos ATCUD Logs antigos
+✅ KEYSET: Percorre a tabela por (creation, name) em chunks - sem OFFSET nem carga total
+✅ COMPRIMIDO: JSONL gzip particionado por empresa e mês em private/files
+✅ VERIFICADO: SHA-256 + contagem de linhas relidos antes de apagar
+✅ TRANSAÇÕES CURTAS: Cada chunk é apagado e confirmado isoladamente
+✅ RESTAURO: restore_atcud_archive() reinsere partições a partir do manifesto
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now, now_datetime
+
+ARCHIVE_FOLDER = ("private", "files", "portugal_compliance", "atcud_archive")
+MANIFEST_FILE = "manifest.jsonl"
+DEFAULT_CHUNK_SIZE = 5000
+LAST_RUN_CACHE_KEY = "portugal_compliance_atcud_archive_last_run"
+ARCHIVABLE_DOCTYPES = ("ATCUD Log", "ATCUD Log Archive")
+
+
+class ArchiveVerificationError(Exception):
+	"""Ficheiro de arquivo não corresponde ao que foi escrito"""
+	pass
+
+
+# ========== LEITURA EM CHUNKS ==========
+
+def iter_atcud_log_chunks(before_date, chunk_size=DEFAULT_CHUNK_SIZE, company=None, doctype="ATCUD Log"):
+	"""
+	✅ Iterar ATCUD Logs com creation < before_date, paginando por (creation, name)
+	doctype: camada quente (ATCUD Log) ou fria (ATCUD Log Archive)
+
+	Como cada chunk é apagado depois de arquivado, o cursor continua válido
+	mesmo com a tabela a encolher entre páginas.
+	"""
+	last_creation, last_name = None, ""
+	company_condition = "AND company = %(company)s" if company else ""
+
+	while True:
+		cursor_condition = ""
+		if last_creation is not None:
+			cursor_condition = """
+				AND (creation > %(last_creation)s
+					OR (creation = %(last_creation)s AND name > %(last_name)s))
+			"""
+
+		rows = frappe.db.sql(f"""
+			SELECT *
+			FROM `tab{doctype}`
+			WHERE creation < %(before_date)s
+				{company_condition}
+				{cursor_condition}
+			ORDER BY creation, name
+			LIMIT %(limit)s
+		""", {
+			"before_date": before_date,
+			"company": company,
+			"last_creation": last_creation,
+			"last_name": last_name,
+			"limit": chunk_size
+		}, as_dict=True)
+
+		if not rows:
+			break
+
+		yield rows
+
+		if len(rows) < chunk_size:
+			break
+
+		last_creation, last_name = rows[-1].creation, rows[-1].name
+
+
+# ========== ESCRITA DAS PARTIÇÕES ==========
+
+def get_archive_root():
+	"""Diretório base do arquivo no site atual"""
+	return frappe.get_site_path(*ARCHIVE_FOLDER)
+
+
+def get_partition_dir(company, period):
+	"""Diretório da partição empresa/ano/mês"""
+	year, month = period.split("-")
+	return os.path.join(get_archive_root(), frappe.scrub(company or "no_company"), year, month)
+
+
+def write_partition_file(partition_dir, rows):
+	"""
+	✅ Escrever uma parte JSONL gzip de forma atómica e devolver a entrada do manifesto
+	"""
+	os.makedirs(partition_dir, exist_ok=True)
+
+	file_name = f"part-{now_datetime().strftime('%Y%m%d%H%M%S%f')}-{frappe.scrub(rows[0].name)}.jsonl.gz"
+	file_path = os.path.join(partition_dir, file_name)
+	tmp_path = f"{file_path}.tmp"
+
+	with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+		for row in rows:
+			f.write(json.dumps(row, default=str, ensure_ascii=False))
+			f.write("\n")
+
+	checksum = _file_sha256(tmp_path)
+	os.replace(tmp_path, file_path)
+
+	return {
+		"file": file_name,
+		"rows": len(rows),
+		"sha256": checksum,
+		"bytes": os.path.getsize(file_path),
+		"first_name": rows[0].name,
+		"last_name": rows[-1].name,
+		"min_creation": str(rows[0].creation),
+		"max_creation": str(rows[-1].creation),
+		"archived_at": now()
+	}
+
+
+def verify_partition_file(partition_dir, entry):
+	"""
+	✅ Reler o ficheiro e confirmar checksum e número de linhas
+	"""
+	file_path = os.path.join(partition_dir, entry["file"])
+
+	if _file_sha256(file_path) != entry["sha256"]:
+		raise ArchiveVerificationError(f"Checksum inválido: {file_path}")
+
+	with gzip.open(file_path, "rt", encoding="utf-8") as f:
+		row_count = sum(1 for _line in f)
+
+	if row_count != entry["rows"]:
+		raise ArchiveVerificationError(
+			f"Contagem inválida em {file_path}: {row_count} != {entry['rows']}")
+
+
+def append_manifest(partition_dir, entry):
+	"""Registar a parte no manifesto da partição"""
+	with open(os.path.join(partition_dir, MANIFEST_FILE), "a", encoding="utf-8") as f:
+		f.write(json.dumps(entry, ensure_ascii=False))
+		f.write("\n")
+
+
+def read_manifest(partition_dir):
+	"""Ler as entradas do manifesto de uma partição"""
+	manifest_path = os.path.join(partition_dir, MANIFEST_FILE)
+	if not os.path.exists(manifest_path):
+		return []
+
+	with open(manifest_path, encoding="utf-8") as f:
+		return [json.loads(line) for line in f if line.strip()]
+
+
+def _file_sha256(file_path):
+	"""SHA-256 de um ficheiro em blocos (memória constante)"""
+	digest = hashlib.sha256()
+	with open(file_path, "rb") as f:
+		for block in iter(lambda: f.read(1024 * 1024), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+def _group_by_partition(rows):
+	"""Agrupar linhas por (empresa, AAAA-MM da criação)"""
+	partitions = defaultdict(list)
+	for row in rows:
+		partitions[(row.company, getdate(row.creation).strftime("%Y-%m"))].append(row)
+	return partitions
+
+
+# ========== PIPELINE DE ARQUIVO ==========
+
+def archive_atcud_logs(before_date, chunk_size=DEFAULT_CHUNK_SIZE, company=None, max_chunks=None,
+					   doctype="ATCUD Log"):
+	"""
+	✅ Arquivar ATCUD Logs anteriores a before_date
+
+	Para cada chunk: escreve as partições, verifica-as, regista-as no manifesto,
+	apaga as linhas por chave primária e confirma a transação.
+
+	Returns:
+		dict: Métricas da execução (linhas, bytes, duração, linhas/s)
+	"""
+	if doctype not in ARCHIVABLE_DOCTYPES:
+		frappe.throw(_("Doctype não arquivável: {0}").format(doctype))
+
+	before_date = getdate(before_date)
+	chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+	started = time.monotonic()
+
+	metrics = {
+		"doctype": doctype,
+		"before_date": str(before_date),
+		"company": company,
+		"started_at": now(),
+		"chunks": 0,
+		"rows": 0,
+		"bytes": 0,
+		"files": 0,
+		"partitions": set()
+	}
+
+	for rows in iter_atcud_log_chunks(before_date, chunk_size, company, doctype):
+		archived_names = []
+
+		for (row_company, period), partition_rows in _group_by_partition(rows).items():
+			partition_dir = get_partition_dir(row_company, period)
+			entry = write_partition_file(partition_dir, partition_rows)
+			verify_partition_file(partition_dir, entry)
+			append_manifest(partition_dir, entry)
+
+			archived_names.extend(row.name for row in partition_rows)
+			metrics["bytes"] += entry["bytes"]
+			metrics["files"] += 1
+			metrics["partitions"].add(f"{row_company}/{period}")
+
+		# ✅ TRANSAÇÃO CURTA: apagar apenas as linhas deste chunk
+		frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE name IN %(names)s",
+					  {"names": tuple(archived_names)})
+		frappe.db.commit()
+
+		metrics["chunks"] += 1
+		metrics["rows"] += len(archived_names)
+
+		if max_chunks and metrics["chunks"] >= cint(max_chunks):
+			break
+
+	metrics["partitions"] = sorted(metrics["partitions"])
+	metrics["duration_seconds"] = round(time.monotonic() - started, 3)
+	metrics["rows_per_second"] = (
+		round(metrics["rows"] / metrics["duration_seconds"]) if metrics["duration_seconds"] else metrics["rows"]
+	)
+
+	frappe.cache().set_value(LAST_RUN_CACHE_KEY, metrics)
+
+	frappe.logger().info(
+		f"ATCUD archive: {metrics['rows']} logs em {metrics['files']} ficheiros "
+		f"({metrics['bytes']} bytes) em {metrics['duration_seconds']}s "
+		f"- {metrics['rows_per_second']} linhas/s")
+
+	return metrics
+
+
+# ========== RESTAURO ==========
+
+def iter_partitions(company=None, from_period=None, to_period=None):
+	"""
+	✅ Iterar diretórios de partição (empresa, AAAA-MM, caminho) dentro dos filtros
+	"""
+	root = get_archive_root()
+	if not os.path.isdir(root):
+		return
+
+	company_dirs = [frappe.scrub(company)] if company else sorted(os.listdir(root))
+
+	for company_dir in company_dirs:
+		company_path = os.path.join(root, company_dir)
+		if not os.path.isdir(company_path):
+			continue
+
+		for year in sorted(os.listdir(company_path)):
+			year_path = os.path.join(company_path, year)
+			if not os.path.isdir(year_path):
+				continue
+
+			for month in sorted(os.listdir(year_path)):
+				period = f"{year}-{month}"
+				if from_period and period < from_period:
+					continue
+				if to_period and period > to_period:
+					continue
+
+				yield company_dir, period, os.path.join(year_path, month)
+
+
+def iter_partition_rows(partition_dir, verify=True):
+	"""
+	✅ Ler as linhas arquivadas de uma partição em streaming
+	"""
+	for entry in read_manifest(partition_dir):
+		if verify:
+			verify_partition_file(partition_dir, entry)
+
+		with gzip.open(os.path.join(partition_dir, entry["file"]), "rt", encoding="utf-8") as f:
+			for line in f:
+				yield json.loads(line)
+
+
+def restore_atcud_archive(company=None, from_period=None, to_period=None, chunk_size=DEFAULT_CHUNK_SIZE,
+						  doctype="ATCUD Log Archive"):
+	"""
+	✅ Reinserir ATCUD Logs arquivados (períodos no formato AAAA-MM)
+
+	Por omissão restaura para a camada fria, onde a camada de consulta
+	(utils.atcud_log_store) os encontra sem poluir a tabela quente.
+	Linhas já existentes são ignoradas, pelo que o restauro é idempotente.
+	Os ficheiros de arquivo não são removidos.
+	"""
+	if doctype not in ARCHIVABLE_DOCTYPES:
+		frappe.throw(_("Doctype não arquivável: {0}").format(doctype))
+
+	chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+	started = time.monotonic()
+	restored, read = 0, 0
+	partitions = []
+
+	for company_dir, period, partition_dir in iter_partitions(company, from_period, to_period):
+		buffer = []
+		for row in iter_partition_rows(partition_dir):
+			read += 1
+			buffer.append(row)
+			if len(buffer) >= chunk_size:
+				restored += _bulk_restore(doctype, buffer)
+				buffer = []
+
+		if buffer:
+			restored += _bulk_restore(doctype, buffer)
+
+		partitions.append(f"{company_dir}/{period}")
+
+	result = {
+		"restored": restored,
+		"skipped": read - restored,
+		"partitions": partitions,
+		"duration_seconds": round(time.monotonic() - started, 3)
+	}
+
+	frappe.logger().info(f"ATCUD archive restore: {result}")
+	return result
+
+
+def _bulk_restore(doctype, rows):
+	"""
+	Inserir um bloco de linhas arquivadas numa única transação
+
+	Returns:
+		int: linhas efetivamente inseridas (as já existentes são ignoradas)
+	"""
+	columns = set(frappe.db.get_table_columns(doctype))
+	fields = [field for field in rows[0].keys() if field in columns]
+	values = [[row.get(field) for field in fields] for row in rows]
+
+	# Um só INSERT IGNORE: ROW_COUNT() conta apenas as linhas inseridas
+	frappe.db.bulk_insert(doctype, fields, values, ignore_duplicates=True, chunk_size=len(values))
+	inserted = cint(frappe.db.sql("SELECT ROW_COUNT()")[0][0])
+	frappe.db.commit()
+
+	return inserted
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def get_last_archive_run():
+	"""✅ API: Métricas da última execução do arquivo"""
+	frappe.only_for("System Manager")
+	return frappe.cache().get_value(LAST_RUN_CACHE_KEY) or {}
+
+
+@frappe.whitelist()
+def start_atcud_archive(before_date, company=None, chunk_size=DEFAULT_CHUNK_SIZE):
+	"""✅ API: Agendar arquivo de ATCUD Logs em background"""
+	frappe.only_for("System Manager")
+
+	frappe.enqueue(
+		"portugal_compliance.utils.atcud_archiver.archive_atcud_logs",
+		queue="long",
+		timeout=7200,
+		job_id="portugal_compliance_atcud_archive",
+		deduplicate=True,
+		before_date=before_date,
+		company=company,
+		chunk_size=cint(chunk_size)
+	)
+
+	return {"success": True, "message": _("Arquivo de ATCUD Logs agendado")}
@@ -13,15 +13,18 @@ Generates ATCUD codes according to Portuguese legislation (Portaria 195/2020)
 
 import frappe
 from frappe import _
-from frappe.utils import getdate, now, today, cint, flt
+from frappe.utils import getdate, now, today, flt
 import re
 import hashlib
 import json
 from datetime import datetime, date
-import qrcode
 import base64
 from io import BytesIO
 
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.performance_metrics import instrumented
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class ATCUDGenerator:
 	"""
@@ -127,6 +130,7 @@ class ATCUDGenerator:
 
 		frappe.logger().info("🇵🇹 ATCUDGenerator ATUALIZADO - Conforme Portaria 195/2020")
 
+	@instrumented("atcud.generate")
 	def generate_atcud_for_document(self, doc):
 		"""
 		✅ FUNÇÃO PRINCIPAL ATUALIZADA: Gerar ATCUD para documento
@@ -233,23 +237,19 @@ class ATCUDGenerator:
 		Baseado na sua experiência com programação.teste_no_console[6]
 		"""
 		try:
-			# ✅ CACHE DE VALIDAÇÕES PARA PERFORMANCE
-			cache_key = f"atcud_validation_{doc.doctype}_{doc.company}"
-			cached_result = frappe.cache().get_value(cache_key)
-
-			if cached_result is None:
+			# ✅ CACHE DE VALIDAÇÕES PARA PERFORMANCE (LRU local + Redis)
+			def load():
 				# ✅ VERIFICAÇÕES BÁSICAS
 				if doc.doctype not in self.supported_document_types:
-					cached_result = {"valid": False,
-									 "error": f"DocType {doc.doctype} não suporta ATCUD"}
-				elif not self._is_portuguese_company_cached(doc.company):
-					cached_result = {"valid": False,
-									 "error": "ATCUD só é obrigatório para empresas portuguesas"}
-				else:
-					cached_result = {"valid": True}
+					return {"valid": False,
+							"error": f"DocType {doc.doctype} não suporta ATCUD"}
+				if not self._is_portuguese_company_cached(doc.company):
+					return {"valid": False,
+							"error": "ATCUD só é obrigatório para empresas portuguesas"}
+				return {"valid": True}
 
-				# Cache por 5 minutos
-				frappe.cache().set_value(cache_key, cached_result, expires_in_sec=300)
+			cached_result = compliance_cache.get_or_set(
+				"company", f"atcud_validation:{doc.doctype}:{doc.company}", load, ttl=300)
 
 			if not cached_result["valid"]:
 				return cached_result
@@ -351,34 +351,27 @@ class ATCUDGenerator:
 		✅ OTIMIZADO: Obter código de validação AT com cache
 		"""
 		try:
-			# ✅ CACHE PARA PERFORMANCE
-			cache_key = f"validation_code_{series_info['prefix']}_{company}"
-			cached_code = frappe.cache().get_value(cache_key)
-
-			if cached_code:
-				return cached_code
-
 			# ✅ BUSCAR NA CONFIGURAÇÃO DA SÉRIE
 			if series_info.get("validation_code"):
 				validation_code = series_info["validation_code"]
 			else:
-				# ✅ BUSCAR POR PREFIX
-				validation_code = frappe.db.get_value(
-					"Portugal Series Configuration",
-					{
-						"prefix": series_info["prefix"],
-						"company": company,
-						"is_active": 1
-					},
-					"validation_code"
-				)
+				# ✅ BUSCAR POR PREFIX (cache invalidada quando a série muda)
+				validation_code = compliance_cache.get_or_set(
+					"series", f"validation_code:{series_info['prefix']}:{company}",
+					lambda: frappe.db.get_value(
+						"Portugal Series Configuration",
+						{
+							"prefix": series_info["prefix"],
+							"company": company,
+							"is_active": 1
+						},
+						"validation_code"
+					))
 
 			if validation_code:
 				# ✅ VALIDAR FORMATO
 				is_valid, _ = self._validate_validation_code_format_enhanced(validation_code)
 				if is_valid:
-					# Cache por 10 minutos
-					frappe.cache().set_value(cache_key, validation_code, expires_in_sec=600)
 					return validation_code
 
 			return None
@@ -579,24 +572,7 @@ class ATCUDGenerator:
 		✅ OTIMIZADO: Verificar se empresa é portuguesa com cache
 		"""
 		try:
-			cache_key = f"portuguese_company_{company}"
-			cached_result = frappe.cache().get_value(cache_key)
-
-			if cached_result is None:
-				company_data = frappe.db.get_value("Company", company,
-												   ["country", "portugal_compliance_enabled"],
-												   as_dict=True)
-
-				if company_data:
-					cached_result = (company_data.country == "Portugal" and
-									 cint(company_data.portugal_compliance_enabled))
-				else:
-					cached_result = False
-
-				# Cache por 10 minutos
-				frappe.cache().set_value(cache_key, cached_result, expires_in_sec=600)
-
-			return cached_result
+			return compliance_cache.is_portuguese_company(company)
 
 		except Exception:
 			return False
@@ -606,22 +582,8 @@ class ATCUDGenerator:
 		✅ OTIMIZADO: Verificar se naming_series é portuguesa
 		"""
 		try:
-			if not naming_series:
-				return False
-
-			# ✅ CACHE PARA PADRÕES COMUNS
-			cache_key = f"portuguese_series_{naming_series}"
-			cached_result = frappe.cache().get_value(cache_key)
-
-			if cached_result is None:
-				# ✅ PADRÃO PORTUGUÊS SEM HÍFENS: XXYYYY + COMPANY.####
-				pattern = r'^[A-Z]{2,4}\d{4}[A-Z0-9]{2,4}\.####$'
-				cached_result = bool(re.match(pattern, naming_series))
-
-				# Cache por 30 minutos
-				frappe.cache().set_value(cache_key, cached_result, expires_in_sec=1800)
-
-			return cached_result
+			# ✅ PADRÃO PORTUGUÊS SEM HÍFENS: XXYYYY + COMPANY.#### (função pura, só LRU local)
+			return compliance_cache.is_portuguese_naming_series(naming_series)
 
 		except Exception:
 			return False
@@ -633,11 +595,15 @@ class ATCUDGenerator:
 
 	# ========== GERAÇÃO DE QR CODE OTIMIZADA ==========
 
+	@instrumented("atcud.qr_code")
 	def _generate_qr_code_optimized(self, doc, atcud_code, series_info):
 		"""
 		✅ OTIMIZADO: Gerar QR code com performance melhorada
 		"""
 		try:
+			# qrcode (e PIL) só são carregados quando é gerado o primeiro QR code
+			import qrcode
+
 			# ✅ DADOS PARA QR CODE OTIMIZADOS
 			qr_data = self._build_qr_data_optimized(doc, atcud_code, series_info)
 
@@ -715,15 +681,7 @@ class ATCUDGenerator:
 		✅ OTIMIZADO: Obter NIF com cache
 		"""
 		try:
-			cache_key = f"nif_{doctype}_{name}"
-			cached_nif = frappe.cache().get_value(cache_key)
-
-			if cached_nif is None:
-				cached_nif = frappe.db.get_value(doctype, name, "tax_id") or ""
-				# Cache por 1 hora
-				frappe.cache().set_value(cache_key, cached_nif, expires_in_sec=3600)
-
-			return cached_nif
+			return compliance_cache.get_party_tax_id(doctype, name)
 
 		except Exception:
 			return ""
@@ -860,7 +818,7 @@ class ATCUDGenerator:
 
 
 # ========== INSTÂNCIA GLOBAL ATUALIZADA ==========
-atcud_generator = ATCUDGenerator()
+atcud_generator = LazySingleton(ATCUDGenerator)
 
 
 # ========== FUNÇÕES AUXILIARES ATUALIZADAS ==========
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+ATCUD Log Store - Portugal Compliance
+Armazenamento quente/frio do ATCUD Log com camada de consulta única
+✅ QUENTE: `tabATCUD Log` guarda apenas os últimos N meses (caminhos de save rápidos)
+✅ FRIO: `tabATCUD Log Archive` guarda o restante histórico (auditoria de 10 anos)
+✅ ROTEAMENTO: Consultas por intervalo de datas vão só à(s) tabela(s) necessária(s)
+✅ TRANSPARENTE: Sem intervalo, a consulta une as duas tabelas
+
+Limites persistidos (tabDefaultValue):
+- cold_upper_bound: nenhuma linha fria tem creation >= este valor
+- hot_lower_bound: nenhuma linha quente tem creation < este valor
+"""
+
+import time
+
+import frappe
+from frappe.utils import add_months, cint, get_first_day, getdate, now, today
+
+HOT_DOCTYPE = "ATCUD Log"
+COLD_DOCTYPE = "ATCUD Log Archive"
+
+DEFAULT_HOT_MONTHS = 12
+DEFAULT_CHUNK_SIZE = 5000
+
+COLD_UPPER_BOUND_KEY = "portugal_compliance_atcud_cold_upper_bound"
+HOT_LOWER_BOUND_KEY = "portugal_compliance_atcud_hot_lower_bound"
+
+
+# ========== CONFIGURAÇÃO ==========
+
+def get_hot_months():
+	"""Meses mantidos na tabela quente (site_config: portugal_compliance_atcud_hot_months)"""
+	return cint(frappe.conf.get("portugal_compliance_atcud_hot_months")) or DEFAULT_HOT_MONTHS
+
+
+def get_hot_cutoff(months=None):
+	"""Primeiro dia do mês que inicia a janela quente"""
+	return add_months(get_first_day(today()), -(cint(months) or get_hot_months()))
+
+
+def _get_bound(key):
+	value = frappe.db.get_global(key)
+	return getdate(value) if value else None
+
+
+def _set_bound(key, value):
+	frappe.db.set_global(key, str(getdate(value)))
+
+
+def get_storage_bounds():
+	"""Limites atuais entre as camadas quente e fria"""
+	return {
+		"cold_upper_bound": _get_bound(COLD_UPPER_BOUND_KEY),
+		"hot_lower_bound": _get_bound(HOT_LOWER_BOUND_KEY)
+	}
+
+
+# ========== ROTEAMENTO ==========
+
+def resolve_tiers(from_date=None, to_date=None):
+	"""
+	✅ Decidir que tabelas consultar para um intervalo de creation
+
+	- from_date >= cold_upper_bound: só quente
+	- to_date < hot_lower_bound: só fria
+	- restantes casos (incl. sem limites conhecidos): ambas
+	"""
+	bounds = get_storage_bounds()
+
+	if from_date and bounds["cold_upper_bound"] and getdate(from_date) >= bounds["cold_upper_bound"]:
+		return [HOT_DOCTYPE]
+
+	if not bounds["cold_upper_bound"]:
+		# Nada foi movido ainda para a camada fria
+		return [HOT_DOCTYPE]
+
+	if to_date and bounds["hot_lower_bound"] and getdate(to_date) < bounds["hot_lower_bound"]:
+		return [COLD_DOCTYPE]
+
+	return [HOT_DOCTYPE, COLD_DOCTYPE]
+
+
+def _with_date_range(filters, from_date, to_date):
+	"""Acrescentar o intervalo de creation aos filtros (lista de condições)"""
+	conditions = []
+
+	if isinstance(filters, dict):
+		for key, value in filters.items():
+			if isinstance(value, (list, tuple)):
+				conditions.append([key, *value])
+			else:
+				conditions.append([key, "=", value])
+	elif filters:
+		conditions.extend(filters)
+
+	if from_date:
+		conditions.append(["creation", ">=", getdate(from_date)])
+	if to_date:
+		# Inclusivo: até ao fim do dia to_date
+		conditions.append(["creation", "<", frappe.utils.add_days(getdate(to_date), 1)])
+
+	return conditions
+
+
+# ========== API DE CONSULTA ==========
+
+def get_atcud_logs(filters=None, fields=None, from_date=None, to_date=None,
+				   order_by="creation desc", limit=None):
+	"""
+	✅ Obter ATCUD Logs das camadas necessárias, ordenados e limitados
+
+	A ordenação é aplicada em cada camada e de novo após a união, pelo que
+	cada tabela devolve no máximo `limit` linhas.
+	"""
+	fields = list(fields or ["name"])
+	conditions = _with_date_range(filters, from_date, to_date)
+	tiers = resolve_tiers(from_date, to_date)
+
+	sort_field, _sep, direction = (order_by or "creation desc").partition(" ")
+	if sort_field not in fields and len(tiers) > 1:
+		fields.append(sort_field)
+
+	results = []
+	for doctype in tiers:
+		rows = frappe.get_all(doctype, filters=conditions, fields=fields,
+							  order_by=order_by, limit=limit)
+		for row in rows:
+			row["storage_tier"] = "hot" if doctype == HOT_DOCTYPE else "cold"
+		results.extend(rows)
+
+	if len(tiers) > 1:
+		results.sort(key=lambda row: (row.get(sort_field) is None, row.get(sort_field)),
+					 reverse=direction.strip().lower() == "desc")
+		if limit:
+			results = results[:cint(limit)]
+
+	return results
+
+
+def count_atcud_logs(filters=None, from_date=None, to_date=None):
+	"""✅ Contar ATCUD Logs nas camadas necessárias"""
+	conditions = _with_date_range(filters, from_date, to_date)
+	return sum(frappe.db.count(doctype, conditions) for doctype in resolve_tiers(from_date, to_date))
+
+
+def get_atcud_log_page(filters=None, fields=None, from_date=None, to_date=None, sort_order="desc",
+					   cursor=None, page_length=None):
+	"""
+	✅ Página de ATCUD Logs por cursor (creation, name) através das camadas
+
+	Todas as linhas frias são anteriores às quentes, por isso as camadas são
+	percorridas em sequência: quente -> fria (desc) ou fria -> quente (asc).
+	"""
+	from portugal_compliance.utils.keyset_pagination import DEFAULT_PAGE_LENGTH, get_page
+
+	tiers = resolve_tiers(from_date, to_date)
+	if sort_order == "asc":
+		tiers.reverse()
+
+	return get_page(tiers, filters=_with_date_range(filters, from_date, to_date), fields=fields,
+					sort_by="creation", sort_order=sort_order, cursor=cursor,
+					page_length=page_length or DEFAULT_PAGE_LENGTH)
+
+
+def find_atcud_log(filters, fields=None):
+	"""
+	✅ Procurar um ATCUD Log: primeiro na camada quente, depois na fria
+
+	Returns:
+		frappe._dict | None
+	"""
+	fields = fields or ["name", "document_type", "document_name", "generation_date", "atcud_code"]
+
+	for doctype in (HOT_DOCTYPE, COLD_DOCTYPE):
+		if doctype == COLD_DOCTYPE and not get_storage_bounds()["cold_upper_bound"]:
+			break
+
+		row = frappe.db.get_value(doctype, filters, fields, as_dict=True)
+		if row:
+			row["storage_tier"] = "hot" if doctype == HOT_DOCTYPE else "cold"
+			return row
+
+	return None
+
+
+def update_atcud_log(filters, values):
+	"""
+	✅ Atualizar um ATCUD Log na camada onde estiver (ex: cancelamento do documento)
+
+	Returns:
+		str | None: nome do log atualizado
+	"""
+	row = find_atcud_log(filters, fields=["name"])
+	if not row:
+		return None
+
+	frappe.db.set_value(HOT_DOCTYPE if row.storage_tier == "hot" else COLD_DOCTYPE, row.name, values)
+	return row.name
+
+
+def get_atcud_log_source(from_date=None, to_date=None, columns=None):
+	"""
+	✅ Expressão de tabela para SQL direto (agregações, subconsultas)
+
+	Devolve a tabela da camada única necessária, ou um UNION ALL das duas.
+	Usar sempre com alias: f"FROM {source} atcud_log".
+	"""
+	tiers = resolve_tiers(from_date, to_date)
+	if len(tiers) == 1:
+		return f"`tab{tiers[0]}`"
+
+	column_list = ", ".join(f"`{column}`" for column in (columns or get_shared_columns()))
+	return f"""(
+		SELECT {column_list} FROM `tabATCUD Log`
+		UNION ALL
+		SELECT {column_list} FROM `tabATCUD Log Archive`
+	)"""
+
+
+# ========== MOVIMENTO QUENTE -> FRIO ==========
+
+def get_shared_columns():
+	"""Colunas comuns às duas tabelas (tolerante a campos personalizados)"""
+	cold_columns = set(frappe.db.get_table_columns(COLD_DOCTYPE))
+	return [column for column in frappe.db.get_table_columns(HOT_DOCTYPE) if column in cold_columns]
+
+
+def move_to_cold_storage(cutoff=None, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=None):
+	"""
+	✅ Mover linhas quentes com creation < cutoff para a tabela fria
+
+	Cada chunk (paginado por creation, name) é copiado com INSERT ... SELECT e
+	apagado da tabela quente na mesma transação curta.
+	"""
+	cutoff = getdate(cutoff or get_hot_cutoff())
+	chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+	started = time.monotonic()
+
+	# ✅ Antes de mover: a camada fria pode passar a ter linhas até ao novo cutoff
+	current_upper = _get_bound(COLD_UPPER_BOUND_KEY)
+	if not current_upper or cutoff > current_upper:
+		_set_bound(COLD_UPPER_BOUND_KEY, cutoff)
+		frappe.db.commit()
+
+	column_list = ", ".join(f"`{column}`" for column in get_shared_columns())
+	moved, chunks = 0, 0
+	completed = True
+
+	while True:
+		names = frappe.db.sql_list("""
+			SELECT name FROM `tabATCUD Log`
+			WHERE creation < %(cutoff)s
+			ORDER BY creation, name
+			LIMIT %(limit)s
+		""", {"cutoff": cutoff, "limit": chunk_size})
+
+		if not names:
+			break
+
+		frappe.db.sql(f"""
+			INSERT IGNORE INTO `tabATCUD Log Archive` ({column_list})
+			SELECT {column_list} FROM `tabATCUD Log` WHERE name IN %(names)s
+		""", {"names": tuple(names)})
+		frappe.db.sql("DELETE FROM `tabATCUD Log` WHERE name IN %(names)s", {"names": tuple(names)})
+		frappe.db.commit()
+
+		moved += len(names)
+		chunks += 1
+
+		if max_chunks and chunks >= cint(max_chunks):
+			completed = len(names) < chunk_size
+			break
+
+	# ✅ Depois de mover tudo: a camada quente só tem linhas >= cutoff
+	if completed:
+		current_lower = _get_bound(HOT_LOWER_BOUND_KEY)
+		if not current_lower or cutoff > current_lower:
+			_set_bound(HOT_LOWER_BOUND_KEY, cutoff)
+		frappe.db.commit()
+
+	result = {
+		"cutoff": str(cutoff),
+		"moved": moved,
+		"chunks": chunks,
+		"completed": completed,
+		"finished_at": now(),
+		"duration_seconds": round(time.monotonic() - started, 3)
+	}
+
+	if moved:
+		frappe.logger().info(f"ATCUD Log hot/cold: {result}")
+
+	return result
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def get_storage_status():
+	"""✅ API: Estado das camadas quente/fria"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	bounds = get_storage_bounds()
+	return {
+		"hot_months": get_hot_months(),
+		"hot_cutoff": str(get_hot_cutoff()),
+		"cold_upper_bound": str(bounds["cold_upper_bound"] or ""),
+		"hot_lower_bound": str(bounds["hot_lower_bound"] or ""),
+		"hot_rows": frappe.db.estimate_count(HOT_DOCTYPE),
+		"cold_rows": frappe.db.estimate_count(COLD_DOCTYPE)
+	}
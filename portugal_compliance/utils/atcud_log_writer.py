@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+ATCUD Log Writer - Portugal Compliance
+Escrita em lote do ATCUD Log e das estatísticas das séries por transação
+✅ BUFFER: Os overrides acumulam as linhas de ATCUD Log da transação atual
+   (frappe.local) em vez de um insert() por documento
+✅ UM INSERT: No commit (frappe.db.before_commit) todas as linhas são escritas
+   num único INSERT multi-linha, com os nomes reservados num só passo da tabSeries
+✅ SÉRIES: Um único UPDATE por série por transação (total_documents_issued,
+   last_document_date, last_document_name)
+✅ ROLLBACK: O buffer é descartado com a transação (frappe.db.after_rollback)
+
+Sem os controladores do ATCUD Log: a verificação de log Success duplicado é feita
+numa consulta para o lote; a limpeza dos logs Failed anteriores do documento e as
+estatísticas da série substituem handle_success.
+"""
+
+import frappe
+from frappe.utils import cint, getdate, now, now_datetime
+
+from portugal_compliance.utils.series_registry import SERIES_DOCTYPE, get_series_by_naming_series
+
+LOG_DOCTYPE = "ATCUD Log"
+LOG_NAME_PREFIX = "ATCUD-LOG-{year}-"
+LOG_NAME_DIGITS = 4
+MODULE_VERSION = "1.0.0"
+
+
+def _get_state():
+	state = getattr(frappe.local, "atcud_log_writer", None)
+	if state is None:
+		state = frappe.local.atcud_log_writer = {"logs": {}, "series": {}, "registered": False}
+	return state
+
+
+def _discard():
+	frappe.local.atcud_log_writer = None
+
+
+def _register_flush(state):
+	"""Escrever no commit da transação atual (ou já, sem callbacks de transação)"""
+	if state["registered"]:
+		return
+
+	before_commit = getattr(frappe.db, "before_commit", None)
+	if before_commit is None:
+		flush()
+		return
+
+	before_commit.add(flush)
+	frappe.db.after_rollback.add(_discard)
+	state["registered"] = True
+
+
+def parse_atcud(atcud_code):
+	"""ATCUD "AAJFJ1-123" -> ("AAJFJ1", 123)"""
+	code, _sep, sequence = (atcud_code or "").partition("-")
+	return code or None, cint(sequence) if sequence.isdigit() else None
+
+
+# ========== ACUMULAR ==========
+
+def queue_atcud_log(doc, **values):
+	"""
+	✅ Acumular o ATCUD Log de um documento submetido
+
+	Args:
+		values: Colunas adicionais do ATCUD Log (as que não existirem são ignoradas)
+	"""
+	if not doc.get("atcud_code"):
+		return
+
+	series = get_series_by_naming_series(doc.get("naming_series"), doc.company, doc.doctype)
+	validation_code, sequence = parse_atcud(doc.atcud_code)
+	timestamp = now()
+
+	row = {
+		"naming_series": "ATCUD-LOG-.YYYY.-.####",
+		"document_type": doc.doctype,
+		"document_name": doc.name,
+		"document_date": doc.get("posting_date") or doc.get("transaction_date"),
+		"company": doc.company,
+		"series_used": series.name if series else None,
+		"atcud_code": doc.atcud_code,
+		"validation_code_used": validation_code,
+		"sequence_number": sequence,
+		"generation_status": "Success",
+		"generation_date": timestamp,
+		"retry_count": 0,
+		"created_by_user": frappe.session.user,
+		"ip_address": getattr(frappe.local, "request_ip", None) or "",
+		"erpnext_version": frappe.__version__,
+		"module_version": MODULE_VERSION,
+		"docstatus": 0,
+		"creation": timestamp,
+		"modified": timestamp,
+		"owner": frappe.session.user,
+		"modified_by": frappe.session.user
+	}
+	row.update(values)
+
+	state = _get_state()
+	state["logs"][(doc.doctype, doc.name)] = row
+	_register_flush(state)
+
+
+def queue_series_usage(doc):
+	"""✅ Acumular a utilização da série do documento (um UPDATE por série no commit)"""
+	series = get_series_by_naming_series(doc.get("naming_series"), doc.company, doc.doctype)
+	if not series:
+		return
+
+	document_date = getdate(doc.get("posting_date") or doc.get("transaction_date") or now_datetime())
+	state = _get_state()
+	usage = state["series"].setdefault(series.name, {"count": 0, "last_date": document_date, "last_name": None})
+	usage["count"] += 1
+	usage["last_date"] = max(usage["last_date"], document_date)
+	usage["last_name"] = doc.name
+	_register_flush(state)
+
+
+# ========== ESCREVER ==========
+
+def reserve_log_names(count, year=None):
+	"""
+	✅ Reservar count nomes ATCUD-LOG-AAAA-#### num só passo (linha da tabSeries bloqueada)
+
+	Mesmo contador de frappe.model.naming.getseries: os nomes continuam a sequência
+	dos ATCUD Log inseridos por insert().
+	"""
+	prefix = LOG_NAME_PREFIX.format(year=year or now_datetime().year)
+	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", prefix)
+
+	if current:
+		start = cint(current[0][0])
+		frappe.db.sql("UPDATE `tabSeries` SET `current` = %s WHERE `name` = %s", (start + count, prefix))
+	else:
+		start = 0
+		frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count))
+
+	return [f"{prefix}{str(number).zfill(LOG_NAME_DIGITS)}" for number in range(start + 1, start + count + 1)]
+
+
+def flush():
+	"""
+	✅ Escrever o buffer da transação: um INSERT de ATCUD Log + um UPDATE por série
+
+	Chamado por frappe.db.before_commit; pode ser chamado diretamente.
+
+	Returns:
+		dict: {"logs": n, "series": n}
+	"""
+	state = getattr(frappe.local, "atcud_log_writer", None)
+	_discard()
+	if not state:
+		return {"logs": 0, "series": 0}
+
+	written = _write_logs(list(state["logs"].values()))
+	_write_series_usage(state["series"])
+
+	return {"logs": written, "series": len(state["series"])}
+
+
+def _write_logs(rows):
+	if not rows:
+		return 0
+
+	# Mesmo critério do before_insert do ATCUD Log: um só log Success por documento
+	existing = {
+		(log.document_type, log.document_name)
+		for log in frappe.get_all(
+			LOG_DOCTYPE,
+			filters={"document_name": ["in", list({row["document_name"] for row in rows})],
+					 "generation_status": "Success"},
+			fields=["document_type", "document_name"]
+		)
+	}
+	rows = [row for row in rows if (row["document_type"], row["document_name"]) not in existing]
+	if not rows:
+		return 0
+
+	columns = set(frappe.db.get_table_columns(LOG_DOCTYPE))
+	fields = ["name"] + sorted({field for row in rows for field in row if field in columns and field != "name"})
+
+	values = [
+		[name] + [row.get(field) for field in fields[1:]]
+		for name, row in zip(reserve_log_names(len(rows)), rows)
+	]
+	frappe.db.bulk_insert(LOG_DOCTYPE, fields, values)
+	_delete_failed_logs([row for row in rows if row.get("generation_status") == "Success"])
+
+	return len(values)
+
+
+def _delete_failed_logs(rows):
+	"""Logs Failed anteriores dos documentos com log Success (como o handle_success)"""
+	names_by_doctype = {}
+	for row in rows:
+		names_by_doctype.setdefault(row["document_type"], set()).add(row["document_name"])
+
+	for doctype, names in sorted(names_by_doctype.items()):
+		frappe.db.delete(LOG_DOCTYPE, {
+			"document_type": doctype,
+			"document_name": ["in", sorted(names)],
+			"generation_status": "Failed"
+		})
+
+
+def _write_series_usage(usage_by_series):
+	for series_name, usage in sorted(usage_by_series.items()):
+		frappe.db.sql(f"""
+			UPDATE `tab{SERIES_DOCTYPE}`
+			SET total_documents_issued = IFNULL(total_documents_issued, 0) + %(count)s,
+				last_document_date = GREATEST(IFNULL(last_document_date, %(last_date)s), %(last_date)s),
+				last_document_name = %(last_name)s
+			WHERE name = %(series)s
+		""", {
+			"count": usage["count"],
+			"last_date": usage["last_date"],
+			"last_name": usage["last_name"],
+			"series": series_name
+		})
@@ -6,6 +6,8 @@ import frappe
 from frappe import _
 from frappe.utils import today, getdate
 
+from portugal_compliance.utils.nif_validator import validate_nif
+
 
 def validate_portugal_settings(doc, method=None):
 	"""
@@ -47,34 +49,7 @@ def validate_portuguese_nif(nif):
 	"""
 	Valida formato do NIF português
 	"""
-	try:
-		if not nif:
-			return False
-
-		# Remover espaços e caracteres não numéricos
-		import re
-		nif = re.sub(r'[^\d]', '', str(nif))
-
-		# Verificar se tem 9 dígitos
-		if len(nif) != 9:
-			return False
-
-		# Verificar se começa com dígito válido
-		if nif[0] not in '123456789':
-			return False
-
-		# Calcular dígito de controlo
-		check_sum = 0
-		for i in range(8):
-			check_sum += int(nif[i]) * (9 - i)
-
-		remainder = check_sum % 11
-		check_digit = 0 if remainder < 2 else 11 - remainder
-
-		return int(nif[8]) == check_digit
-
-	except Exception:
-		return False
+	return validate_nif(nif)
 
 
 def create_default_configurations(company_doc):
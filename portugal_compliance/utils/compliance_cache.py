@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Compliance Cache - Portugal Compliance
+Cache em dois níveis para consultas de compliance no caminho de gravação
+✅ NÍVEL 1: LRU limitado por worker (sem ida ao Redis)
+✅ NÍVEL 2: Redis partilhado entre workers (frappe.cache)
+✅ VERSÕES: Cada namespace (company, party, series, fiscal) tem um contador no Redis;
+   as chaves incluem a versão e invalidar = incrementar o contador
+✅ COERÊNCIA: As versões são lidas uma vez por pedido/job (um MGET) - uma
+   alteração noutro worker fica visível no pedido seguinte
+✅ PÓS-COMMIT: Com uma transação aberta o contador só é incrementado em
+   frappe.db.after_commit (outro worker não pode recarregar a linha antiga para
+   a versão nova); até lá a própria transação lê o namespace sem cache
+✅ MÉTRICAS: Contadores de hits (local/redis) e misses por namespace
+
+Invalidação por doc_events (hooks.py): Company -> company,
+Customer/Supplier -> party, Portugal Series Configuration -> series,
+Fiscal Year/Period Closing Voucher/Accounting Period -> fiscal (utils/fiscal_calendar).
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import frappe
+from frappe.utils import cint
+
+NAMESPACES = ("company", "party", "series", "fiscal")
+
+KEY_PREFIX = "portugal_compliance:cc:"
+VERSION_KEY_PREFIX = "portugal_compliance:cc_version:"
+STATS_KEY = "portugal_compliance:cc_stats"
+
+DEFAULT_TTL = 600
+LOCAL_MAX_ENTRIES = 4096
+STATS_FLUSH_EVERY = 200
+
+PORTUGUESE_NAMING_SERIES_PATTERN = re.compile(r'^[A-Z]{2,4}\d{4}[A-Z0-9]{2,4}\.####$')
+
+_MISSING = object()
+
+
+class _LocalLRU:
+	"""LRU limitado com expiração por entrada (partilhado pelas threads do worker)"""
+
+	def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, key):
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is None:
+				return _MISSING
+
+			value, expires_at = entry
+			if expires_at < time.monotonic():
+				del self.entries[key]
+				return _MISSING
+
+			self.entries.move_to_end(key)
+			return value
+
+	def set(self, key, value, ttl):
+		with self.lock:
+			self.entries[key] = (value, time.monotonic() + ttl)
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.max_entries:
+				self.entries.popitem(last=False)
+
+	def clear(self, prefix=None):
+		with self.lock:
+			if prefix is None:
+				self.entries.clear()
+			else:
+				for key in [key for key in self.entries if key.startswith(prefix)]:
+					del self.entries[key]
+
+	def __len__(self):
+		return len(self.entries)
+
+
+_local = _LocalLRU()
+_stats = {namespace: {"local_hits": 0, "redis_hits": 0, "misses": 0} for namespace in NAMESPACES}
+_pending_stats = {"count": 0}
+
+
+# ========== VERSÕES ==========
+
+def _version_key(namespace):
+	return frappe.cache().make_key(f"{VERSION_KEY_PREFIX}{namespace}")
+
+
+def get_versions():
+	"""Versões de todos os namespaces, lidas uma vez por pedido/job"""
+	versions = getattr(frappe.local, "compliance_cache_versions", None)
+	if versions is None:
+		values = frappe.cache().mget([_version_key(namespace) for namespace in NAMESPACES])
+		versions = {namespace: cint(value) for namespace, value in zip(NAMESPACES, values)}
+		frappe.local.compliance_cache_versions = versions
+
+	return versions
+
+
+def get_version(namespace):
+	return get_versions()[namespace]
+
+
+def invalidate(namespace):
+	"""
+	✅ Invalidar um namespace em todos os workers
+
+	Incrementa o contador no Redis (chaves antigas deixam de ser lidas e
+	expiram pelo TTL) e limpa o LRU local deste worker. Dentro de uma transação
+	com escritas o incremento fica para depois do commit (descartado no rollback)
+	e o namespace é lido sem cache até lá.
+	"""
+	_local.clear(f"{namespace}:")
+
+	if not _in_transaction():
+		_bump(namespace)
+		return
+
+	pending = getattr(frappe.local, "compliance_cache_pending", None)
+	if pending is None:
+		pending = frappe.local.compliance_cache_pending = set()
+		frappe.db.after_commit.add(_bump_pending)
+		frappe.db.after_rollback.add(_discard_pending)
+
+	pending.add(namespace)
+
+
+def is_pending(namespace):
+	"""Namespace invalidado na transação atual (ainda sem commit)"""
+	return namespace in (getattr(frappe.local, "compliance_cache_pending", None) or ())
+
+
+def _in_transaction():
+	db = getattr(frappe.local, "db", None)
+	return bool(db and getattr(db, "after_commit", None) is not None and getattr(db, "transaction_writes", 0))
+
+
+def _bump(namespace):
+	version = frappe.cache().incr(_version_key(namespace))
+	get_versions()[namespace] = cint(version)
+	_local.clear(f"{namespace}:")
+
+
+def _bump_pending():
+	pending = getattr(frappe.local, "compliance_cache_pending", None) or ()
+	frappe.local.compliance_cache_pending = None
+	for namespace in sorted(pending):
+		_bump(namespace)
+
+
+def _discard_pending():
+	frappe.local.compliance_cache_pending = None
+
+
+# ========== LEITURA ==========
+
+def get_or_set(namespace, key, loader, ttl=DEFAULT_TTL):
+	"""
+	✅ Valor em cache ou calculado por loader()
+
+	Ordem: LRU local -> Redis -> loader (guardado nos dois níveis).
+	None também é guardado (evita repetir consultas sem resultado).
+	Namespace invalidado na transação atual: loader() sem cache.
+	"""
+	if is_pending(namespace):
+		return loader()
+
+	versioned_key = f"{namespace}:{get_version(namespace)}:{key}"
+	stats = _stats[namespace]
+
+	value = _local.get(versioned_key)
+	if value is not _MISSING:
+		stats["local_hits"] += 1
+		_count_lookup()
+		return value
+
+	cached = frappe.cache().get_value(f"{KEY_PREFIX}{versioned_key}")
+	if cached is not None:
+		stats["redis_hits"] += 1
+		value = cached[0]
+	else:
+		stats["misses"] += 1
+		value = loader()
+		frappe.cache().set_value(f"{KEY_PREFIX}{versioned_key}", (value,), expires_in_sec=ttl)
+
+	_local.set(versioned_key, value, ttl)
+	_count_lookup()
+	return value
+
+
+def _count_lookup():
+	_pending_stats["count"] += 1
+	if _pending_stats["count"] >= STATS_FLUSH_EVERY:
+		flush_stats()
+
+
+# ========== MÉTRICAS ==========
+
+def flush_stats():
+	"""Somar os contadores deste worker no Redis (um pipeline) e reiniciá-los"""
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for namespace, counters in _stats.items():
+		for counter, value in counters.items():
+			if value:
+				pipe.hincrby(cache.make_key(STATS_KEY), f"{namespace}:{counter}", value)
+				counters[counter] = 0
+	pipe.execute()
+	_pending_stats["count"] = 0
+
+
+def get_stats():
+	"""Contadores agregados de todos os workers + estado deste worker"""
+	flush_stats()
+	cache = frappe.cache()
+	# Pipeline: comando HGETALL nativo (RedisWrapper.hgetall aplica make_key e unpickle)
+	raw = cache.pipeline().hgetall(cache.make_key(STATS_KEY)).execute()[0] or {}
+
+	totals = {namespace: {"local_hits": 0, "redis_hits": 0, "misses": 0} for namespace in NAMESPACES}
+	for field, value in raw.items():
+		namespace, counter = frappe.safe_decode(field).split(":", 1)
+		if namespace in totals and counter in totals[namespace]:
+			totals[namespace][counter] = cint(value)
+
+	for counters in totals.values():
+		lookups = sum(counters.values())
+		counters["hit_ratio"] = round((lookups - counters["misses"]) / lookups, 4) if lookups else None
+
+	return {
+		"namespaces": totals,
+		"versions": get_versions(),
+		"local_entries": len(_local)
+	}
+
+
+def reset_stats():
+	for counters in _stats.values():
+		for counter in counters:
+			counters[counter] = 0
+	frappe.cache().delete(frappe.cache().make_key(STATS_KEY))
+
+
+@frappe.whitelist()
+def get_compliance_cache_stats():
+	"""API: métricas da cache de compliance"""
+	frappe.only_for("System Manager")
+	return get_stats()
+
+
+# ========== CONSULTAS DE COMPLIANCE ==========
+
+def is_portuguese_company(company):
+	"""Empresa portuguesa com compliance ativo"""
+	if not company:
+		return False
+
+	def load():
+		company_data = frappe.db.get_value("Company", company,
+										   ["country", "portugal_compliance_enabled"], as_dict=True)
+		return bool(company_data and company_data.country == "Portugal"
+					and cint(company_data.portugal_compliance_enabled))
+
+	return get_or_set("company", company, load)
+
+
+def get_party_tax_id(doctype, name):
+	"""NIF de um Customer/Supplier"""
+	if not name:
+		return ""
+
+	return get_or_set("party", f"{doctype}:{name}",
+					  lambda: frappe.db.get_value(doctype, name, "tax_id") or "", ttl=3600)
+
+
+@lru_cache(maxsize=1024)
+def is_portuguese_naming_series(naming_series):
+	"""Função pura: padrão português XXYYYY + COMPANY.#### (só LRU local)"""
+	return bool(naming_series and PORTUGUESE_NAMING_SERIES_PATTERN.match(naming_series))
+
+
+# ========== DOC EVENTS ==========
+
+def invalidate_company_cache(doc, method=None):
+	invalidate("company")
+
+
+def invalidate_party_cache(doc, method=None):
+	invalidate("party")
+
+
+def invalidate_series_cache(doc, method=None):
+	invalidate("series")
+
+
+def invalidate_fiscal_cache(doc, method=None):
+	invalidate("fiscal")
@@ -14,6 +14,15 @@ from frappe.utils import getdate, now, today, cint, flt
 import re
 from datetime import datetime, date
 
+from portugal_compliance.utils.nif_validator import (
+	NIF_INVALID_CHECK_DIGIT,
+	NIF_INVALID_FIRST_DIGIT,
+	NIF_INVALID_LENGTH,
+	NIF_VALID,
+	get_nif_status,
+)
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class PortugueseComplianceHooks:
 	"""
@@ -521,45 +530,23 @@ class PortugueseComplianceHooks:
 		"""
 		Validar NIF português
 		"""
-		try:
-			if not nif:
-				return True  # NIF vazio é permitido
-
-			# ✅ LIMPAR NIF
-			nif_clean = re.sub(r'[^0-9]', '', str(nif))
-
-			# ✅ VERIFICAR COMPRIMENTO
-			if len(nif_clean) != 9:
-				if throw_error:
-					frappe.throw(_("NIF deve ter 9 dígitos"))
-				return False
-
-			# ✅ VERIFICAR PRIMEIRO DÍGITO
-			if nif_clean[0] not in '123456789':
-				if throw_error:
-					frappe.throw(_("NIF inválido - primeiro dígito deve ser 1-9"))
-				return False
-
-			# ✅ CALCULAR DÍGITO DE CONTROLO
-			checksum = 0
-			for i in range(8):
-				checksum += int(nif_clean[i]) * (9 - i)
+		if not nif:
+			return True  # NIF vazio é permitido
 
-			remainder = checksum % 11
-			control_digit = 0 if remainder < 2 else 11 - remainder
-
-			if int(nif_clean[8]) != control_digit:
-				if throw_error:
-					frappe.throw(_("NIF inválido - dígito de controlo incorreto"))
-				return False
+		status = get_nif_status(nif)
 
+		if status == NIF_VALID:
 			return True
 
-		except Exception as e:
-			frappe.log_error(f"Erro na validação de NIF: {str(e)}", "PortugueseComplianceHooks")
-			if throw_error:
-				frappe.throw(_("Erro na validação do NIF: {0}").format(str(e)))
-			return False
+		if throw_error:
+			messages = {
+				NIF_INVALID_LENGTH: _("NIF deve ter 9 dígitos"),
+				NIF_INVALID_FIRST_DIGIT: _("NIF inválido - primeiro dígito deve ser 1-9"),
+				NIF_INVALID_CHECK_DIGIT: _("NIF inválido - dígito de controlo incorreto")
+			}
+			frappe.throw(messages.get(status, _("NIF inválido")))
+
+		return False
 
 	# ========== MÉTODOS DE AUDITORIA ==========
 
@@ -597,7 +584,7 @@ ATCUD Gerado Automaticamente:
 # ========== INSTÂNCIA GLOBAL ==========
 
 # ✅ INSTÂNCIA GLOBAL PARA USO
-portuguese_compliance_hooks = PortugueseComplianceHooks()
+portuguese_compliance_hooks = LazySingleton(PortugueseComplianceHooks)
 
 
 # ========== FUNÇÕES PARA HOOKS ==========
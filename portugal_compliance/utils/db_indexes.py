@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+DB Indexes - Portugal Compliance
+Criação declarativa dos índices usados pelos caminhos críticos
+✅ DECLARATIVO: Cada módulo declara {doctype: ([colunas], ...)} e chama ensure_indexes
+✅ IDEMPOTENTE: frappe.db.add_index ignora índices já existentes (mesmo nome)
+✅ NOMES: "<colunas>_index" (convenção do frappe); ["creation"] usa o índice "creation"
+✅ PATCHES: run_index_patch é o corpo comum dos patches de índices
+"""
+
+import frappe
+
+
+def get_index_name(fields):
+	"""Nome do índice para a lista de colunas"""
+	return "creation" if list(fields) == ["creation"] else "_".join(fields) + "_index"
+
+
+def ensure_indexes(index_map):
+	"""
+	✅ Criar os índices declarados em index_map ({doctype: ([colunas], ...)})
+
+	Doctypes sem tabela (ainda não sincronizados) são ignorados.
+	"""
+	for doctype, indexes in index_map.items():
+		if not frappe.db.table_exists(doctype):
+			continue
+
+		for fields in indexes:
+			frappe.db.add_index(doctype, list(fields), get_index_name(fields))
+
+
+def run_index_patch(ensure, description):
+	"""Corpo comum dos patches de índices: criar (idempotente) e registar"""
+	ensure()
+	frappe.logger().info(f"✅ {description}")
@@ -19,6 +19,10 @@ from datetime import datetime, date
 import time
 import json
 
+from portugal_compliance.utils import series_registry
+from portugal_compliance.utils.performance_metrics import instrumented
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class PortugalComplianceDocumentHooks:
 	"""
@@ -433,6 +437,10 @@ class PortugalComplianceDocumentHooks:
 			if not self._is_portuguese_naming_series(getattr(doc, 'naming_series', '')):
 				frappe.throw(_("Naming series portuguesa é obrigatória"))
 
+			# ✅ Assinatura RSA-SHA1 encadeada (último hash guardado na série)
+			from portugal_compliance.utils.document_signer import sign_document
+			sign_document(doc)
+
 		except Exception as e:
 			frappe.log_error(f"Erro validação submissão: {str(e)}")
 			raise
@@ -454,24 +462,11 @@ class PortugalComplianceDocumentHooks:
 	def _auto_select_communicated_series(self, doc):
 		"""✅ OTIMIZADO: Auto-selecionar série comunicada"""
 		try:
-			# Prioridade: Comunicada > Ativa
-			for filters in [
-				{"is_communicated": 1, "validation_code": ["!=", ""]},
-				{"is_active": 1}
-			]:
-				filters.update({
-					"document_type": doc.doctype,
-					"company": doc.company
-				})
-
-				series = frappe.get_all("Portugal Series Configuration",
-										filters=filters,
-										fields=["prefix"],
-										limit=1)
+			# Prioridade: Comunicada > Ativa (registo em memória, sem consultas)
+			series = series_registry.get_best_series(doc.doctype, doc.company)
 
-				if series:
-					doc.naming_series = f"{series[0].prefix}.####"
-					return
+			if series:
+				doc.naming_series = f"{series.prefix}.####"
 
 		except Exception as e:
 			frappe.log_error(f"Erro em auto_select_communicated_series: {str(e)}")
@@ -479,16 +474,17 @@ class PortugalComplianceDocumentHooks:
 	def _generate_atcud_with_real_validation_code(self, doc):
 		"""✅ OTIMIZADO: Gerar ATCUD com código real da AT"""
 		try:
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"naming_series": doc.naming_series,
-				"company": doc.company,
-				"document_type": doc.doctype
-			}, ["name", "validation_code", "current_sequence"], as_dict=True)
+			series_config = series_registry.get_series_by_naming_series(
+				doc.naming_series, doc.company, doc.doctype)
 
 			if not series_config or not series_config.validation_code:
 				return None
 
-			next_seq = (series_config.current_sequence or 0) + 1
+			# Sequência sempre lida da BD (bloqueada até ao commit)
+			current_sequence = frappe.db.get_value("Portugal Series Configuration",
+												   series_config.name, "current_sequence",
+												   for_update=True)
+			next_seq = (current_sequence or 0) + 1
 			atcud_code = f"{series_config.validation_code}-{str(next_seq).zfill(8)}"
 
 			frappe.db.set_value("Portugal Series Configuration",
@@ -527,17 +523,14 @@ class PortugalComplianceDocumentHooks:
 				continue
 
 	def _validate_document_sequence_certified(self, doc):
-		"""✅ OTIMIZADO: Validar sequência do documento"""
+		"""✅ OTIMIZADO: Validar sequência do documento (instantâneo do registo de séries)"""
 		if not getattr(doc, 'naming_series', None):
 			return
 
 		prefix = doc.naming_series.replace('.####', '')
-		series_config = frappe.db.get_value("Portugal Series Configuration", {
-			"prefix": prefix,
-			"company": doc.company
-		}, "current_sequence")
+		series_config = series_registry.get_series_by_prefix(prefix, doc.company)
 
-		if series_config and series_config > 99999999:
+		if series_config and (series_config.current_sequence or 0) > 99999999:
 			frappe.throw(_("Série '{0}' atingiu o limite máximo").format(prefix))
 
 	def _validate_portuguese_required_fields(self, doc):
@@ -618,24 +611,20 @@ class PortugalComplianceDocumentHooks:
 			return {"success": False, "error": str(e)}
 
 	def _replace_naming_series_with_portuguese_only(self, company_abbr):
-		"""✅ OTIMIZADO: Substituir naming series"""
+		"""✅ OTIMIZADO: Substituir naming series (todos os doctypes num só diff)"""
 		try:
-			for doctype in self.supported_doctypes.keys():
-				self._update_property_setter_for_doctype(doctype, company_abbr)
+			from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
+
+			sync_naming_series_options(list(self.supported_doctypes.keys()))
 		except Exception as e:
 			frappe.log_error(f"Erro ao configurar naming series: {str(e)}")
 
 	def _update_property_setter_for_doctype(self, doctype, company_abbr):
 		"""✅ OTIMIZADO: Atualizar Property Setter"""
 		try:
-			series = frappe.get_all("Portugal Series Configuration",
-									filters={"document_type": doctype, "is_active": 1},
-									fields=["prefix"],
-									order_by="is_communicated desc, creation asc")
+			from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
 
-			if series:
-				naming_series_options = [f"{s.prefix}.####" for s in series]
-				self._create_or_update_property_setter(doctype, naming_series_options)
+			sync_naming_series_options([doctype])
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao atualizar Property Setter para {doctype}: {str(e)}")
@@ -749,7 +738,7 @@ class PortugalComplianceDocumentHooks:
 
 
 # ========== INSTÂNCIA GLOBAL ==========
-portugal_document_hooks = PortugalComplianceDocumentHooks()
+portugal_document_hooks = LazySingleton(PortugalComplianceDocumentHooks)
 
 
 # ========== FUNÇÕES GLOBAIS PARA HOOKS ==========
@@ -781,21 +770,46 @@ def _create_single_custom_field(self, doctype, field_config):
 		return False
 
 
+@instrumented("document_hooks.before_save")
 def generate_atcud_before_save(doc, method=None):
 	"""Hook global para geração de ATCUD"""
 	return portugal_document_hooks.generate_atcud_before_save(doc, method)
 
 
+@instrumented("document_hooks.validate")
 def validate_portugal_compliance(doc, method=None):
 	"""Hook para validate de documentos"""
 	return portugal_document_hooks.validate_portugal_compliance(doc, method)
 
 
+@instrumented("document_hooks.before_submit")
 def before_submit_document(doc, method=None):
 	"""Hook para before_submit de documentos"""
 	return portugal_document_hooks.before_submit_document(doc, method)
 
 
+def _set_party_nif_fields(doc):
+	"""Preencher nif_validated e o NIF normalizado usado pela pesquisa indexada"""
+	from portugal_compliance.queries.party_search import NORMALIZED_TAX_ID_FIELD
+	from portugal_compliance.utils.nif_validator import normalize_nif, validate_nif
+
+	if doc.meta.has_field("nif_validated"):
+		doc.nif_validated = 1 if doc.tax_id and validate_nif(doc.tax_id) else 0
+
+	if doc.meta.has_field(NORMALIZED_TAX_ID_FIELD):
+		doc.set(NORMALIZED_TAX_ID_FIELD, normalize_nif(doc.tax_id))
+
+
+def validate_customer_nif(doc, method=None):
+	"""Hook para validate de Customer"""
+	_set_party_nif_fields(doc)
+
+
+def validate_supplier_nif(doc, method=None):
+	"""Hook para validate de Supplier"""
+	_set_party_nif_fields(doc)
+
+
 # ========== APIS WHITELISTED ==========
 
 @frappe.whitelist()
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Document Signer - Portugal Compliance
+Assinatura certificada RSA-SHA1 encadeada por série (Portaria 363/2010)
+✅ MENSAGEM: InvoiceDate;SystemEntryDate;InvoiceNo;GrossTotal;HashAnterior
+✅ ÚLTIMO HASH POR SÉRIE: Guardado na Portugal Series Configuration (last_hash)
+   e lido com SELECT ... FOR UPDATE - sem consultar o documento anterior
+✅ CHAVE PRIVADA: Carregada uma vez por worker (recarregada se o ficheiro mudar)
+✅ VERIFICAÇÃO: Percorre a cadeia de uma série em streaming (keyset por posição),
+   apenas com a chave pública
+✅ SAF-T: InvoiceNo/DocumentNumber, datas e total exportados = campos assinados
+
+Configuração (site_config.json):
+- portugal_compliance_signing_key: caminho do PEM (relativo ao site ou absoluto)
+- portugal_compliance_signing_key_password: password do PEM (opcional)
+- portugal_compliance_signing_key_version: HashControl (padrão "1")
+- portugal_compliance_signing_public_key: PEM da chave pública para verificação
+  (opcional - sem ele, derivada da chave privada)
+"""
+
+import base64
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, getdate
+
+from portugal_compliance.utils.performance_metrics import instrumented
+
+SERIES_DOCTYPE = "Portugal Series Configuration"
+
+# Documentos assinados e respetivo campo de total bruto (GrossTotal)
+# Payment Entry fica de fora: o SAF-T (PT) 1.04 não tem Hash em Payments
+SIGNED_DOCTYPES = {
+	"Sales Invoice": "grand_total",
+	"POS Invoice": "grand_total",
+	"Delivery Note": "grand_total"
+}
+
+DEFAULT_KEY_VERSION = "1"
+VERIFY_BATCH_SIZE = 1000
+
+_signing_key = {"signature": None, "key": None}
+_public_key = {"signature": None, "key": None}
+
+
+# ========== CHAVE PRIVADA ==========
+
+def get_key_path(conf_key="portugal_compliance_signing_key"):
+	path = frappe.conf.get(conf_key)
+	if not path:
+		return None
+
+	return path if os.path.isabs(path) else frappe.get_site_path(path)
+
+
+def get_key_version():
+	return str(frappe.conf.get("portugal_compliance_signing_key_version") or DEFAULT_KEY_VERSION)
+
+
+def is_signing_enabled():
+	path = get_key_path()
+	return bool(path and os.path.isfile(path))
+
+
+def get_private_key():
+	"""
+	✅ Chave privada carregada uma vez por processo
+
+	Memorizada por (caminho, mtime): substituir o ficheiro PEM recarrega a chave
+	sem reiniciar os workers.
+	"""
+	path = get_key_path()
+	if not path or not os.path.isfile(path):
+		frappe.throw(_("Chave privada de assinatura não configurada (portugal_compliance_signing_key)"))
+
+	signature = (path, os.stat(path).st_mtime_ns)
+	if _signing_key["signature"] != signature:
+		from cryptography.hazmat.primitives import serialization
+
+		password = frappe.conf.get("portugal_compliance_signing_key_password")
+		with open(path, "rb") as handle:
+			_signing_key["key"] = serialization.load_pem_private_key(
+				handle.read(), password=password.encode("utf-8") if password else None)
+		_signing_key["signature"] = signature
+
+	return _signing_key["key"]
+
+
+def get_public_key():
+	"""
+	✅ Chave pública para verificar a cadeia
+
+	Lida do PEM público configurado (a verificação não precisa da chave
+	privada); sem ele, derivada da chave privada.
+	"""
+	path = get_key_path("portugal_compliance_signing_public_key")
+	if not path:
+		return get_private_key().public_key()
+
+	if not os.path.isfile(path):
+		frappe.throw(_("Chave pública de assinatura não encontrada: {0}").format(path))
+
+	signature = (path, os.stat(path).st_mtime_ns)
+	if _public_key["signature"] != signature:
+		from cryptography.hazmat.primitives import serialization
+
+		with open(path, "rb") as handle:
+			_public_key["key"] = serialization.load_pem_public_key(handle.read())
+		_public_key["signature"] = signature
+
+	return _public_key["key"]
+
+
+# ========== MENSAGEM E ASSINATURA ==========
+
+def build_message(posting_date, system_entry_date, document_no, gross_total, previous_hash):
+	"""Mensagem a assinar: datas, número, total bruto e hash do documento anterior"""
+	return ";".join([
+		getdate(posting_date).strftime("%Y-%m-%d"),
+		get_datetime(system_entry_date).strftime("%Y-%m-%dT%H:%M:%S"),
+		document_no,
+		f"{flt(gross_total, 2):.2f}",
+		previous_hash or ""
+	])
+
+
+def get_document_no(doc):
+	"""Número do documento assinado e exportado no SAF-T (InvoiceNo/DocumentNumber)"""
+	return doc.get("name")
+
+
+def get_document_message(doc, previous_hash):
+	return build_message(doc.posting_date, doc.creation, get_document_no(doc),
+						 doc.get(SIGNED_DOCTYPES[doc.doctype]), previous_hash)
+
+
+def sign_message(message, private_key=None):
+	"""RSA PKCS#1 v1.5 com SHA-1, em Base64"""
+	from cryptography.hazmat.primitives import hashes
+	from cryptography.hazmat.primitives.asymmetric import padding
+
+	private_key = private_key or get_private_key()
+	signature = private_key.sign(message.encode("utf-8"), padding.PKCS1v15(), hashes.SHA1())
+	return base64.b64encode(signature).decode("ascii")
+
+
+def verify_signature(message, signature, public_key):
+	from cryptography.exceptions import InvalidSignature
+	from cryptography.hazmat.primitives import hashes
+	from cryptography.hazmat.primitives.asymmetric import padding
+
+	try:
+		public_key.verify(base64.b64decode(signature), message.encode("utf-8"),
+						  padding.PKCS1v15(), hashes.SHA1())
+		return True
+	except (InvalidSignature, ValueError):
+		return False
+
+
+# ========== ASSINATURA NA SUBMISSÃO ==========
+
+def get_series_for_document(doc, for_update=False):
+	"""Série do documento (mesmo critério da geração de ATCUD)"""
+	return frappe.db.get_value(SERIES_DOCTYPE, {
+		"naming_series": doc.naming_series,
+		"company": doc.company,
+		"document_type": doc.doctype
+	}, ["name", "last_hash", "hashed_documents"], as_dict=True, for_update=for_update)
+
+
+@instrumented("document_signer.sign")
+def sign_document(doc):
+	"""
+	✅ Assinar o documento no before_submit
+
+	A linha da série fica bloqueada até ao commit da submissão: documentos da
+	mesma série são assinados um de cada vez e sempre sobre o último hash.
+	"""
+	if doc.doctype not in SIGNED_DOCTYPES or doc.get("saft_hash_sequence"):
+		return
+
+	if not doc.meta.has_field("saft_hash") or not is_signing_enabled():
+		return
+
+	series = get_series_for_document(doc, for_update=True)
+	if not series:
+		return
+
+	signature = sign_message(get_document_message(doc, series.last_hash))
+	position = cint(series.hashed_documents) + 1
+
+	doc.saft_hash = signature
+	doc.saft_hash_control = get_key_version()
+	doc.saft_hash_sequence = position
+
+	frappe.db.set_value(SERIES_DOCTYPE, series.name, {
+		"last_hash": signature,
+		"last_hash_document": doc.name,
+		"hashed_documents": position
+	}, update_modified=False)
+
+
+# ========== VERIFICAÇÃO ==========
+
+def iter_signed_documents(doctype, naming_series, company, batch_size=VERIFY_BATCH_SIZE):
+	"""Documentos assinados de uma série por ordem da cadeia, lidos em lotes"""
+	total_field = SIGNED_DOCTYPES[doctype]
+	last_position = 0
+
+	while True:
+		rows = frappe.db.sql(f"""
+			SELECT name, posting_date, creation, `{total_field}` AS gross_total,
+				saft_hash, saft_hash_sequence
+			FROM `tab{doctype}`
+			WHERE naming_series = %(naming_series)s
+				AND company = %(company)s
+				AND saft_hash_sequence > %(last_position)s
+			ORDER BY saft_hash_sequence
+			LIMIT %(batch_size)s
+		""", {
+			"naming_series": naming_series,
+			"company": company,
+			"last_position": last_position,
+			"batch_size": cint(batch_size)
+		}, as_dict=True)
+
+		if not rows:
+			return
+
+		yield from rows
+		last_position = rows[-1].saft_hash_sequence
+
+
+def verify_series_chain(series_name, max_breaks=100):
+	"""
+	✅ Reverificar toda a cadeia de hash de uma série
+
+	Returns:
+		dict: {"series", "checked", "valid", "breaks": [{"document", "position", "reason"}]}
+	"""
+	series = frappe.get_doc(SERIES_DOCTYPE, series_name)
+	if series.document_type not in SIGNED_DOCTYPES:
+		frappe.throw(_("Documentos {0} não são assinados").format(series.document_type))
+
+	public_key = get_public_key()
+	breaks = []
+	checked = 0
+	previous_hash = ""
+	last_document = None
+
+	def add_break(document, position, reason):
+		if len(breaks) < max_breaks:
+			breaks.append({"document": document, "position": position, "reason": reason})
+
+	for row in iter_signed_documents(series.document_type, series.naming_series, series.company):
+		checked += 1
+
+		if cint(row.saft_hash_sequence) != checked:
+			add_break(row.name, row.saft_hash_sequence, f"Posição esperada {checked}")
+			checked = cint(row.saft_hash_sequence)
+
+		message = build_message(row.posting_date, row.creation, get_document_no(row),
+								row.gross_total, previous_hash)
+		if not verify_signature(message, row.saft_hash, public_key):
+			add_break(row.name, row.saft_hash_sequence, "Assinatura não corresponde ao documento/hash anterior")
+
+		previous_hash = row.saft_hash
+		last_document = row.name
+
+	if checked != cint(series.hashed_documents):
+		add_break(series.last_hash_document, series.hashed_documents,
+				  f"Série indica {series.hashed_documents} documentos assinados, cadeia tem {checked}")
+	elif checked and (series.last_hash != previous_hash or series.last_hash_document != last_document):
+		add_break(series.last_hash_document, series.hashed_documents,
+				  "Último hash da série não corresponde ao último documento da cadeia")
+
+	return {
+		"series": series_name,
+		"checked": checked,
+		"valid": not breaks,
+		"breaks": breaks
+	}
+
+
+@frappe.whitelist()
+def verify_hash_chain(series_name):
+	"""API: verificar a cadeia de hash de uma série"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+	return verify_series_chain(series_name)
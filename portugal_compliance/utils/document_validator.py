@@ -16,6 +16,11 @@ import re
 from frappe.utils import cint, flt, getdate
 from datetime import datetime
 
+from portugal_compliance.utils.nif_validator import STRICT_FIRST_DIGITS
+from portugal_compliance.utils.nif_validator import validate_nif as validate_canonical_nif
+from portugal_compliance.utils.fiscal_calendar import get_fiscal_year
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class DocumentValidationUtilities:
 	"""
@@ -38,37 +43,9 @@ class DocumentValidationUtilities:
 		"""
 		✅ UTILITÁRIO: Validar NIF português (algoritmo oficial)
 		Usado por document_hooks.py e outras partes do sistema
+		Delegado ao validador canónico (nif_validator)
 		"""
-		if not nif:
-			return False
-
-		try:
-			# Remover espaços e caracteres não numéricos
-			nif = re.sub(r'\D', '', str(nif))
-
-			# Verificar comprimento
-			if len(nif) != 9:
-				return False
-
-			# Verificar primeiro dígito
-			first_digit = int(nif[0])
-			valid_first_digits = [1, 2, 3, 5, 6, 7, 8, 9]
-
-			if first_digit not in valid_first_digits:
-				return False
-
-			# Calcular dígito de controle
-			total = 0
-			for i in range(8):
-				total += int(nif[i]) * (9 - i)
-
-			remainder = total % 11
-			check_digit = 0 if remainder < 2 else 11 - remainder
-
-			return check_digit == int(nif[8])
-
-		except (ValueError, IndexError):
-			return False
+		return validate_canonical_nif(nif, STRICT_FIRST_DIGITS)
 
 	def get_nif_type(self, nif):
 		"""
@@ -235,9 +212,7 @@ class DocumentValidationUtilities:
 		✅ UTILITÁRIO: Validar se data está no ano fiscal correto
 		"""
 		try:
-			from erpnext.accounts.utils import get_fiscal_year
-			fiscal_year = get_fiscal_year(date_value, company=company)
-			return True
+			return bool(get_fiscal_year(date_value, company))
 		except Exception:
 			return False
 
@@ -267,8 +242,13 @@ class DocumentValidationUtilities:
 		✅ UTILITÁRIO: Obter informações do ano fiscal
 		"""
 		try:
-			from erpnext.accounts.utils import get_fiscal_year
-			fiscal_year = get_fiscal_year(date_value, company=company)
+			fiscal_year = get_fiscal_year(date_value, company)
+			if not fiscal_year:
+				return {
+					'fiscal_year': None,
+					'is_valid': False,
+					'error': _("Data {0} fora de qualquer ano fiscal ativo da empresa {1}").format(date_value, company)
+				}
 
 			return {
 				'fiscal_year': fiscal_year[0],
@@ -547,7 +527,7 @@ class DocumentValidationUtilities:
 
 
 # ========== INSTÂNCIA GLOBAL ==========
-document_validation_utilities = DocumentValidationUtilities()
+document_validation_utilities = LazySingleton(DocumentValidationUtilities)
 
 
 # ========== FUNÇÕES AUXILIARES PARA USO EXTERNO ==========
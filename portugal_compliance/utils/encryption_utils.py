@@ -1,68 +1,198 @@
+"""
+Encryption Utils - Portugal Compliance
+✅ CHAVES VERSIONADAS: portugal_compliance_encryption_keys = {"1": "...", "2": "..."} no site_config,
+   portugal_compliance_encryption_key_version = versão ativa (cifra); todas as versões decifram
+✅ CACHE POR WORKER: PBKDF2 corre uma vez por chave e por processo (não por EncryptionUtils())
+✅ ROTAÇÃO: rotate_encryption_key acrescenta uma versão e re-cifra em background os valores
+   guardados (reencrypt_stored_values) - nenhum texto cifrado fica sem chave
+✅ COMPATÍVEL: Valores no formato antigo (base64 de um token Fernet da chave única
+   portugal_compliance_encryption_key) continuam a decifrar e são re-cifrados
+"""
+
 import frappe
 from frappe import _
+from frappe.utils import cint
 from frappe.utils.password import get_decrypted_password, set_encrypted_password
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
+import binascii
 import os
 import hashlib
 import secrets
+import threading
+
+KEYS_CONFIG = "portugal_compliance_encryption_keys"
+ACTIVE_VERSION_CONFIG = "portugal_compliance_encryption_key_version"
+LEGACY_KEY_CONFIG = "portugal_compliance_encryption_key"
+
+KDF_SALT = b'portugal_compliance_salt'
+KDF_ITERATIONS = 100000
+
+# Valor cifrado: pcv<versão>:<token Fernet>
+TOKEN_PREFIX = "pcv"
+LEGACY_VERSION = "legacy"
+
+# Campos que guardam valores cifrados por encrypt_portugal_data / encrypt_validation_code
+ENCRYPTED_FIELDS = [
+	("Portugal Series Configuration", "validation_code"),
+]
+REENCRYPT_CHUNK_SIZE = 500
+
+_derived_keys = {}
+_derive_lock = threading.Lock()
+
+
+def derive_fernet_key(secret):
+	"""
+	✅ Chave Fernet de um segredo (PBKDF2-HMAC-SHA256) - uma derivação por segredo e por worker
+	"""
+	key = _derived_keys.get(secret)
+	if key is None:
+		with _derive_lock:
+			key = _derived_keys.get(secret)
+			if key is None:
+				kdf = PBKDF2HMAC(
+					algorithm=hashes.SHA256(),
+					length=32,
+					salt=KDF_SALT,
+					iterations=KDF_ITERATIONS,
+				)
+				key = _derived_keys[secret] = base64.urlsafe_b64encode(kdf.derive(secret.encode()))
+
+	return key
+
+
+class KeyRing:
+	"""Versões de chave: a ativa cifra, todas decifram"""
+
+	def __init__(self, keys, active_version):
+		self.active_version = str(active_version)
+		self.fernets = {str(version): Fernet(derive_fernet_key(secret)) for version, secret in keys.items()}
+		if self.active_version not in self.fernets:
+			raise ValueError(f"Versão de chave ativa inexistente: {self.active_version}")
+
+		self.active_fernet = self.fernets[self.active_version]
+		self.active_key = derive_fernet_key(keys[self.active_version])
+
+	def encrypt(self, data):
+		token = self.active_fernet.encrypt(data.encode('utf-8')).decode('ascii')
+		return f"{TOKEN_PREFIX}{self.active_version}:{token}"
+
+	def get_version(self, value):
+		"""Versão de um valor cifrado, LEGACY_VERSION (formato antigo) ou None (não cifrado)"""
+		if not value or not isinstance(value, str):
+			return None
+
+		if value.startswith(TOKEN_PREFIX) and ":" in value:
+			return value[len(TOKEN_PREFIX):value.index(":")]
+
+		return LEGACY_VERSION if self._legacy_token(value) else None
+
+	def decrypt(self, value):
+		version = self.get_version(value)
+
+		if version == LEGACY_VERSION:
+			token = self._legacy_token(value)
+			# Formato antigo não indica a versão: tentar da mais recente para a mais antiga
+			for fernet_version in sorted(self.fernets, key=cint, reverse=True):
+				try:
+					return self.fernets[fernet_version].decrypt(token).decode('utf-8')
+				except InvalidToken:
+					continue
+			raise InvalidToken
+
+		if version not in self.fernets:
+			raise InvalidToken
+
+		return self.fernets[version].decrypt(value[value.index(":") + 1:].encode('ascii')).decode('utf-8')
+
+	def needs_reencryption(self, value):
+		version = self.get_version(value)
+		return version is not None and version != self.active_version
+
+	@staticmethod
+	def _legacy_token(value):
+		try:
+			token = base64.urlsafe_b64decode(value.encode('ascii'))
+		except (binascii.Error, ValueError, UnicodeEncodeError):
+			return None
+
+		# Tokens Fernet começam pelo byte de versão 0x80
+		return token if token[:1] == b'\x80' else None
+
+
+_rings = {}
+
+
+def get_key_config():
+	"""
+	Chaves e versão ativa do site_config (a chave única antiga passa a versão "1";
+	sem nenhuma chave, é gerada e guardada a versão "1")
+	"""
+	keys = dict(frappe.conf.get(KEYS_CONFIG) or {})
+	active_version = str(frappe.conf.get(ACTIVE_VERSION_CONFIG) or "")
+
+	if not keys:
+		legacy_key = frappe.conf.get(LEGACY_KEY_CONFIG)
+		if not legacy_key:
+			legacy_key = generate_secret()
+			save_key_config({"1": legacy_key}, "1")
+		keys = {"1": legacy_key}
+
+	return {str(version): secret for version, secret in keys.items()}, active_version or max(keys, key=cint)
+
+
+def get_key_ring():
+	"""✅ Key ring do site (reconstruído só quando as chaves do site_config mudam)"""
+	keys, active_version = get_key_config()
+	cache_key = (frappe.local.site, active_version, tuple(sorted(keys.items())))
+
+	ring = _rings.get(cache_key)
+	if ring is None:
+		ring = _rings[cache_key] = KeyRing(keys, active_version)
+
+	return ring
+
+
+def generate_secret():
+	"""Novo segredo aleatório"""
+	return base64.urlsafe_b64encode(secrets.token_bytes(32)).decode()
+
+
+def save_key_config(keys, active_version):
+	"""Guardar chaves e versão ativa no site_config.json (e no frappe.conf do processo)"""
+	from frappe.installer import update_site_config
+
+	update_site_config(KEYS_CONFIG, keys)
+	update_site_config(ACTIVE_VERSION_CONFIG, str(active_version))
+	frappe.conf[KEYS_CONFIG] = keys
+	frappe.conf[ACTIVE_VERSION_CONFIG] = str(active_version)
 
 
 class EncryptionUtils:
 	def __init__(self):
-		self.encryption_key = self._get_encryption_key()
-		self.fernet = Fernet(self.encryption_key)
+		self.key_ring = get_key_ring()
+		self.encryption_key = self.key_ring.active_key
+		self.fernet = self.key_ring.active_fernet
 
 	def _get_encryption_key(self):
 		"""
-		Obtém chave de encriptação do site_config.json ou gera uma nova
+		Obtém a chave de encriptação ativa (derivada uma vez por worker)
 		"""
 		try:
-			# Tentar obter chave do site_config
-			site_config = frappe.get_site_config()
-			encryption_key = site_config.get('portugal_compliance_encryption_key')
-
-			if not encryption_key:
-				# Gerar nova chave se não existir
-				encryption_key = self._generate_encryption_key()
-				self._save_encryption_key(encryption_key)
-
-			# Converter para formato Fernet se necessário
-			if isinstance(encryption_key, str):
-				# Derivar chave usando PBKDF2
-				kdf = PBKDF2HMAC(
-					algorithm=hashes.SHA256(),
-					length=32,
-					salt=b'portugal_compliance_salt',
-					iterations=100000,
-				)
-				key = base64.urlsafe_b64encode(kdf.derive(encryption_key.encode()))
-				return key
-
-			return encryption_key
+			return get_key_ring().active_key
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao obter chave de encriptação: {str(e)}", "Encryption Utils")
-			# Usar chave padrão como fallback (não recomendado para produção)
-			return Fernet.generate_key()
+			raise
 
 	def _generate_encryption_key(self):
 		"""
 		Gera nova chave de encriptação segura
 		"""
-		return base64.urlsafe_b64encode(secrets.token_bytes(32)).decode()
-
-	def _save_encryption_key(self, key):
-		"""
-		Salva chave de encriptação no site_config.json
-		"""
-		try:
-			frappe.conf.portugal_compliance_encryption_key = key
-			frappe.conf.save()
-		except Exception as e:
-			frappe.log_error(f"Erro ao salvar chave de encriptação: {str(e)}", "Encryption Utils")
+		return generate_secret()
 
 	def encrypt_data(self, data):
 		"""
@@ -76,11 +206,8 @@ class EncryptionUtils:
 			if not isinstance(data, str):
 				data = str(data)
 
-			# Encriptar dados
-			encrypted_data = self.fernet.encrypt(data.encode('utf-8'))
-
-			# Retornar como string base64
-			return base64.urlsafe_b64encode(encrypted_data).decode('utf-8')
+			# Encriptar com a versão ativa (pcv<versão>:<token>)
+			return self.key_ring.encrypt(data)
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao encriptar dados: {str(e)}", "Encryption Utils")
@@ -94,13 +221,8 @@ class EncryptionUtils:
 			if not encrypted_data:
 				return encrypted_data
 
-			# Decodificar base64
-			encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode('utf-8'))
-
-			# Desencriptar dados
-			decrypted_data = self.fernet.decrypt(encrypted_bytes)
-
-			return decrypted_data.decode('utf-8')
+			# Qualquer versão do key ring (ou formato antigo)
+			return self.key_ring.decrypt(encrypted_data)
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao desencriptar dados: {str(e)}", "Encryption Utils")
@@ -248,17 +370,17 @@ class EncryptionUtils:
 
 	def secure_delete_key(self):
 		"""
-		Remove chave de encriptação de forma segura (para rotação de chaves)
+		Remove as versões de chave antigas (só quando já nenhum valor guardado as usa)
 		"""
 		try:
-			# Remover chave do site_config
-			if hasattr(frappe.conf, 'portugal_compliance_encryption_key'):
-				delattr(frappe.conf, 'portugal_compliance_encryption_key')
-				frappe.conf.save()
+			if count_stale_values():
+				frappe.log_error("Ainda existem valores cifrados com chaves antigas - re-cifrar primeiro",
+								 "Encryption Utils")
+				return False
 
-			# Limpar variáveis da memória
-			self.encryption_key = None
-			self.fernet = None
+			keys, active_version = get_key_config()
+			save_key_config({active_version: keys[active_version]}, active_version)
+			self.key_ring = get_key_ring()
 
 			return True
 
@@ -268,20 +390,24 @@ class EncryptionUtils:
 
 	def rotate_encryption_key(self):
 		"""
-		Rotaciona chave de encriptação (gera nova chave)
+		Rotaciona chave de encriptação: nova versão ativa, versões antigas mantidas para
+		decifrar, re-cifra dos valores guardados em background
 		"""
 		try:
-			# Gerar nova chave
-			new_key = self._generate_encryption_key()
+			keys, active_version = get_key_config()
+			new_version = str(max(cint(version) for version in keys) + 1)
+			keys[new_version] = self._generate_encryption_key()
 
-			# Salvar nova chave
-			self._save_encryption_key(new_key)
+			save_key_config(keys, new_version)
 
 			# Atualizar instância atual
-			self.encryption_key = self._get_encryption_key()
-			self.fernet = Fernet(self.encryption_key)
+			self.key_ring = get_key_ring()
+			self.encryption_key = self.key_ring.active_key
+			self.fernet = self.key_ring.active_fernet
 
-			frappe.logger().info("Chave de encriptação rotacionada com sucesso")
+			enqueue_reencryption()
+
+			frappe.logger().info(f"Chave de encriptação rotacionada com sucesso (versão {new_version})")
 			return True
 
 		except Exception as e:
@@ -320,6 +446,7 @@ class EncryptionUtils:
 
 
 # Funções utilitárias globais
+# (EncryptionUtils() é barato: o key ring e as chaves derivadas estão em cache no worker)
 def encrypt_portugal_data(data):
 	"""
 	Função global para encriptar dados relacionados com Portugal Compliance
@@ -368,6 +495,106 @@ def verify_document_hash(document_content, stored_hash):
 	return utils.verify_document_integrity(document_content, stored_hash)
 
 
+# ========== RE-CIFRA EM BACKGROUND ==========
+
+def _iter_encrypted_values(doctype, fieldname, chunk_size=REENCRYPT_CHUNK_SIZE):
+	"""Blocos (name, valor) paginados por chave (name > último)"""
+	last_name = ""
+
+	while True:
+		rows = frappe.db.sql(f"""
+			SELECT name, `{fieldname}`
+			FROM `tab{doctype}`
+			WHERE name > %(last_name)s AND IFNULL(`{fieldname}`, '') != ''
+			ORDER BY name
+			LIMIT %(limit)s
+		""", {"last_name": last_name, "limit": chunk_size})
+
+		if not rows:
+			break
+
+		yield rows
+
+		if len(rows) < chunk_size:
+			break
+
+		last_name = rows[-1][0]
+
+
+def _get_encrypted_fields():
+	return [
+		(doctype, fieldname) for doctype, fieldname in ENCRYPTED_FIELDS
+		if frappe.db.table_exists(doctype) and frappe.db.has_column(doctype, fieldname)
+	]
+
+
+def reencrypt_stored_values(chunk_size=REENCRYPT_CHUNK_SIZE):
+	"""
+	✅ Job: re-cifrar com a versão ativa os valores guardados com versões antigas
+
+	Um commit por bloco; valores não cifrados (texto simples) são ignorados.
+
+	Returns:
+		dict: {"doctype.campo": valores re-cifrados}
+	"""
+	ring = get_key_ring()
+	summary = {}
+
+	for doctype, fieldname in _get_encrypted_fields():
+		rewritten = 0
+		for rows in _iter_encrypted_values(doctype, fieldname, cint(chunk_size) or REENCRYPT_CHUNK_SIZE):
+			for name, value in rows:
+				if not ring.needs_reencryption(value):
+					continue
+
+				try:
+					frappe.db.set_value(doctype, name, fieldname, ring.encrypt(ring.decrypt(value)),
+										update_modified=False)
+					rewritten += 1
+				except InvalidToken:
+					frappe.log_error(f"Valor cifrado sem chave disponível: {doctype} {name}.{fieldname}",
+									 "Encryption Utils")
+
+			frappe.db.commit()
+
+		summary[f"{doctype}.{fieldname}"] = rewritten
+
+	frappe.logger().info(f"Re-cifra concluída (versão {ring.active_version}): {summary}")
+	return summary
+
+
+def count_stale_values():
+	"""Valores guardados ainda cifrados com versões não ativas"""
+	ring = get_key_ring()
+	return sum(
+		1
+		for doctype, fieldname in _get_encrypted_fields()
+		for rows in _iter_encrypted_values(doctype, fieldname)
+		for _name, value in rows
+		if ring.needs_reencryption(value)
+	)
+
+
+def enqueue_reencryption():
+	frappe.enqueue(
+		"portugal_compliance.utils.encryption_utils.reencrypt_stored_values",
+		queue="long",
+		timeout=3600,
+		job_id="portugal_compliance_reencrypt_stored_values",
+		deduplicate=True,
+		enqueue_after_commit=True
+	)
+
+
+@frappe.whitelist()
+def start_reencryption():
+	"""✅ API: Re-cifrar em background os valores com chaves antigas"""
+	frappe.only_for(["System Manager"])
+
+	enqueue_reencryption()
+	return {"success": True, "message": _("Re-cifra agendada")}
+
+
 # Hook para inicialização do módulo
 def setup_encryption():
 	"""
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Fiscal Calendar - Portugal Compliance
+Calendário fiscal em memória por empresa (por worker)
+✅ TRÊS CONSULTAS POR EMPRESA: Anos fiscais, Period Closing Voucher submetidos e
+   Accounting Period com documentos fechados - carregados uma vez
+✅ COERENTE: Recarregado quando a versão "fiscal" da compliance_cache muda
+   (doc_events de Fiscal Year, Period Closing Voucher e Accounting Period, com a
+   versão incrementada após o commit) ou passados CALENDAR_MAX_AGE segundos
+✅ INTERVALOS: "Que ano fiscal / período fechado?" por pesquisa binária, sem ir à BD -
+   importações em massa de Stock Entry / Journal Entry não pagam consultas por linha
+
+Mesma semântica de erpnext.accounts.utils.get_fiscal_year: anos fiscais desativados
+são ignorados e um ano sem empresas associadas aplica-se a todas.
+"""
+
+import threading
+import time
+from bisect import bisect_right
+
+import frappe
+from frappe.utils import getdate
+
+from portugal_compliance.utils import compliance_cache
+
+# Salvaguarda: um período fechado noutro worker é visto no máximo após este tempo
+CALENDAR_MAX_AGE = 300
+
+
+class FiscalCalendar:
+	"""Intervalos imutáveis de uma empresa (anos fiscais e períodos contabilísticos)"""
+
+	def __init__(self, company, fiscal_years, closed_fiscal_years, accounting_periods):
+		self.company = company
+		self.loaded_at = time.monotonic()
+
+		self.fiscal_years = sorted(
+			(frappe._dict(name=fy.name, year_start_date=getdate(fy.year_start_date),
+						  year_end_date=getdate(fy.year_end_date)) for fy in fiscal_years),
+			key=lambda fy: fy.year_start_date)
+		self.fiscal_year_starts = [fy.year_start_date for fy in self.fiscal_years]
+		self.closed_fiscal_years = set(closed_fiscal_years)
+
+		periods = {}
+		for row in accounting_periods:
+			period = periods.setdefault(row.name, frappe._dict(
+				name=row.name, start_date=getdate(row.start_date), end_date=getdate(row.end_date),
+				closed_doctypes=set()))
+			if row.document_type and row.closed:
+				period.closed_doctypes.add(row.document_type)
+
+		self.accounting_periods = sorted(periods.values(), key=lambda period: period.start_date)
+		self.accounting_period_starts = [period.start_date for period in self.accounting_periods]
+
+	def get_fiscal_year(self, date):
+		"""Ano fiscal da data (o de início mais recente que a contém) ou None"""
+		date = getdate(date)
+		index = bisect_right(self.fiscal_year_starts, date)
+		while index > 0:
+			index -= 1
+			fiscal_year = self.fiscal_years[index]
+			if fiscal_year.year_end_date >= date:
+				return fiscal_year
+
+		return None
+
+	def get_accounting_period(self, date, doctype=None):
+		"""Accounting Period que contém a data (com o doctype fechado, se indicado) ou None"""
+		date = getdate(date)
+		for index in range(bisect_right(self.accounting_period_starts, date) - 1, -1, -1):
+			period = self.accounting_periods[index]
+			if period.end_date >= date and (not doctype or doctype in period.closed_doctypes):
+				return period
+
+		return None
+
+	def get_closing(self, date, doctype=None):
+		"""
+		Motivo pelo qual a data está fechada para o doctype (ou None se aberta)
+
+		Returns:
+			dict | None: {"reason": "fiscal_year", "fiscal_year"} ou
+						 {"reason": "accounting_period", "accounting_period"}
+		"""
+		fiscal_year = self.get_fiscal_year(date)
+		if fiscal_year and fiscal_year.name in self.closed_fiscal_years:
+			return {"reason": "fiscal_year", "fiscal_year": fiscal_year.name}
+
+		if doctype:
+			period = self.get_accounting_period(date, doctype)
+			if period:
+				return {"reason": "accounting_period", "accounting_period": period.name}
+
+		return None
+
+
+_state = {"version": None, "calendars": {}}
+_lock = threading.Lock()
+
+
+def load_calendar(company):
+	"""Carregar o calendário de uma empresa (3 consultas)"""
+	fiscal_years = frappe.db.sql("""
+		SELECT fy.name, fy.year_start_date, fy.year_end_date
+		FROM `tabFiscal Year` fy
+		WHERE IFNULL(fy.disabled, 0) = 0
+		  AND (
+			NOT EXISTS (SELECT 1 FROM `tabFiscal Year Company` fyc WHERE fyc.parent = fy.name)
+			OR EXISTS (SELECT 1 FROM `tabFiscal Year Company` fyc
+					   WHERE fyc.parent = fy.name AND fyc.company = %(company)s)
+		  )
+	""", {"company": company}, as_dict=True)
+
+	closed_fiscal_years = frappe.get_all(
+		"Period Closing Voucher",
+		filters={"company": company, "docstatus": 1},
+		pluck="fiscal_year"
+	)
+
+	accounting_periods = frappe.db.sql("""
+		SELECT ap.name, ap.start_date, ap.end_date, cd.document_type, cd.closed
+		FROM `tabAccounting Period` ap
+		LEFT JOIN `tabClosed Document` cd ON cd.parent = ap.name AND cd.parenttype = 'Accounting Period'
+		WHERE ap.company = %(company)s
+	""", {"company": company}, as_dict=True)
+
+	return FiscalCalendar(company, fiscal_years, closed_fiscal_years, accounting_periods)
+
+
+def get_calendar(company):
+	"""Calendário atual da empresa (recarregado quando a versão "fiscal" mudou ou expirou)"""
+	if compliance_cache.is_pending("fiscal"):
+		# Calendário alterado nesta transação: leitura própria, não partilhada
+		return load_calendar(company)
+
+	version = compliance_cache.get_version("fiscal")
+
+	with _lock:
+		if _state["version"] != version:
+			_state["version"] = version
+			_state["calendars"] = {}
+
+		calendar = _state["calendars"].get(company)
+
+	if calendar is None or time.monotonic() - calendar.loaded_at >= CALENDAR_MAX_AGE:
+		calendar = load_calendar(company)
+		with _lock:
+			if _state["version"] == version:
+				_state["calendars"][company] = calendar
+
+	return calendar
+
+
+def clear_calendars():
+	with _lock:
+		_state["version"] = None
+		_state["calendars"] = {}
+
+
+# ========== RESOLUÇÃO ==========
+
+def get_fiscal_year(date, company):
+	"""
+	✅ Ano fiscal da data para a empresa
+
+	Returns:
+		tuple | None: (nome, início, fim) - o mesmo formato de erpnext get_fiscal_year
+	"""
+	if not date or not company:
+		return None
+
+	fiscal_year = get_calendar(company).get_fiscal_year(date)
+	if not fiscal_year:
+		return None
+
+	return fiscal_year.name, fiscal_year.year_start_date, fiscal_year.year_end_date
+
+
+def get_period_closing(date, company, doctype=None):
+	"""✅ Motivo de fecho da data para a empresa/doctype (None se o período estiver aberto)"""
+	if not date or not company:
+		return None
+
+	return get_calendar(company).get_closing(date, doctype)
+
+
+def is_period_closed(date, company, doctype=None):
+	"""✅ Data num ano fiscal fechado (Period Closing Voucher) ou num Accounting Period fechado ao doctype"""
+	return bool(get_period_closing(date, company, doctype))
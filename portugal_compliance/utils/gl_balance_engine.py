@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+GL Balance Engine - Portugal Compliance
+Saldos de abertura/fecho do SAF-T sem varrer o GL Entry desde o início
+✅ AGREGADO: `tabGL Monthly Balance` guarda débito/crédito por (empresa, conta, mês)
+✅ INCREMENTAL: Construído uma vez e atualizado a partir dos GL Entries novos
+   (marca de água creation/name por empresa, em tabDefaultValue)
+✅ UMA CONSULTA: Abertura e fecho de qualquer período numa consulta agrupada
+   (meses agregados + GL Entries ainda não agregados + meses parciais nas pontas)
+✅ CANCELAMENTOS: Os GL Entries de estorno somam-se aos originais (saldo líquido zero),
+   por isso is_cancelled não é filtrado e nenhuma linha precisa de ser revista
+
+Limitação: GL Entries apagados (repost de stock/contabilidade) não são vistos pelo
+modo incremental - usar verify_gl_balances/rebuild_gl_balances para os meses afetados.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_months, add_to_date, cint, flt, get_first_day, get_last_day, getdate, now_datetime
+
+from portugal_compliance.utils.db_indexes import ensure_indexes
+
+BALANCE_DOCTYPE = "GL Monthly Balance"
+
+WATERMARK_KEY_PREFIX = "portugal_compliance_gl_balance_watermark:"
+
+DEFAULT_BATCH_SIZE = 10000
+
+# GL Entries mais recentes que isto ficam por agregar (transações ainda abertas
+# podem gravar creation anterior à marca de água); são lidos diretamente na consulta
+SETTLE_SECONDS = 300
+
+MONTH_START_SQL = "DATE_SUB({column}, INTERVAL DAYOFMONTH({column}) - 1 DAY)"
+
+
+# ========== ESQUEMA ==========
+
+GL_BALANCE_INDEXES = {
+	"GL Entry": (["company", "creation"], ["company", "posting_date"]),
+	BALANCE_DOCTYPE: (["company", "period_start"],)
+}
+
+
+def ensure_balance_schema():
+	"""Índices usados pelo modo incremental e pela consulta de saldos"""
+	ensure_indexes(GL_BALANCE_INDEXES)
+
+
+def make_row_name(company, account, period_start):
+	"""Nome determinístico da linha (permite INSERT ... ON DUPLICATE KEY UPDATE)"""
+	return hashlib.md5(f"{company}|{account}|{getdate(period_start)}".encode("utf-8")).hexdigest()
+
+
+# ========== MARCA DE ÁGUA ==========
+
+def get_watermark(company):
+	"""Último GL Entry agregado: {"creation": ..., "name": ...} ou None se nunca construído"""
+	value = frappe.db.get_global(f"{WATERMARK_KEY_PREFIX}{company}")
+	return json.loads(value) if value else None
+
+
+def _set_watermark(company, creation, name):
+	frappe.db.set_global(f"{WATERMARK_KEY_PREFIX}{company}",
+						 json.dumps({"creation": str(creation), "name": name}))
+
+
+def _clear_watermark(company):
+	frappe.db.set_global(f"{WATERMARK_KEY_PREFIX}{company}", None)
+
+
+def _after_watermark_condition(alias=""):
+	prefix = f"{alias}." if alias else ""
+	return (f"({prefix}creation > %(watermark_creation)s"
+			f" OR ({prefix}creation = %(watermark_creation)s AND {prefix}name > %(watermark_name)s))")
+
+
+def _lock(company):
+	from frappe.utils.synchronization import filelock
+
+	return filelock(f"pt_gl_balance_{frappe.scrub(company)}", timeout=600)
+
+
+# ========== CONSTRUÇÃO ==========
+
+def build_gl_balances(company, from_date=None):
+	"""
+	✅ (Re)construir o agregado de uma empresa a partir de from_date (ou do início)
+
+	Os meses >= from_date são apagados e recalculados no servidor com um único
+	INSERT ... SELECT agrupado, até à marca de água atual.
+	"""
+	ensure_balance_schema()
+
+	with _lock(company):
+		watermark = get_watermark(company)
+		if not watermark:
+			# Primeira construção: sempre completa
+			from_date = None
+		if not from_date:
+			watermark = _latest_settled_entry(company)
+
+		period_start = get_first_day(from_date) if from_date else None
+		delete_filters = {"company": company}
+		if period_start:
+			delete_filters["period_start"] = (">=", period_start)
+		frappe.db.delete(BALANCE_DOCTYPE, delete_filters)
+
+		if watermark:
+			_insert_grouped(company, watermark, period_start)
+			_set_watermark(company, watermark["creation"], watermark["name"])
+		else:
+			_clear_watermark(company)
+
+		frappe.db.commit()
+
+	return get_balance_status(company)
+
+
+def rebuild_gl_balances(company, from_date=None):
+	"""Alias explícito para reconstrução (ex.: após repost que apagou GL Entries)"""
+	return build_gl_balances(company, from_date=from_date)
+
+
+def _latest_settled_entry(company):
+	row = frappe.db.sql("""
+		SELECT creation, name
+		FROM `tabGL Entry`
+		WHERE company = %(company)s AND creation <= %(settled)s
+		ORDER BY creation DESC, name DESC
+		LIMIT 1
+	""", {"company": company, "settled": _settled_before()}, as_dict=True)
+
+	return {"creation": str(row[0].creation), "name": row[0].name} if row else None
+
+
+def _settled_before():
+	return add_to_date(now_datetime(), seconds=-SETTLE_SECONDS)
+
+
+def _insert_grouped(company, watermark, period_start=None):
+	month_start = MONTH_START_SQL.format(column="posting_date")
+	period_condition = "AND posting_date >= %(period_start)s" if period_start else ""
+
+	frappe.db.sql(f"""
+		INSERT INTO `tab{BALANCE_DOCTYPE}`
+			(name, creation, modified, owner, modified_by, docstatus,
+			 company, account, period_start, debit, credit, entry_count)
+		SELECT MD5(CONCAT(company, '|', account, '|', {month_start})),
+			NOW(), NOW(), 'Administrator', 'Administrator', 0,
+			company, account, {month_start}, SUM(debit), SUM(credit), COUNT(*)
+		FROM `tabGL Entry`
+		WHERE company = %(company)s
+			AND (creation < %(watermark_creation)s
+				OR (creation = %(watermark_creation)s AND name <= %(watermark_name)s))
+			{period_condition}
+		GROUP BY company, account, {month_start}
+	""", {
+		"company": company,
+		"period_start": period_start,
+		"watermark_creation": watermark["creation"],
+		"watermark_name": watermark["name"]
+	})
+
+
+# ========== ATUALIZAÇÃO INCREMENTAL ==========
+
+def refresh_gl_balances(company, batch_size=DEFAULT_BATCH_SIZE):
+	"""
+	✅ Agregar os GL Entries criados depois da marca de água
+
+	Lê em lotes por (creation, name), soma por (conta, mês) em Python e aplica
+	com um único INSERT ... ON DUPLICATE KEY UPDATE por lote. Agregado e marca
+	de água avançam na mesma transação.
+
+	Returns:
+		int: GL Entries agregados
+	"""
+	if not get_watermark(company):
+		return build_gl_balances(company)["aggregated_entries"]
+
+	processed = 0
+	settled = _settled_before()
+
+	with _lock(company):
+		while True:
+			watermark = get_watermark(company)
+			entries = frappe.db.sql(f"""
+				SELECT name, creation, account, posting_date, debit, credit
+				FROM `tabGL Entry`
+				WHERE company = %(company)s
+					AND {_after_watermark_condition()}
+					AND creation <= %(settled)s
+				ORDER BY creation, name
+				LIMIT %(batch_size)s
+			""", {
+				"company": company,
+				"settled": settled,
+				"batch_size": cint(batch_size),
+				"watermark_creation": watermark["creation"],
+				"watermark_name": watermark["name"]
+			}, as_dict=True)
+
+			if not entries:
+				break
+
+			_apply_deltas(company, aggregate_entries(entries))
+			_set_watermark(company, entries[-1].creation, entries[-1].name)
+			frappe.db.commit()
+
+			processed += len(entries)
+			if len(entries) < cint(batch_size):
+				break
+
+	return processed
+
+
+def aggregate_entries(entries):
+	"""Somar GL Entries por (conta, primeiro dia do mês)"""
+	totals = {}
+	for entry in entries:
+		key = (entry["account"], get_first_day(entry["posting_date"]))
+		total = totals.setdefault(key, [0.0, 0.0, 0])
+		total[0] += flt(entry["debit"])
+		total[1] += flt(entry["credit"])
+		total[2] += 1
+
+	return totals
+
+
+def _apply_deltas(company, totals):
+	if not totals:
+		return
+
+	values = []
+	params = {"company": company}
+	for index, ((account, period_start), (debit, credit, count)) in enumerate(totals.items()):
+		values.append(f"(%(name_{index})s, NOW(), NOW(), 'Administrator', 'Administrator', 0, "
+					  f"%(company)s, %(account_{index})s, %(period_{index})s, "
+					  f"%(debit_{index})s, %(credit_{index})s, %(count_{index})s)")
+		params.update({
+			f"name_{index}": make_row_name(company, account, period_start),
+			f"account_{index}": account,
+			f"period_{index}": period_start,
+			f"debit_{index}": debit,
+			f"credit_{index}": credit,
+			f"count_{index}": count
+		})
+
+	frappe.db.sql(f"""
+		INSERT INTO `tab{BALANCE_DOCTYPE}`
+			(name, creation, modified, owner, modified_by, docstatus,
+			 company, account, period_start, debit, credit, entry_count)
+		VALUES {", ".join(values)}
+		ON DUPLICATE KEY UPDATE
+			debit = debit + VALUES(debit),
+			credit = credit + VALUES(credit),
+			entry_count = entry_count + VALUES(entry_count),
+			modified = NOW()
+	""", params)
+
+
+# ========== CONSULTA ==========
+
+def get_period_bounds(from_date, to_date):
+	"""
+	Meses usados do agregado para um período
+
+	Returns:
+		tuple: (opening_month, closing_month)
+		- abertura: meses agregados < opening_month + GL [opening_month, from_date)
+		- fecho: meses agregados < closing_month + GL [closing_month, to_date]
+	"""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+
+	opening_month = get_first_day(from_date)
+	if to_date == get_last_day(to_date):
+		closing_month = add_months(get_first_day(to_date), 1)
+	else:
+		closing_month = get_first_day(to_date)
+
+	return opening_month, closing_month
+
+
+def get_account_balances(company, from_date, to_date, refresh=True):
+	"""
+	✅ Saldos de abertura (antes de from_date) e fecho (até to_date) por conta
+
+	Saldo = débito - crédito (positivo devedor, negativo credor).
+
+	Returns:
+		dict: {account: {"opening_balance": float, "closing_balance": float}}
+	"""
+	if refresh:
+		refresh_gl_balances(company)
+
+	watermark = get_watermark(company)
+	if not watermark:
+		# Empresa sem GL Entries assentes: só as pontas/cauda lidas diretamente
+		watermark = {"creation": "1900-01-01 00:00:00", "name": ""}
+
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	opening_month, closing_month = get_period_bounds(from_date, to_date)
+
+	rows = frappe.db.sql(f"""
+		SELECT account, SUM(opening) AS opening_balance, SUM(closing) AS closing_balance
+		FROM (
+			SELECT account,
+				CASE WHEN period_start < %(opening_month)s THEN debit - credit ELSE 0 END AS opening,
+				debit - credit AS closing
+			FROM `tab{BALANCE_DOCTYPE}`
+			WHERE company = %(company)s AND period_start < %(closing_month)s
+
+			UNION ALL
+
+			SELECT account,
+				CASE WHEN posting_date < %(opening_month)s THEN debit - credit ELSE 0 END,
+				debit - credit
+			FROM `tabGL Entry`
+			WHERE company = %(company)s
+				AND posting_date < %(closing_month)s
+				AND {_after_watermark_condition()}
+
+			UNION ALL
+
+			SELECT account, debit - credit, 0
+			FROM `tabGL Entry`
+			WHERE company = %(company)s
+				AND posting_date >= %(opening_month)s AND posting_date < %(from_date)s
+
+			UNION ALL
+
+			SELECT account, 0, debit - credit
+			FROM `tabGL Entry`
+			WHERE company = %(company)s
+				AND posting_date >= %(closing_month)s AND posting_date <= %(to_date)s
+		) balances
+		GROUP BY account
+	""", {
+		"company": company,
+		"from_date": from_date,
+		"to_date": to_date,
+		"opening_month": opening_month,
+		"closing_month": closing_month,
+		"watermark_creation": watermark["creation"],
+		"watermark_name": watermark["name"]
+	}, as_dict=True)
+
+	return {
+		row.account: {
+			"opening_balance": flt(row.opening_balance, 2),
+			"closing_balance": flt(row.closing_balance, 2)
+		}
+		for row in rows
+	}
+
+
+def roll_up_balances(accounts, balances):
+	"""
+	✅ Somar os saldos das contas de movimento nas contas-grupo ascendentes
+
+	Args:
+		accounts: lista de dicts com name e parent_account
+		balances: resultado de get_account_balances
+
+	Returns:
+		dict: {account: {"opening_balance", "closing_balance"}} para todas as contas
+	"""
+	parents = {account["name"]: account.get("parent_account") for account in accounts}
+	totals = {name: {"opening_balance": 0.0, "closing_balance": 0.0} for name in parents}
+
+	for account, balance in balances.items():
+		current, visited = account, set()
+		while current and current not in visited:
+			visited.add(current)
+			total = totals.setdefault(current, {"opening_balance": 0.0, "closing_balance": 0.0})
+			total["opening_balance"] += balance["opening_balance"]
+			total["closing_balance"] += balance["closing_balance"]
+			current = parents.get(current)
+
+	for total in totals.values():
+		total["opening_balance"] = flt(total["opening_balance"], 2)
+		total["closing_balance"] = flt(total["closing_balance"], 2)
+
+	return totals
+
+
+# ========== VERIFICAÇÃO ==========
+
+def verify_gl_balances(company, from_date=None, to_date=None):
+	"""
+	✅ Comparar o agregado com o GL Entry mês a mês (até à marca de água)
+
+	Returns:
+		list: meses divergentes [{"period_start", "expected", "stored"}]
+	"""
+	watermark = get_watermark(company)
+	if not watermark:
+		return []
+
+	month_start = MONTH_START_SQL.format(column="posting_date")
+	params = {
+		"company": company,
+		"from_date": get_first_day(from_date) if from_date else None,
+		"to_date": getdate(to_date) if to_date else None,
+		"watermark_creation": watermark["creation"],
+		"watermark_name": watermark["name"]
+	}
+
+	expected = frappe.db.sql(f"""
+		SELECT {month_start} AS period_start, SUM(debit) AS debit, SUM(credit) AS credit, COUNT(*) AS entry_count
+		FROM `tabGL Entry`
+		WHERE company = %(company)s
+			AND NOT {_after_watermark_condition()}
+			{"AND posting_date >= %(from_date)s" if from_date else ""}
+			{"AND posting_date <= %(to_date)s" if to_date else ""}
+		GROUP BY {month_start}
+	""", params, as_dict=True)
+
+	stored = frappe.db.sql(f"""
+		SELECT period_start, SUM(debit) AS debit, SUM(credit) AS credit, SUM(entry_count) AS entry_count
+		FROM `tab{BALANCE_DOCTYPE}`
+		WHERE company = %(company)s
+			{"AND period_start >= %(from_date)s" if from_date else ""}
+			{"AND period_start <= %(to_date)s" if to_date else ""}
+		GROUP BY period_start
+	""", params, as_dict=True)
+
+	def summary(row):
+		return (flt(row.debit, 2), flt(row.credit, 2), cint(row.entry_count))
+
+	expected_by_month = {getdate(row.period_start): summary(row) for row in expected}
+	stored_by_month = {getdate(row.period_start): summary(row) for row in stored}
+
+	return [
+		{
+			"period_start": month,
+			"expected": expected_by_month.get(month),
+			"stored": stored_by_month.get(month)
+		}
+		for month in sorted(set(expected_by_month) | set(stored_by_month))
+		if expected_by_month.get(month) != stored_by_month.get(month)
+	]
+
+
+def get_balance_status(company):
+	"""Estado do agregado de uma empresa"""
+	stats = frappe.db.sql(f"""
+		SELECT COUNT(*) AS rows_count, COALESCE(SUM(entry_count), 0) AS aggregated_entries,
+			MIN(period_start) AS first_period, MAX(period_start) AS last_period
+		FROM `tab{BALANCE_DOCTYPE}`
+		WHERE company = %(company)s
+	""", {"company": company}, as_dict=True)[0]
+
+	return {
+		"company": company,
+		"watermark": get_watermark(company),
+		"rows": cint(stats.rows_count),
+		"aggregated_entries": cint(stats.aggregated_entries),
+		"first_period": stats.first_period,
+		"last_period": stats.last_period
+	}
+
+
+def refresh_all_companies():
+	"""Tarefa diária: avançar o agregado das empresas portuguesas já construídas"""
+	for company in frappe.get_all("Company", filters={"country": "Portugal"}, pluck="name"):
+		if not get_watermark(company):
+			continue
+
+		try:
+			refresh_gl_balances(company)
+		except Exception as e:
+			frappe.log_error(f"Error refreshing GL balances for {company}: {str(e)}",
+							 "GL Balance Engine")
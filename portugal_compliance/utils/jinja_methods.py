@@ -15,13 +15,13 @@ from frappe import _
 from frappe.utils import cint, flt, getdate, formatdate, fmt_money, now, today
 import re
 from datetime import datetime, date
-import qrcode
 import io
 import base64
-from PIL import Image
 import hashlib
 import json
 
+from portugal_compliance.utils.nif_validator import validate_nif
+
 
 # ========== MÉTODOS ATCUD CERTIFICADOS CORRIGIDOS ==========
 
@@ -514,32 +514,7 @@ def validate_portuguese_nif(nif):
 	"""
 	✅ CORRIGIDO: Validar NIF português conforme algoritmo oficial
 	"""
-	try:
-		if not nif:
-			return False
-
-		# Remover caracteres não numéricos
-		nif_clean = re.sub(r'[^\d]', '', str(nif))
-
-		# Verificar se tem 9 dígitos
-		if len(nif_clean) != 9:
-			return False
-
-		# Verificar se começa com dígito válido
-		if nif_clean[0] not in '123456789':
-			return False
-
-		# ✅ ALGORITMO OFICIAL: Calcular dígito de controlo
-		check_sum = 0
-		for i in range(8):
-			check_sum += int(nif_clean[i]) * (9 - i)
-
-		remainder = check_sum % 11
-		check_digit = 0 if remainder < 2 else 11 - remainder
-
-		return int(nif_clean[8]) == check_digit
-	except Exception:
-		return False
+	return validate_nif(nif)
 
 
 def get_company_nif(company):
@@ -931,6 +906,10 @@ def generate_qr_code_image(qr_data, size=200):
 		if not qr_data:
 			return ""
 
+		# qrcode/PIL só são carregados na primeira impressão com QR code
+		import qrcode
+		from PIL import Image
+
 		# Gerar QR Code
 		qr = qrcode.QRCode(
 			version=1,
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Keyset Pagination - Portugal Compliance
+Paginação por cursor para os relatórios de séries, ATCUD e SAF-T
+✅ CURSOR: (campo de ordenação, name) da última linha - cada página é uma leitura
+   de índice com LIMIT, sem OFFSET (tempo constante na página 1 ou na 10000)
+✅ ORDENAÇÃO: Apenas colunas indexadas (ver REPORT_INDEXES)
+✅ PROJEÇÃO: O cliente escolhe as colunas (dentro das permitidas por relatório)
+✅ TOTAL: Estimativa sem COUNT(*) à tabela inteira - estatísticas da tabela sem
+   filtros, contagem limitada a COUNT_CAP linhas com filtros
+✅ CAMADAS: Vários doctypes percorridos em sequência (ATCUD Log quente/frio)
+"""
+
+import base64
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from portugal_compliance.utils.db_indexes import ensure_indexes
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+# Acima disto o total com filtros é devolvido como "mais de COUNT_CAP"
+COUNT_CAP = 1000
+
+# Índices que suportam a ordenação (creation, name) com e sem filtro por empresa.
+# O name (chave primária) está implícito em cada índice secundário InnoDB.
+REPORT_INDEXES = {
+	"ATCUD Log": (["creation"], ["company", "creation"]),
+	"ATCUD Log Archive": (["creation"], ["company", "creation"]),
+	"SAF-T Export Log": (["creation"], ["company", "creation"]),
+	"Portugal Series Configuration": (["creation"], ["company", "creation"])
+}
+
+
+def ensure_report_indexes():
+	"""Criar os índices usados pela paginação dos relatórios"""
+	ensure_indexes(REPORT_INDEXES)
+
+
+# ========== PARÂMETROS ==========
+
+def parse_sort(sort_by, sort_order, sortable_fields):
+	"""✅ Validar a ordenação pedida (apenas colunas indexadas)"""
+	sort_by = sort_by or sortable_fields[0]
+	if sort_by not in sortable_fields:
+		frappe.throw(_("Sorting is only allowed on indexed columns: {0}").format(", ".join(sortable_fields)))
+
+	sort_order = (sort_order or "desc").lower()
+	if sort_order not in ("asc", "desc"):
+		frappe.throw(_("Invalid sort order: {0}").format(sort_order))
+
+	return sort_by, sort_order
+
+
+def parse_fields(fields, allowed_fields, default_fields):
+	"""✅ Projeção de colunas: lista (ou JSON) restrita às colunas permitidas"""
+	if isinstance(fields, str):
+		fields = frappe.parse_json(fields)
+
+	if not fields:
+		return list(default_fields)
+
+	invalid = [field for field in fields if field not in allowed_fields]
+	if invalid:
+		frappe.throw(_("Fields not available in this report: {0}").format(", ".join(invalid)))
+
+	return list(fields)
+
+
+def get_page_length(page_length):
+	return min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+
+
+def to_conditions(filters):
+	"""Filtros (dict ou lista) como lista de condições [campo, operador, valor]"""
+	if isinstance(filters, str):
+		filters = frappe.parse_json(filters)
+
+	if isinstance(filters, dict):
+		return [
+			[key, *value] if isinstance(value, (list, tuple)) else [key, "=", value]
+			for key, value in filters.items()
+		]
+
+	return [list(condition) for condition in (filters or [])]
+
+
+# ========== CURSOR ==========
+
+def encode_cursor(sort_by, sort_order, row, tier=0):
+	"""Cursor opaco com a posição da última linha devolvida"""
+	payload = [sort_by, sort_order, tier, row.get(sort_by), row.get("name")]
+	return base64.urlsafe_b64encode(json.dumps(payload, default=str).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+	"""
+	✅ Ler um cursor emitido por encode_cursor() para a mesma ordenação
+
+	Returns:
+		dict: {"tier", "value", "name"}
+	"""
+	try:
+		payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+		cursor_sort_by, cursor_sort_order, tier, value, name = payload
+	except Exception:
+		frappe.throw(_("Invalid pagination cursor"))
+
+	if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order):
+		frappe.throw(_("Pagination cursor does not match the requested sorting"))
+
+	return {"tier": cint(tier), "value": value, "name": name}
+
+
+def get_keyset_conditions(sort_by, sort_order, position):
+	"""
+	Condição "depois da posição do cursor" em filtros do frappe:
+	sort <= v AND (sort < v OR name < n)   (desc; > para asc)
+
+	Returns:
+		tuple: (condições AND, condições OR ou None)
+	"""
+	operator = "<" if sort_order == "desc" else ">"
+
+	if sort_by == "name":
+		return [["name", operator, position["name"]]], None
+
+	return (
+		[[sort_by, operator + "=", position["value"]]],
+		[[sort_by, operator, position["value"]], ["name", operator, position["name"]]]
+	)
+
+
+# ========== PÁGINA ==========
+
+def get_page(doctypes, filters=None, fields=None, sort_by="creation", sort_order="desc", cursor=None,
+			 page_length=DEFAULT_PAGE_LENGTH, with_total=None):
+	"""
+	✅ Obter uma página ordenada por (sort_by, name) a partir do cursor
+
+	doctypes: doctype ou lista de doctypes percorridos por esta ordem; todas as
+	linhas de um precedem as do seguinte na ordenação pedida (camadas ATCUD Log).
+	Permissões aplicadas via frappe.get_list.
+	with_total: incluir a estimativa do total (por omissão, só na primeira página)
+
+	Returns:
+		dict: {"data", "has_more", "next_cursor", "sort_by", "sort_order", "page_length", "total"?}
+	"""
+	doctypes = [doctypes] if isinstance(doctypes, str) else list(doctypes)
+	page_length = get_page_length(page_length)
+	conditions = to_conditions(filters)
+	query_fields = list(dict.fromkeys([*(fields or ["name"]), "name", sort_by]))
+
+	if sort_by == "name":
+		order_by = f"name {sort_order}"
+	else:
+		order_by = f"{sort_by} {sort_order}, name {sort_order}"
+
+	position = decode_cursor(cursor, sort_by, sort_order) if cursor else None
+	tier = position["tier"] if position else 0
+	rows = []
+
+	# Uma linha a mais indica que existe página seguinte
+	while tier < len(doctypes) and len(rows) <= page_length:
+		tier_conditions = list(conditions)
+		or_conditions = None
+		if position and position["tier"] == tier:
+			keyset_conditions, or_conditions = get_keyset_conditions(sort_by, sort_order, position)
+			tier_conditions.extend(keyset_conditions)
+
+		batch = frappe.get_list(doctypes[tier], filters=tier_conditions, or_filters=or_conditions,
+								fields=query_fields, order_by=order_by,
+								limit_page_length=page_length + 1 - len(rows))
+		rows.extend((tier, row) for row in batch)
+		tier += 1
+
+	has_more = len(rows) > page_length
+	rows = rows[:page_length]
+
+	result = {
+		"data": [row for _tier, row in rows],
+		"has_more": has_more,
+		"next_cursor": encode_cursor(sort_by, sort_order, rows[-1][1], rows[-1][0]) if has_more else None,
+		"sort_by": sort_by,
+		"sort_order": sort_order,
+		"page_length": page_length
+	}
+
+	if with_total is None:
+		with_total = not cursor
+
+	if with_total:
+		result["total"] = estimate_total(doctypes, conditions)
+
+	return result
+
+
+def estimate_total(doctypes, filters=None, cap=COUNT_CAP):
+	"""
+	✅ Total aproximado sem COUNT(*) à tabela inteira
+
+	- sem filtros: linhas estimadas pelas estatísticas da tabela
+	- com filtros: contagem exata até cap linhas (leitura de índice com LIMIT)
+
+	Returns:
+		dict: {"count", "exact"} - exact=False com filtros significa "mais de count"
+	"""
+	doctypes = [doctypes] if isinstance(doctypes, str) else list(doctypes)
+	conditions = to_conditions(filters)
+
+	if not conditions:
+		return {"count": sum(cint(frappe.db.estimate_count(doctype)) for doctype in doctypes), "exact": False}
+
+	count = 0
+	for doctype in doctypes:
+		count += len(frappe.get_list(doctype, filters=conditions, pluck="name", order_by=None,
+									 limit_page_length=cap + 1 - count))
+		if count > cap:
+			return {"count": cap, "exact": False}
+
+	return {"count": count, "exact": True}
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Lazy - Portugal Compliance
+Construção diferida de singletons e dependências pesadas
+✅ LazySingleton: o módulo expõe o mesmo nome (atcud_generator, email_manager, ...)
+   mas a instância só é criada no primeiro acesso a um atributo
+✅ lazy_import: módulo opcional importado na primeira utilização (None se não existir)
+
+Os workers (gunicorn/RQ) e o bench migrate importam hooks e doc_events sem
+construir classes nem carregar qrcode/PIL/numpy até serem realmente usados.
+"""
+
+import importlib
+import threading
+
+
+class LazySingleton:
+	"""
+	✅ Proxy para uma instância criada por factory() no primeiro acesso
+
+	Leitura, escrita e remoção de atributos são delegadas na instância
+	(compatível com patch.object nos testes).
+	"""
+
+	__slots__ = ("_factory", "_instance", "_lock")
+
+	def __init__(self, factory):
+		object.__setattr__(self, "_factory", factory)
+		object.__setattr__(self, "_instance", None)
+		object.__setattr__(self, "_lock", threading.Lock())
+
+	def _get_instance(self):
+		instance = self._instance
+		if instance is None:
+			with self._lock:
+				instance = self._instance
+				if instance is None:
+					instance = self._factory()
+					object.__setattr__(self, "_instance", instance)
+
+		return instance
+
+	def is_constructed(self):
+		return self._instance is not None
+
+	def __getattr__(self, name):
+		return getattr(self._get_instance(), name)
+
+	def __setattr__(self, name, value):
+		setattr(self._get_instance(), name, value)
+
+	def __delattr__(self, name):
+		delattr(self._get_instance(), name)
+
+	def __repr__(self):
+		factory = getattr(self._factory, "__name__", repr(self._factory))
+		state = "constructed" if self.is_constructed() else "deferred"
+		return f"<LazySingleton {factory} ({state})>"
+
+
+_MISSING = object()
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+def lazy_import(module_name):
+	"""
+	✅ Importar module_name na primeira chamada (memorizado por processo)
+
+	Returns:
+		module ou None se a dependência opcional não estiver instalada
+	"""
+	module = _modules.get(module_name, _MISSING)
+	if module is _MISSING:
+		with _modules_lock:
+			module = _modules.get(module_name, _MISSING)
+			if module is _MISSING:
+				try:
+					module = importlib.import_module(module_name)
+				except ImportError:
+					module = None
+				_modules[module_name] = module
+
+	return module
@@ -14,6 +14,8 @@ from frappe.utils import getdate, now, today, cint
 import re
 from datetime import datetime, date
 
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class PortugueseNamingSeriesCustomizer:
 	"""
@@ -367,7 +369,7 @@ class PortugueseNamingSeriesCustomizer:
 # ========== INSTÂNCIA GLOBAL ==========
 
 # ✅ INSTÂNCIA GLOBAL PARA USO
-portuguese_naming_customizer = PortugueseNamingSeriesCustomizer()
+portuguese_naming_customizer = LazySingleton(PortugueseNamingSeriesCustomizer)
 
 
 # ========== FUNÇÕES AUXILIARES PARA USO EXTERNO ==========
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Naming Series Sync - Portugal Compliance
+Sincronização das opções de naming_series (Property Setters) com as séries ativas
+✅ UMA CONSULTA: Opções desejadas de todos os doctypes a partir das
+   Portugal Series Configuration ativas
+✅ UMA CONSULTA: Property Setters atuais de todos os doctypes
+✅ DIFF: Só escreve as linhas que mudaram (criar / atualizar / remover legado)
+✅ CACHE: Meta limpa uma vez no fim e só para os doctypes alterados
+✅ IDEMPOTENTE: Segunda execução sem alterações não escreve nada
+
+Ordem das opções (a primeira é a predefinição do campo): séries do ano corrente
+ou anteriores antes das do próximo ano (passagem de ano), comunicadas primeiro,
+mais recentes primeiro.
+"""
+
+import frappe
+from frappe.utils import get_datetime, getdate, now
+
+from portugal_compliance.utils.series_registry import SERIES_DOCTYPE, get_prefix_year
+
+PROPERTY_SETTER_FIELDS = [
+	"name", "doc_type", "field_name", "property", "property_type", "value", "doctype_or_field",
+	"creation", "modified", "owner", "modified_by"
+]
+
+
+def get_property_setter_name(doctype):
+	"""Nome padrão (o mesmo do Customize Form)"""
+	return f"{doctype}-naming_series-options"
+
+
+def compute_desired_options(series_rows, year=None):
+	"""
+	✅ Opções de naming_series por doctype
+
+	Args:
+		series_rows: séries ativas (document_type, prefix, is_communicated, creation)
+
+	Returns:
+		dict: {doctype: "FT2025NDX.####\\nFS2025NDX.####"}
+	"""
+	year = year or getdate().year
+	by_doctype = {}
+	for series in series_rows:
+		if series.document_type and series.prefix:
+			by_doctype.setdefault(series.document_type, []).append(series)
+
+	desired = {}
+	for doctype, rows in by_doctype.items():
+		rows.sort(key=lambda series: (
+			(get_prefix_year(series.prefix) or 0) > year,
+			not series.is_communicated,
+			-(get_datetime(series.creation).timestamp() if series.creation else 0),
+			series.prefix
+		))
+
+		options = []
+		for series in rows:
+			option = f"{series.prefix}.####"
+			if option not in options:
+				options.append(option)
+
+		desired[doctype] = "\n".join(options)
+
+	return desired
+
+
+def diff_property_setters(desired, current):
+	"""
+	✅ Comparar opções desejadas com os Property Setters atuais
+
+	Args:
+		desired: {doctype: value}
+		current: Property Setters de naming_series/options (name, doc_type, value)
+
+	Returns:
+		dict: {"create": {doctype: value}, "update": {name: value}, "remove": [names],
+			   "doctypes": set dos doctypes alterados}
+	"""
+	by_name = {setter.name: setter for setter in current}
+	changes = {"create": {}, "update": {}, "remove": [], "doctypes": set()}
+
+	for doctype, value in desired.items():
+		name = get_property_setter_name(doctype)
+		setter = by_name.get(name)
+
+		if not setter:
+			changes["create"][doctype] = value
+			changes["doctypes"].add(doctype)
+		elif (setter.value or "") != value:
+			changes["update"][name] = value
+			changes["doctypes"].add(doctype)
+
+		# Property Setters antigos por empresa ({doctype}-naming_series-options-{abbr})
+		# sobrepõem-se ao padrão de forma não determinística
+		for setter in current:
+			if setter.doc_type == doctype and setter.name.startswith(f"{name}-"):
+				changes["remove"].append(setter.name)
+				changes["doctypes"].add(doctype)
+
+	return changes
+
+
+def sync_naming_series_options(doctypes=None):
+	"""
+	✅ Sincronizar os Property Setters de naming_series com as séries ativas
+
+	Args:
+		doctypes: Restringir a estes doctypes (padrão: todos os que têm séries ativas)
+
+	Returns:
+		dict: Resumo (created, updated, removed, unchanged, doctypes)
+	"""
+	filters = {"is_active": 1}
+	if doctypes:
+		filters["document_type"] = ["in", list(doctypes)]
+
+	series_rows = frappe.get_all(
+		SERIES_DOCTYPE,
+		filters=filters,
+		fields=["document_type", "prefix", "is_communicated", "creation"]
+	)
+	desired = compute_desired_options(series_rows)
+
+	# Só doctypes com campo naming_series
+	if desired:
+		with_field = set(frappe.get_all(
+			"DocField",
+			filters={"parent": ["in", list(desired)], "fieldname": "naming_series", "parenttype": "DocType"},
+			pluck="parent"
+		))
+		desired = {doctype: value for doctype, value in desired.items() if doctype in with_field}
+
+	if not desired:
+		return {"created": 0, "updated": 0, "removed": 0, "unchanged": 0, "doctypes": []}
+
+	current = frappe.get_all(
+		"Property Setter",
+		filters={"doc_type": ["in", list(desired)], "field_name": "naming_series", "property": "options"},
+		fields=["name", "doc_type", "value"]
+	)
+	changes = diff_property_setters(desired, current)
+
+	if changes["create"]:
+		timestamp = now()
+		user = frappe.session.user
+		frappe.db.bulk_insert("Property Setter", PROPERTY_SETTER_FIELDS, [
+			(get_property_setter_name(doctype), doctype, "naming_series", "options", "Text", value, "DocField",
+			 timestamp, timestamp, user, user)
+			for doctype, value in changes["create"].items()
+		], ignore_duplicates=True)
+
+	for name, value in changes["update"].items():
+		frappe.db.set_value("Property Setter", name, "value", value)
+
+	if changes["remove"]:
+		frappe.db.delete("Property Setter", {"name": ["in", changes["remove"]]})
+
+	# ✅ Limpar a meta uma vez, só dos doctypes alterados
+	for doctype in sorted(changes["doctypes"]):
+		frappe.clear_cache(doctype=doctype)
+
+	summary = {
+		"created": len(changes["create"]),
+		"updated": len(changes["update"]),
+		"removed": len(changes["remove"]),
+		"unchanged": len(desired) - len(changes["doctypes"]),
+		"doctypes": sorted(changes["doctypes"])
+	}
+
+	if changes["doctypes"]:
+		frappe.logger().info(f"✅ Property Setters de naming_series sincronizados: {summary}")
+
+	return summary
+
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+NIF Validator - Portugal Compliance
+Validador canónico do NIF português (algoritmo oficial mod 11)
+✅ ÚNICO: Substitui as implementações duplicadas em utils, regional e overrides
+✅ ESCALAR: validate_nif() para o caminho de save
+✅ VETORIZADO: classify_nif_batch() valida milhões de NIFs com NumPy (matriz de dígitos)
+✅ FALLBACK: Implementação pura em Python se NumPy não estiver disponível
+"""
+
+import re
+
+from portugal_compliance.utils.lazy import lazy_import
+
+# ========== CONSTANTES ==========
+
+NIF_LENGTH = 9
+
+# Primeiros dígitos aceites (1-9). Algumas validações históricas excluem o "4"
+# (NIFs de não residentes "45"), por isso o conjunto é configurável por chamada.
+VALID_FIRST_DIGITS = "123456789"
+STRICT_FIRST_DIGITS = "12356789"
+
+# NIF genérico "Consumidor final" usado no SAF-T (PT)
+FINAL_CONSUMER_NIF = "999999990"
+
+# ✅ CÓDIGOS DE ESTADO (inteiros para caberem num array int8)
+NIF_VALID = 0
+NIF_EMPTY = 1
+NIF_INVALID_LENGTH = 2
+NIF_INVALID_FIRST_DIGIT = 3
+NIF_INVALID_CHECK_DIGIT = 4
+
+NIF_STATUS_LABELS = {
+	NIF_VALID: "valid",
+	NIF_EMPTY: "empty",
+	NIF_INVALID_LENGTH: "invalid_length",
+	NIF_INVALID_FIRST_DIGIT: "invalid_first_digit",
+	NIF_INVALID_CHECK_DIGIT: "invalid_check_digit"
+}
+
+NIF_STATUS_MESSAGES = {
+	NIF_VALID: "NIF válido",
+	NIF_EMPTY: "NIF não fornecido",
+	NIF_INVALID_LENGTH: "NIF deve ter 9 dígitos",
+	NIF_INVALID_FIRST_DIGIT: "Primeiro dígito do NIF inválido",
+	NIF_INVALID_CHECK_DIGIT: "Dígito de controlo inválido"
+}
+
+NIF_ENTITY_TYPES = {
+	"1": "Pessoa Singular",
+	"2": "Pessoa Singular",
+	"3": "Pessoa Singular",
+	"4": "Pessoa Singular (Não Residente)",
+	"5": "Pessoa Coletiva",
+	"6": "Administração Pública",
+	"7": "Outras Entidades",
+	"8": "Empresário em Nome Individual",
+	"9": "Pessoa Coletiva"
+}
+
+_NON_DIGIT = re.compile(r"[^0-9]")
+
+# Pesos 9..2 aplicados aos primeiros 8 dígitos
+_CHECK_WEIGHTS = (9, 8, 7, 6, 5, 4, 3, 2)
+
+
+# ========== VALIDAÇÃO ESCALAR ==========
+
+def normalize_nif(nif):
+	"""
+	✅ Remover tudo o que não seja dígito ASCII (espaços, "PT", pontos, ...)
+	"""
+	if not nif:
+		return ""
+
+	nif = str(nif)
+	if nif.isascii() and nif.isdigit():
+		# Caminho rápido: a maioria dos NIFs já está limpa
+		return nif
+
+	return _NON_DIGIT.sub("", nif)
+
+
+def compute_check_digit(first_eight):
+	"""
+	✅ Calcular o dígito de controlo para os primeiros 8 dígitos
+	"""
+	checksum = sum(int(digit) * weight for digit, weight in zip(first_eight, _CHECK_WEIGHTS))
+	remainder = checksum % 11
+	return 0 if remainder < 2 else 11 - remainder
+
+
+def get_nif_status(nif, valid_first_digits=VALID_FIRST_DIGITS):
+	"""
+	✅ Classificar um NIF e devolver um dos códigos NIF_*
+	"""
+	clean_nif = normalize_nif(nif)
+
+	if not clean_nif:
+		return NIF_EMPTY
+
+	if len(clean_nif) != NIF_LENGTH:
+		return NIF_INVALID_LENGTH
+
+	if clean_nif[0] not in valid_first_digits:
+		return NIF_INVALID_FIRST_DIGIT
+
+	if compute_check_digit(clean_nif[:8]) != int(clean_nif[8]):
+		return NIF_INVALID_CHECK_DIGIT
+
+	return NIF_VALID
+
+
+def validate_nif(nif, valid_first_digits=VALID_FIRST_DIGITS):
+	"""
+	✅ Validar NIF português (algoritmo oficial mod 11)
+	"""
+	return get_nif_status(nif, valid_first_digits) == NIF_VALID
+
+
+def get_nif_entity_type(nif):
+	"""
+	✅ Tipo de entidade a partir do primeiro dígito
+	"""
+	clean_nif = normalize_nif(nif)
+	if not clean_nif:
+		return None
+
+	return NIF_ENTITY_TYPES.get(clean_nif[0], "Desconhecido")
+
+
+def format_nif(nif):
+	"""
+	✅ Formatar NIF para exibição (XXX XXX XXX)
+	"""
+	clean_nif = normalize_nif(nif)
+	if len(clean_nif) != NIF_LENGTH:
+		return nif
+
+	return f"{clean_nif[:3]} {clean_nif[3:6]} {clean_nif[6:]}"
+
+
+# ========== VALIDAÇÃO EM LOTE (VETORIZADA) ==========
+
+def classify_nif_batch(nifs, valid_first_digits=VALID_FIRST_DIGITS):
+	"""
+	✅ Classificar uma sequência de NIFs de uma só vez
+
+	Devolve uma lista de códigos NIF_* pela mesma ordem da entrada.
+	Com NumPy, os NIFs de 9 dígitos são convertidos numa matriz (n, 9) e o
+	checksum é calculado com um único produto matricial.
+	"""
+	cleaned = [normalize_nif(nif) for nif in nifs]
+
+	# NumPy é opcional e só é importado no primeiro lote - o fallback em Python
+	# puro mantém o mesmo resultado
+	np = lazy_import("numpy")
+	if np is None:
+		return [_classify_clean_nif(nif, valid_first_digits) for nif in cleaned]
+
+	return _classify_clean_nifs_numpy(np, cleaned, valid_first_digits).tolist()
+
+
+def validate_nif_batch(nifs, valid_first_digits=VALID_FIRST_DIGITS):
+	"""
+	✅ Validar uma sequência de NIFs - devolve lista de booleanos
+	"""
+	return [status == NIF_VALID for status in classify_nif_batch(nifs, valid_first_digits)]
+
+
+def _classify_clean_nif(clean_nif, valid_first_digits):
+	"""Classificar um NIF já normalizado (fallback sem NumPy)"""
+	if not clean_nif:
+		return NIF_EMPTY
+
+	if len(clean_nif) != NIF_LENGTH:
+		return NIF_INVALID_LENGTH
+
+	if clean_nif[0] not in valid_first_digits:
+		return NIF_INVALID_FIRST_DIGIT
+
+	if compute_check_digit(clean_nif[:8]) != int(clean_nif[8]):
+		return NIF_INVALID_CHECK_DIGIT
+
+	return NIF_VALID
+
+
+def _classify_clean_nifs_numpy(np, cleaned, valid_first_digits):
+	"""Classificar NIFs normalizados sobre uma matriz de dígitos"""
+	count = len(cleaned)
+	lengths = np.fromiter((len(nif) for nif in cleaned), dtype=np.int32, count=count)
+
+	status = np.full(count, NIF_INVALID_LENGTH, dtype=np.int8)
+	status[lengths == 0] = NIF_EMPTY
+
+	candidates = np.flatnonzero(lengths == NIF_LENGTH)
+	if not candidates.size:
+		return status
+
+	# ✅ MATRIZ (n, 9) DE DÍGITOS: bytes ASCII contíguos - b"0"
+	buffer = "".join(cleaned[i] for i in candidates).encode("ascii")
+	digits = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, NIF_LENGTH).astype(np.int32) - 48
+
+	checksum = digits[:, :8] @ np.array(_CHECK_WEIGHTS, dtype=np.int32)
+	remainder = checksum % 11
+	check_digit = np.where(remainder < 2, 0, 11 - remainder)
+
+	allowed = np.array([int(d) for d in valid_first_digits], dtype=np.int32)
+	first_digit_ok = np.isin(digits[:, 0], allowed)
+
+	status[candidates] = np.where(
+		~first_digit_ok,
+		NIF_INVALID_FIRST_DIGIT,
+		np.where(check_digit == digits[:, 8], NIF_VALID, NIF_INVALID_CHECK_DIGIT)
+	)
+
+	return status
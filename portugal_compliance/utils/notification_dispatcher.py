@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Notification Dispatcher - Portugal Compliance
+Fila de notificações com deduplicação e resumos (digests) por destinatário
+✅ FILA: Eventos guardados em Redis, nunca enviados no caminho do pedido
+✅ DEDUPLICAÇÃO: O mesmo evento (dedup_key) só é enviado uma vez por janela
+✅ DIGEST: Todos os eventos pendentes de um destinatário seguem num único email/alerta
+✅ DESTINATÁRIOS: Resolvidos por empresa (User Permission) e guardados em cache
+✅ JOB ÚNICO: Um só job enfileirado (job_id fixo) processa a fila inteira
+✅ SEM PERDAS: Digests que falham voltam à fila só para os destinatários em falta
+   (até MAX_SEND_ATTEMPTS); a tarefa horária retoma a fila
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now
+
+CHANNEL_EMAIL = "email"
+CHANNEL_SYSTEM = "system"
+
+DEFAULT_DEDUP_WINDOW = 3600
+RECIPIENT_CACHE_TTL = 600
+MAX_FULL_EVENTS_PER_DIGEST = 20
+MAX_FLUSH_ROUNDS = 5
+MAX_SEND_ATTEMPTS = 5
+
+DEFAULT_RECIPIENT_ROLES = (
+	"Accounts Manager",
+	"Accounts User",
+	"System Manager",
+	"Portugal Compliance User"
+)
+
+FLUSH_JOB_ID = "portugal_compliance_notification_flush"
+FLUSH_METHOD = "portugal_compliance.utils.notification_dispatcher.flush_notifications"
+
+PENDING_KEY = "portugal_compliance:notifications:pending"
+COUNTS_KEY = "portugal_compliance:notifications:counts"
+SEEN_KEY_PREFIX = "portugal_compliance:notifications:seen:"
+RECIPIENTS_KEY_PREFIX = "portugal_compliance:notifications:recipients:"
+
+
+# ========== CONFIGURAÇÃO ==========
+
+def get_dedup_window():
+	"""Janela de deduplicação em segundos (site_config: portugal_compliance_notification_dedup_window)"""
+	return cint(frappe.conf.get("portugal_compliance_notification_dedup_window")) or DEFAULT_DEDUP_WINDOW
+
+
+def make_dedup_key(*parts):
+	"""Chave de deduplicação estável a partir de partes arbitrárias"""
+	raw = "|".join(str(part) for part in parts if part is not None)
+	return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# ========== RESOLUÇÃO DE DESTINATÁRIOS ==========
+
+def get_company_recipients(company=None, roles=DEFAULT_RECIPIENT_ROLES):
+	"""
+	✅ Utilizadores ativos com os papéis indicados que têm acesso à empresa
+
+	Um utilizador sem User Permission de Company vê todas as empresas; com
+	restrições, só é incluído se uma delas for a empresa pedida.
+
+	Returns:
+		list: [{"user", "email", "full_name"}]
+	"""
+	roles = tuple(sorted(roles))
+	cache_key = f"{RECIPIENTS_KEY_PREFIX}{company or '*'}:{make_dedup_key(*roles)}"
+
+	cached = frappe.cache().get_value(cache_key)
+	if cached is not None:
+		return cached
+
+	conditions = ""
+	if company:
+		conditions = """
+			AND (
+				NOT EXISTS (
+					SELECT 1 FROM `tabUser Permission` up
+					WHERE up.user = u.name AND up.allow = 'Company'
+				)
+				OR EXISTS (
+					SELECT 1 FROM `tabUser Permission` up
+					WHERE up.user = u.name AND up.allow = 'Company' AND up.for_value = %(company)s
+				)
+			)"""
+
+	recipients = frappe.db.sql(f"""
+		SELECT DISTINCT u.name AS user, u.email, u.full_name
+		FROM `tabUser` u
+		JOIN `tabHas Role` hr ON hr.parent = u.name AND hr.parenttype = 'User'
+		WHERE hr.role IN %(roles)s
+			AND u.enabled = 1
+			AND u.user_type = 'System User'
+			AND IFNULL(u.email, '') != ''
+			{conditions}
+		ORDER BY u.name
+	""", {"roles": roles, "company": company}, as_dict=True)
+
+	recipients = [dict(row) for row in recipients]
+	frappe.cache().set_value(cache_key, recipients, expires_in_sec=RECIPIENT_CACHE_TTL)
+	return recipients
+
+
+def clear_recipient_cache(doc=None, method=None):
+	"""
+	✅ Limpar a cache de destinatários (doc_events de User Permission)
+	"""
+	if doc and doc.get("allow") and doc.allow != "Company":
+		return
+
+	frappe.cache().delete_keys(RECIPIENTS_KEY_PREFIX)
+
+
+# ========== FILA ==========
+
+def queue_notification(subject, content, dedup_key=None, company=None, recipients=None,
+					   channel=CHANNEL_EMAIL, priority="normal", document_type=None,
+					   document_name=None, roles=None):
+	"""
+	✅ Colocar um evento na fila de notificações
+
+	Args:
+		subject: Assunto do evento (linha no digest)
+		content: Corpo HTML (email) ou texto (alerta de sistema)
+		dedup_key: Eventos com a mesma chave dentro da janela são contados, não reenviados
+		company: Empresa para resolver destinatários quando recipients não é dado
+		recipients: Emails (canal email) ou utilizadores (canal system)
+		channel: "email" ou "system" (Notification Log)
+		priority: "high" processa a fila na fila de jobs "short"
+
+	Returns:
+		dict: {"queued": bool, "duplicate": bool, "dedup_key": str}
+	"""
+	dedup_key = dedup_key or make_dedup_key(channel, company, subject, document_type, document_name)
+	field = f"{channel}:{dedup_key}"
+	cache = frappe.cache()
+
+	# Pipeline = comandos Redis crus (o RedisWrapper do Frappe faz pickle em hset/hget)
+	is_new = cache.pipeline().set(cache.make_key(f"{SEEN_KEY_PREFIX}{field}"), 1,
+								  nx=True, ex=get_dedup_window()).execute()[0]
+
+	if not is_new:
+		cache.pipeline().hincrby(cache.make_key(COUNTS_KEY), field, 1).execute()
+		return {"queued": False, "duplicate": True, "dedup_key": dedup_key}
+
+	event = {
+		"channel": channel,
+		"subject": subject,
+		"content": content,
+		"company": company,
+		"recipients": list(recipients) if recipients else None,
+		"roles": list(roles) if roles else None,
+		"priority": priority,
+		"document_type": document_type,
+		"document_name": document_name,
+		"queued_at": now()
+	}
+	pipe = cache.pipeline()
+	pipe.hset(cache.make_key(PENDING_KEY), field, json.dumps(event, default=str))
+	pipe.hset(cache.make_key(COUNTS_KEY), field, 1)
+	pipe.execute()
+
+	schedule_flush(priority)
+	return {"queued": True, "duplicate": False, "dedup_key": dedup_key}
+
+
+def schedule_flush(priority="normal"):
+	"""
+	✅ Enfileirar o job único de envio (após commit, sem duplicados)
+	"""
+	frappe.enqueue(
+		FLUSH_METHOD,
+		queue="short" if priority == "high" else "default",
+		job_id=FLUSH_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True
+	)
+
+
+def get_queue_status():
+	"""Eventos pendentes e ocorrências acumuladas"""
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.hlen(cache.make_key(PENDING_KEY))
+	pipe.hvals(cache.make_key(COUNTS_KEY))
+	pending, counts = pipe.execute()
+
+	return {
+		"pending_events": pending,
+		"pending_occurrences": sum(int(count) for count in counts)
+	}
+
+
+# ========== ENVIO (JOB) ==========
+
+def _claim_pending():
+	"""Ler e limpar a fila numa única transação Redis (MULTI/EXEC)"""
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.hgetall(cache.make_key(PENDING_KEY))
+	pipe.hgetall(cache.make_key(COUNTS_KEY))
+	pipe.delete(cache.make_key(PENDING_KEY), cache.make_key(COUNTS_KEY))
+	raw_events, raw_counts, _deleted = pipe.execute()
+
+	counts = {frappe.safe_decode(key): int(value) for key, value in raw_counts.items()}
+	events = []
+	for key, value in raw_events.items():
+		field = frappe.safe_decode(key)
+		event = json.loads(frappe.safe_decode(value))
+		event["field"] = field
+		event["occurrences"] = counts.get(field, 1)
+		events.append(event)
+
+	events.sort(key=lambda event: event["queued_at"])
+	return events
+
+
+def requeue_failed(failed):
+	"""
+	✅ Devolver à fila os eventos de digests que falharam
+
+	Cada evento volta só com os destinatários do envio falhado (os restantes já o
+	receberam). Depois de MAX_SEND_ATTEMPTS tentativas o evento é registado e descartado.
+
+	Args:
+		failed: [(recipients, [events])]
+
+	Returns:
+		int: Eventos devolvidos à fila
+	"""
+	requeued = {}
+	for recipients, events in failed:
+		for event in events:
+			attempts = cint(event.get("attempts")) + 1
+			if attempts >= MAX_SEND_ATTEMPTS:
+				frappe.log_error(f"Notificação descartada após {attempts} tentativas: {event['subject']} "
+								 f"({', '.join(recipients)})", "Portugal Compliance Notifications")
+				continue
+
+			retry = requeued.setdefault(event["field"], dict(event, recipients=[], attempts=attempts))
+			retry["recipients"] = sorted(set(retry["recipients"]) | set(recipients))
+
+	if not requeued:
+		return 0
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for field, event in requeued.items():
+		occurrences = event.pop("occurrences", 1)
+		event.pop("field", None)
+		pipe.hset(cache.make_key(PENDING_KEY), field, json.dumps(event, default=str))
+		pipe.hincrby(cache.make_key(COUNTS_KEY), field, occurrences)
+	pipe.execute()
+
+	return len(requeued)
+
+
+def resume_notification_queue():
+	"""✅ Tarefa horária: reenviar eventos devolvidos à fila (falhas de envio, jobs perdidos)"""
+	cache = frappe.cache()
+	if cache.pipeline().hlen(cache.make_key(PENDING_KEY)).execute()[0]:
+		schedule_flush()
+		return True
+
+	return False
+
+
+def _resolve_event_recipients(event):
+	"""Destinatários de um evento: explícitos ou da empresa (cache)"""
+	if event.get("recipients"):
+		return event["recipients"]
+
+	recipients = get_company_recipients(event.get("company"),
+										roles=event.get("roles") or DEFAULT_RECIPIENT_ROLES)
+	key = "email" if event["channel"] == CHANNEL_EMAIL else "user"
+	return [recipient[key] for recipient in recipients]
+
+
+def group_by_recipient(events):
+	"""
+	✅ Agrupar eventos por (canal, destinatário)
+
+	Destinatários com exatamente os mesmos eventos partilham um único envio.
+
+	Returns:
+		list: [(channel, [recipients], [events])]
+	"""
+	per_recipient = {}
+	for index, event in enumerate(events):
+		for recipient in _resolve_event_recipients(event):
+			per_recipient.setdefault((event["channel"], recipient), []).append(index)
+
+	batches = {}
+	for (channel, recipient), indexes in per_recipient.items():
+		batches.setdefault((channel, tuple(indexes)), []).append(recipient)
+
+	return [
+		(channel, sorted(recipients), [events[index] for index in indexes])
+		for (channel, indexes), recipients in batches.items()
+	]
+
+
+def flush_notifications():
+	"""
+	✅ Job: enviar todos os eventos pendentes como digests por destinatário
+
+	Repete enquanto chegarem eventos novos durante o envio (o job ainda em
+	execução impede a deduplicação do enqueue de criar outro). Digests que
+	falham são desfeitos (savepoint) e devolvidos à fila no fim do job.
+	"""
+	summary = {"events": 0, "emails": 0, "system_alerts": 0, "requeued": 0}
+	failed = []
+
+	for _round in range(MAX_FLUSH_ROUNDS):
+		events = _claim_pending()
+		if not events:
+			break
+
+		summary["events"] += len(events)
+
+		for channel, recipients, batch in group_by_recipient(events):
+			frappe.db.savepoint("notification_digest")
+			try:
+				if channel == CHANNEL_EMAIL:
+					_send_email_digest(recipients, batch)
+					summary["emails"] += 1
+				else:
+					summary["system_alerts"] += _create_system_digest(recipients, batch)
+			except Exception as e:
+				frappe.db.rollback(save_point="notification_digest")
+				failed.append((recipients, batch))
+				frappe.log_error(f"Erro ao enviar digest de notificações: {str(e)}",
+								 "Portugal Compliance Notifications")
+
+		frappe.db.commit()
+
+	summary["requeued"] = requeue_failed(failed)
+
+	if summary["events"]:
+		frappe.logger().info(f"📬 Notificações Portugal Compliance: {summary}")
+
+	return summary
+
+
+def _event_title(event):
+	title = event["subject"]
+	if event.get("occurrences", 1) > 1:
+		title = f"{title} (×{event['occurrences']})"
+	return title
+
+
+def _send_email_digest(recipients, events):
+	"""Um email para o grupo de destinatários com todos os seus eventos"""
+	if len(events) == 1:
+		subject = _event_title(events[0])
+		message = events[0]["content"]
+	else:
+		subject = _("Portugal Compliance: {0} notificações").format(len(events))
+		message = _render_email_digest(events)
+
+	frappe.sendmail(
+		recipients=recipients,
+		subject=subject,
+		message=message,
+		delayed=not any(event.get("priority") == "high" for event in events),
+		retry=3
+	)
+
+
+def _render_email_digest(events):
+	"""HTML do digest: índice de todos os eventos + corpo dos primeiros N"""
+	index_rows = "".join(
+		f"<li>{frappe.utils.escape_html(_event_title(event))}</li>" for event in events
+	)
+
+	sections = "".join(
+		f"<hr><h3>{frappe.utils.escape_html(_event_title(event))}</h3>{event['content']}"
+		for event in events[:MAX_FULL_EVENTS_PER_DIGEST]
+	)
+
+	omitted = len(events) - MAX_FULL_EVENTS_PER_DIGEST
+	footer = ""
+	if omitted > 0:
+		footer = "<hr><p><em>{0}</em></p>".format(
+			_("{0} notificações adicionais omitidas - ver índice acima").format(omitted))
+
+	return f"""
+	<div style="font-family: Arial, sans-serif; max-width: 700px;">
+		<h2>📬 {_("Resumo de notificações Portugal Compliance")}</h2>
+		<ul>{index_rows}</ul>
+		{sections}
+		{footer}
+	</div>
+	"""
+
+
+def _create_system_digest(users, events):
+	"""Um Notification Log por utilizador com todos os seus alertas"""
+	if len(events) == 1:
+		event = events[0]
+		subject = _event_title(event)
+		content = event["content"]
+		document_type, document_name = event.get("document_type"), event.get("document_name")
+	else:
+		subject = _("Portugal Compliance: {0} alertas").format(len(events))
+		content = "<br>".join(
+			f"• {_event_title(event)}: {event['content']}" for event in events
+		)
+		document_type = document_name = None
+
+	for user in users:
+		frappe.get_doc({
+			"doctype": "Notification Log",
+			"subject": subject,
+			"email_content": content,
+			"for_user": user,
+			"type": "Alert",
+			"document_type": document_type,
+			"document_name": document_name
+		}).insert(ignore_permissions=True)
+
+	return len(users)
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def get_notification_queue_status():
+	"""✅ API: Estado da fila de notificações"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+	return get_queue_status()
+
+
+@frappe.whitelist()
+def flush_notifications_now():
+	"""✅ API: Processar a fila de notificações imediatamente"""
+	frappe.only_for("System Manager")
+	return flush_notifications()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Party NIF Scanner - Portugal Compliance
+Auditoria de qualidade de dados dos NIFs de Clientes e Fornecedores
+✅ CHUNKS: Paginação por chave (name) - memória constante em milhões de registos
+✅ VETORIZADO: Cada chunk validado de uma vez com nif_validator.classify_nif_batch
+✅ RELATÓRIO: CSV com os registos problemáticos + resumo JSON em private/files
+✅ PRÉ SAF-T: Detetar NIFs inválidos/duplicados antes da exportação
+"""
+
+import csv
+import json
+import os
+import time
+from collections import Counter
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+
+from portugal_compliance.utils.nif_validator import (
+	FINAL_CONSUMER_NIF,
+	NIF_EMPTY,
+	NIF_STATUS_LABELS,
+	NIF_VALID,
+	classify_nif_batch,
+	normalize_nif,
+)
+
+PARTY_DOCTYPES = ("Customer", "Supplier")
+DEFAULT_CHUNK_SIZE = 50000
+MAX_DUPLICATES_IN_SUMMARY = 1000
+REPORT_FOLDER = ("private", "files", "portugal_compliance", "nif_reports")
+LAST_SCAN_CACHE_KEY = "portugal_compliance_last_party_nif_scan"
+
+
+def iter_party_chunks(doctype, chunk_size=DEFAULT_CHUNK_SIZE):
+	"""
+	✅ Percorrer a tabela da entidade em chunks paginados por chave (name > último)
+	Evita OFFSET: cada página custa o mesmo independentemente da posição.
+	"""
+	last_name = ""
+	name_field = "customer_name" if doctype == "Customer" else "supplier_name"
+
+	while True:
+		rows = frappe.db.sql(f"""
+			SELECT name, {name_field} AS party_name, tax_id, disabled
+			FROM `tab{doctype}`
+			WHERE name > %(last_name)s
+			ORDER BY name
+			LIMIT %(limit)s
+		""", {"last_name": last_name, "limit": chunk_size}, as_dict=True)
+
+		if not rows:
+			break
+
+		yield rows
+
+		if len(rows) < chunk_size:
+			break
+
+		last_name = rows[-1].name
+
+
+def scan_party_nifs(doctypes=None, chunk_size=DEFAULT_CHUNK_SIZE, include_empty=False):
+	"""
+	✅ Auditar os NIFs de todos os Clientes/Fornecedores e escrever relatório
+
+	Args:
+		doctypes: Lista de doctypes a auditar (padrão: Customer e Supplier)
+		chunk_size: Registos por página
+		include_empty: Incluir registos sem NIF no CSV (são sempre contados)
+
+	Returns:
+		dict: Resumo da auditoria (também guardado em JSON e em cache)
+	"""
+	doctypes = [dt for dt in (doctypes or PARTY_DOCTYPES) if dt in PARTY_DOCTYPES]
+	chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+	started = time.monotonic()
+
+	report_dir = frappe.get_site_path(*REPORT_FOLDER)
+	os.makedirs(report_dir, exist_ok=True)
+
+	timestamp = now_datetime().strftime("%Y%m%d_%H%M%S")
+	csv_path = os.path.join(report_dir, f"party_nif_report_{timestamp}.csv")
+	summary_path = os.path.join(report_dir, f"party_nif_report_{timestamp}.json")
+
+	summary = {
+		"started_at": str(now_datetime()),
+		"chunk_size": chunk_size,
+		"doctypes": {},
+		"report_file": csv_path,
+		"summary_file": summary_path
+	}
+
+	with open(csv_path, "w", encoding="utf-8", newline="") as report_file:
+		writer = csv.writer(report_file)
+		writer.writerow(["doctype", "name", "party_name", "tax_id", "issue", "disabled"])
+
+		for doctype in doctypes:
+			summary["doctypes"][doctype] = _scan_doctype(doctype, chunk_size, writer, include_empty)
+
+	summary["duration_seconds"] = round(time.monotonic() - started, 3)
+	summary["total_scanned"] = sum(s["scanned"] for s in summary["doctypes"].values())
+	summary["total_invalid"] = sum(s["invalid"] for s in summary["doctypes"].values())
+	summary["rows_per_second"] = (
+		round(summary["total_scanned"] / summary["duration_seconds"])
+		if summary["duration_seconds"] else summary["total_scanned"]
+	)
+
+	with open(summary_path, "w", encoding="utf-8") as f:
+		json.dump(summary, f, indent=2, ensure_ascii=False)
+
+	frappe.cache().set_value(LAST_SCAN_CACHE_KEY, summary)
+
+	frappe.logger().info(
+		f"Party NIF scan: {summary['total_scanned']} registos, {summary['total_invalid']} inválidos "
+		f"em {summary['duration_seconds']}s")
+
+	return summary
+
+
+def _scan_doctype(doctype, chunk_size, writer, include_empty):
+	"""Auditar um doctype e escrever os problemas no CSV"""
+	status_counts = Counter()
+	nif_counts = Counter()
+	scanned = 0
+
+	for rows in iter_party_chunks(doctype, chunk_size):
+		statuses = classify_nif_batch([row.tax_id for row in rows])
+		scanned += len(rows)
+
+		for row, status in zip(rows, statuses):
+			status_counts[status] += 1
+
+			if status == NIF_VALID:
+				clean_nif = normalize_nif(row.tax_id)
+				if clean_nif != FINAL_CONSUMER_NIF:
+					# Chave inteira: metade da memória de uma string por NIF
+					nif_counts[int(clean_nif)] += 1
+				continue
+
+			if status == NIF_EMPTY and not include_empty:
+				continue
+
+			writer.writerow([
+				doctype, row.name, row.party_name, row.tax_id or "",
+				NIF_STATUS_LABELS[status], cint(row.disabled)
+			])
+
+	duplicates = {nif: count for nif, count in nif_counts.items() if count > 1}
+
+	return {
+		"scanned": scanned,
+		"valid": status_counts[NIF_VALID],
+		"empty": status_counts[NIF_EMPTY],
+		"invalid": scanned - status_counts[NIF_VALID] - status_counts[NIF_EMPTY],
+		"by_status": {NIF_STATUS_LABELS[k]: v for k, v in status_counts.items()},
+		"duplicate_nifs": len(duplicates),
+		"duplicates_sample": {
+			f"{nif:09d}": count
+			for nif, count in sorted(duplicates.items(), key=lambda item: -item[1])[:MAX_DUPLICATES_IN_SUMMARY]
+		}
+	}
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def start_party_nif_scan(doctypes=None, chunk_size=DEFAULT_CHUNK_SIZE, include_empty=0):
+	"""✅ API: Agendar auditoria de NIFs em background (fila long)"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	if isinstance(doctypes, str):
+		doctypes = json.loads(doctypes)
+
+	job = frappe.enqueue(
+		"portugal_compliance.utils.party_nif_scanner.scan_party_nifs",
+		queue="long",
+		timeout=3600,
+		job_id="portugal_compliance_party_nif_scan",
+		deduplicate=True,
+		doctypes=doctypes,
+		chunk_size=cint(chunk_size),
+		include_empty=cint(include_empty)
+	)
+
+	return {
+		"success": True,
+		"job_id": getattr(job, "id", None),
+		"message": _("Auditoria de NIFs agendada")
+	}
+
+
+@frappe.whitelist()
+def get_last_party_nif_scan():
+	"""✅ API: Resumo da última auditoria de NIFs"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+	return frappe.cache().get_value(LAST_SCAN_CACHE_KEY) or {}
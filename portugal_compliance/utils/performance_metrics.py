@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Performance Metrics - Portugal Compliance
+Instrumentação opcional dos caminhos críticos (hooks, ATCUD, SAF-T, webservice AT)
+✅ OPT-IN: Ativa com portugal_compliance_instrumentation = 1 no site_config.json;
+   desativada custa uma leitura de frappe.conf por chamada
+✅ POR ETAPA: Tempo de relógio, consultas à BD e chamadas Redis (inclusivos:
+   uma etapa inclui as etapas que chama)
+✅ HISTOGRAMAS POR WORKER: Buckets fixos em memória, somados no Redis
+   (um pipeline) a cada FLUSH_EVERY observações ou FLUSH_INTERVAL segundos
+✅ PERSISTÊNCIA: Tarefa horária passa o agregado do Redis para
+   Compliance Performance Metric (uma linha por etapa e hora)
+✅ CONSULTA: get_performance_metrics (JSON com p50/p95/p99) e
+   get_prometheus_metrics (formato de texto Prometheus; valores da janela pedida)
+
+Uso:
+	@instrumented("document_hooks.validate")
+	def validate_portugal_compliance(doc, method=None): ...
+
+	with track("saft.render"):
+		...
+"""
+
+import functools
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import add_to_date, cint, flt, get_datetime, now_datetime
+
+METRIC_DOCTYPE = "Compliance Performance Metric"
+
+# Limites superiores dos buckets (ms); o último bucket é +Inf
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+METRICS_KEY = "portugal_compliance:perf"
+SNAPSHOT_KEY = "portugal_compliance:perf:persisting"
+
+FLUSH_EVERY = 500
+FLUSH_INTERVAL = 60
+RETENTION_DAYS = 30
+
+_histograms = {}
+_pending = {"count": 0, "last_flush": time.monotonic()}
+_lock = threading.Lock()
+_redis_calls = threading.local()
+
+
+def is_enabled():
+	return bool(cint(frappe.conf.get("portugal_compliance_instrumentation")))
+
+
+def _new_histogram():
+	return {"calls": 0, "total_ms": 0.0, "db_queries": 0, "redis_calls": 0,
+			"buckets": [0] * (len(BUCKETS_MS) + 1)}
+
+
+def _bucket_index(elapsed_ms):
+	for index, upper in enumerate(BUCKETS_MS):
+		if elapsed_ms <= upper:
+			return index
+
+	return len(BUCKETS_MS)
+
+
+# ========== CONTADORES (BD / REDIS) ==========
+
+def _get_db_counter():
+	"""
+	Contador de consultas da ligação atual: frappe.db.sql é envolvido uma vez
+	por ligação (o mesmo mecanismo do frappe.recorder)
+	"""
+	db = frappe.db
+	counter = getattr(db, "_pc_query_counter", None)
+	if counter is None:
+		counter = db._pc_query_counter = [0]
+		original_sql = db.sql
+
+		def sql(*args, **kwargs):
+			counter[0] += 1
+			return original_sql(*args, **kwargs)
+
+		db.sql = sql
+
+	return counter
+
+
+def _count_redis_call():
+	_redis_calls.count = getattr(_redis_calls, "count", 0) + 1
+
+
+def _install_redis_counter():
+	"""
+	Contar comandos Redis desta thread: execute_command do cliente partilhado
+	é envolvido uma vez por processo; cada pipeline executado conta como uma chamada
+	"""
+	cache = frappe.cache()
+	if getattr(cache, "_pc_counted", False):
+		return
+
+	original_execute = cache.execute_command
+	original_pipeline = cache.pipeline
+
+	def execute_command(*args, **kwargs):
+		_count_redis_call()
+		return original_execute(*args, **kwargs)
+
+	def pipeline(*args, **kwargs):
+		pipe = original_pipeline(*args, **kwargs)
+		pipe_execute = pipe.execute
+
+		def execute(*execute_args, **execute_kwargs):
+			_count_redis_call()
+			return pipe_execute(*execute_args, **execute_kwargs)
+
+		pipe.execute = execute
+		return pipe
+
+	cache.execute_command = execute_command
+	cache.pipeline = pipeline
+	cache._pc_counted = True
+
+
+# ========== MEDIÇÃO ==========
+
+@contextmanager
+def track(stage):
+	"""✅ Medir um bloco como etapa stage (sem efeito se a instrumentação estiver desativada)"""
+	if not is_enabled():
+		yield
+		return
+
+	_install_redis_counter()
+	db_counter = _get_db_counter()
+	db_before = db_counter[0]
+	redis_before = getattr(_redis_calls, "count", 0)
+	started = time.perf_counter()
+
+	try:
+		yield
+	finally:
+		record(stage, (time.perf_counter() - started) * 1000, db_counter[0] - db_before,
+			   getattr(_redis_calls, "count", 0) - redis_before)
+
+
+def instrumented(stage):
+	"""✅ Decorador: cada chamada da função é medida como etapa stage"""
+
+	def decorator(func):
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			if not is_enabled():
+				return func(*args, **kwargs)
+
+			with track(stage):
+				return func(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+def record(stage, elapsed_ms, db_queries=0, redis_calls=0):
+	"""Somar uma observação ao histograma deste worker"""
+	with _lock:
+		histogram = _histograms.get(stage)
+		if histogram is None:
+			histogram = _histograms[stage] = _new_histogram()
+
+		histogram["calls"] += 1
+		histogram["total_ms"] += elapsed_ms
+		histogram["db_queries"] += db_queries
+		histogram["redis_calls"] += redis_calls
+		histogram["buckets"][_bucket_index(elapsed_ms)] += 1
+		_pending["count"] += 1
+
+		due = (_pending["count"] >= FLUSH_EVERY
+			   or time.monotonic() - _pending["last_flush"] >= FLUSH_INTERVAL)
+
+	if due:
+		try:
+			flush()
+		except Exception as e:
+			frappe.log_error(f"Erro ao enviar métricas de performance: {str(e)}", "Performance Metrics")
+
+
+def _take_histograms():
+	with _lock:
+		taken = dict(_histograms)
+		_histograms.clear()
+		_pending["count"] = 0
+		_pending["last_flush"] = time.monotonic()
+
+	return taken
+
+
+def flush():
+	"""Somar os histogramas deste worker no Redis (um pipeline) e reiniciá-los"""
+	taken = _take_histograms()
+	if not taken:
+		return
+
+	cache = frappe.cache()
+	key = cache.make_key(METRICS_KEY)
+	pipe = cache.pipeline()
+
+	for stage, histogram in taken.items():
+		pipe.hincrby(key, f"{stage}|calls", histogram["calls"])
+		pipe.hincrby(key, f"{stage}|total_us", int(histogram["total_ms"] * 1000))
+		pipe.hincrby(key, f"{stage}|db_queries", histogram["db_queries"])
+		pipe.hincrby(key, f"{stage}|redis_calls", histogram["redis_calls"])
+		for index, count in enumerate(histogram["buckets"]):
+			if count:
+				pipe.hincrby(key, f"{stage}|b{index}", count)
+
+	pipe.execute()
+
+
+# ========== AGREGAÇÃO ==========
+
+def _parse_redis_hash(raw):
+	"""Campos "etapa|métrica" do Redis -> {etapa: histograma}"""
+	stages = {}
+
+	for field, value in (raw or {}).items():
+		stage, metric = frappe.safe_decode(field).rsplit("|", 1)
+		histogram = stages.setdefault(stage, _new_histogram())
+		value = cint(value)
+
+		if metric == "total_us":
+			histogram["total_ms"] += value / 1000
+		elif metric.startswith("b"):
+			index = cint(metric[1:])
+			if index < len(histogram["buckets"]):
+				histogram["buckets"][index] += value
+		elif metric in histogram:
+			histogram[metric] += value
+
+	return stages
+
+
+def _merge(target, source):
+	for metric in ("calls", "total_ms", "db_queries", "redis_calls"):
+		target[metric] += source[metric]
+
+	for index, count in enumerate(source["buckets"]):
+		target["buckets"][index] += count
+
+
+def _read_live():
+	"""Agregado ainda no Redis (inclui um snapshot por persistir)"""
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.hgetall(cache.make_key(METRICS_KEY))
+	pipe.hgetall(cache.make_key(SNAPSHOT_KEY))
+	live, snapshot = pipe.execute()
+
+	stages = _parse_redis_hash(live)
+	for stage, histogram in _parse_redis_hash(snapshot).items():
+		_merge(stages.setdefault(stage, _new_histogram()), histogram)
+
+	return stages
+
+
+def _read_persisted(since, stage=None):
+	filters = {"period_start": [">=", since]}
+	if stage:
+		filters["stage"] = stage
+
+	stages = {}
+	for row in frappe.get_all(METRIC_DOCTYPE, filters=filters,
+							  fields=["stage", "calls", "total_ms", "db_queries", "redis_calls", "histogram"]):
+		histogram = stages.setdefault(row.stage, _new_histogram())
+		_merge(histogram, {
+			"calls": cint(row.calls),
+			"total_ms": flt(row.total_ms),
+			"db_queries": cint(row.db_queries),
+			"redis_calls": cint(row.redis_calls),
+			"buckets": _load_buckets(row.histogram)
+		})
+
+	return stages
+
+
+def _load_buckets(value):
+	buckets = [0] * (len(BUCKETS_MS) + 1)
+	for index, count in enumerate(json.loads(value or "[]")[:len(buckets)]):
+		buckets[index] = cint(count)
+
+	return buckets
+
+
+def estimate_percentile(buckets, fraction):
+	"""Percentil estimado: limite superior do bucket onde a fração é atingida"""
+	total = sum(buckets)
+	if not total:
+		return None
+
+	target = total * fraction
+	cumulative = 0
+	for index, count in enumerate(buckets):
+		cumulative += count
+		if cumulative >= target:
+			return BUCKETS_MS[index] if index < len(BUCKETS_MS) else None
+
+	return None
+
+
+def summarize(histogram):
+	calls = histogram["calls"]
+	return {
+		"calls": calls,
+		"mean_ms": round(histogram["total_ms"] / calls, 3) if calls else None,
+		"p50_ms": estimate_percentile(histogram["buckets"], 0.5),
+		"p95_ms": estimate_percentile(histogram["buckets"], 0.95),
+		"p99_ms": estimate_percentile(histogram["buckets"], 0.99),
+		"avg_db_queries": round(histogram["db_queries"] / calls, 2) if calls else None,
+		"avg_redis_calls": round(histogram["redis_calls"] / calls, 2) if calls else None,
+		"total_ms": round(histogram["total_ms"], 3)
+	}
+
+
+def collect(hours=24, stage=None):
+	"""Histogramas por etapa: últimas hours horas persistidas + agregado em curso"""
+	flush()
+	stages = _read_persisted(add_to_date(now_datetime(), hours=-cint(hours)), stage)
+
+	for name, histogram in _read_live().items():
+		if not stage or name == stage:
+			_merge(stages.setdefault(name, _new_histogram()), histogram)
+
+	return stages
+
+
+def get_metrics(hours=24, stage=None):
+	"""
+	✅ Resumo por etapa (percentis estimados pelos buckets)
+
+	Returns:
+		dict: {"enabled", "hours", "buckets_ms", "stages": {etapa: {"calls", "p95_ms", ...}}}
+	"""
+	stages = collect(hours, stage)
+	return {
+		"enabled": is_enabled(),
+		"hours": cint(hours),
+		"buckets_ms": list(BUCKETS_MS),
+		"stages": {name: summarize(histogram) for name, histogram in sorted(stages.items())}
+	}
+
+
+def _escape_label(value):
+	return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render_prometheus(stages):
+	"""Histogramas no formato de texto Prometheus (segundos, buckets cumulativos)"""
+	lines = [
+		"# HELP portugal_compliance_stage_duration_seconds Wall time per instrumented stage",
+		"# TYPE portugal_compliance_stage_duration_seconds histogram"
+	]
+
+	for stage, histogram in sorted(stages.items()):
+		label = _escape_label(stage)
+		cumulative = 0
+		for index, count in enumerate(histogram["buckets"]):
+			cumulative += count
+			upper = f"{BUCKETS_MS[index] / 1000:g}" if index < len(BUCKETS_MS) else "+Inf"
+			lines.append(f'portugal_compliance_stage_duration_seconds_bucket{{stage="{label}",le="{upper}"}} {cumulative}')
+		lines.append(f'portugal_compliance_stage_duration_seconds_sum{{stage="{label}"}} {histogram["total_ms"] / 1000:.6f}')
+		lines.append(f'portugal_compliance_stage_duration_seconds_count{{stage="{label}"}} {histogram["calls"]}')
+
+	for metric, help_text in (("db_queries", "Database queries issued per stage"),
+							  ("redis_calls", "Redis calls issued per stage")):
+		lines.append(f"# HELP portugal_compliance_stage_{metric}_total {help_text}")
+		lines.append(f"# TYPE portugal_compliance_stage_{metric}_total counter")
+		for stage, histogram in sorted(stages.items()):
+			lines.append(f'portugal_compliance_stage_{metric}_total{{stage="{_escape_label(stage)}"}} {histogram[metric]}')
+
+	return "\n".join(lines) + "\n"
+
+
+# ========== PERSISTÊNCIA ==========
+
+def make_row_name(stage, period_start):
+	return hashlib.md5(f"{stage}|{get_datetime(period_start)}".encode("utf-8")).hexdigest()
+
+
+def persist_metrics():
+	"""
+	✅ Passar o agregado do Redis para Compliance Performance Metric (tarefa horária)
+
+	O hash é renomeado (atómico) antes de ser lido: observações novas vão para
+	um hash novo. O snapshot só é apagado depois do commit - se a tarefa falhar,
+	a execução seguinte volta a processá-lo.
+
+	Returns:
+		int: etapas persistidas
+	"""
+	flush()
+	cache = frappe.cache()
+	live_key = cache.make_key(METRICS_KEY)
+	snapshot_key = cache.make_key(SNAPSHOT_KEY)
+
+	pipe = cache.pipeline()
+	pipe.exists(snapshot_key)
+	pipe.exists(live_key)
+	snapshot_exists, live_exists = pipe.execute()
+
+	if not snapshot_exists:
+		if not live_exists:
+			return 0
+		cache.pipeline().rename(live_key, snapshot_key).execute()
+
+	stages = _parse_redis_hash(cache.pipeline().hgetall(snapshot_key).execute()[0])
+	period_start = now_datetime().replace(minute=0, second=0, microsecond=0)
+
+	for stage, histogram in stages.items():
+		_upsert_row(stage, period_start, histogram)
+
+	frappe.db.commit()
+	cache.pipeline().delete(snapshot_key).execute()
+	return len(stages)
+
+
+def _upsert_row(stage, period_start, histogram):
+	name = make_row_name(stage, period_start)
+	existing = frappe.db.get_value(METRIC_DOCTYPE, name,
+								   ["calls", "total_ms", "db_queries", "redis_calls", "histogram"],
+								   as_dict=True, for_update=True)
+
+	if existing:
+		_merge(histogram, {
+			"calls": cint(existing.calls),
+			"total_ms": flt(existing.total_ms),
+			"db_queries": cint(existing.db_queries),
+			"redis_calls": cint(existing.redis_calls),
+			"buckets": _load_buckets(existing.histogram)
+		})
+		frappe.db.set_value(METRIC_DOCTYPE, name, {
+			"calls": histogram["calls"],
+			"total_ms": histogram["total_ms"],
+			"db_queries": histogram["db_queries"],
+			"redis_calls": histogram["redis_calls"],
+			"histogram": json.dumps(histogram["buckets"])
+		}, update_modified=False)
+		return
+
+	frappe.get_doc({
+		"doctype": METRIC_DOCTYPE,
+		"stage": stage,
+		"period_start": period_start,
+		"calls": histogram["calls"],
+		"total_ms": histogram["total_ms"],
+		"db_queries": histogram["db_queries"],
+		"redis_calls": histogram["redis_calls"],
+		"histogram": json.dumps(histogram["buckets"])
+	}).insert(ignore_permissions=True)
+
+
+def cleanup_metrics(days=RETENTION_DAYS):
+	"""Apagar linhas com mais de days dias"""
+	frappe.db.delete(METRIC_DOCTYPE, {"period_start": ["<", add_to_date(now_datetime(), days=-cint(days))]})
+	frappe.db.commit()
+
+
+def reset_metrics():
+	_take_histograms()
+	cache = frappe.cache()
+	cache.pipeline().delete(cache.make_key(METRICS_KEY), cache.make_key(SNAPSHOT_KEY)).execute()
+
+
+# ========== APIS ==========
+
+@frappe.whitelist()
+def get_performance_metrics(hours=24, stage=None):
+	"""API: métricas por etapa (JSON)"""
+	frappe.only_for("System Manager")
+	return get_metrics(hours=hours, stage=stage)
+
+
+@frappe.whitelist()
+def get_prometheus_metrics(hours=24):
+	"""API: métricas no formato de texto Prometheus (para scraping)"""
+	from werkzeug.wrappers import Response
+
+	frappe.only_for("System Manager")
+	return Response(render_prometheus(collect(hours)), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+SAF-T Batch - Portugal Compliance
+SAF-T mensal/anual de todas as empresas como jobs independentes
+✅ FAN-OUT: Um job por empresa; empresas pequenas agrupadas num só job
+✅ LIMITE GLOBAL: No máximo N gerações SAF-T em simultâneo no site (slots no Redis),
+   independentemente de quantas execuções estão em curso
+✅ DURÁVEL: Cada empresa tem o seu SAF-T Export Log e o ficheiro fica em
+   private/files/saft_exports (generate_saft_background)
+✅ PROGRESSO: Estado agregado da execução a partir dos SAF-T Export Log
+
+Fila e slots:
+- os grupos de uma execução são acrescentados à fila global (LPUSH; saem por RPOP)
+- cada slot livre (SET NX com TTL) move atomicamente um grupo da fila para a lista
+  "em curso" do slot (RPOPLPUSH) e enfileira o job do grupo; no fim do grupo, o mesmo
+  slot troca-o pelo grupo seguinte
+- um slot de um worker que morreu (ou de um job perdido) expira pelo TTL, mas o grupo
+  continua na lista "em curso"; quem volta a ocupar o slot devolve-o à fila.
+  resume_saft_queue() (horária) ocupa os slots livres e recupera estes grupos
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate, now
+
+QUEUE_KEY = "portugal_compliance:saft_batch:queue"
+SLOT_KEY = "portugal_compliance:saft_batch:slot:{slot}"
+INFLIGHT_KEY = "portugal_compliance:saft_batch:inflight:{slot}"
+RUN_CACHE_KEY = "portugal_compliance_saft_batch_run_{run_id}"
+LAST_RUN_CACHE_KEY = "portugal_compliance_saft_batch_last_{kind}"
+
+DEFAULT_MAX_CONCURRENCY = 2
+
+# Linhas de GL Entry no período: abaixo de SMALL_COMPANY_ROWS a empresa é agrupada,
+# até GROUP_ROW_BUDGET linhas por grupo
+SMALL_COMPANY_ROWS = 20000
+GROUP_ROW_BUDGET = 100000
+
+KIND_SETTINGS = {
+	"monthly": {"timeout": 3600, "export_reason": "Monthly Submission"},
+	"annual": {"timeout": 14400, "export_reason": "Annual Submission"}
+}
+
+# Margem do TTL do slot sobre o timeout do job
+SLOT_TTL_MARGIN = 600
+RUN_TTL = 60 * 24 * 3600
+
+
+def get_max_concurrency():
+	"""Gerações SAF-T simultâneas (site_config: portugal_compliance_saft_max_concurrency)"""
+	return max(cint(frappe.conf.get("portugal_compliance_saft_max_concurrency")) or DEFAULT_MAX_CONCURRENCY, 1)
+
+
+# ========== AGRUPAMENTO ==========
+
+def get_company_sizes(companies, from_date, to_date):
+	"""Linhas de GL Entry por empresa no período (índice company, posting_date)"""
+	if not companies:
+		return {}
+
+	rows = frappe.db.sql("""
+		SELECT company, COUNT(*)
+		FROM `tabGL Entry`
+		WHERE company IN %(companies)s
+		  AND posting_date BETWEEN %(from_date)s AND %(to_date)s
+		  AND is_cancelled = 0
+		GROUP BY company
+	""", {"companies": list(companies), "from_date": from_date, "to_date": to_date})
+
+	sizes = {company: 0 for company in companies}
+	sizes.update({company: cint(count) for company, count in rows})
+	return sizes
+
+
+def group_companies(sizes, small_company_rows=SMALL_COMPANY_ROWS, group_row_budget=GROUP_ROW_BUDGET):
+	"""
+	✅ Empresas grandes sozinhas, pequenas agrupadas (first-fit decreasing)
+
+	Os grupos saem por tamanho decrescente: os jobs mais longos começam primeiro.
+
+	Returns:
+		list: [{"companies": [...], "rows": n}]
+	"""
+	groups = []
+	small_groups = []
+
+	for company, rows in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+		if rows >= small_company_rows:
+			groups.append({"companies": [company], "rows": rows})
+			continue
+
+		for group in small_groups:
+			if group["rows"] + rows <= group_row_budget:
+				group["companies"].append(company)
+				group["rows"] += rows
+				break
+		else:
+			small_groups.append({"companies": [company], "rows": rows})
+
+	return sorted(groups + small_groups, key=lambda group: -group["rows"])
+
+
+# ========== EXECUÇÃO ==========
+
+def start_saft_batch(kind, from_date, to_date, companies=None):
+	"""
+	✅ Criar os SAF-T Export Log e enfileirar a geração por grupos de empresas
+
+	Args:
+		kind: "monthly" ou "annual"
+		companies: por omissão, todas as empresas com portugal_compliance_enabled
+
+	Returns:
+		str: run_id
+	"""
+	if kind not in KIND_SETTINGS:
+		frappe.throw(_("Unknown SAF-T batch type: {0}").format(kind))
+
+	settings = KIND_SETTINGS[kind]
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	if companies is None:
+		companies = frappe.get_all("Company", filters={"portugal_compliance_enabled": 1}, pluck="name")
+
+	run_id = frappe.generate_hash(length=12)
+	export_logs = {}
+
+	for company in companies:
+		export_log = frappe.get_doc({
+			"doctype": "SAF-T Export Log",
+			"company": company,
+			"from_date": from_date,
+			"to_date": to_date,
+			"export_type": "Full",
+			"export_reason": settings["export_reason"],
+			"status": "Pending"
+		})
+		# A geração é feita pelos jobs do lote (não pelo after_insert)
+		export_log.flags.in_saft_batch = True
+		export_log.insert(ignore_permissions=True)
+		export_logs[company] = export_log.name
+
+	groups = group_companies(get_company_sizes(companies, from_date, to_date))
+
+	frappe.cache().set_value(RUN_CACHE_KEY.format(run_id=run_id), {
+		"run_id": run_id,
+		"kind": kind,
+		"from_date": str(from_date),
+		"to_date": str(to_date),
+		"started_at": now(),
+		"export_logs": export_logs,
+		"groups": [group["companies"] for group in groups]
+	}, expires_in_sec=RUN_TTL)
+	frappe.cache().set_value(LAST_RUN_CACHE_KEY.format(kind=kind), run_id, expires_in_sec=RUN_TTL)
+
+	# Os jobs só podem ler os logs depois do commit
+	frappe.db.commit()
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for group in groups:
+		pipe.lpush(cache.make_key(QUEUE_KEY), json.dumps({
+			"run_id": run_id,
+			"timeout": settings["timeout"],
+			"export_logs": [export_logs[company] for company in group["companies"]]
+		}))
+	pipe.execute()
+
+	fill_slots()
+
+	frappe.logger().info(
+		f"Portugal Compliance: SAF-T {kind} batch {run_id} - {len(companies)} companies in {len(groups)} jobs")
+	return run_id
+
+
+def _acquire_slot(slot, ttl):
+	cache = frappe.cache()
+	return bool(cache.pipeline().set(cache.make_key(SLOT_KEY.format(slot=slot)), now(), nx=True, ex=ttl)
+				.execute()[0])
+
+
+def _claim_slot(slot):
+	"""
+	Ocupar um slot livre; um grupo ainda "em curso" nesse slot pertence a um job
+	perdido (o slot expirou) e volta à fila
+	"""
+	if not _acquire_slot(slot, SLOT_TTL_MARGIN):
+		return False
+
+	cache = frappe.cache()
+	lost = cache.pipeline().rpoplpush(cache.make_key(INFLIGHT_KEY.format(slot=slot)),
+									  cache.make_key(QUEUE_KEY)).execute()[0]
+	if lost is not None:
+		frappe.logger().warning(f"Portugal Compliance: SAF-T batch group re-queued from expired slot {slot}")
+
+	return True
+
+
+def fill_slots():
+	"""Ocupar os slots livres (até ao limite global) com grupos da fila"""
+	for slot in range(get_max_concurrency()):
+		if _claim_slot(slot):
+			dispatch(slot)
+
+
+def dispatch(slot):
+	"""
+	✅ Com o slot ocupado: trocar o grupo "em curso" pelo próximo da fila e enfileirar o seu job
+
+	Sem grupos, o slot é libertado; a fila é relida depois de libertar para não
+	perder um grupo acrescentado entretanto (quem acrescenta tenta os slots depois).
+	"""
+	cache = frappe.cache()
+	queue_key = cache.make_key(QUEUE_KEY)
+	slot_key = cache.make_key(SLOT_KEY.format(slot=slot))
+	inflight_key = cache.make_key(INFLIGHT_KEY.format(slot=slot))
+
+	while True:
+		# Transação: o grupo terminado sai e o seguinte passa da fila para "em curso"
+		pipe = cache.pipeline()
+		pipe.delete(inflight_key)
+		pipe.rpoplpush(queue_key, inflight_key)
+		raw = pipe.execute()[1]
+		if raw is not None:
+			break
+
+		pipe = cache.pipeline()
+		pipe.delete(slot_key)
+		pipe.llen(queue_key)
+		_deleted, pending = pipe.execute()
+		if not pending or not _claim_slot(slot):
+			return
+
+	group = json.loads(raw)
+	timeout = cint(group.get("timeout")) or KIND_SETTINGS["monthly"]["timeout"]
+
+	# O slot fica ocupado enquanto o job do grupo puder estar a correr
+	cache.pipeline().expire(slot_key, timeout + SLOT_TTL_MARGIN).execute()
+
+	frappe.enqueue(
+		"portugal_compliance.utils.saft_batch.run_saft_group",
+		queue="long",
+		timeout=timeout,
+		slot=slot,
+		group=group
+	)
+
+
+def run_saft_group(slot, group):
+	"""
+	✅ Job de um grupo: gerar o SAF-T de cada empresa e passar o slot ao grupo seguinte
+
+	Logs "In Progress" são de uma execução anterior do mesmo grupo que não terminou
+	(o grupo só volta à fila depois de o slot do job perdido expirar).
+	"""
+	from portugal_compliance.utils.saft_generator import generate_saft_background
+
+	try:
+		for log_name in group["export_logs"]:
+			if frappe.db.get_value("SAF-T Export Log", log_name, "status") not in ("Pending", "In Progress"):
+				continue
+
+			# Trata os próprios erros (log Failed + realtime)
+			generate_saft_background(log_name)
+			frappe.db.commit()
+	finally:
+		dispatch(slot)
+
+
+def resume_saft_queue():
+	"""
+	✅ Tarefa horária: recuperar grupos de jobs perdidos (slot expirado) e retomar a fila
+
+	Slots acima do limite atual (limite reduzido entretanto) só devolvem o grupo à fila.
+	"""
+	cache = frappe.cache()
+	max_concurrency = get_max_concurrency()
+
+	for key in cache.scan_iter(match=cache.make_key(INFLIGHT_KEY.format(slot="*"))):
+		slot = cint(frappe.safe_decode(key).rsplit(":", 1)[-1])
+		if slot >= max_concurrency and _claim_slot(slot):
+			cache.pipeline().delete(cache.make_key(SLOT_KEY.format(slot=slot))).execute()
+
+	fill_slots()
+
+
+# ========== PROGRESSO ==========
+
+def get_saft_batch_status(run_id):
+	"""
+	✅ Progresso agregado de uma execução (estado lido dos SAF-T Export Log)
+
+	Returns:
+		dict | None
+	"""
+	run = frappe.cache().get_value(RUN_CACHE_KEY.format(run_id=run_id))
+	if not run:
+		return None
+
+	logs = frappe.get_all(
+		"SAF-T Export Log",
+		filters={"name": ["in", list(run["export_logs"].values())]},
+		fields=["name", "company", "status", "file_size", "processing_time", "total_records",
+				"xml_validation_status", "modified"]
+	)
+
+	by_status = {}
+	for log in logs:
+		by_status[log.status] = by_status.get(log.status, 0) + 1
+
+	finished = by_status.get("Completed", 0) + by_status.get("Failed", 0) + by_status.get("Cancelled", 0)
+	total = len(run["export_logs"])
+
+	return {
+		"run_id": run_id,
+		"kind": run["kind"],
+		"from_date": run["from_date"],
+		"to_date": run["to_date"],
+		"started_at": run["started_at"],
+		"total": total,
+		"finished": finished,
+		"progress": round(finished * 100.0 / total, 1) if total else 100.0,
+		"by_status": by_status,
+		"total_file_size": sum(cint(log.file_size) for log in logs),
+		"total_processing_time": round(sum(flt(log.processing_time) for log in logs), 3),
+		"last_update": str(max((log.modified for log in logs), default="") or ""),
+		"jobs": len(run["groups"]),
+		"companies": sorted(logs, key=lambda log: log.company)
+	}
+
+
+@frappe.whitelist()
+def get_saft_batch_progress(run_id=None, kind="monthly"):
+	"""✅ API: Progresso de uma execução (por omissão, a última do tipo indicado)"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	run_id = run_id or frappe.cache().get_value(LAST_RUN_CACHE_KEY.format(kind=kind))
+	if not run_id:
+		return None
+
+	return get_saft_batch_status(run_id)
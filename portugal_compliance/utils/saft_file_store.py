@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+SAF-T File Store - Portugal Compliance
+Ficheiros SAF-T já gerados servidos a partir do disco
+✅ STREAMING: Leitura em blocos, nunca o ficheiro inteiro em memória
+✅ RANGES: Pedidos HTTP Range (retoma de downloads) sobre o ficheiro original
+✅ COMPRESSÃO: gzip ou zip gerados em streaming
+✅ INTEGRIDADE: SHA256 verificado em blocos e memorizado por (tamanho, mtime)
+✅ FINGERPRINT: Só regenerar quando os dados de origem mudaram
+"""
+
+import gzip
+import hashlib
+import os
+import zipfile
+
+import frappe
+from frappe.utils import getdate
+from werkzeug.http import parse_range_header
+
+CHUNK_SIZE = 1024 * 1024
+
+# Incrementar quando o formato gerado mudar (invalida todos os fingerprints)
+FINGERPRINT_VERSION = "1"
+
+# Documentos cujo conteúdo entra no SAF-T (contagem + último modified no período)
+FINGERPRINT_DOCUMENTS = (
+	"Sales Invoice",
+	"POS Invoice",
+	"Purchase Invoice",
+	"Payment Entry",
+	"Journal Entry",
+	"Delivery Note",
+	"Purchase Receipt",
+	"Stock Entry"
+)
+
+# Dados mestre (último modified da tabela inteira - índice em modified)
+FINGERPRINT_MASTERS = ("Customer", "Supplier", "Item", "Account")
+
+VERIFIED_CACHE_PREFIX = "portugal_compliance:saft_verified:"
+
+COMPRESSION_TYPES = {
+	"gzip": {"extension": ".gz", "content_type": "application/gzip"},
+	"zip": {"extension": ".zip", "content_type": "application/zip"}
+}
+
+
+# ========== FINGERPRINT ==========
+
+def compute_source_fingerprint(company, from_date, to_date, export_type):
+	"""
+	✅ Resumo barato dos dados de origem de uma exportação
+
+	Inclui contagem e MAX(modified) dos documentos submetidos/cancelados do
+	período, o último modified dos dados mestre e da empresa.
+	"""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	parts = [FINGERPRINT_VERSION, company, str(from_date), str(to_date), export_type or ""]
+
+	for doctype in FINGERPRINT_DOCUMENTS:
+		if not frappe.db.table_exists(doctype):
+			continue
+
+		count, last_modified = frappe.db.sql(f"""
+			SELECT COUNT(*), MAX(modified)
+			FROM `tab{doctype}`
+			WHERE company = %(company)s
+				AND posting_date BETWEEN %(from_date)s AND %(to_date)s
+				AND docstatus > 0
+		""", {"company": company, "from_date": from_date, "to_date": to_date})[0]
+		parts.append(f"{doctype}:{count}:{last_modified}")
+
+	for doctype in FINGERPRINT_MASTERS:
+		parts.append(f"{doctype}:{frappe.db.sql(f'SELECT MAX(modified) FROM `tab{doctype}`')[0][0]}")
+
+	parts.append(f"Company:{frappe.db.get_value('Company', company, 'modified')}")
+
+	return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_download_state(export_log):
+	"""
+	✅ Estado do ficheiro de uma exportação
+
+	Returns:
+		str: "ready", "missing", "stale" ou "not_completed"
+	"""
+	if export_log.status != "Completed":
+		return "not_completed"
+
+	if not export_log.file_path or not os.path.isfile(export_log.file_path):
+		return "missing"
+
+	if export_log.get("source_fingerprint") != compute_source_fingerprint(
+			export_log.company, export_log.from_date, export_log.to_date, export_log.export_type):
+		return "stale"
+
+	return "ready"
+
+
+# ========== INTEGRIDADE ==========
+
+def hash_file(file_path, chunk_size=CHUNK_SIZE):
+	"""SHA256 de um ficheiro lido em blocos"""
+	digest = hashlib.sha256()
+	with open(file_path, "rb") as handle:
+		for block in iter(lambda: handle.read(chunk_size), b""):
+			digest.update(block)
+
+	return digest.hexdigest()
+
+
+def verify_file(file_path, expected_hash):
+	"""
+	✅ Verificar o ficheiro contra o hash guardado
+
+	O resultado é memorizado por (caminho, tamanho, mtime): downloads repetidos
+	de um ficheiro inalterado não voltam a ler o disco para calcular o hash.
+	"""
+	if not expected_hash:
+		return False
+
+	stat = os.stat(file_path)
+	cache_key = f"{VERIFIED_CACHE_PREFIX}{hashlib.sha1(file_path.encode('utf-8')).hexdigest()}"
+	signature = f"{stat.st_size}:{stat.st_mtime_ns}:{expected_hash}"
+
+	if frappe.cache().get_value(cache_key) == signature:
+		return True
+
+	if hash_file(file_path) != expected_hash:
+		return False
+
+	frappe.cache().set_value(cache_key, signature)
+	return True
+
+
+# ========== STREAMING ==========
+
+def iter_file_range(file_path, start=0, stop=None, chunk_size=CHUNK_SIZE):
+	"""Blocos de bytes do intervalo [start, stop) do ficheiro"""
+	with open(file_path, "rb") as handle:
+		handle.seek(start)
+		remaining = None if stop is None else stop - start
+
+		while remaining is None or remaining > 0:
+			block = handle.read(chunk_size if remaining is None else min(chunk_size, remaining))
+			if not block:
+				break
+
+			if remaining is not None:
+				remaining -= len(block)
+			yield block
+
+
+def iter_gzip(file_path, arcname, chunk_size=CHUNK_SIZE):
+	"""Ficheiro comprimido em gzip bloco a bloco (cabeçalho com o nome original)"""
+	buffer = _StreamBuffer()
+	with gzip.GzipFile(filename=arcname, mode="wb", fileobj=buffer, mtime=0) as compressed:
+		for block in iter_file_range(file_path, chunk_size=chunk_size):
+			compressed.write(block)
+			yield from buffer.drain()
+
+	yield from buffer.drain()
+
+
+def iter_zip(file_path, arcname, chunk_size=CHUNK_SIZE):
+	"""Arquivo zip com uma única entrada, escrito num stream não posicionável"""
+	buffer = _StreamBuffer()
+	with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+		with archive.open(zipfile.ZipInfo(arcname), mode="w", force_zip64=True) as entry:
+			for block in iter_file_range(file_path, chunk_size=chunk_size):
+				entry.write(block)
+				yield from buffer.drain()
+
+	yield from buffer.drain()
+
+
+class _StreamBuffer:
+	"""Destino de escrita não posicionável que acumula bytes até serem drenados"""
+
+	def __init__(self):
+		self._chunks = []
+		self._position = 0
+
+	def write(self, data):
+		if data:
+			self._chunks.append(bytes(data))
+			self._position += len(data)
+		return len(data)
+
+	def tell(self):
+		return self._position
+
+	def flush(self):
+		pass
+
+	def drain(self):
+		chunks, self._chunks = self._chunks, []
+		yield from chunks
+
+
+# ========== RANGES ==========
+
+def resolve_range(range_header, file_size, if_range=None, etag=None):
+	"""
+	✅ Interpretar o cabeçalho Range (um único intervalo)
+
+	Returns:
+		tuple: (start, stop) ou None para o ficheiro completo
+	Raises:
+		ValueError: intervalo não satisfazível (HTTP 416)
+	"""
+	if not range_header:
+		return None
+
+	# If-Range com ETag diferente: enviar o ficheiro completo
+	if if_range and etag and if_range.strip('"') != etag:
+		return None
+
+	parsed = parse_range_header(range_header)
+	if not parsed or len(parsed.ranges) != 1:
+		return None
+
+	resolved = parsed.range_for_length(file_size)
+	if resolved is None:
+		raise ValueError("Range Not Satisfiable")
+
+	return resolved
+
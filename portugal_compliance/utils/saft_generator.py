@@ -2,21 +2,36 @@ import frappe
 from frappe import _
 from frappe.utils import getdate, formatdate, now, get_site_path
 import os
+import re
 import hashlib
-import xml.etree.ElementTree as ET
 from jinja2 import Environment, FileSystemLoader
 import time
 from datetime import datetime
+from portugal_compliance.exceptions.saft_generation_error import SAFTSchemaError
+from portugal_compliance.utils.document_signer import get_document_no
+from portugal_compliance.utils.gl_balance_engine import get_account_balances, roll_up_balances
+from portugal_compliance.utils.performance_metrics import instrumented
+from portugal_compliance.utils.saft_file_store import compute_source_fingerprint
+from portugal_compliance.utils.saft_validator import (
+	ConcurrentSAFTValidator,
+	apply_validation_result,
+	format_validation_errors,
+	validate_saft_content
+)
+
+# Blocos escritos em disco e entregues ao validador XSD
+WRITE_BLOCK_SIZE = 256 * 1024
 
 
 class SAFTGenerator:
 	def __init__(self):
 		self.template_path = os.path.join(
 			frappe.get_app_path("portugal_compliance"),
-			"templates", "saf_t"
+			"templates", "saft_t"
 		)
 		self.records_count = 0
 
+	@instrumented("saft.generate")
 	def generate_saft(self, company, from_date, to_date, export_type="full"):
 		"""
 		Gera arquivo SAF-T XML para empresa e período especificado
@@ -37,22 +52,28 @@ class SAFTGenerator:
 			# Carregar e renderizar template
 			saft_xml = self.render_template(context)
 
-			# Validar XML gerado
-			if self.validate_xml_structure(saft_xml):
-				processing_time = time.time() - start_time
-				frappe.publish_realtime('saft_generation_progress', {
-					'status': 'completed',
-					'processing_time': processing_time
-				})
+			# Validar XML gerado (XSD por secção, streaming)
+			validation = validate_saft_content(saft_xml)
+			if not validation["valid"]:
+				raise SAFTSchemaError(
+					_("Generated SAF-T XML failed XSD validation:\n{0}").format(format_validation_errors(validation)),
+					schema_version="1.04_01",
+					validation_errors=validation["errors"]
+				)
+
+			processing_time = time.time() - start_time
+			frappe.publish_realtime('saft_generation_progress', {
+				'status': 'completed',
+				'processing_time': processing_time
+			})
 
-				return saft_xml
-			else:
-				raise Exception("XML gerado não passou na validação")
+			return saft_xml
 
 		except Exception as e:
 			frappe.log_error(f"Erro na geração SAF-T: {str(e)}")
 			raise
 
+	@instrumented("saft.prepare_context")
 	def prepare_context(self, company_doc, from_date, to_date, export_type):
 		"""
 		Prepara contexto com todos os dados necessários para o template
@@ -83,7 +104,7 @@ class SAFTGenerator:
 			"payments": self.get_payments_data(company_doc.name, from_date, to_date),
 
 			# Accounting data (if export_type includes accounting)
-			"chart_of_accounts": self.get_chart_of_accounts(company_doc.name) if export_type in [
+			"chart_of_accounts": self.get_chart_of_accounts(company_doc.name, from_date, to_date) if export_type in [
 				"full", "accounting"] else [],
 			"journal_entries": self.get_journal_entries_data(company_doc.name, from_date,
 															 to_date) if export_type in ["full",
@@ -92,7 +113,9 @@ class SAFTGenerator:
 			# Movement of goods (if export_type includes movement)
 			"stock_movements": self.get_stock_movements_data(company_doc.name, from_date,
 															 to_date) if export_type in ["full",
-																						 "movement"] else []
+																						 "movement"] else [],
+			"delivery_notes": self.get_delivery_notes_data(company_doc.name, from_date,
+														   to_date) if export_type in ["full", "movement"] else []
 		}
 
 		return context
@@ -232,12 +255,27 @@ class SAFTGenerator:
 
 	def get_sales_invoices_data(self, company, from_date, to_date):
 		"""
-		Obtém dados das faturas de venda
+		Obtém dados das faturas de venda (Sales Invoice e POS Invoice)
+		✅ Número, datas e total exportados são os mesmos da mensagem assinada
 		"""
-		invoices = frappe.db.sql("""
+		invoices = []
+		for doctype in ("Sales Invoice", "POS Invoice"):
+			invoices.extend(self.get_signed_invoices_data(doctype, company, from_date, to_date))
+
+		self.records_count += len(invoices)
+		return invoices
+
+	def get_signed_invoices_data(self, doctype, company, from_date, to_date):
+		"""
+		Obtém faturas de um doctype assinado, com os itens agrupados por fatura
+		"""
+		invoices = frappe.db.sql(f"""
 								 SELECT si.name,
 										si.customer,
 										si.posting_date,
+										si.creation,
+										si.docstatus,
+										si.owner,
 										si.due_date,
 										si.total,
 										si.grand_total,
@@ -247,18 +285,20 @@ class SAFTGenerator:
 										si.status,
 										si.atcud_code,
 										si.portugal_series,
+										si.saft_hash,
+										si.saft_hash_control,
 										sii.item_code,
 										sii.item_name,
 										sii.qty,
 										sii.rate,
 										sii.amount,
 										sii.base_amount
-								 FROM `tabSales Invoice` si
-										  INNER JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
+								 FROM `tab{doctype}` si
+										  INNER JOIN `tab{doctype} Item` sii ON sii.parent = si.name
 								 WHERE si.company = %s
 								   AND si.posting_date BETWEEN %s AND %s
 								   AND si.docstatus = 1
-								 ORDER BY si.posting_date, si.name
+								 ORDER BY si.posting_date, si.name, sii.idx
 								 """, (company, from_date, to_date), as_dict=True)
 
 		# Agrupar itens por fatura
@@ -266,23 +306,28 @@ class SAFTGenerator:
 		for invoice in invoices:
 			invoice_id = invoice.name
 			if invoice_id not in grouped_invoices:
-				grouped_invoices[invoice_id] = {
-					'header': {
-						'name': invoice.name,
-						'customer': invoice.customer,
-						'posting_date': invoice.posting_date,
-						'due_date': invoice.due_date,
-						'total': invoice.total,
-						'grand_total': invoice.grand_total,
-						'outstanding_amount': invoice.outstanding_amount,
-						'currency': invoice.currency,
-						'conversion_rate': invoice.conversion_rate,
-						'status': invoice.status,
-						'atcud_code': invoice.atcud_code,
-						'portugal_series': invoice.portugal_series
-					},
+				grouped_invoices[invoice_id] = frappe._dict({
+					'name': invoice.name,
+					'document_no': get_document_no(invoice),
+					'customer': invoice.customer,
+					'posting_date': invoice.posting_date,
+					'creation': invoice.creation,
+					'docstatus': invoice.docstatus,
+					'owner': invoice.owner,
+					'is_pos': doctype == "POS Invoice",
+					'due_date': invoice.due_date,
+					'total': invoice.total,
+					'grand_total': invoice.grand_total,
+					'outstanding_amount': invoice.outstanding_amount,
+					'currency': invoice.currency,
+					'conversion_rate': invoice.conversion_rate,
+					'status': invoice.status,
+					'atcud_code': invoice.atcud_code,
+					'portugal_series': invoice.portugal_series,
+					'hash_control': invoice.saft_hash,
+					'hash_control_version': invoice.saft_hash_control,
 					'items': []
-				}
+				})
 
 			grouped_invoices[invoice_id]['items'].append({
 				'item_code': invoice.item_code,
@@ -293,7 +338,6 @@ class SAFTGenerator:
 				'base_amount': invoice.base_amount
 			})
 
-		self.records_count += len(grouped_invoices)
 		return list(grouped_invoices.values())
 
 	def get_purchase_invoices_data(self, company, from_date, to_date):
@@ -389,9 +433,10 @@ class SAFTGenerator:
 		self.records_count += len(payments)
 		return payments
 
-	def get_chart_of_accounts(self, company):
+	def get_chart_of_accounts(self, company, from_date, to_date):
 		"""
-		Obtém plano de contas
+		Obtém plano de contas com saldos de abertura/fecho do período
+		✅ Saldos do agregado mensal (gl_balance_engine) - sem varrer o GL Entry
 		"""
 		accounts = frappe.db.sql("""
 								 SELECT name,
@@ -400,12 +445,17 @@ class SAFTGenerator:
 										account_type,
 										parent_account,
 										is_group,
-										account_currency
+										account_currency,
+										creation
 								 FROM `tabAccount`
 								 WHERE company = %s
 								 ORDER BY account_number, name
 								 """, (company,), as_dict=True)
 
+		balances = roll_up_balances(accounts, get_account_balances(company, from_date, to_date))
+		for account in accounts:
+			account.update(balances[account.name])
+
 		return accounts
 
 	def get_journal_entries_data(self, company, from_date, to_date):
@@ -457,9 +507,73 @@ class SAFTGenerator:
 
 		return stock_movements
 
-	def render_template(self, context):
+	def get_delivery_notes_data(self, company, from_date, to_date):
+		"""
+		Obtém guias de remessa (Delivery Note) para MovementOfGoods
+		✅ Exporta o hash da assinatura e os campos da mensagem assinada
+		"""
+		notes = frappe.db.sql("""
+							  SELECT dn.name,
+									 dn.customer,
+									 dn.posting_date,
+									 dn.creation,
+									 dn.docstatus,
+									 dn.owner,
+									 dn.set_warehouse,
+									 dn.net_total,
+									 dn.grand_total,
+									 dn.atcud_code,
+									 dn.saft_hash,
+									 dn.saft_hash_control,
+									 dni.item_code,
+									 dni.item_name,
+									 dni.qty,
+									 dni.uom,
+									 dni.rate,
+									 dni.against_sales_order
+							  FROM `tabDelivery Note` dn
+									   INNER JOIN `tabDelivery Note Item` dni ON dni.parent = dn.name
+							  WHERE dn.company = %s
+								AND dn.posting_date BETWEEN %s AND %s
+								AND dn.docstatus = 1
+							  ORDER BY dn.posting_date, dn.name, dni.idx
+							  """, (company, from_date, to_date), as_dict=True)
+
+		grouped_notes = {}
+		for note in notes:
+			if note.name not in grouped_notes:
+				grouped_notes[note.name] = frappe._dict({
+					'name': note.name,
+					'document_no': get_document_no(note),
+					'customer': note.customer,
+					'posting_date': note.posting_date,
+					'creation': note.creation,
+					'docstatus': note.docstatus,
+					'owner': note.owner,
+					'from_warehouse': note.set_warehouse,
+					'net_total': note.net_total,
+					'grand_total': note.grand_total,
+					'atcud_code': note.atcud_code,
+					'hash_control': note.saft_hash,
+					'hash_control_version': note.saft_hash_control,
+					'items': []
+				})
+
+			grouped_notes[note.name]['items'].append({
+				'item_code': note.item_code,
+				'item_name': note.item_name,
+				'qty': note.qty,
+				'uom': note.uom,
+				'basic_rate': note.rate,
+				'sales_order': note.against_sales_order
+			})
+
+		self.records_count += len(grouped_notes)
+		return list(grouped_notes.values())
+
+	def get_template_environment(self):
 		"""
-		Renderiza template SAF-T com contexto fornecido
+		Ambiente Jinja com os filtros SAF-T
 		"""
 		env = Environment(
 			loader=FileSystemLoader(self.template_path),
@@ -473,8 +587,78 @@ class SAFTGenerator:
 		env.filters['format_decimal'] = self.format_decimal_filter
 		env.filters['escape_xml'] = self.escape_xml_filter
 
-		template = env.get_template('main.xml')
-		return template.render(context)
+		return env
+
+	def render_template(self, context):
+		"""
+		Renderiza template SAF-T com contexto fornecido
+		"""
+		return self.get_template_environment().get_template('main.xml').render(context)
+
+	def iter_rendered_blocks(self, context, block_size=WRITE_BLOCK_SIZE):
+		"""
+		Renderiza o template em streaming, em blocos de bytes UTF-8
+		"""
+		template = self.get_template_environment().get_template('main.xml')
+		buffer, size = [], 0
+
+		for piece in template.generate(context):
+			buffer.append(piece)
+			size += len(piece)
+			if size >= block_size:
+				yield "".join(buffer).encode("utf-8")
+				buffer, size = [], 0
+
+		if buffer:
+			yield "".join(buffer).encode("utf-8")
+
+	@instrumented("saft.write_file")
+	def write_saft_file(self, company, from_date, to_date, export_type="full", validate=True, file_key=None):
+		"""
+		Gera o SAF-T diretamente para disco, bloco a bloco
+		- file_key: nome do SAF-T Export Log (ou sufixo único) - cada exportação tem o seu ficheiro
+		- SHA256 e tamanho calculados durante a escrita
+		- Validação XSD numa thread em paralelo: cada bloco é validado enquanto o
+		  seguinte é renderizado e escrito
+		"""
+		start_time = time.time()
+		from_date = getdate(from_date)
+		to_date = getdate(to_date)
+
+		company_doc = frappe.get_doc("Company", company)
+		context = self.prepare_context(company_doc, from_date, to_date, export_type)
+
+		file_path = self.get_export_path(company, from_date, to_date, export_type, file_key)
+		temp_path = f"{file_path}.tmp"
+		digest = hashlib.sha256()
+		file_size = 0
+		validator = ConcurrentSAFTValidator() if validate else None
+
+		try:
+			with open(temp_path, "wb") as handle:
+				for block in self.iter_rendered_blocks(context):
+					handle.write(block)
+					digest.update(block)
+					file_size += len(block)
+					if validator:
+						validator.feed(block)
+		except Exception:
+			if validator:
+				validator.close()
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+			raise
+
+		validation = validator.close() if validator else None
+		os.replace(temp_path, file_path)
+
+		return {
+			"file_path": file_path,
+			"file_size": file_size,
+			"file_hash": digest.hexdigest(),
+			"validation": validation,
+			"processing_time": time.time() - start_time
+		}
 
 	def format_date_filter(self, date_value):
 		"""
@@ -513,52 +697,37 @@ class SAFTGenerator:
 
 		return value
 
-	def validate_xml_structure(self, xml_content):
-		"""
-		Valida estrutura básica do XML SAF-T
-		"""
-		try:
-			root = ET.fromstring(xml_content)
-
-			# Verificar namespace
-			expected_namespace = "urn:OECD:StandardAuditFile-Tax:PT_1.04_01"
-			if root.tag != f"{{{expected_namespace}}}AuditFile":
-				return False
-
-			# Verificar elementos obrigatórios
-			required_elements = ["Header", "MasterFiles"]
-			for element in required_elements:
-				if root.find(f".//{{{expected_namespace}}}{element}") is None:
-					return False
-
-			return True
-
-		except ET.ParseError:
-			return False
-
 	def get_records_count(self):
 		"""
 		Retorna número total de registros processados
 		"""
 		return self.records_count
 
-	def save_saft_file(self, xml_content, company, from_date, to_date):
+	def save_saft_file(self, xml_content, company, from_date, to_date, export_type="full", file_key=None):
 		"""
 		Salva arquivo SAF-T no sistema de arquivos
 		"""
-		filename = f"SAFT-PT_{company}_{from_date}_{to_date}.xml"
-
-		# Criar diretório se não existir
-		export_dir = os.path.join(get_site_path(), "private", "files", "saft_exports")
-		os.makedirs(export_dir, exist_ok=True)
-
-		file_path = os.path.join(export_dir, filename)
+		file_path = self.get_export_path(company, from_date, to_date, export_type, file_key)
 
 		with open(file_path, 'w', encoding='utf-8') as f:
 			f.write(xml_content)
 
 		return file_path
 
+	def get_export_path(self, company, from_date, to_date, export_type="full", file_key=None):
+		"""
+		Caminho do ficheiro SAF-T (cria o diretório se não existir)
+		Tipo de exportação + nome do log (ou sufixo aleatório) no nome: exportações do
+		mesmo período nunca substituem o ficheiro (e o hash) de um log anterior
+		"""
+		file_key = re.sub(r"[^\w.-]", "_", file_key or frappe.generate_hash(length=10))
+		filename = f"SAFT-PT_{company}_{from_date}_{to_date}_{export_type or 'full'}_{file_key}.xml"
+
+		export_dir = os.path.join(get_site_path(), "private", "files", "saft_exports")
+		os.makedirs(export_dir, exist_ok=True)
+
+		return os.path.join(export_dir, filename)
+
 	def generate_file_hash(self, xml_content):
 		"""
 		Gera hash SHA256 do conteúdo XML
@@ -578,34 +747,36 @@ def generate_saft_background(log_name):
 
 		generator = SAFTGenerator()
 
-		# Gerar SAF-T
-		saft_xml = generator.generate_saft(
-			export_log.company,
-			export_log.from_date,
-			export_log.to_date,
-			export_log.export_type
+		# Fingerprint dos dados de origem (antes de gerar)
+		source_fingerprint = compute_source_fingerprint(
+			export_log.company, export_log.from_date, export_log.to_date, export_log.export_type
 		)
 
-		# Salvar arquivo
-		file_path = generator.save_saft_file(
-			saft_xml,
+		# Gerar SAF-T para disco com validação XSD concorrente
+		result = generator.write_saft_file(
 			export_log.company,
 			export_log.from_date,
-			export_log.to_date
+			export_log.to_date,
+			export_log.export_type,
+			file_key=export_log.name
 		)
 
 		# Atualizar log
-		export_log.file_path = file_path
-		export_log.file_size = len(saft_xml.encode('utf-8'))
-		export_log.file_hash = generator.generate_file_hash(saft_xml)
+		export_log.file_path = result["file_path"]
+		export_log.file_size = result["file_size"]
+		export_log.file_hash = result["file_hash"]
+		export_log.source_fingerprint = source_fingerprint
 		export_log.total_records = generator.get_records_count()
+		export_log.processing_time = result["processing_time"]
+		apply_validation_result(export_log, result["validation"])
 		export_log.status = "Completed"
 		export_log.save()
 
 		# Notificar conclusão
 		frappe.publish_realtime('saft_export_completed', {
 			'export_log_name': log_name,
-			'filename': os.path.basename(file_path)
+			'filename': os.path.basename(result["file_path"]),
+			'xml_validation_status': export_log.xml_validation_status
 		})
 
 	except Exception as e:
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+SAF-T Validator - Portugal Compliance
+Validação XSD em streaming contra xsd/saftpt1.04_01.xsd (XSD 1.1)
+✅ STREAMING: lxml XMLPullParser alimentado por blocos (ficheiro ou gerador)
+✅ POR SECÇÕES: Cada registo (Customer, Invoice, Transaction, ...) é validado com a
+   sua declaração no XSD e descartado - memória limitada ao maior registo
+✅ ERROS: Primeiros N erros com número de linha; contagem total mantida
+✅ CONCORRENTE: ConcurrentSAFTValidator valida numa thread enquanto o ficheiro é escrito
+"""
+
+import queue
+import threading
+
+import frappe
+from lxml import etree
+
+SAFT_NAMESPACE = "urn:OECD:StandardAuditFile-Tax:PT_1.04_01"
+SAFT_XSD_FILE = "saftpt1.04_01.xsd"
+
+DEFAULT_MAX_ERRORS = 50
+FEED_CHUNK_SIZE = 256 * 1024
+
+# Registos validados como subárvore completa e libertados logo a seguir
+RECORD_PATHS = frozenset([
+	("AuditFile", "Header"),
+	("AuditFile", "MasterFiles", "GeneralLedgerAccounts", "Account"),
+	("AuditFile", "MasterFiles", "Customer"),
+	("AuditFile", "MasterFiles", "Supplier"),
+	("AuditFile", "MasterFiles", "Product"),
+	("AuditFile", "MasterFiles", "TaxTable", "TaxTableEntry"),
+	("AuditFile", "GeneralLedgerEntries", "Journal", "Transaction"),
+	("AuditFile", "SourceDocuments", "SalesInvoices", "Invoice"),
+	("AuditFile", "SourceDocuments", "MovementOfGoods", "StockMovement"),
+	("AuditFile", "SourceDocuments", "WorkingDocuments", "WorkDocument"),
+	("AuditFile", "SourceDocuments", "Payments", "Payment")
+])
+
+# Contentores: só se verifica a presença dos filhos obrigatórios
+CONTAINER_PATHS = frozenset(
+	record_path[:depth] for record_path in RECORD_PATHS for depth in range(1, len(record_path))
+)
+
+_schema = None
+_declarations = {}
+
+
+# ========== SCHEMA ==========
+
+def get_saft_schema():
+	"""XSD SAF-T (PT) carregado uma vez por processo"""
+	global _schema
+
+	if _schema is None:
+		import xmlschema
+
+		_schema = xmlschema.XMLSchema11(
+			frappe.get_app_path("portugal_compliance", "xsd", SAFT_XSD_FILE))
+
+	return _schema
+
+
+def get_declaration(path):
+	"""Declaração XSD de um caminho (tuplo de nomes locais) - memorizada"""
+	if path not in _declarations:
+		xpath = "/" + "/".join(f"saft:{name}" for name in path)
+		_declarations[path] = get_saft_schema().find(xpath, namespaces={"saft": SAFT_NAMESPACE})
+
+	return _declarations[path]
+
+
+# ========== VALIDADOR EM STREAMING ==========
+
+class StreamingSAFTValidator:
+	"""
+	✅ Validador incremental: feed(bytes) ... close() -> resultado
+
+	Uso:
+		validator = StreamingSAFTValidator()
+		for block in blocks:
+			validator.feed(block)
+		result = validator.close()
+	"""
+
+	def __init__(self, max_errors=DEFAULT_MAX_ERRORS):
+		self.max_errors = max_errors
+		self.schema = get_saft_schema()
+		self.parser = etree.XMLPullParser(events=("start", "end"), huge_tree=True)
+		self.path = []
+		self.seen_children = {}
+		self.errors = []
+		self.error_count = 0
+		self.sections = 0
+		self.well_formed = True
+		self.closed = False
+
+	# ---------- API ----------
+
+	def feed(self, data):
+		if not self.well_formed:
+			return
+
+		try:
+			self.parser.feed(data)
+		except etree.XMLSyntaxError as e:
+			self._syntax_error(e)
+			return
+
+		self._process_events()
+
+	def close(self):
+		if not self.closed:
+			self.closed = True
+			if self.well_formed:
+				try:
+					self.parser.close()
+				except etree.XMLSyntaxError as e:
+					self._syntax_error(e)
+				else:
+					self._process_events()
+
+		return self.result()
+
+	def result(self):
+		return {
+			"valid": self.well_formed and self.error_count == 0,
+			"well_formed": self.well_formed,
+			"error_count": self.error_count,
+			"errors": list(self.errors),
+			"sections": self.sections
+		}
+
+	# ---------- EVENTOS ----------
+
+	def _process_events(self):
+		for event, elem in self.parser.read_events():
+			if event == "start":
+				self._start(elem)
+			else:
+				self._end(elem)
+
+	def _start(self, elem):
+		qname = etree.QName(elem)
+
+		if not self.path and (qname.namespace != SAFT_NAMESPACE or qname.localname != "AuditFile"):
+			self._add_error(elem.sourceline, f"/{qname.localname}",
+							f"Root element must be AuditFile in namespace {SAFT_NAMESPACE}")
+
+		self.path.append(qname.localname)
+
+		path = tuple(self.path)
+		if path in CONTAINER_PATHS:
+			self.seen_children[path] = set()
+
+	def _end(self, elem):
+		path = tuple(self.path)
+		self.path.pop()
+
+		if path[:-1] in self.seen_children:
+			self.seen_children[path[:-1]].add(path[-1])
+
+		if path in CONTAINER_PATHS:
+			self._check_required_children(elem, path)
+		elif path in RECORD_PATHS or path[:-1] in CONTAINER_PATHS:
+			self._validate_fragment(elem, path)
+		else:
+			# Descendentes de um registo: validados com o registo
+			return
+
+		self._release(elem)
+
+	def _validate_fragment(self, elem, path):
+		declaration = get_declaration(path)
+		self.sections += 1
+
+		if declaration is None:
+			self._add_error(elem.sourceline, "/" + "/".join(path), "Unexpected element")
+			return
+
+		for error in declaration.iter_errors(elem):
+			self._add_error(error.sourceline or elem.sourceline, error.path or "/" + "/".join(path),
+							error.reason or str(error))
+
+	def _check_required_children(self, elem, path):
+		"""Contentor já sem filhos (libertados): confirmar os obrigatórios"""
+		seen = self.seen_children.pop(path, set())
+		declaration = get_declaration(path)
+		if declaration is None:
+			self._add_error(elem.sourceline, "/" + "/".join(path), "Unexpected element")
+			return
+
+		content = getattr(declaration.type, "content", None)
+		if content is None or not hasattr(content, "iter_elements"):
+			return
+
+		for child in content.iter_elements():
+			local_name = etree.QName(child.name).localname if child.name else None
+			if local_name and child.min_occurs and local_name not in seen:
+				self._add_error(elem.sourceline, "/" + "/".join(path),
+								f"Required element {local_name} is missing")
+
+	def _release(self, elem):
+		"""Libertar o elemento e os irmãos anteriores (memória limitada)"""
+		elem.clear(keep_tail=False)
+		parent = elem.getparent()
+		if parent is not None:
+			while elem.getprevious() is not None:
+				del parent[0]
+
+	def _syntax_error(self, error):
+		self.well_formed = False
+		line = error.position[0] if getattr(error, "position", None) else getattr(error, "lineno", None)
+		self._add_error(line, "/" + "/".join(self.path), f"XML syntax error: {error.msg}")
+
+	def _add_error(self, line, path, message):
+		self.error_count += 1
+		if len(self.errors) < self.max_errors:
+			self.errors.append({"line": line, "path": path, "message": message})
+
+
+class ConcurrentSAFTValidator:
+	"""
+	✅ Validação numa thread enquanto o ficheiro é escrito
+
+	feed() coloca o bloco numa fila limitada (o escritor só espera se a
+	validação ficar muito atrasada); close() espera pelo fim e devolve o resultado.
+	O parser lxml é criado e usado apenas dentro da thread de validação.
+	"""
+
+	def __init__(self, max_errors=DEFAULT_MAX_ERRORS, max_pending=64):
+		# Schema carregado na thread principal (precisa do contexto frappe)
+		get_saft_schema()
+
+		self.max_errors = max_errors
+		self.blocks = queue.Queue(maxsize=max_pending)
+		self.outcome = None
+		self.failure = None
+		self.thread = threading.Thread(target=self._run, name="saft-xsd-validator", daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		try:
+			validator = StreamingSAFTValidator(max_errors=self.max_errors)
+			while True:
+				block = self.blocks.get()
+				if block is None:
+					break
+				validator.feed(block)
+
+			self.outcome = validator.close()
+		except Exception as e:
+			self.failure = e
+			# Continuar a consumir para não bloquear o escritor
+			while self.blocks.get() is not None:
+				pass
+
+	def feed(self, data):
+		self.blocks.put(data)
+
+	def close(self):
+		self.blocks.put(None)
+		self.thread.join()
+
+		if self.failure:
+			raise self.failure
+
+		return self.outcome
+
+
+# ========== ATALHOS ==========
+
+def validate_saft_file(file_path, max_errors=DEFAULT_MAX_ERRORS, chunk_size=FEED_CHUNK_SIZE):
+	"""✅ Validar um ficheiro SAF-T lido em blocos"""
+	validator = StreamingSAFTValidator(max_errors=max_errors)
+	with open(file_path, "rb") as handle:
+		for block in iter(lambda: handle.read(chunk_size), b""):
+			validator.feed(block)
+			if not validator.well_formed:
+				break
+
+	return validator.close()
+
+
+def validate_saft_content(xml_content, max_errors=DEFAULT_MAX_ERRORS, chunk_size=FEED_CHUNK_SIZE):
+	"""✅ Validar XML já em memória (str ou bytes)"""
+	if isinstance(xml_content, str):
+		xml_content = xml_content.encode("utf-8")
+
+	validator = StreamingSAFTValidator(max_errors=max_errors)
+	for offset in range(0, len(xml_content), chunk_size):
+		validator.feed(xml_content[offset:offset + chunk_size])
+
+	return validator.close()
+
+
+def format_validation_errors(result):
+	"""Texto para SAF-T Export Log.xsd_validation_errors"""
+	lines = [f"Line {error['line'] or '?'}: {error['path']}: {error['message']}" for error in result["errors"]]
+
+	omitted = result["error_count"] - len(result["errors"])
+	if omitted > 0:
+		lines.append(f"... {omitted} more error(s) not shown")
+
+	return "\n".join(lines)
+
+
+def apply_validation_result(export_log, result):
+	"""Preencher xml_validation_status/xsd_validation_errors (sem gravar)"""
+	if not result["well_formed"]:
+		export_log.xml_validation_status = "Validation Error"
+	else:
+		export_log.xml_validation_status = "Valid" if result["valid"] else "Invalid"
+
+	export_log.xsd_validation_errors = format_validation_errors(result)
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Sequence Audit - Portugal Compliance
+Auditoria incremental da integridade das sequências ATCUD por série
+✅ SHARDS: Uma unidade de trabalho por (empresa, série); os shards de cada empresa
+   são agrupados em jobs da fila "long" que correm em paralelo nos workers
+✅ INCREMENTAL: Cada série guarda uma marca de água (audit_watermark) e só os
+   documentos com modified posterior são lidos, em lotes por cursor (modified, name)
+✅ ESTADO: Maior sequência vista, lacunas em intervalos [início, fim], duplicados
+   confirmados e documentos submetidos sem ATCUD válido ficam na própria série
+✅ PLANO: Uma consulta agregada por doctype escolhe as séries com alterações;
+   séries sem documentos novos não geram jobs
+
+A sequência de cada documento é o sufixo do ATCUD (CODIGO-SEQUENCIA). Reler um
+documento já auditado é inofensivo: a sequência só passa a duplicado depois de
+confirmada com uma consulta ao atcud_code.
+"""
+
+import bisect
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import cint, get_datetime, now, now_datetime, today
+
+from portugal_compliance.utils.atcud_log_writer import parse_atcud
+from portugal_compliance.utils.db_indexes import ensure_indexes
+from portugal_compliance.utils.notification_dispatcher import CHANNEL_SYSTEM, make_dedup_key, queue_notification
+from portugal_compliance.utils.series_registry import SERIES_DOCTYPE
+
+# Transações ainda abertas há menos de SAFETY_LAG não ficam atrás da marca de água
+SAFETY_LAG = timedelta(minutes=5)
+CHUNK_SIZE = 5000
+SHARDS_PER_JOB = 25
+JOB_TIMEOUT = 3600
+JOB_ID_PREFIX = "portugal_compliance_sequence_audit"
+
+AUDIT_FIELDS = [
+	"name", "company", "prefix", "document_type", "naming_series", "audit_watermark",
+	"audit_last_sequence", "audit_max_sequence", "audit_gap_count", "audit_duplicate_count",
+	"audit_invalid_count", "audit_gaps", "audit_duplicates", "audit_invalid_documents", "last_audit_date"
+]
+
+AUDIT_INDEXES = (["naming_series", "modified"], ["atcud_code"])
+
+
+# ========== LACUNAS E DUPLICADOS ==========
+
+def apply_sequences(max_sequence, gaps, sequences):
+	"""
+	✅ Incorporar sequências lidas no estado da série
+
+	Args:
+		max_sequence: Maior sequência já vista
+		gaps: Intervalos [início, fim] em falta, ordenados e disjuntos
+		sequences: Sequências lidas neste lote (podem repetir)
+
+	Returns:
+		tuple: (max_sequence, gaps, candidatos a duplicado)
+	"""
+	counts = Counter(sequences)
+	candidates = {sequence for sequence, count in counts.items() if count > 1}
+	gaps = [list(gap) for gap in gaps]
+
+	for sequence in sorted(counts):
+		if sequence > max_sequence:
+			if sequence > max_sequence + 1:
+				gaps.append([max_sequence + 1, sequence - 1])
+			max_sequence = sequence
+			continue
+
+		position = bisect.bisect_right([gap[0] for gap in gaps], sequence) - 1
+		if position < 0 or gaps[position][1] < sequence:
+			# Já vista: documento relido ou duplicado
+			candidates.add(sequence)
+			continue
+
+		start, end = gaps.pop(position)
+		gaps[position:position] = [gap for gap in ([start, sequence - 1], [sequence + 1, end]) if gap[0] <= gap[1]]
+
+	return max_sequence, gaps, sorted(candidates)
+
+
+def get_last_checked(max_sequence, gaps):
+	"""Última sequência sem lacunas até ela"""
+	return gaps[0][0] - 1 if gaps else max_sequence
+
+
+def count_missing(gaps):
+	"""Número de sequências em falta nos intervalos"""
+	return sum(end - start + 1 for start, end in gaps)
+
+
+def _load_json(value, default):
+	if not value:
+		return default
+	try:
+		return json.loads(value) if isinstance(value, str) else value
+	except ValueError:
+		return default
+
+
+def get_cutoff():
+	"""Limite superior de modified auditado nesta execução"""
+	return now_datetime() - SAFETY_LAG
+
+
+# ========== SHARD (EMPRESA, SÉRIE) ==========
+
+def audit_series(series_name, cutoff=None, chunk_size=CHUNK_SIZE):
+	"""
+	✅ Auditar os documentos da série alterados desde a marca de água
+
+	O estado é gravado (e a transação confirmada) no fim de cada lote, com a marca
+	de água no modified do último documento lido: um job interrompido retoma aí.
+
+	Returns:
+		dict: Resumo da série depois da auditoria
+	"""
+	cutoff = get_datetime(cutoff) if cutoff else get_cutoff()
+	series = frappe.db.get_value(SERIES_DOCTYPE, series_name, AUDIT_FIELDS, as_dict=True)
+	if not series or not _has_audit_columns(series.document_type):
+		return None
+
+	max_sequence = cint(series.audit_max_sequence)
+	gaps = _load_json(series.audit_gaps, [])
+	previous_duplicates = _load_json(series.audit_duplicates, {})
+	duplicates = dict(previous_duplicates)
+	invalid = set(_load_json(series.audit_invalid_documents, []))
+	watermark = series.audit_watermark
+	documents_read = 0
+
+	for rows in _iter_changed_documents(series, watermark, cutoff, chunk_size):
+		documents_read += len(rows)
+		by_sequence = defaultdict(list)
+
+		for row in rows:
+			_validation_code, sequence = parse_atcud(row.atcud_code)
+			if sequence:
+				by_sequence[sequence].append(row)
+				invalid.discard(row.name)
+			elif row.docstatus:
+				invalid.add(row.name)
+
+		max_sequence, gaps, candidates = apply_sequences(
+			max_sequence, gaps, [sequence for sequence, seen in by_sequence.items() for _row in seen])
+		duplicates.update(_confirm_duplicates(series, candidates, by_sequence))
+		duplicates = {sequence: names for sequence, names in duplicates.items() if names}
+
+		watermark = rows[-1].modified
+		_save_state(series, max_sequence, gaps, duplicates, invalid, watermark)
+		frappe.db.commit()
+
+	_save_state(series, max_sequence, gaps, duplicates, invalid, max(get_datetime(watermark or cutoff), cutoff))
+	frappe.db.commit()
+
+	new_duplicates = sorted(set(duplicates) - set(previous_duplicates), key=cint)
+	if new_duplicates:
+		create_duplicate_alert(series, new_duplicates, duplicates)
+
+	return {
+		"series": series.name,
+		"company": series.company,
+		"documents_read": documents_read,
+		"last_checked": get_last_checked(max_sequence, gaps),
+		"max_sequence": max_sequence,
+		"gap_count": count_missing(gaps),
+		"duplicate_count": len(duplicates),
+		"invalid_count": len(invalid)
+	}
+
+
+def _has_audit_columns(doctype):
+	return bool(doctype) and frappe.db.table_exists(doctype) \
+		and frappe.db.has_column(doctype, "atcud_code") and frappe.db.has_column(doctype, "naming_series")
+
+
+def _iter_changed_documents(series, watermark, cutoff, chunk_size):
+	"""
+	Lotes por cursor (modified, name) dos documentos da série em ]marca, cutoff]
+
+	O primeiro lote inclui modified = marca de água: documentos gravados no mesmo
+	instante que o último lido por um job interrompido voltam a ser lidos.
+	"""
+	values = {"naming_series": series.naming_series, "cutoff": cutoff, "limit": cint(chunk_size)}
+	lower = ""
+	if watermark:
+		values["watermark"] = watermark
+		lower = "AND modified >= %(watermark)s"
+
+	while True:
+		rows = frappe.db.sql(f"""
+			SELECT name, atcud_code, docstatus, modified
+			FROM `tab{series.document_type}`
+			WHERE naming_series = %(naming_series)s
+			  AND modified <= %(cutoff)s
+			  {lower}
+			ORDER BY modified, name
+			LIMIT %(limit)s
+		""", values, as_dict=True)
+
+		if not rows:
+			return
+
+		yield rows
+
+		if len(rows) < chunk_size:
+			return
+
+		values.update(last_modified=rows[-1].modified, last_name=rows[-1].name)
+		lower = "AND (modified > %(last_modified)s OR (modified = %(last_modified)s AND name > %(last_name)s))"
+
+
+def _confirm_duplicates(series, candidates, by_sequence):
+	"""
+	✅ Confirmar candidatos a duplicado com uma consulta ao atcud_code
+
+	Returns:
+		dict: {sequência: [documentos]} - lista vazia quando a sequência deixou de estar duplicada
+	"""
+	if not candidates:
+		return {}
+
+	codes = {row.atcud_code for sequence in candidates for row in by_sequence[sequence]}
+	found = defaultdict(set)
+	for row in frappe.db.sql(f"""
+		SELECT name, atcud_code
+		FROM `tab{series.document_type}`
+		WHERE naming_series = %(naming_series)s
+		  AND atcud_code IN %(codes)s
+	""", {"naming_series": series.naming_series, "codes": tuple(codes)}, as_dict=True):
+		found[parse_atcud(row.atcud_code)[1]].add(row.name)
+
+	return {
+		str(sequence): sorted(found[sequence]) if len(found[sequence]) > 1 else []
+		for sequence in candidates
+	}
+
+
+def _save_state(series, max_sequence, gaps, duplicates, invalid, watermark):
+	frappe.db.set_value(SERIES_DOCTYPE, series.name, {
+		"audit_watermark": watermark,
+		"last_audit_date": now(),
+		"audit_max_sequence": max_sequence,
+		"audit_last_sequence": get_last_checked(max_sequence, gaps),
+		"audit_gap_count": count_missing(gaps),
+		"audit_gaps": json.dumps(gaps),
+		"audit_duplicate_count": len(duplicates),
+		"audit_duplicates": json.dumps(duplicates, sort_keys=True),
+		"audit_invalid_count": len(invalid),
+		"audit_invalid_documents": json.dumps(sorted(invalid))
+	}, update_modified=False)
+
+
+def create_duplicate_alert(series, new_duplicates, duplicates):
+	"""✅ Alerta crítico por série quando aparecem sequências ATCUD duplicadas"""
+	try:
+		lines = "\n".join(f"  {sequence}: {', '.join(duplicates[sequence])}" for sequence in new_duplicates[:20])
+		message = f"""
+		🚨 ALERTA CRÍTICO - Duplicação de ATCUD na série {series.prefix} ({series.company}):
+		{len(new_duplicates)} sequência(s) usadas por mais de um documento.
+{lines}
+
+		Verificação imediata necessária.
+		"""
+
+		queue_notification(
+			"CRÍTICO: Duplicação ATCUD",
+			message,
+			dedup_key=make_dedup_key("atcud_integrity", series.name, today()),
+			company=series.company,
+			channel=CHANNEL_SYSTEM,
+			priority="high"
+		)
+
+	except Exception as e:
+		frappe.log_error(f"Error creating ATCUD duplicate alert for {series.name}: {str(e)}")
+
+
+def run_audit_shards(series_names, cutoff=None):
+	"""
+	✅ Job: auditar um grupo de shards da mesma empresa
+
+	Uma série com erro não impede as restantes (o estado dela fica na marca anterior).
+	"""
+	results = []
+	for series_name in series_names:
+		try:
+			result = audit_series(series_name, cutoff)
+			if result:
+				results.append(result)
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(frappe.get_traceback(), f"Sequence audit failed: {series_name}")
+
+	return results
+
+
+# ========== PLANO E ORQUESTRAÇÃO ==========
+
+def plan_audit_shards(companies=None, cutoff=None):
+	"""
+	✅ Séries com documentos alterados desde a marca de água
+
+	Uma consulta agregada (naming_series, MAX(modified)) por doctype sobre o índice
+	de modified, em vez de uma por série.
+
+	Returns:
+		dict: {empresa: [séries]}
+	"""
+	cutoff = get_datetime(cutoff) if cutoff else get_cutoff()
+	filters = {"document_type": ["is", "set"], "naming_series": ["is", "set"]}
+	if companies:
+		filters["company"] = ["in", list(companies)]
+
+	by_doctype = defaultdict(list)
+	for series in frappe.get_all(SERIES_DOCTYPE, filters=filters,
+								 fields=["name", "company", "document_type", "naming_series", "audit_watermark"]):
+		by_doctype[series.document_type].append(series)
+
+	shards = defaultdict(list)
+	for doctype, series_list in by_doctype.items():
+		if not _has_audit_columns(doctype):
+			continue
+
+		watermarks = [series.audit_watermark for series in series_list]
+		values = {"naming_series": tuple({series.naming_series for series in series_list}), "cutoff": cutoff}
+		lower = ""
+		if all(watermarks):
+			values["watermark"] = min(watermarks)
+			lower = "AND modified > %(watermark)s"
+
+		changed = dict(frappe.db.sql(f"""
+			SELECT naming_series, MAX(modified)
+			FROM `tab{doctype}`
+			WHERE naming_series IN %(naming_series)s
+			  AND modified <= %(cutoff)s
+			  {lower}
+			GROUP BY naming_series
+		""", values))
+
+		for series in series_list:
+			last_modified = changed.get(series.naming_series)
+			if last_modified and (not series.audit_watermark
+								  or get_datetime(last_modified) > get_datetime(series.audit_watermark)):
+				shards[series.company].append(series.name)
+
+	return dict(shards)
+
+
+def start_sequence_audit(companies=None):
+	"""
+	✅ Enfileirar a auditoria das séries alteradas (jobs paralelos na fila "long")
+
+	Returns:
+		dict: {"series": n, "jobs": n, "cutoff": str}
+	"""
+	cutoff = get_cutoff()
+	shards = plan_audit_shards(companies, cutoff)
+	jobs = 0
+
+	for company, series_names in sorted(shards.items()):
+		for index in range(0, len(series_names), SHARDS_PER_JOB):
+			chunk = series_names[index:index + SHARDS_PER_JOB]
+			frappe.enqueue(
+				"portugal_compliance.utils.sequence_audit.run_audit_shards",
+				queue="long",
+				timeout=JOB_TIMEOUT,
+				job_id=f"{JOB_ID_PREFIX}::{company}::{index // SHARDS_PER_JOB}",
+				deduplicate=True,
+				series_names=chunk,
+				cutoff=str(cutoff)
+			)
+			jobs += 1
+
+	summary = {"series": sum(len(names) for names in shards.values()), "jobs": jobs, "cutoff": str(cutoff)}
+	frappe.logger().info(f"Sequence audit queued: {summary}")
+	return summary
+
+
+def reset_audit_state(series_name):
+	"""Apagar o estado da série (a próxima auditoria relê todo o histórico)"""
+	frappe.db.set_value(SERIES_DOCTYPE, series_name, {
+		"audit_watermark": None,
+		"last_audit_date": None,
+		"audit_max_sequence": 0,
+		"audit_last_sequence": 0,
+		"audit_gap_count": 0,
+		"audit_gaps": None,
+		"audit_duplicate_count": 0,
+		"audit_duplicates": None,
+		"audit_invalid_count": 0,
+		"audit_invalid_documents": None
+	}, update_modified=False)
+
+
+# ========== LEITURA DO ESTADO ==========
+
+def get_audit_state(company=None, active_only=False):
+	"""
+	✅ Estado da auditoria por série (sem ler documentos)
+
+	Returns:
+		list: Séries com last_checked, max_sequence, gaps, duplicates e invalid_documents
+	"""
+	filters = {}
+	if company:
+		filters["company"] = company
+	if active_only:
+		filters["is_active"] = 1
+
+	state = []
+	for series in frappe.get_all(SERIES_DOCTYPE, filters=filters, fields=AUDIT_FIELDS + ["current_sequence"],
+								 order_by="company, prefix"):
+		state.append(frappe._dict({
+			"series": series.name,
+			"company": series.company,
+			"prefix": series.prefix,
+			"document_type": series.document_type,
+			"current_sequence": series.current_sequence,
+			"watermark": series.audit_watermark,
+			"last_audit_date": series.last_audit_date,
+			"last_checked": cint(series.audit_last_sequence),
+			"max_sequence": cint(series.audit_max_sequence),
+			"gap_count": cint(series.audit_gap_count),
+			"gaps": _load_json(series.audit_gaps, []),
+			"duplicate_count": cint(series.audit_duplicate_count),
+			"duplicates": _load_json(series.audit_duplicates, {}),
+			"invalid_count": cint(series.audit_invalid_count),
+			"invalid_documents": _load_json(series.audit_invalid_documents, [])
+		}))
+
+	return state
+
+
+def get_audit_summary(company=None):
+	"""✅ Totais da última auditoria (séries auditadas, com lacunas, duplicados, inválidos)"""
+	state = get_audit_state(company)
+	return {
+		"series": len(state),
+		"audited": sum(1 for series in state if series.watermark),
+		"series_with_gaps": sum(1 for series in state if series.gap_count),
+		"missing_sequences": sum(series.gap_count for series in state),
+		"series_with_duplicates": sum(1 for series in state if series.duplicate_count),
+		"duplicate_sequences": sum(series.duplicate_count for series in state),
+		"invalid_documents": sum(series.invalid_count for series in state),
+		"oldest_watermark": min((series.watermark for series in state if series.watermark), default=None)
+	}
+
+
+# ========== ÍNDICES ==========
+
+def ensure_audit_indexes():
+	"""Índices (naming_series, modified) e (atcud_code) nas tabelas das séries"""
+	doctypes = frappe.get_all(SERIES_DOCTYPE, filters={"document_type": ["is", "set"]},
+							  pluck="document_type", distinct=True)
+	ensure_indexes({doctype: AUDIT_INDEXES for doctype in sorted(set(doctypes)) if _has_audit_columns(doctype)})
+
+
+# ========== API ==========
+
+@frappe.whitelist()
+def get_sequence_audit_status(company=None):
+	"""✅ API: Estado da auditoria de sequências"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+	return {"success": True, "summary": get_audit_summary(company), "series": get_audit_state(company),
+			"checked_at": now()}
+
+
+@frappe.whitelist()
+def run_sequence_audit(company=None, full=0):
+	"""✅ API: Enfileirar a auditoria (full=1 apaga o estado e relê todo o histórico)"""
+	frappe.only_for(["System Manager"])
+
+	if cint(full):
+		filters = {"company": company} if company else {}
+		for series_name in frappe.get_all(SERIES_DOCTYPE, filters=filters, pluck="name"):
+			reset_audit_state(series_name)
+
+	result = start_sequence_audit([company] if company else None)
+	return {"success": True, "message": _("{0} series queued for audit").format(result["series"]), **result}
@@ -17,6 +17,8 @@ from frappe.utils import cint, now, today, getdate
 from datetime import date, datetime
 import re
 
+from portugal_compliance.utils.lazy import LazySingleton
+
 # ✅ MAPEAMENTO OFICIAL COMPLETO DOS TIPOS DE DOCUMENTOS CONFORME LEGISLAÇÃO PORTUGUESA
 DOCUMENT_TYPE_PREFIXES = {
 	# Documentos Fiscais Principais
@@ -226,6 +228,7 @@ class SeriesAdapter:
 		"""
 		✅ ALINHADO: Atualiza Property Setter COMPATÍVEL com startup_fixes.py
 		Usa abordagem padrão (não específica por empresa)
+		✅ DIFF: utils/naming_series_sync - só escreve se as opções mudaram
 		"""
 		try:
 			# ✅ VERIFICAR SE DOCTYPE EXISTE
@@ -235,40 +238,16 @@ class SeriesAdapter:
 					"error": f"DocType {doctype} does not exist"
 				}
 
-			# ✅ BUSCAR SÉRIES ATIVAS PARA QUALQUER EMPRESA (ALINHADO)
-			active_series = frappe.get_all("Portugal Series Configuration",
-										   filters={
-											   "document_type": doctype,
-											   "is_active": 1
-										   },
-										   fields=["prefix"],
-										   order_by="is_communicated desc, creation desc")
-
-			if not active_series:
-				frappe.logger().info(f"⏭️ Nenhuma série portuguesa ativa para {doctype}")
-				return {
-					"success": True,
-					"doctype": doctype,
-					"message": "No active Portuguese series found",
-					"action": "none"
-				}
+			from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
 
-			# ✅ GERAR OPÇÕES BASEADAS EM SÉRIES EXISTENTES
-			naming_options = []
-			for series in active_series:
-				naming_option = f"{series.prefix}.####"
-				naming_options.append(naming_option)
+			summary = sync_naming_series_options([doctype])
 
-			if not naming_options:
-				return {
-					"success": True,
-					"doctype": doctype,
-					"message": "No naming options generated",
-					"action": "none"
-				}
-
-			# ✅ USAR PROPERTY SETTER PADRÃO (ALINHADO COM STARTUP_FIXES)
-			return self.sync_property_setter_standard(doctype, naming_options, force_update)
+			return {
+				"success": True,
+				"doctype": doctype,
+				"action": "updated" if doctype in summary["doctypes"] else "none",
+				"property_setter": f"{doctype}-naming_series-options"
+			}
 
 		except Exception as e:
 			frappe.log_error(f"Error updating naming series for {doctype}: {str(e)}")
@@ -429,24 +408,17 @@ class SeriesAdapter:
 				"summary": {}
 			}
 
-			for doctype in doctypes_to_sync:
-				try:
-					result = self.update_doctype_naming_series(doctype, company_abbr, year,
-															   force_update)
-					results["results"][doctype] = result
+			# ✅ DIFF ÚNICO PARA TODOS OS DOCTYPES (utils/naming_series_sync)
+			from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
 
-					if result["success"]:
-						results["successful_updates"] += 1
-					else:
-						results["failed_updates"] += 1
-
-				except Exception as e:
-					results["results"][doctype] = {
-						"success": False,
-						"error": str(e)
-					}
-					results["failed_updates"] += 1
-					frappe.log_error(f"Error syncing {doctype}: {str(e)}")
+			summary = sync_naming_series_options(doctypes_to_sync)
+			for doctype in doctypes_to_sync:
+				results["results"][doctype] = {
+					"success": True,
+					"doctype": doctype,
+					"action": "updated" if doctype in summary["doctypes"] else "none"
+				}
+			results["successful_updates"] = len(doctypes_to_sync)
 
 			# Gerar resumo
 			results["summary"] = {
@@ -603,7 +575,7 @@ class SeriesAdapter:
 
 
 # ✅ INSTÂNCIA GLOBAL ALINHADA
-series_adapter = SeriesAdapter()
+series_adapter = LazySingleton(SeriesAdapter)
 
 
 # ========== FUNÇÕES AUXILIARES ALINHADAS ==========
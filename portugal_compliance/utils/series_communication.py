@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Series Communication - Portugal Compliance
+Comunicação de séries à AT em background
+✅ JOB: Um job deduplicado por (empresa, conjunto de séries) - o pedido HTTP devolve logo o job_id
+✅ CONCORRÊNCIA: Séries registadas em paralelo, até portugal_compliance_at_max_concurrency
+✅ PROGRESSO: Evento realtime series_communication_progress por série + estado em cache (polling)
+✅ CREDENCIAIS: Nunca nos argumentos do job (payload RQ / registo de jobs falhados) - o job
+   usa as credenciais guardadas da empresa, ou credenciais indicadas pelo utilizador
+   cifradas numa chave de cache de vida curta que só o job lê (e apaga)
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now
+
+from portugal_compliance.utils.encryption_utils import get_key_ring
+
+STATUS_CACHE_KEY = "portugal_compliance_series_communication_{job_id}"
+STATUS_TTL = 24 * 3600
+CREDENTIALS_CACHE_KEY = "portugal_compliance_series_communication_credentials_{job_id}"
+CREDENTIALS_TTL = 1800
+PROGRESS_EVENT = "series_communication_progress"
+DEFAULT_MAX_CONCURRENCY = 3
+
+
+def get_max_concurrency():
+	"""Registos simultâneos na AT (site_config: portugal_compliance_at_max_concurrency)"""
+	return max(cint(frappe.conf.get("portugal_compliance_at_max_concurrency")) or DEFAULT_MAX_CONCURRENCY, 1)
+
+
+def get_job_id(company, naming_series):
+	"""✅ Mesmo conjunto de séries da mesma empresa = mesmo job (duplo clique não duplica)"""
+	digest = hashlib.sha1("\n".join(sorted(naming_series)).encode("utf-8")).hexdigest()[:12]
+	return f"portugal_compliance_series_communication::{company}::{digest}"
+
+
+def get_status(job_id):
+	return frappe.cache().get_value(STATUS_CACHE_KEY.format(job_id=job_id))
+
+
+def set_status(job_id, status):
+	frappe.cache().set_value(STATUS_CACHE_KEY.format(job_id=job_id), status, expires_in_sec=STATUS_TTL)
+
+
+def stash_credentials(job_id, username, password):
+	"""✅ Credenciais indicadas pelo utilizador, cifradas, para o job job_id (TTL curto)"""
+	token = get_key_ring().encrypt(json.dumps({"username": username, "password": password}))
+	frappe.cache().set_value(CREDENTIALS_CACHE_KEY.format(job_id=job_id), token, expires_in_sec=CREDENTIALS_TTL)
+
+
+def pop_credentials(job_id):
+	"""
+	✅ Ler e apagar as credenciais do job
+
+	Returns:
+		tuple: (username, password) - (None, None) usa as credenciais guardadas da empresa
+	"""
+	if not job_id:
+		return None, None
+
+	key = CREDENTIALS_CACHE_KEY.format(job_id=job_id)
+	token = frappe.cache().get_value(key)
+	frappe.cache().delete_value(key)
+	if not token:
+		return None, None
+
+	credentials = json.loads(get_key_ring().decrypt(token))
+	return credentials.get("username"), credentials.get("password")
+
+
+def enqueue_series_communication(company, naming_series, username=None, password=None):
+	"""
+	✅ Enfileirar a comunicação das séries de uma empresa
+
+	Se o mesmo conjunto já estiver em fila ou a correr, devolve o job existente.
+	username/password (opcionais) não vão no job: ficam cifrados em cache até o job os ler.
+
+	Returns:
+		dict: {"job_id", "company", "total_series", "already_running"}
+	"""
+	from frappe.utils.background_jobs import is_job_enqueued
+
+	naming_series = sorted(set(naming_series))
+	job_id = get_job_id(company, naming_series)
+
+	if is_job_enqueued(job_id):
+		return {"job_id": job_id, "company": company, "total_series": len(naming_series), "already_running": True}
+
+	set_status(job_id, {
+		"job_id": job_id,
+		"company": company,
+		"status": "Queued",
+		"total": len(naming_series),
+		"done": 0,
+		"successful": 0,
+		"failed": 0,
+		"results": [],
+		"queued_at": now()
+	})
+
+	if username and password:
+		stash_credentials(job_id, username, password)
+
+	frappe.enqueue(
+		"portugal_compliance.utils.series_communication.communicate_series",
+		queue="long",
+		timeout=3600,
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		company=company,
+		naming_series=naming_series,
+		notify_user=frappe.session.user,
+		status_key=job_id
+	)
+
+	return {"job_id": job_id, "company": company, "total_series": len(naming_series), "already_running": False}
+
+
+def _register_series(site, user, naming_series, company, username, password):
+	"""
+	Registo de uma série numa thread do job
+	Cada thread tem o seu contexto frappe (ligação à BD própria) e o seu cliente AT.
+	"""
+	frappe.init(site=site)
+	try:
+		frappe.connect()
+		frappe.set_user(user)
+
+		from portugal_compliance.utils.at_webservice import ATWebserviceClient
+
+		result = ATWebserviceClient().register_naming_series(naming_series, company, username, password)
+		frappe.db.commit()
+		return result
+
+	except Exception as e:
+		frappe.log_error(f"Erro ao comunicar série {naming_series}: {str(e)}", "Series Communication")
+		return {"success": False, "error": str(e), "naming_series": naming_series}
+
+	finally:
+		frappe.destroy()
+
+
+def communicate_series(company, naming_series, notify_user=None, status_key=None):
+	"""
+	✅ Job: registar as séries na AT em paralelo e publicar o progresso
+
+	O estado e os eventos são atualizados só nesta thread, à medida que cada série termina.
+	Credenciais: as indicadas para este job (cache cifrada) ou as guardadas da empresa.
+	"""
+	username, password = pop_credentials(status_key)
+	status = get_status(status_key) or {"job_id": status_key, "company": company, "results": []}
+	status.update({
+		"status": "Running",
+		"total": len(naming_series),
+		"done": 0,
+		"successful": 0,
+		"failed": 0,
+		"results": [],
+		"started_at": now()
+	})
+	set_status(status_key, status)
+
+	site = frappe.local.site
+	user = frappe.session.user
+
+	with ThreadPoolExecutor(max_workers=min(get_max_concurrency(), len(naming_series) or 1)) as executor:
+		futures = {
+			executor.submit(_register_series, site, user, series, company, username, password): series
+			for series in naming_series
+		}
+
+		for future in as_completed(futures):
+			series = futures[future]
+			result = future.result()
+			success = bool(result.get("success"))
+
+			status["done"] += 1
+			status["successful" if success else "failed"] += 1
+			status["results"].append({
+				"naming_series": series,
+				"success": success,
+				"atcud": result.get("atcud"),
+				"error": result.get("error")
+			})
+			set_status(status_key, status)
+
+			frappe.publish_realtime(PROGRESS_EVENT, {
+				"job_id": status_key,
+				"company": company,
+				"naming_series": series,
+				"success": success,
+				"done": status["done"],
+				"total": status["total"],
+				"message": result.get("message") or result.get("error")
+			}, user=notify_user)
+
+	status.update({"status": "Completed", "finished_at": now()})
+	set_status(status_key, status)
+
+	frappe.publish_realtime(PROGRESS_EVENT, dict(status, finished=True), user=notify_user)
+	return status
+
+
+@frappe.whitelist()
+def get_series_communication_status(job_id):
+	"""✅ API: Estado de um job de comunicação de séries (alternativa ao evento realtime)"""
+	status = get_status(job_id)
+	if not status:
+		return {"success": False, "error": _("Job de comunicação não encontrado")}
+
+	frappe.has_permission("Company", "read", doc=status.get("company"), throw=True)
+	return dict(status, success=True)
@@ -17,6 +17,9 @@ import re
 from frappe.utils import cint, today, getdate
 from erpnext.accounts.utils import get_fiscal_year
 
+from portugal_compliance.utils import series_registry
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class SeriesManager:
 	"""
@@ -74,42 +77,10 @@ class SeriesManager:
 	def get_best_series_configuration(self, doc):
 		"""
 		✅ ALINHADO: Obtém a melhor configuração de série (prioriza comunicadas)
+		Registo em memória (series_registry) - sem consultas à BD
 		"""
 		try:
-			# ✅ PRIORIDADE 1: Série comunicada com validation_code
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"document_type": doc.doctype,
-				"company": doc.company,
-				"is_active": 1,
-				"is_communicated": 1,
-				"validation_code": ["!=", ""]
-			}, ["name", "prefix"], order_by="communication_date desc")
-
-			if series_config:
-				return frappe.get_doc("Portugal Series Configuration", series_config[0])
-
-			# ✅ PRIORIDADE 2: Série comunicada sem validation_code
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"document_type": doc.doctype,
-				"company": doc.company,
-				"is_active": 1,
-				"is_communicated": 1
-			}, ["name", "prefix"], order_by="communication_date desc")
-
-			if series_config:
-				return frappe.get_doc("Portugal Series Configuration", series_config[0])
-
-			# ✅ PRIORIDADE 3: Série ativa não comunicada
-			series_config = frappe.db.get_value("Portugal Series Configuration", {
-				"document_type": doc.doctype,
-				"company": doc.company,
-				"is_active": 1
-			}, ["name", "prefix"], order_by="creation desc")
-
-			if series_config:
-				return frappe.get_doc("Portugal Series Configuration", series_config[0])
-
-			return None
+			return series_registry.get_best_series(doc.doctype, doc.company)
 
 		except Exception as e:
 			frappe.log_error(f"Erro ao obter configuração de série: {str(e)}", "SeriesManager")
@@ -126,12 +97,9 @@ class SeriesManager:
 			# ✅ EXTRAIR PREFIXO (FORMATO SEM HÍFENS)
 			prefix = naming_series.replace('.####', '')
 
-			# ✅ VERIFICAR SE EXISTE SÉRIE PORTUGUESA COM ESTE PREFIXO
-			return frappe.db.exists("Portugal Series Configuration", {
-				"prefix": prefix,
-				"company": company,
-				"is_active": 1
-			})
+			# ✅ VERIFICAR SE EXISTE SÉRIE PORTUGUESA ATIVA COM ESTE PREFIXO
+			series = series_registry.get_series_by_prefix(prefix, company)
+			return bool(series and series.is_active)
 
 		except Exception:
 			return False
@@ -644,7 +612,7 @@ class SeriesManager:
 
 
 # ========== INSTÂNCIA GLOBAL ALINHADA ==========
-series_manager = SeriesManager()
+series_manager = LazySingleton(SeriesManager)
 
 
 # ========== FUNÇÕES AUXILIARES PARA HOOKS ALINHADAS ==========
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Series Registry - Portugal Compliance
+Registo em memória das Portugal Series Configuration (por worker)
+✅ UMA CONSULTA: Todas as séries carregadas de uma vez e indexadas por
+   (empresa, doctype), (empresa, prefixo) e (empresa, naming_series)
+✅ COERENTE: Recarregado quando a versão "series" da compliance_cache muda
+   (doc_events da série e escritas diretas que alteram campos indexados, com a
+   versão incrementada após o commit) ou passados REGISTRY_MAX_AGE segundos
+✅ ZERO CONSULTAS: Resolução de séries no caminho de gravação sem ir à BD
+
+Campos voláteis (current_sequence, total_documents_issued) são um instantâneo do
+momento do carregamento - para incrementar a sequência ler sempre da BD.
+"""
+
+import re
+import threading
+import time
+
+import frappe
+from frappe.utils import get_datetime, getdate
+
+from portugal_compliance.utils import compliance_cache
+
+SERIES_DOCTYPE = "Portugal Series Configuration"
+
+# Salvaguarda: nenhum worker usa um registo mais antigo do que isto
+REGISTRY_MAX_AGE = 300
+
+REGISTRY_FIELDS = [
+	"name", "series_name", "company", "document_type", "prefix", "naming_series",
+	"is_active", "is_communicated", "validation_code", "communication_date",
+	"at_environment", "current_sequence", "creation"
+]
+
+# Prefixo XXYYYY + EMPRESA (ex: FT2025NDX)
+PREFIX_YEAR_PATTERN = re.compile(r'^([A-Z]{2,4})(\d{4})([A-Z0-9]{2,4})$')
+
+
+def get_prefix_year(prefix):
+	"""Ano embutido no prefixo (None se o prefixo não tiver o formato XXYYYY + EMPRESA)"""
+	match = PREFIX_YEAR_PATTERN.match(prefix or "")
+	return int(match.group(2)) if match else None
+
+
+class SeriesRegistry:
+	"""Índices imutáveis de uma versão do registo"""
+
+	def __init__(self, rows, version):
+		self.version = version
+		self.loaded_at = time.monotonic()
+		self.by_name = {}
+		self.by_company_doctype = {}
+		self.by_prefix = {}
+		self.by_naming_series = {}
+
+		for row in rows:
+			series = frappe._dict(row)
+			series.prefix_year = get_prefix_year(series.prefix)
+			self.by_name[series.name] = series
+			self.by_company_doctype.setdefault((series.company, series.document_type), []).append(series)
+			self.by_prefix.setdefault((series.company, series.prefix), series)
+			if series.naming_series:
+				self.by_naming_series.setdefault((series.company, series.naming_series), []).append(series)
+
+		for series_list in self.by_company_doctype.values():
+			series_list.sort(key=_priority)
+
+	def __len__(self):
+		return len(self.by_name)
+
+
+def _priority(series):
+	"""
+	Ordem de preferência numa (empresa, doctype):
+	comunicada com código AT > comunicada > ativa; mais recente primeiro
+	"""
+	rank = 0 if series.is_communicated and series.validation_code else 1 if series.is_communicated else 2
+	latest = series.communication_date if rank < 2 else series.creation
+	return (rank, -(get_datetime(latest).timestamp() if latest else 0), series.prefix or "")
+
+
+_state = {"registry": None}
+_lock = threading.Lock()
+
+
+def get_registry():
+	"""Registo atual (recarregado quando a versão "series" mudou ou o registo expirou)"""
+	if compliance_cache.is_pending("series"):
+		# Séries alteradas nesta transação: registo só desta leitura, não partilhado
+		return _load_registry(None)
+
+	version = compliance_cache.get_version("series")
+	registry = _state["registry"]
+
+	if not _is_current(registry, version):
+		with _lock:
+			registry = _state["registry"]
+			if not _is_current(registry, version):
+				registry = _state["registry"] = _load_registry(version)
+
+	return registry
+
+
+def _is_current(registry, version):
+	return registry is not None and registry.version == version \
+		and time.monotonic() - registry.loaded_at < REGISTRY_MAX_AGE
+
+
+def _load_registry(version):
+	return SeriesRegistry(frappe.get_all(SERIES_DOCTYPE, fields=REGISTRY_FIELDS, order_by="name"), version)
+
+
+def clear_registry():
+	_state["registry"] = None
+
+
+# ========== RESOLUÇÃO ==========
+
+def get_series(name):
+	return get_registry().by_name.get(name)
+
+
+def get_series_by_prefix(prefix, company):
+	return get_registry().by_prefix.get((company, prefix))
+
+
+def get_series_by_naming_series(naming_series, company, doctype=None):
+	"""Série de uma naming_series (opcionalmente restrita ao doctype)"""
+	for series in get_registry().by_naming_series.get((company, naming_series), []):
+		if not doctype or series.document_type == doctype:
+			return series
+
+	return None
+
+
+def get_company_series(doctype, company=None, active_only=True, communicated_only=False):
+	"""Séries de um doctype por ordem de preferência (todas as empresas se company=None)"""
+	registry = get_registry()
+	if company:
+		candidates = registry.by_company_doctype.get((company, doctype), [])
+	else:
+		candidates = sorted(
+			(series for (_, series_doctype), series_list in registry.by_company_doctype.items()
+			 if series_doctype == doctype for series in series_list),
+			key=_priority)
+
+	return [
+		series for series in candidates
+		if (series.is_active or not active_only) and (series.is_communicated or not communicated_only)
+	]
+
+
+def get_best_series(doctype, company, require_validation_code=False):
+	"""
+	✅ Melhor série ativa para um documento novo
+
+	require_validation_code: só aceitar séries comunicadas com código AT
+
+	Séries de anos futuros (pré-criadas pela passagem de ano) só entram a partir
+	de 1 de janeiro desse ano.
+	"""
+	current_year = getdate().year
+	for series in get_company_series(doctype, company):
+		if series.prefix_year and series.prefix_year > current_year:
+			continue
+		if not require_validation_code or (series.is_communicated and series.validation_code):
+			return series
+
+	return None
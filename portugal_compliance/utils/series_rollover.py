@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Series Rollover - Portugal Compliance
+Passagem de ano das séries: as séries do ano seguinte ficam prontas em dezembro
+✅ PLANO EM MEMÓRIA: Séries do próximo ano de todas as empresas calculadas a partir
+   das séries ativas do ano corrente (FT2025NDX -> FT2026NDX)
+✅ BULK INSERT: Todas as séries novas numa única inserção
+✅ PROPERTY SETTERS: Opções de naming_series num só diff (utils/naming_series_sync)
+✅ AT: Registo em background, uma empresa de cada vez com o limite de concorrência
+   da comunicação de séries (utils/series_communication)
+✅ 1 DE JANEIRO: As séries novas só passam a ser escolhidas no próprio ano
+   (series_registry.get_best_series) - sem configuração síncrona na manhã de Ano Novo
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import getdate, now
+
+from portugal_compliance.utils import compliance_cache
+from portugal_compliance.utils.series_registry import PREFIX_YEAR_PATTERN, SERIES_DOCTYPE
+
+ROLLOVER_MONTH = 12
+SUMMARY_CACHE_KEY = "portugal_compliance_series_rollover_{year}"
+SUMMARY_TTL = 90 * 24 * 3600
+
+SERIES_FIELDS = [
+	"name", "series_name", "company", "document_type", "prefix", "naming_series", "is_active",
+	"current_sequence", "total_documents_issued", "is_communicated", "at_environment",
+	"document_code", "year_code", "company_code", "creation", "modified", "owner", "modified_by"
+]
+
+
+def get_next_year_prefix(prefix, year):
+	"""FT2025NDX -> FT2026NDX (None se o prefixo não for do ano indicado)"""
+	match = PREFIX_YEAR_PATTERN.match(prefix or "")
+	if not match or int(match.group(2)) != year:
+		return None
+
+	return f"{match.group(1)}{year + 1}{match.group(3)}"
+
+
+def plan_rollover(year=None, companies=None):
+	"""
+	✅ Calcular em memória as séries do ano seguinte (sem escrever)
+
+	Duas consultas: séries ativas do ano e séries já existentes do ano seguinte.
+
+	Returns:
+		list: Linhas prontas para inserção (uma por série em falta)
+	"""
+	year = year or getdate().year
+	filters = {"is_active": 1, "prefix": ["like", f"%{year}%"]}
+	if companies:
+		filters["company"] = ["in", companies]
+
+	current_series = frappe.get_all(
+		SERIES_DOCTYPE,
+		filters=filters,
+		fields=["series_name", "company", "document_type", "prefix", "at_environment", "document_code",
+				"company_code"],
+		order_by="company, document_type, prefix"
+	)
+
+	existing = frappe.get_all(
+		SERIES_DOCTYPE,
+		filters={"prefix": ["like", f"%{year + 1}%"]},
+		fields=["company", "prefix", "series_name"]
+	)
+	existing_prefixes = {(series.company, series.prefix) for series in existing}
+	existing_names = {series.series_name for series in existing}
+
+	plan = []
+	for series in current_series:
+		prefix = get_next_year_prefix(series.prefix, year)
+		if not prefix or (series.company, prefix) in existing_prefixes:
+			continue
+
+		match = PREFIX_YEAR_PATTERN.match(prefix)
+		series_name = (series.series_name or "").replace(series.prefix, prefix)
+		if not series_name or series_name == series.series_name or series_name in existing_names:
+			series_name = f"{series.series_name} - {prefix}"
+
+		existing_prefixes.add((series.company, prefix))
+		existing_names.add(series_name)
+
+		plan.append(frappe._dict({
+			# Mesmo formato de nome de PortugalSeriesConfiguration.generate_unique_name
+			"name": f"{match.group(1)}-{year + 1}-{match.group(3)}-{frappe.generate_hash(length=6)}",
+			"series_name": series_name,
+			"company": series.company,
+			"document_type": series.document_type,
+			"prefix": prefix,
+			"naming_series": f"{prefix}.####",
+			"at_environment": series.at_environment,
+			"document_code": series.document_code or match.group(1),
+			"year_code": str(year + 1),
+			"company_code": series.company_code or match.group(3)
+		}))
+
+	return plan
+
+
+def create_rollover_series(plan):
+	"""✅ Inserir todas as séries do plano de uma vez (sem controladores por documento)"""
+	if not plan:
+		return 0
+
+	timestamp = now()
+	user = frappe.session.user
+
+	frappe.db.bulk_insert(SERIES_DOCTYPE, SERIES_FIELDS, [
+		(series.name, series.series_name, series.company, series.document_type, series.prefix,
+		 series.naming_series, 1, 1, 0, 0, series.at_environment, series.document_code,
+		 series.year_code, series.company_code, timestamp, timestamp, user, user)
+		for series in plan
+	], ignore_duplicates=True)
+
+	# Versão "series" só depois do commit: antes disso outro worker recarregaria o
+	# registo sem as séries do ano seguinte e mantinha-o com a versão nova
+	frappe.db.after_commit.add(_invalidate_series_cache)
+	return len(plan)
+
+
+def _invalidate_series_cache():
+	compliance_cache.invalidate("series")
+
+
+def merge_naming_series_options(plan):
+	"""
+	✅ Acrescentar as naming_series novas aos Property Setters - um diff para todos os
+	doctypes do plano (utils/naming_series_sync; séries do próximo ano no fim da lista)
+	"""
+	from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
+
+	return sync_naming_series_options(sorted({series.document_type for series in plan}))
+
+
+def enqueue_rollover_communication(year):
+	"""✅ Um único job para o registo na AT (deduplicado por ano)"""
+	frappe.enqueue(
+		"portugal_compliance.utils.series_rollover.communicate_rollover_series",
+		queue="long",
+		timeout=4 * 3600,
+		job_id=f"portugal_compliance_series_rollover::{year}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		year=year
+	)
+
+
+def communicate_rollover_series(year):
+	"""
+	✅ Job: registar na AT as séries do ano seguinte ainda não comunicadas
+
+	Uma empresa de cada vez; dentro da empresa, até portugal_compliance_at_max_concurrency
+	registos simultâneos. Séries que falhem ficam por comunicar e são retomadas na
+	próxima execução diária de dezembro.
+	"""
+	from portugal_compliance.utils.series_communication import communicate_series, get_job_id
+
+	pending = frappe.get_all(
+		SERIES_DOCTYPE,
+		filters={"is_active": 1, "is_communicated": 0, "year_code": str(year + 1)},
+		fields=["company", "naming_series"],
+		order_by="company"
+	)
+
+	series_by_company = {}
+	for series in pending:
+		series_by_company.setdefault(series.company, []).append(series.naming_series)
+
+	results = {}
+	for company, naming_series in series_by_company.items():
+		try:
+			status = communicate_series(company, naming_series, notify_user=frappe.session.user,
+										status_key=get_job_id(company, naming_series))
+			results[company] = {"successful": status["successful"], "failed": status["failed"]}
+		except Exception as e:
+			frappe.log_error(f"Erro ao comunicar séries de {year + 1} da empresa {company}: {str(e)}",
+							 "Series Rollover")
+			results[company] = {"error": str(e)}
+
+	_update_summary(year, {"communication": results, "communicated_at": now()})
+	return results
+
+
+def run_series_rollover(year=None, companies=None, force=False):
+	"""
+	✅ Passagem de ano completa: plano, inserção, property setters e registo na AT
+
+	Idempotente - corre todos os dias em dezembro e só cria/comunica o que falta.
+	Fora de dezembro só corre com force=True.
+
+	Returns:
+		dict | None: Resumo (None se fora de dezembro)
+	"""
+	today_date = getdate()
+	if not force and today_date.month != ROLLOVER_MONTH:
+		return None
+
+	year = year or today_date.year
+	plan = plan_rollover(year, companies)
+	created = create_rollover_series(plan)
+	options = merge_naming_series_options(plan) if plan else {"doctypes": []}
+	frappe.db.commit()
+
+	enqueue_rollover_communication(year)
+
+	summary = {
+		"year": year + 1,
+		"created": created,
+		"companies": len({series.company for series in plan}),
+		"doctypes": options["doctypes"],
+		"ran_at": now()
+	}
+	_update_summary(year, summary)
+
+	frappe.logger().info(
+		f"Portugal Compliance: series rollover to {year + 1} - {created} series created")
+	return summary
+
+
+def _update_summary(year, values):
+	key = SUMMARY_CACHE_KEY.format(year=year)
+	summary = frappe.cache().get_value(key) or {}
+	summary.update(values)
+	frappe.cache().set_value(key, summary, expires_in_sec=SUMMARY_TTL)
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def preview_series_rollover(year=None):
+	"""✅ API: Séries que a passagem de ano vai criar (sem escrever)"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	plan = plan_rollover(int(year) if year else None)
+	return {
+		"success": True,
+		"total": len(plan),
+		"series": [
+			{"company": series.company, "document_type": series.document_type, "prefix": series.prefix}
+			for series in plan
+		]
+	}
+
+
+@frappe.whitelist()
+def start_series_rollover(year=None):
+	"""✅ API: Antecipar a passagem de ano (fora de dezembro também)"""
+	frappe.only_for(["System Manager"])
+
+	summary = run_series_rollover(int(year) if year else None, force=True)
+	return {"success": True, "summary": summary, "message": _("Séries do próximo ano criadas")}
+
+
+@frappe.whitelist()
+def get_series_rollover_status(year=None):
+	"""✅ API: Resumo da última passagem de ano"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	year = int(year) if year else getdate().year
+	return frappe.cache().get_value(SUMMARY_CACHE_KEY.format(year=year)) or {}
@@ -16,6 +16,8 @@ from frappe import _
 from frappe.utils import cint, getdate, now_datetime
 import re
 
+from portugal_compliance.utils.lazy import LazySingleton
+
 
 class SeriesValidator:
 	"""
@@ -356,35 +358,31 @@ class SeriesValidator:
 				'recommendations': []
 			}
 
-			# ✅ FILTRAR SÉRIES ATIVAS
-			filters = {'is_active': 1}
-			if company:
-				filters['company'] = company
-
-			active_series = frappe.get_all(
-				'Portugal Series Configuration',
-				filters=filters,
-				fields=['name', 'prefix', 'document_type', 'current_sequence', 'company']
-			)
-
-			for series in active_series:
-				try:
-					sequence_analysis['series_analyzed'] += 1
+			# ✅ ESTADO DA AUDITORIA INCREMENTAL (sem reler os documentos de cada série)
+			from portugal_compliance.utils.sequence_audit import get_audit_state
+
+			for series in get_audit_state(company, active_only=True):
+				sequence_analysis['series_analyzed'] += 1
+				sequence_analysis['by_series'][series.prefix] = {
+					'audited_until': series.watermark,
+					'last_checked_sequence': series.last_checked,
+					'max_number': series.max_sequence,
+					'current_sequence': series.current_sequence,
+					'gaps': series.gaps,
+					'gap_count': series.gap_count,
+					'has_gaps': series.gap_count > 0,
+					'duplicates': series.duplicates,
+					'invalid_documents': series.invalid_count
+				}
 
-					# ✅ ANALISAR SEQUÊNCIA DESTA SÉRIE
-					series_analysis = self._analyze_series_sequence(series)
-					sequence_analysis['by_series'][series.prefix] = series_analysis
+				if series.gap_count:
+					sequence_analysis['series_with_gaps'] += 1
+					sequence_analysis['total_gaps'] += series.gap_count
 
-					if series_analysis['has_gaps']:
-						sequence_analysis['series_with_gaps'] += 1
-						sequence_analysis['total_gaps'] += len(series_analysis['gaps'])
-
-				except Exception as e:
-					frappe.log_error(f"Erro ao analisar série {series.prefix}: {str(e)}",
-									 "SeriesValidator")
-					sequence_analysis['by_series'][series.prefix] = {
-						'error': str(e)
-					}
+				if not series.watermark:
+					sequence_analysis['recommendations'].append(
+						f"Série {series.prefix} ainda não foi auditada"
+					)
 
 			# ✅ GERAR RECOMENDAÇÕES
 			if sequence_analysis['series_with_gaps'] > 0:
@@ -401,109 +399,6 @@ class SeriesValidator:
 				'analysis_date': now_datetime()
 			}
 
-	def _analyze_series_sequence(self, series):
-		"""
-		✅ ALINHADO: Analisar sequência de uma série específica
-		"""
-		try:
-			doctype = series.document_type
-			naming_series = f"{series.prefix}.####"
-
-			# ✅ VERIFICAR SE TABELA E CAMPO EXISTEM
-			if not frappe.db.table_exists(f"tab{doctype}"):
-				return {
-					'error': f"Tabela {doctype} não existe",
-					'has_gaps': False
-				}
-
-			# ✅ BUSCAR DOCUMENTOS DESTA SÉRIE
-			docs = frappe.get_all(
-				doctype,
-				filters={
-					'naming_series': naming_series,
-					'docstatus': ['!=', 2]  # Excluir cancelados
-				},
-				fields=['name', 'creation'],
-				order_by='creation'
-			)
-
-			if not docs:
-				return {
-					'total_docs': 0,
-					'has_gaps': False,
-					'gaps': [],
-					'sequence_range': None
-				}
-
-			# ✅ EXTRAIR NÚMEROS DOS DOCUMENTOS
-			numbers = []
-			for doc in docs:
-				# ✅ EXTRAIR NÚMERO DO NOME DO DOCUMENTO
-				number = self._extract_document_number(doc.name)
-				if number:
-					numbers.append(number)
-
-			if not numbers:
-				return {
-					'total_docs': len(docs),
-					'has_gaps': False,
-					'gaps': [],
-					'sequence_range': None,
-					'issue': 'Não foi possível extrair números dos documentos'
-				}
-
-			# ✅ ANALISAR LACUNAS
-			numbers.sort()
-			min_num = min(numbers)
-			max_num = max(numbers)
-
-			gaps = []
-			for i in range(min_num, max_num + 1):
-				if i not in numbers:
-					gaps.append(i)
-
-			return {
-				'total_docs': len(numbers),
-				'min_number': min_num,
-				'max_number': max_num,
-				'current_sequence': series.current_sequence,
-				'gaps': gaps,
-				'has_gaps': len(gaps) > 0,
-				'sequence_range': f"{min_num}-{max_num}",
-				'gap_percentage': round((len(gaps) / (max_num - min_num + 1)) * 100,
-										2) if max_num > min_num else 0
-			}
-
-		except Exception as e:
-			frappe.log_error(f"Erro ao analisar sequência da série {series.prefix}: {str(e)}",
-							 "SeriesValidator")
-			return {
-				'error': str(e),
-				'has_gaps': False
-			}
-
-	def _extract_document_number(self, document_name):
-		"""
-		✅ ALINHADO: Extrair número do documento (formato SEM HÍFENS)
-		"""
-		if not document_name:
-			return None
-
-		# ✅ PADRÕES PARA EXTRAIR NÚMERO
-		patterns = [
-			r'\.(\d+)$',  # ERPNext: FT2025NDX.0001
-			r'-(\d{8})$',  # ATCUD: AAJFJMVNTN-00000001
-			r'-(\d+)$',  # Alternativo: PREFIX-NNNN
-			r'(\d+)$'  # Apenas números no final
-		]
-
-		for pattern in patterns:
-			match = re.search(pattern, document_name)
-			if match:
-				return int(match.group(1))
-
-		return None
-
 	def _generate_recommendations(self, validation_results):
 		"""
 		✅ ALINHADO: Gerar recomendações baseadas na validação
@@ -623,7 +518,7 @@ class SeriesValidator:
 
 
 # ========== INSTÂNCIA GLOBAL ALINHADA ==========
-series_validator = SeriesValidator()
+series_validator = LazySingleton(SeriesValidator)
 
 
 # ========== FUNÇÕES AUXILIARES ALINHADAS ==========
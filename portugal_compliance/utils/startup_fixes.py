@@ -11,6 +11,8 @@ Baseado na sua experiência com programação.sistemas_erp[5]
 import frappe
 from frappe import _
 
+from portugal_compliance.utils import compliance_cache
+
 
 def fix_customer_search_on_startup():
 	"""
@@ -82,6 +84,7 @@ def fix_naming_series_formats():
 
 		if series_with_hyphens:
 			frappe.db.commit()
+			compliance_cache.invalidate("series")
 			frappe.logger().info(
 				f"✅ {len(series_with_hyphens)} séries corrigidas para formato ERPNext")
 
@@ -112,86 +115,18 @@ def setup_naming_series_property_setters():
 	"""
 	✅ VERSÃO DINÂMICA: Property Setters baseados no abbr da empresa
 	Baseado na sua experiência com programação.consistência_de_dados[3]
+	✅ DIFF: Uma consulta às séries, uma aos Property Setters, só escreve o que mudou
+	(utils/naming_series_sync) - bench migrate sem reescritas nem limpezas de meta inúteis
 	"""
 	try:
-		frappe.logger().info("🔧 Configurando Property Setters DINÂMICOS")
-
-		# Buscar todas as empresas portuguesas ativas
-		portuguese_companies = frappe.get_all("Company",
-											  filters={
-												  "country": "Portugal",
-												  "portugal_compliance_enabled": 1
-											  },
-											  fields=["name", "abbr"])
+		from portugal_compliance.utils.naming_series_sync import sync_naming_series_options
 
-		if not portuguese_companies:
-			frappe.logger().info("Nenhuma empresa portuguesa encontrada")
-			return
-
-		# Para cada empresa portuguesa
-		for company in portuguese_companies:
-			try:
-				# ✅ BUSCAR SÉRIES DINÂMICAS BASEADAS NO ABBR
-				company_series = frappe.get_all("Portugal Series Configuration",
-												filters={
-													"company": company.name,
-													"is_active": 1
-												},
-												fields=["document_type", "naming_series"])
-
-				if not company_series:
-					frappe.logger().info(f"Nenhuma série encontrada para {company.name}")
-					continue
-
-				# Agrupar por document_type
-				series_by_doctype = {}
-				for serie in company_series:
-					doctype = serie.document_type
-					if doctype not in series_by_doctype:
-						series_by_doctype[doctype] = []
-					series_by_doctype[doctype].append(serie.naming_series)
-
-				# Configurar Property Setters DINÂMICOS
-				configured_count = 0
-				for doctype, naming_series_list in series_by_doctype.items():
-					try:
-						# ✅ PROPERTY SETTER ESPECÍFICO POR EMPRESA
-						property_setter_name = f"{doctype}-naming_series-options-{company.abbr}"
-
-						# Verificar se já existe
-						if frappe.db.exists("Property Setter", property_setter_name):
-							# Atualizar existente
-							frappe.db.set_value("Property Setter", property_setter_name,
-												"value", '\n'.join(naming_series_list))
-						else:
-							# Criar novo DINÂMICO
-							property_setter = frappe.get_doc({
-								"doctype": "Property Setter",
-								"name": property_setter_name,
-								"doc_type": doctype,
-								"property": "options",
-								"field_name": "naming_series",
-								"property_type": "Text",
-								"value": '\n'.join(naming_series_list),
-								"doctype_or_field": "DocField"
-							})
-							property_setter.insert(ignore_permissions=True)
-
-						frappe.logger().info(f"✅ Property Setter DINÂMICO: {property_setter_name}")
-						configured_count += 1
-
-					except Exception as e:
-						frappe.log_error(
-							f"Erro ao configurar Property Setter para {doctype}: {str(e)}")
-
-				frappe.logger().info(
-					f"✅ {configured_count} Property Setters DINÂMICOS para {company.name} ({company.abbr})")
-
-			except Exception as e:
-				frappe.log_error(f"Erro ao processar empresa {company.name}: {str(e)}")
+		frappe.logger().info("🔧 Configurando Property Setters DINÂMICOS")
 
+		summary = sync_naming_series_options()
 		frappe.db.commit()
-		frappe.logger().info("✅ Property Setters DINÂMICOS configurados")
+
+		frappe.logger().info(f"✅ Property Setters DINÂMICOS configurados: {summary}")
 
 	except Exception as e:
 		frappe.log_error(f"Erro na configuração de Property Setters DINÂMICOS: {str(e)}")
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Task Graph - Portugal Compliance
+Suites diária/semanal/mensal/anual executadas como grafo de jobs independentes
+✅ GRAFO: Cada suite declara TASK_GRAPH = {passo: task(depends_on=...)} no seu módulo
+✅ PARALELO: Passos sem dependências são enfileirados de imediato (workers diferentes);
+   um dependente é enfileirado quando o último dos seus inputs termina
+✅ TIMEOUT: Fila e timeout por passo - um passo lento não prende a suite inteira
+✅ DURAÇÃO: Estado e duração de cada passo no Redis, caminho crítico no fim da execução
+   e histograma "task.<suite>.<passo>" na instrumentação (se ativa)
+✅ SKIP: Passos com fingerprint não correm se os dados de entrada não mudaram
+
+Um passo que falha não bloqueia os dependentes (como na execução sequencial
+anterior, cada passo trata os seus próprios erros); o estado fica registado.
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now
+
+from portugal_compliance.utils.performance_metrics import track
+
+SUITES = {
+	"daily": "portugal_compliance.tasks.daily",
+	"weekly": "portugal_compliance.tasks.weekly",
+	"monthly": "portugal_compliance.tasks.monthly",
+	"yearly": "portugal_compliance.tasks.yearly"
+}
+
+DEFAULT_STEP_TIMEOUT = 600
+STEP_METHOD = "portugal_compliance.utils.task_graph.run_step"
+
+RUN_KEY = "portugal_compliance:task_run:{suite}"
+RUN_TTL = 7 * 24 * 3600
+LAST_RUN_KEY = "portugal_compliance_task_last_run_{suite}"
+FINGERPRINT_KEY = "portugal_compliance_task_fingerprint_{suite}_{step}"
+
+FINISHED_STATUSES = ("success", "skipped", "failed")
+
+
+# ========== DECLARAÇÃO ==========
+
+def task(depends_on=(), timeout=DEFAULT_STEP_TIMEOUT, queue="default", fingerprint=None):
+	"""
+	✅ Declarar um passo do grafo
+
+	Args:
+		depends_on: passos que têm de terminar antes deste
+		timeout: timeout do job (segundos)
+		queue: fila RQ (short/default/long)
+		fingerprint: função sem argumentos que resume os dados de entrada; se o
+			valor for igual ao da última execução com sucesso, o passo é saltado
+	"""
+	return frappe._dict(depends_on=tuple(depends_on), timeout=timeout, queue=queue, fingerprint=fingerprint)
+
+
+def get_graph(suite):
+	if suite not in SUITES:
+		frappe.throw(_("Unknown task suite: {0}").format(suite))
+
+	return frappe.get_module(SUITES[suite]).TASK_GRAPH
+
+
+def get_dependents(graph):
+	"""{passo: [passos que dependem dele]} pela ordem de declaração"""
+	dependents = {step: [] for step in graph}
+	for step, spec in graph.items():
+		for dependency in spec.depends_on:
+			dependents[dependency].append(step)
+
+	return dependents
+
+
+def topological_order(graph):
+	"""
+	✅ Ordem de execução compatível com as dependências (Kahn)
+
+	Raises:
+		ValueError: dependência não declarada ou ciclo
+	"""
+	missing = sorted({
+		dependency for spec in graph.values() for dependency in spec.depends_on if dependency not in graph
+	})
+	if missing:
+		raise ValueError(f"Dependências não declaradas: {', '.join(missing)}")
+
+	pending = {step: len(spec.depends_on) for step, spec in graph.items()}
+	dependents = get_dependents(graph)
+	ready = [step for step, count in pending.items() if not count]
+	order = []
+
+	while ready:
+		step = ready.pop(0)
+		order.append(step)
+		for dependent in dependents[step]:
+			pending[dependent] -= 1
+			if not pending[dependent]:
+				ready.append(dependent)
+
+	if len(order) != len(graph):
+		cycle = sorted(step for step in graph if step not in order)
+		raise ValueError(f"Ciclo de dependências entre: {', '.join(cycle)}")
+
+	return order
+
+
+def critical_path(graph, durations):
+	"""
+	✅ Caminho mais longo pelo grafo com as durações medidas (ms)
+
+	É o tempo mínimo da suite com workers suficientes.
+
+	Returns:
+		dict: {"duration_ms", "steps"}
+	"""
+	finish = {}
+	previous = {}
+
+	for step in topological_order(graph):
+		start, previous[step] = 0, None
+		for dependency in graph[step].depends_on:
+			if finish[dependency] > start:
+				start, previous[step] = finish[dependency], dependency
+		finish[step] = start + flt(durations.get(step))
+
+	if not finish:
+		return {"duration_ms": 0, "steps": []}
+
+	step = max(finish, key=finish.get)
+	duration = finish[step]
+	steps = []
+	while step:
+		steps.append(step)
+		step = previous[step]
+
+	return {"duration_ms": round(duration, 3), "steps": list(reversed(steps))}
+
+
+# ========== EXECUÇÃO DE UM PASSO ==========
+
+def _get_fingerprint(suite, step, spec):
+	if not spec.fingerprint:
+		return None
+
+	try:
+		return str(spec.fingerprint())
+	except Exception as e:
+		frappe.log_error(f"Erro no fingerprint de {suite}.{step}: {str(e)}", "Portugal Compliance Tasks")
+		return None
+
+
+def execute_step(suite, step, spec):
+	"""
+	✅ Correr um passo no processo atual (com commit próprio)
+
+	Returns:
+		tuple: (status, erro) com status em success/skipped/failed
+	"""
+	fingerprint = _get_fingerprint(suite, step, spec)
+	fingerprint_key = FINGERPRINT_KEY.format(suite=suite, step=step)
+
+	if fingerprint is not None and fingerprint == frappe.db.get_global(fingerprint_key):
+		return "skipped", None
+
+	try:
+		method = frappe.get_attr(f"{SUITES[suite]}.{step}")
+		with track(f"task.{suite}.{step}"):
+			method()
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Erro no passo {suite}.{step}: {str(e)}", "Portugal Compliance Tasks")
+		return "failed", str(e)
+
+	if fingerprint is not None:
+		frappe.db.set_global(fingerprint_key, fingerprint)
+		frappe.db.commit()
+
+	return "success", None
+
+
+# ========== EXECUÇÃO DA SUITE (JOBS) ==========
+
+def _run_key(suite):
+	return frappe.cache().make_key(RUN_KEY.format(suite=suite))
+
+
+def _decode(value):
+	return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def start_suite(suite, inline=False):
+	"""
+	✅ Iniciar uma execução da suite
+
+	inline=True corre todos os passos neste processo, por ordem topológica
+	(consola, testes); caso contrário enfileira os passos sem dependências.
+
+	Returns:
+		str: run_id (ou o resumo da execução, se inline)
+	"""
+	graph = get_graph(suite)
+	order = topological_order(graph)
+
+	if inline:
+		return run_suite_inline(suite)
+
+	status = get_run_status(suite)
+	if status and not status["finished"]:
+		frappe.logger().warning(
+			f"Portugal Compliance: {suite} run {status['run_id']} not finished, starting a new run")
+
+	run_id = frappe.generate_hash(length=12)
+	mapping = {"run_id": run_id, "started_at": now(), "total": len(graph), "finished_count": 0}
+	for step, spec in graph.items():
+		mapping[f"{step}|status"] = "waiting" if spec.depends_on else "queued"
+		mapping[f"{step}|pending"] = len(spec.depends_on)
+
+	cache = frappe.cache()
+	key = _run_key(suite)
+	pipe = cache.pipeline()
+	pipe.delete(key)
+	pipe.hset(key, mapping=mapping)
+	pipe.expire(key, RUN_TTL)
+	pipe.execute()
+
+	for step in order:
+		if not graph[step].depends_on:
+			enqueue_step(suite, step, run_id)
+
+	return run_id
+
+
+def enqueue_step(suite, step, run_id):
+	"""Enfileirar um passo com a fila e o timeout declarados"""
+	spec = get_graph(suite)[step]
+	frappe.enqueue(
+		STEP_METHOD,
+		queue=spec.queue,
+		timeout=spec.timeout,
+		job_id=f"portugal_compliance_task::{suite}::{run_id}::{step}",
+		deduplicate=True,
+		suite=suite,
+		step=step,
+		run_id=run_id
+	)
+
+
+def run_step(suite, step, run_id):
+	"""
+	✅ Job de um passo: executa, regista e enfileira os dependentes prontos
+
+	O contador de dependências pendentes é decrementado com HINCRBY, pelo que
+	só o último input a terminar enfileira cada dependente.
+	"""
+	cache = frappe.cache()
+	key = _run_key(suite)
+
+	if _decode(cache.pipeline().hget(key, "run_id").execute()[0]) != run_id:
+		frappe.logger().info(f"Portugal Compliance: {suite}.{step} belongs to a superseded run {run_id}")
+		return
+
+	graph = get_graph(suite)
+	dependents = get_dependents(graph)[step]
+
+	pipe = cache.pipeline()
+	pipe.hset(key, mapping={f"{step}|status": "running", f"{step}|started_at": now()})
+	pipe.execute()
+
+	started = time.perf_counter()
+	status, error = execute_step(suite, step, graph[step])
+	duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+	pipe = cache.pipeline()
+	pipe.hset(key, mapping={
+		f"{step}|status": status,
+		f"{step}|duration_ms": duration_ms,
+		f"{step}|finished_at": now(),
+		f"{step}|error": error or ""
+	})
+	pipe.hincrby(key, "finished_count", 1)
+	pipe.hget(key, "total")
+	for dependent in dependents:
+		pipe.hincrby(key, f"{dependent}|pending", -1)
+	results = pipe.execute()
+
+	finished_count, total = results[1], cint(_decode(results[2]))
+	for dependent, remaining in zip(dependents, results[3:]):
+		if remaining == 0:
+			pipe = cache.pipeline()
+			pipe.hset(key, f"{dependent}|status", "queued")
+			pipe.execute()
+			enqueue_step(suite, dependent, run_id)
+
+	if finished_count == total:
+		finish_run(suite)
+
+
+def finish_run(suite):
+	"""Registar o resumo da execução (soma vs caminho crítico)"""
+	status = get_run_status(suite)
+	frappe.cache().set_value(LAST_RUN_KEY.format(suite=suite), status, expires_in_sec=RUN_TTL * 5)
+
+	frappe.logger().info(
+		f"Portugal Compliance: {suite} tasks finished - critical path "
+		f"{status['critical_path']['duration_ms']} ms, sum {status['sum_ms']} ms, "
+		f"failed: {', '.join(status['failed']) or '-'}, skipped: {', '.join(status['skipped']) or '-'}")
+
+
+def run_suite_inline(suite):
+	"""Correr todos os passos neste processo (ordem topológica)"""
+	graph = get_graph(suite)
+	steps = {}
+
+	for step in topological_order(graph):
+		started = time.perf_counter()
+		status, error = execute_step(suite, step, graph[step])
+		steps[step] = {
+			"status": status,
+			"duration_ms": round((time.perf_counter() - started) * 1000, 3),
+			"error": error
+		}
+
+	return _summarize(suite, graph, None, None, steps)
+
+
+# ========== ESTADO ==========
+
+def _summarize(suite, graph, run_id, started_at, steps):
+	durations = {step: flt(info.get("duration_ms")) for step, info in steps.items()}
+	return {
+		"suite": suite,
+		"run_id": run_id,
+		"started_at": started_at,
+		"finished": all(info.get("status") in FINISHED_STATUSES for info in steps.values()),
+		"steps": steps,
+		"sum_ms": round(sum(durations.values()), 3),
+		"critical_path": critical_path(graph, durations),
+		"failed": [step for step, info in steps.items() if info.get("status") == "failed"],
+		"skipped": [step for step, info in steps.items() if info.get("status") == "skipped"]
+	}
+
+
+def get_run_status(suite):
+	"""
+	✅ Estado da execução atual (ou da última) da suite
+
+	Returns:
+		dict | None
+	"""
+	graph = get_graph(suite)
+	cache = frappe.cache()
+	raw = cache.pipeline().hgetall(_run_key(suite)).execute()[0]
+	if not raw:
+		return None
+
+	fields = {_decode(field): _decode(value) for field, value in raw.items()}
+	steps = {}
+	for step in graph:
+		steps[step] = {
+			"status": fields.get(f"{step}|status"),
+			"duration_ms": flt(fields.get(f"{step}|duration_ms")) if f"{step}|duration_ms" in fields else None,
+			"started_at": fields.get(f"{step}|started_at"),
+			"finished_at": fields.get(f"{step}|finished_at"),
+			"error": fields.get(f"{step}|error") or None
+		}
+
+	return _summarize(suite, graph, fields.get("run_id"), fields.get("started_at"), steps)
+
+
+@frappe.whitelist()
+def get_task_run_status(suite="daily"):
+	"""✅ API: Estado da execução atual e resumo da última execução terminada"""
+	frappe.only_for("System Manager")
+
+	return {
+		"current": get_run_status(suite),
+		"last_finished": frappe.cache().get_value(LAST_RUN_KEY.format(suite=suite)),
+		"graph": {step: list(spec.depends_on) for step, spec in get_graph(suite).items()}
+	}
+
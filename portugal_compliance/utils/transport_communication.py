@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, NovaDX - Octávio Daio and contributors
+# For license information, please see license.txt
+
+"""
+Transport Communication - Portugal Compliance
+Comunicação de documentos de transporte (Guias) à AT em background
+✅ FILA DURÁVEL: A submissão só marca o documento como Pending (at_transport_status) -
+   sem pedido SOAP no caminho de submissão da Delivery Note / Stock Entry
+✅ LOTES: Um job deduplicado lê os pendentes em lotes (keyset por name), carrega
+   itens, moradas e NIFs de todo o lote de uma vez e grava o código AT no documento
+✅ SESSÃO PARTILHADA: Uma sessão HTTP (keep-alive) por ambiente durante todo o job
+✅ RETRIES: Timeouts/erros de ligação/5xx repetidos com backoff no próprio pedido;
+   se falharem todos, o documento fica Pending até MAX_ATTEMPTS execuções
+   (retomado pela tarefa horária). Erros de validação da AT marcam Failed logo.
+✅ STUB: site_config portugal_compliance_at_transport_endpoint = "stub" responde
+   localmente (sem certificados nem rede); um URL http:// aponta para um stub local
+
+Endpoint (site_config): portugal_compliance_at_transport_endpoint
+Lote (site_config): portugal_compliance_at_transport_batch_size
+"""
+
+import hashlib
+import re
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import frappe
+import requests
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, getdate, now, now_datetime
+from requests.adapters import BaseAdapter
+
+from portugal_compliance.utils import compliance_cache
+
+# Stock Entry só é documento de transporte quando há movimento de mercadorias para fora
+TRANSPORT_DOCTYPES = {
+	"Delivery Note": None,
+	"Stock Entry": ("Material Transfer", "Send to Subcontractor")
+}
+
+STATUS_FIELD = "at_transport_status"
+CODE_FIELD = "at_transport_code"
+MESSAGE_FIELD = "at_transport_message"
+ATTEMPTS_FIELD = "at_transport_attempts"
+
+ENDPOINTS = {
+	"test": "https://servicos.portaldasfinancas.gov.pt:701/sgdtws/documentosTransporte",
+	"production": "https://servicos.portaldasfinancas.gov.pt:401/sgdtws/documentosTransporte"
+}
+STUB_ENDPOINT = "stub://at/sgdtws/documentosTransporte"
+
+DISPATCH_JOB_ID = "portugal_compliance_transport_dispatch"
+DEFAULT_BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+REQUEST_RETRIES = 3
+RETRY_DELAY = 2
+REQUEST_TIMEOUT = 30
+
+MOVEMENT_TYPES = ("GR", "GT", "GA", "GC", "GD")
+DEFAULT_MOVEMENT_TYPE = {"Delivery Note": "GR", "Stock Entry": "GT"}
+
+
+class TransportTransientError(Exception):
+	"""Falha temporária (timeout, ligação, HTTP 5xx) - o documento fica Pending"""
+
+
+def get_batch_size():
+	"""Documentos por lote (site_config: portugal_compliance_at_transport_batch_size)"""
+	return max(cint(frappe.conf.get("portugal_compliance_at_transport_batch_size")) or DEFAULT_BATCH_SIZE, 1)
+
+
+def get_endpoint(environment):
+	"""Endpoint do ambiente (site_config sobrepõe; "stub" = resposta local)"""
+	configured = frappe.conf.get("portugal_compliance_at_transport_endpoint")
+	if configured == "stub":
+		return STUB_ENDPOINT
+
+	return configured or ENDPOINTS.get(environment) or ENDPOINTS["test"]
+
+
+def is_transport_document(doc):
+	purposes = TRANSPORT_DOCTYPES.get(doc.doctype, ())
+	return doc.doctype in TRANSPORT_DOCTYPES and (purposes is None or doc.get("purpose") in purposes)
+
+
+# ========== DOC EVENTS ==========
+
+def mark_transport_document(doc, method=None):
+	"""✅ before_submit: marcar como pendente (gravado com a submissão, sem escrita extra)"""
+	if not doc.meta.has_field(STATUS_FIELD) or not is_transport_document(doc):
+		return
+
+	if not compliance_cache.is_portuguese_company(doc.company):
+		return
+
+	doc.set(STATUS_FIELD, "Pending")
+	doc.set(ATTEMPTS_FIELD, 0)
+	doc.set(MESSAGE_FIELD, None)
+
+
+def queue_transport_document(doc, method=None):
+	"""✅ on_submit: acordar o dispatcher depois do commit (um job para todos os documentos)"""
+	if doc.get(STATUS_FIELD) == "Pending":
+		enqueue_transport_dispatch()
+
+
+def enqueue_transport_dispatch():
+	frappe.enqueue(
+		"portugal_compliance.utils.transport_communication.dispatch_transport_documents",
+		queue="long",
+		timeout=3600,
+		job_id=DISPATCH_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True
+	)
+
+
+# ========== CONSTRUÇÃO DOS DOCUMENTOS (EM LOTE) ==========
+
+def get_movement_type(doctype, name):
+	"""Tipo de guia a partir do prefixo do documento (GR2025NDX0001 -> GR)"""
+	code = (name or "")[:2].upper()
+	return code if code in MOVEMENT_TYPES else DEFAULT_MOVEMENT_TYPE[doctype]
+
+
+def _address(detail=None, city=None, postal_code=None, country="PT"):
+	return {"detail": detail or "", "city": city or "", "postal_code": postal_code or "", "country": country or "PT"}
+
+
+def _start_time(date_value, time_value):
+	"""Início do transporte: data/hora do documento, nunca antes do momento da comunicação"""
+	start = get_datetime(f"{getdate(date_value)} {time_value or '00:00:00'}")
+	return max(start, now_datetime()).replace(microsecond=0)
+
+
+def load_transport_documents(doctype, names):
+	"""
+	✅ Dados de envio de um lote de documentos com um número fixo de consultas
+
+	Returns:
+		list: frappe._dict por documento (formato de build_transport_envelope)
+	"""
+	if not names:
+		return []
+
+	is_delivery_note = doctype == "Delivery Note"
+	parent_fields = ["name", "company", "posting_date", "posting_time", "atcud_code"]
+	if is_delivery_note:
+		parent_fields += ["customer", "customer_name", "customer_address", "shipping_address_name",
+						  "company_address", "set_warehouse", "lr_date", "vehicle_no"]
+		item_doctype, item_fields = "Delivery Note Item", ["parent", "item_name", "qty", "uom", "base_net_rate",
+														   "warehouse"]
+	else:
+		parent_fields += ["purpose", "from_warehouse", "to_warehouse", "supplier", "supplier_name",
+						  "supplier_address"]
+		item_doctype, item_fields = "Stock Entry Detail", ["parent", "item_name", "qty", "uom", "basic_rate",
+														   "s_warehouse", "t_warehouse"]
+
+	parents = frappe.get_all(doctype, filters={"name": ["in", names]}, fields=parent_fields)
+	items_by_parent = {}
+	for item in frappe.get_all(item_doctype, filters={"parent": ["in", names], "parenttype": doctype},
+							   fields=item_fields, order_by="parent, idx"):
+		items_by_parent.setdefault(item.parent, []).append(item)
+
+	companies = {
+		company.name: company
+		for company in frappe.get_all("Company", filters={"name": ["in", list({p.company for p in parents})]},
+									  fields=["name", "company_name", "tax_id"])
+	}
+
+	warehouse_names, address_names = set(), set()
+	for parent in parents:
+		first = (items_by_parent.get(parent.name) or [frappe._dict()])[0]
+		if is_delivery_note:
+			parent.warehouse_from = parent.set_warehouse or first.get("warehouse")
+			warehouse_names.add(parent.warehouse_from)
+			address_names.update([parent.company_address, parent.customer_address, parent.shipping_address_name])
+		else:
+			parent.warehouse_from = parent.from_warehouse or first.get("s_warehouse")
+			parent.warehouse_to = parent.to_warehouse or first.get("t_warehouse")
+			warehouse_names.update([parent.warehouse_from, parent.warehouse_to])
+			address_names.add(parent.supplier_address)
+
+	warehouses = _load_by_name("Warehouse", warehouse_names, ["name", "address_line_1", "city", "pin"])
+	addresses = _load_by_name("Address", address_names, ["name", "address_line1", "city", "pincode", "country"])
+	countries = {
+		country.name: (country.code or "PT").upper()
+		for country in _load_by_name("Country", {a.country for a in addresses.values()}, ["name", "code"]).values()
+	}
+
+	if is_delivery_note:
+		party_tax_ids = _load_by_name("Customer", {p.customer for p in parents}, ["name", "tax_id"])
+	else:
+		party_tax_ids = _load_by_name("Supplier", {p.supplier for p in parents}, ["name", "tax_id"])
+
+	def warehouse_address(name):
+		warehouse = warehouses.get(name)
+		return _address(warehouse.address_line_1, warehouse.city, warehouse.pin) if warehouse else _address(name)
+
+	def party_address(name, fallback):
+		address = addresses.get(name)
+		if not address:
+			return fallback
+		return _address(address.address_line1, address.city, address.pincode, countries.get(address.country))
+
+	documents = []
+	for parent in parents:
+		company = companies.get(parent.company) or frappe._dict(company_name=parent.company)
+		address_from = party_address(parent.get("company_address"), warehouse_address(parent.warehouse_from))
+
+		if is_delivery_note:
+			party = party_tax_ids.get(parent.customer) or frappe._dict()
+			customer = (party.tax_id, parent.customer_name or parent.customer)
+			address_to = party_address(parent.shipping_address_name,
+									   party_address(parent.customer_address, _address()))
+			customer_address = party_address(parent.customer_address, address_to)
+			start = _start_time(parent.lr_date or parent.posting_date, parent.posting_time)
+			lines = [(item.item_name, item.qty, item.uom, item.base_net_rate)
+					 for item in items_by_parent.get(parent.name, [])]
+		else:
+			party = party_tax_ids.get(parent.supplier) if parent.supplier else None
+			# Transferência entre armazéns próprios: o destinatário é a própria empresa
+			customer = (party.tax_id, parent.supplier_name) if party else (company.tax_id, company.company_name)
+			address_to = party_address(parent.supplier_address, warehouse_address(parent.warehouse_to))
+			customer_address = address_to if party else address_from
+			start = _start_time(parent.posting_date, parent.posting_time)
+			lines = [(item.item_name, item.qty, item.uom, item.basic_rate)
+					 for item in items_by_parent.get(parent.name, [])]
+
+		documents.append(frappe._dict({
+			"doctype": doctype,
+			"name": parent.name,
+			"company": parent.company,
+			"company_tax_id": company.tax_id or "",
+			"company_name": company.company_name or parent.company,
+			"company_address": address_from,
+			"atcud": parent.atcud_code or "",
+			"movement_type": get_movement_type(doctype, parent.name),
+			"movement_date": getdate(parent.posting_date),
+			"movement_start_time": start,
+			"customer_tax_id": customer[0] or "999999990",
+			"customer_name": customer[1] or "",
+			"customer_address": customer_address,
+			"address_to": address_to,
+			"address_from": address_from,
+			"vehicle_id": parent.get("vehicle_no") or "",
+			"lines": [
+				{"description": description, "quantity": flt(qty), "uom": uom or "UN", "unit_price": flt(price)}
+				for description, qty, uom, price in lines
+			]
+		}))
+
+	return documents
+
+
+def _load_by_name(doctype, names, fields):
+	names = [name for name in names if name]
+	if not names:
+		return {}
+	return {row.name: row for row in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=fields)}
+
+
+# ========== SOAP ==========
+
+def _address_xml(tag, address):
+	return (
+		f"<{tag}><Addressdetail>{escape(address['detail'][:100])}</Addressdetail>"
+		f"<City>{escape(address['city'][:50])}</City>"
+		f"<PostalCode>{escape(address['postal_code'])}</PostalCode>"
+		f"<Country>{escape(address['country'])}</Country></{tag}>"
+	)
+
+
+def build_transport_envelope(document, credentials):
+	"""✅ Envelope envioDocumentoTransporte (WS-Security igual ao registo de séries)"""
+	lines = "".join(
+		f"<Line><ProductDescription>{escape((line['description'] or '')[:200])}</ProductDescription>"
+		f"<Quantity>{line['quantity']:.2f}</Quantity>"
+		f"<UnitOfMeasure>{escape(line['uom'])}</UnitOfMeasure>"
+		f"<UnitPrice>{line['unit_price']:.2f}</UnitPrice></Line>"
+		for line in document.lines
+	)
+	vehicle = f"<VehicleID>{escape(document.vehicle_id)}</VehicleID>" if document.vehicle_id else ""
+
+	return (
+		'<?xml version="1.0" encoding="utf-8"?>'
+		'<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+		'xmlns:doc="https://servicos.portaldasfinancas.gov.pt/sgdtws/documentosTransporte/">'
+		'<soapenv:Header><wss:Security xmlns:wss="http://schemas.xmlsoap.org/ws/2002/12/secext">'
+		f"<wss:UsernameToken><wss:Username>{escape(credentials['username'])}</wss:Username>"
+		f"<wss:Password>{escape(credentials['password'])}</wss:Password>"
+		f"<wss:Nonce>{escape(credentials['nonce'])}</wss:Nonce>"
+		f"<wss:Created>{escape(credentials['created'])}</wss:Created></wss:UsernameToken>"
+		"</wss:Security></soapenv:Header>"
+		"<soapenv:Body><doc:envioDocumentoTransporteRequestElem>"
+		f"<TaxRegistrationNumber>{escape(document.company_tax_id)}</TaxRegistrationNumber>"
+		f"<CompanyName>{escape(document.company_name)}</CompanyName>"
+		f"{_address_xml('CompanyAddress', document.company_address)}"
+		f"<DocumentNumber>{escape(document.name)}</DocumentNumber>"
+		f"<ATCUD>{escape(document.atcud)}</ATCUD>"
+		"<MovementStatus>N</MovementStatus>"
+		f"<MovementDate>{document.movement_date.isoformat()}</MovementDate>"
+		f"<MovementType>{document.movement_type}</MovementType>"
+		f"<CustomerTaxID>{escape(document.customer_tax_id)}</CustomerTaxID>"
+		f"{_address_xml('CustomerAddress', document.customer_address)}"
+		f"<CustomerName>{escape(document.customer_name)}</CustomerName>"
+		f"{_address_xml('AddressTo', document.address_to)}"
+		f"{_address_xml('AddressFrom', document.address_from)}"
+		f"<MovementStartTime>{document.movement_start_time.isoformat()}</MovementStartTime>"
+		f"{vehicle}{lines}"
+		"</doc:envioDocumentoTransporteRequestElem></soapenv:Body></soapenv:Envelope>"
+	)
+
+
+def parse_transport_response(status_code, response_text):
+	"""
+	Resultado de um envio
+
+	Returns:
+		dict: {"success", "code" (ATDocCodeID), "message"}
+
+	Raises:
+		TransportTransientError: HTTP 5xx sem SOAP Fault (repetir mais tarde)
+	"""
+	response_text = response_text or ""
+	fault = re.search(r"<faultstring>(.*?)</faultstring>", response_text, re.S)
+	if status_code >= 500 and not fault:
+		raise TransportTransientError(f"HTTP {status_code}")
+
+	return_code = re.search(r"<ReturnCode>(-?\d+)</ReturnCode>", response_text)
+	message = re.search(r"<ReturnMessage>(.*?)</ReturnMessage>", response_text, re.S) or fault
+	doc_code = re.search(r"<ATDocCodeID>([A-Za-z0-9]+)</ATDocCodeID>", response_text)
+
+	message = message.group(1).strip() if message else f"HTTP {status_code}"
+	if status_code == 200 and return_code and cint(return_code.group(1)) == 0 and doc_code:
+		return {"success": True, "code": doc_code.group(1), "message": message}
+
+	return {"success": False, "code": None, "message": message}
+
+
+class StubTransportAdapter(BaseAdapter):
+	"""
+	Resposta local do serviço de documentos de transporte (stub://)
+	Código AT determinístico a partir do número do documento; sem rede nem certificados.
+	"""
+
+	def send(self, request, **kwargs):
+		body = request.body.decode("utf-8") if isinstance(request.body, bytes) else (request.body or "")
+		number = re.search(r"<DocumentNumber>(.*?)</DocumentNumber>", body)
+
+		response = requests.Response()
+		response.request = request
+		response.url = request.url
+		response.encoding = "utf-8"
+
+		if not number:
+			response.status_code = 400
+			response._content = b"<ReturnCode>-1</ReturnCode><ReturnMessage>DocumentNumber em falta</ReturnMessage>"
+			return response
+
+		doc_code = str(int(hashlib.sha1(number.group(1).encode("utf-8")).hexdigest()[:12], 16))[:9]
+		response.status_code = 200
+		response._content = (
+			"<envioDocumentoTransporteResponseElem><ReturnCode>0</ReturnCode>"
+			f"<ReturnMessage>OK (stub)</ReturnMessage><ATDocCodeID>{doc_code}</ATDocCodeID>"
+			"</envioDocumentoTransporteResponseElem>"
+		).encode("utf-8")
+		return response
+
+	def close(self):
+		pass
+
+
+class TransportClient:
+	"""
+	Cliente de um ambiente: uma sessão HTTP reutilizada por todos os envios do job
+	Credenciais lidas uma vez por empresa e cifradas por pedido (nonce/timestamp novos).
+	"""
+
+	def __init__(self, environment):
+		self.environment = environment
+		self.endpoint = get_endpoint(environment)
+		self.credentials = {}
+		self.at_client = None
+
+		if self.endpoint.startswith("stub://"):
+			self.session = requests.Session()
+			self.session.mount("stub://", StubTransportAdapter())
+		elif self.endpoint.startswith("http://"):
+			# Stub HTTP local (sem TLS mútuo)
+			self.session = requests.Session()
+		else:
+			from portugal_compliance.utils.at_webservice import ATWebserviceClient
+
+			self.at_client = ATWebserviceClient(environment)
+			self.session = self.at_client.get_authenticated_session()
+
+	def get_credentials(self, company):
+		if company not in self.credentials:
+			if self.at_client:
+				self.credentials[company] = self.at_client.get_secure_credentials(company)
+			else:
+				self.credentials[company] = {"username": "stub", "password": "stub"}
+
+		credentials = self.credentials[company]
+		if not self.at_client:
+			return {"username": credentials["username"], "password": credentials["password"], "nonce": "",
+					"created": datetime.utcnow().isoformat()}
+
+		return self.at_client.encrypt_credentials(credentials["username"], credentials["password"])
+
+	def send(self, document):
+		"""Enviar um documento; timeouts/ligação/5xx repetidos com backoff"""
+		envelope = build_transport_envelope(document, self.get_credentials(document.company))
+		headers = {
+			"Content-Type": "text/xml; charset=utf-8",
+			"SOAPAction": "https://servicos.portaldasfinancas.gov.pt/sgdtws/documentosTransporte/",
+			"User-Agent": "Portugal-Compliance-ERPNext-Native/2.0"
+		}
+
+		last_error = None
+		for attempt in range(REQUEST_RETRIES):
+			try:
+				response = self.session.post(self.endpoint, data=envelope.encode("utf-8"), headers=headers,
+											 timeout=REQUEST_TIMEOUT)
+				return parse_transport_response(response.status_code, response.text)
+
+			except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+					TransportTransientError) as e:
+				last_error = e
+				if attempt < REQUEST_RETRIES - 1:
+					time.sleep(RETRY_DELAY * (attempt + 1))
+
+		raise TransportTransientError(str(last_error))
+
+	def close(self):
+		self.session.close()
+
+
+# ========== DISPATCHER ==========
+
+def dispatch_transport_documents(batch_size=None):
+	"""
+	✅ Job: comunicar todos os documentos de transporte pendentes, lote a lote
+
+	Relê a fila até esvaziar (documentos submetidos durante o job também são enviados).
+	Commit por lote: um job interrompido não repete os já comunicados.
+
+	Returns:
+		dict: {"communicated", "failed", "retry"}
+	"""
+	batch_size = batch_size or get_batch_size()
+	summary = {"communicated": 0, "failed": 0, "retry": 0}
+	clients = {}
+	environments = {}
+
+	try:
+		for doctype in TRANSPORT_DOCTYPES:
+			last_name = ""
+			while True:
+				rows = frappe.get_all(
+					doctype,
+					filters={"docstatus": 1, STATUS_FIELD: "Pending", "name": [">", last_name]},
+					fields=["name", "company", ATTEMPTS_FIELD],
+					order_by="name asc",
+					limit=batch_size
+				)
+				if not rows:
+					break
+
+				last_name = rows[-1].name
+				attempts = {row.name: cint(row.get(ATTEMPTS_FIELD)) for row in rows}
+
+				for company in {row.company for row in rows} - set(environments):
+					environments[company] = frappe.db.get_value("Company", company, "at_environment") or "test"
+
+				for document in load_transport_documents(doctype, [row.name for row in rows]):
+					environment = environments[document.company]
+					if environment not in clients:
+						clients[environment] = TransportClient(environment)
+
+					outcome = _send_document(clients[environment], document, attempts[document.name])
+					summary[outcome] += 1
+
+				frappe.db.commit()
+
+	finally:
+		for client in clients.values():
+			client.close()
+
+	if any(summary.values()):
+		frappe.logger().info(f"Portugal Compliance: transport documents dispatched - {summary}")
+
+	return summary
+
+
+def _send_document(client, document, attempts):
+	"""Enviar e gravar o resultado no documento; devolve communicated / failed / retry"""
+	try:
+		result = client.send(document)
+	except TransportTransientError as e:
+		attempts += 1
+		status = "Failed" if attempts >= MAX_ATTEMPTS else "Pending"
+		_set_transport_fields(document, status, None, str(e), attempts)
+		if status == "Failed":
+			frappe.log_error(f"Guia {document.name} não comunicada após {attempts} tentativas: {str(e)}",
+							 "AT Transport Communication")
+		return "failed" if status == "Failed" else "retry"
+	except Exception as e:
+		frappe.log_error(f"Erro ao comunicar guia {document.name}: {str(e)}", "AT Transport Communication")
+		_set_transport_fields(document, "Failed", None, str(e), attempts + 1)
+		return "failed"
+
+	if result["success"]:
+		_set_transport_fields(document, "Communicated", result["code"], result["message"], attempts + 1)
+		return "communicated"
+
+	# Erro de validação da AT: repetir não resolve - corrigir e usar retry_transport_document
+	_set_transport_fields(document, "Failed", None, result["message"], attempts + 1)
+	return "failed"
+
+
+def _set_transport_fields(document, status, code, message, attempts):
+	values = {STATUS_FIELD: status, MESSAGE_FIELD: (message or "")[:500], ATTEMPTS_FIELD: attempts}
+	if code:
+		values[CODE_FIELD] = code
+
+	frappe.db.set_value(document.doctype, document.name, values, update_modified=False)
+
+
+def get_transport_queue_counts():
+	"""Documentos por estado, por doctype (uma consulta agrupada por doctype)"""
+	counts = {}
+	for doctype in TRANSPORT_DOCTYPES:
+		rows = frappe.db.sql(f"""
+			SELECT `{STATUS_FIELD}`, COUNT(*)
+			FROM `tab{doctype}`
+			WHERE docstatus = 1 AND IFNULL(`{STATUS_FIELD}`, '') != ''
+			GROUP BY `{STATUS_FIELD}`
+		""")
+		counts[doctype] = {status: cint(count) for status, count in rows}
+
+	return counts
+
+
+def resume_transport_queue():
+	"""✅ Tarefa horária: voltar a enviar pendentes (falhas temporárias, jobs perdidos)"""
+	for doctype in TRANSPORT_DOCTYPES:
+		if frappe.db.exists(doctype, {"docstatus": 1, STATUS_FIELD: "Pending"}):
+			enqueue_transport_dispatch()
+			return True
+
+	return False
+
+
+# ========== APIS WHITELISTED ==========
+
+@frappe.whitelist()
+def get_transport_queue_status():
+	"""✅ API: Estado da fila de documentos de transporte"""
+	frappe.only_for(["System Manager", "Accounts Manager", "Stock Manager"])
+	return {"success": True, "counts": get_transport_queue_counts(), "checked_at": now()}
+
+
+@frappe.whitelist()
+def retry_transport_document(doctype, name):
+	"""✅ API: Voltar a pôr uma guia falhada na fila (depois de corrigir os dados)"""
+	if doctype not in TRANSPORT_DOCTYPES:
+		frappe.throw(_("{0} is not a transport document").format(doctype))
+
+	doc = frappe.get_doc(doctype, name)
+	doc.check_permission("submit")
+
+	if doc.docstatus != 1 or doc.get(STATUS_FIELD) == "Communicated":
+		return {"success": False, "message": _("Document is not pending communication")}
+
+	doc.db_set({STATUS_FIELD: "Pending", ATTEMPTS_FIELD: 0, MESSAGE_FIELD: None}, update_modified=False)
+	enqueue_transport_dispatch()
+	return {"success": True, "message": _("Transport document queued for AT communication")}